@@ -0,0 +1,125 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import datetime
+import os
+
+from redisbench_admin.utils.remote import (
+    PERFORMANCE_RTS_HOST,
+    PERFORMANCE_RTS_PORT,
+    PERFORMANCE_RTS_AUTH,
+    extract_git_vars,
+    PERFORMANCE_RTS_USER,
+)
+
+(
+    GITHUB_ORG,
+    GITHUB_REPO,
+    _,
+    _,
+    _,
+    _,
+) = extract_git_vars()
+
+# environment variables
+CHANGEPOINTS_WORKERS = int(os.getenv("CHANGEPOINTS_WORKERS", "8"))
+CHANGEPOINTS_TEST_NAMES_CHUNK_SIZE = int(
+    os.getenv("CHANGEPOINTS_TEST_NAMES_CHUNK_SIZE", "100")
+)
+
+
+def create_detect_changepoints_arguments(parser):
+    parser.add_argument("--github_repo", type=str, default=GITHUB_REPO)
+    parser.add_argument("--github_org", type=str, default=GITHUB_ORG)
+    parser.add_argument("--triggering_env", type=str, default="circleci")
+    parser.add_argument(
+        "--test",
+        type=str,
+        default="",
+        help="specify a test (or a comma separated list of tests) to analyze. If none is specified by default will use all the project tests.",
+    )
+    parser.add_argument("--deployment_name", type=str, default=None)
+    parser.add_argument("--metric_name", type=str, default=None)
+    parser.add_argument("--running_platform", type=str, default=None)
+    parser.add_argument(
+        "--branch",
+        type=str,
+        default="master",
+        help="analyze the by.branch time-series of this branch",
+    )
+    parser.add_argument(
+        "--tag",
+        type=str,
+        default=None,
+        help="analyze the by.version time-series of this version tag instead of a branch",
+    )
+    parser.add_argument(
+        "--extra-filter",
+        type=str,
+        default=[],
+        action="append",
+        help="additional RedisTimeSeries label filter (e.g. arch=aarch64). Can be specified multiple times.",
+    )
+    parser.add_argument(
+        "--from-date",
+        type=lambda s: datetime.datetime.strptime(s, "%Y-%m-%d"),
+        default=None,
+        help="by default the full history is analyzed",
+    )
+    parser.add_argument(
+        "--to-date",
+        type=lambda s: datetime.datetime.strptime(s, "%Y-%m-%d"),
+        default=None,
+    )
+    parser.add_argument(
+        "--penalty-factor",
+        type=float,
+        default=3.0,
+        help="Penalty of each change point, in units of noise variance * log(number of samples). Higher values detect fewer change points.",
+    )
+    parser.add_argument(
+        "--min-segment-size",
+        type=int,
+        default=5,
+        help="Minimum number of samples on each side of a change point.",
+    )
+    parser.add_argument(
+        "--min-change-percent",
+        type=float,
+        default=5.0,
+        help="Ignore mean shifts below this percentage. (0-100)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=CHANGEPOINTS_WORKERS,
+        help="Number of threads fetching and analyzing the time-series. Also bounds the number of connections to RedisTimeSeries.",
+    )
+    parser.add_argument(
+        "--report-days",
+        type=int,
+        default=7,
+        help="Print the change points detected over the last N days.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Only print the detected change points, without writing the annotations to RedisTimeSeries.",
+    )
+    parser.add_argument(
+        "--redistimeseries_host", type=str, default=PERFORMANCE_RTS_HOST
+    )
+    parser.add_argument(
+        "--redistimeseries_port", type=int, default=PERFORMANCE_RTS_PORT
+    )
+    parser.add_argument(
+        "--redistimeseries_pass", type=str, default=PERFORMANCE_RTS_AUTH
+    )
+    parser.add_argument(
+        "--redistimeseries_user", type=str, default=PERFORMANCE_RTS_USER
+    )
+    return parser
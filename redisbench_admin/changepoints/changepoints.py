@@ -0,0 +1,351 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import datetime
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+from pytablewriter import MarkdownTableWriter
+
+from redisbench_admin.changepoints.args import CHANGEPOINTS_TEST_NAMES_CHUNK_SIZE
+from redisbench_admin.changepoints.detection import get_changepoints_batch
+from redisbench_admin.compare.compare import (
+    get_test_names_filter_chunks,
+    get_timeseries_by_test_name,
+)
+from redisbench_admin.compare.stats import get_datapoints_values
+from redisbench_admin.run.common import get_start_time_vars
+from redisbench_admin.utils.remote import (
+    COMPACTION_LABEL,
+    get_overall_dashboard_keynames,
+)
+
+
+def get_project_changepoints_keys(triggering_env, org, repo):
+    """
+    Returns the sorted set of change point annotations of a project
+    ( member "<time-series name>:<timestamp>", scored by the change timestamp )
+    and the hash holding the change points details of each time-series.
+    """
+    prefix = "ci.benchmarks.redislabs/{}/{}/{}:changepoints".format(
+        triggering_env, org, repo
+    )
+    return "{}:zset".format(prefix), "{}:by_ts_name".format(prefix)
+
+
+def get_changepoint_member(ts_name, timestamp):
+    return "{}:{}".format(ts_name, timestamp)
+
+
+def get_changepoints_filters(
+    tf_github_org,
+    tf_github_repo,
+    tf_triggering_env,
+    by_key,
+    by_value,
+    metric_name=None,
+    deployment_name=None,
+    running_platform=None,
+    extra_filters=[],
+):
+    filters = [
+        "github_org={}".format(tf_github_org),
+        "github_repo={}".format(tf_github_repo),
+        "triggering_env={}".format(tf_triggering_env),
+        "{}={}".format(by_key, by_value),
+        # only the raw series, not their compaction tiers
+        "{}=".format(COMPACTION_LABEL),
+    ]
+    if metric_name is not None:
+        filters.append("metric={}".format(metric_name))
+    if deployment_name is not None:
+        filters.append("deployment_name={}".format(deployment_name))
+    if running_platform is not None:
+        filters.append("running_platform={}".format(running_platform))
+    filters.extend(extra_filters)
+    return filters
+
+
+def detect_changepoints_command_logic(args, project_name, project_version):
+    logging.info(
+        "Using: {project_name} {project_version}".format(
+            project_name=project_name, project_version=project_version
+        )
+    )
+    logging.info(
+        "Checking connection to RedisTimeSeries with user: {}, host: {}, port: {}".format(
+            args.redistimeseries_user,
+            args.redistimeseries_host,
+            args.redistimeseries_port,
+        )
+    )
+    workers = max(1, args.workers)
+    connection_pool = redis.BlockingConnectionPool(
+        max_connections=workers,
+        host=args.redistimeseries_host,
+        port=args.redistimeseries_port,
+        password=args.redistimeseries_pass,
+        username=args.redistimeseries_user,
+        retry_on_timeout=True,
+    )
+    rts = redis.Redis(connection_pool=connection_pool)
+    rts.ping()
+    tf_github_org = args.github_org
+    tf_github_repo = args.github_repo
+    tf_triggering_env = args.triggering_env
+    by_key = "branch"
+    by_value = args.branch
+    if args.tag is not None:
+        by_key = "version"
+        by_value = args.tag
+    from_ts_ms = 0
+    _, to_ts_ms, _ = get_start_time_vars()
+    if args.from_date is not None:
+        _, from_ts_ms, _ = get_start_time_vars(args.from_date)
+    if args.to_date is not None:
+        _, to_ts_ms, _ = get_start_time_vars(args.to_date)
+    filters = get_changepoints_filters(
+        tf_github_org,
+        tf_github_repo,
+        tf_triggering_env,
+        by_key,
+        by_value,
+        args.metric_name,
+        args.deployment_name,
+        args.running_platform,
+        args.extra_filter,
+    )
+    if args.test != "":
+        test_names = args.test.split(",")
+    else:
+        _, testcases_setname, *_ = get_overall_dashboard_keynames(
+            tf_github_org, tf_github_repo, tf_triggering_env
+        )
+        test_names = sorted([x.decode() for x in rts.smembers(testcases_setname)])
+        logging.info(
+            "Detected {} tests on {}".format(len(test_names), testcases_setname)
+        )
+    if len(test_names) == 0:
+        logging.warning("No tests to analyze. Exiting...")
+        return
+    zset_key = None
+    series_key = None
+    if args.dry_run is False:
+        zset_key, series_key = get_project_changepoints_keys(
+            tf_triggering_env, tf_github_org, tf_github_repo
+        )
+    logging.info(
+        "Detecting change points on the time-series matching {}".format(
+            " ".join(filters)
+        )
+    )
+    total_series, changepoints = detect_changepoints(
+        rts,
+        filters,
+        test_names,
+        from_ts_ms,
+        to_ts_ms,
+        args.penalty_factor,
+        args.min_segment_size,
+        args.min_change_percent,
+        workers,
+        zset_key,
+        series_key,
+    )
+    logging.info(
+        "Detected {} change points across {} time-series".format(
+            len(changepoints), total_series
+        )
+    )
+    if zset_key is not None:
+        logging.info(
+            "Change point annotations written to {} and {}".format(zset_key, series_key)
+        )
+    report_from_ts_ms = to_ts_ms - args.report_days * 24 * 60 * 60 * 1000
+    print_changepoints_table(
+        [x for x in changepoints if x[0] >= report_from_ts_ms],
+        "Change points detected over the last {} days on {} {}".format(
+            args.report_days, by_key, by_value
+        ),
+    )
+
+
+def detect_changepoints(
+    rts,
+    filters,
+    test_names,
+    from_ts_ms,
+    to_ts_ms,
+    penalty_factor=3.0,
+    min_segment_size=5,
+    min_change_percent=5.0,
+    workers=1,
+    zset_key=None,
+    series_key=None,
+    chunk_size=CHANGEPOINTS_TEST_NAMES_CHUNK_SIZE,
+):
+    """
+    Detects the change points of every time-series matching the filters for
+    the given tests. Each chunk of tests is bulk fetched with TS.MREVRANGE and
+    analyzed in a single batch, with up to `workers` chunks in flight.
+    When zset_key and series_key are given the change points are written back
+    as annotations ( see write_changepoints_annotations ).
+    Returns the number of analyzed time-series and the list of
+    (timestamp, test name, time-series name, before, after, % change)
+    change points, most recent first.
+    """
+
+    def detect_chunk(chunk):
+        series_changepoints = detect_test_names_changepoints(
+            rts,
+            filters,
+            chunk,
+            from_ts_ms,
+            to_ts_ms,
+            penalty_factor,
+            min_segment_size,
+            min_change_percent,
+        )
+        if zset_key is not None:
+            write_changepoints_annotations(
+                rts, zset_key, series_key, series_changepoints, from_ts_ms, to_ts_ms
+            )
+        return series_changepoints
+
+    total_series = 0
+    changepoints = []
+    chunks = get_test_names_filter_chunks(test_names, chunk_size)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for series_changepoints in executor.map(detect_chunk, chunks):
+            total_series = total_series + len(series_changepoints)
+            for ts_name, (test_name, ts_changepoints) in series_changepoints.items():
+                for timestamp, before, after, pct_change in ts_changepoints:
+                    changepoints.append(
+                        (timestamp, test_name, ts_name, before, after, pct_change)
+                    )
+    changepoints.sort(key=lambda x: (-x[0], x[2]))
+    return total_series, changepoints
+
+
+def detect_test_names_changepoints(
+    rts,
+    filters,
+    test_names,
+    from_ts_ms,
+    to_ts_ms,
+    penalty_factor=3.0,
+    min_segment_size=5,
+    min_change_percent=5.0,
+):
+    """
+    Returns a dict of time-series name -> (test name, list of
+    (timestamp, before, after, % change) change points).
+    """
+    timeseries_by_test_name = get_timeseries_by_test_name(
+        rts, filters, "test_name", test_names, from_ts_ms, to_ts_ms
+    )
+    series = []
+    for test_name, datapoints_by_ts_name in timeseries_by_test_name.items():
+        for ts_name, datapoints in datapoints_by_ts_name.items():
+            # avoiding target time-series
+            if "target" in ts_name:
+                continue
+            series.append((test_name, ts_name, datapoints[::-1]))
+    series_changepoints = {}
+    batch_changepoints = get_changepoints_batch(
+        [get_datapoints_values(datapoints) for _, _, datapoints in series],
+        penalty_factor,
+        min_segment_size,
+        min_change_percent,
+    )
+    for (test_name, ts_name, datapoints), ts_changepoints in zip(
+        series, batch_changepoints
+    ):
+        series_changepoints[ts_name] = (
+            test_name,
+            [
+                (int(datapoints[pos][0]), before, after, pct_change)
+                for pos, before, after, pct_change in ts_changepoints
+            ],
+        )
+    return series_changepoints
+
+
+def write_changepoints_annotations(
+    rts, zset_key, series_key, series_changepoints, from_ts_ms, to_ts_ms
+):
+    """
+    Replaces the change points of the analyzed time-series within
+    [from_ts_ms, to_ts_ms]: stale annotations from previous runs are removed
+    and the new ones added to the project sorted set, in a single pipeline.
+    """
+    if len(series_changepoints) == 0:
+        return
+    ts_names = list(series_changepoints.keys())
+    previous_details = rts.hmget(series_key, ts_names)
+    pipeline = rts.pipeline(transaction=False)
+    for ts_name, previous in zip(ts_names, previous_details):
+        test_name, ts_changepoints = series_changepoints[ts_name]
+        details = []
+        if previous is not None:
+            for changepoint in json.loads(previous):
+                if from_ts_ms <= changepoint["timestamp"] <= to_ts_ms:
+                    pipeline.zrem(
+                        zset_key,
+                        get_changepoint_member(ts_name, changepoint["timestamp"]),
+                    )
+                else:
+                    details.append(changepoint)
+        for timestamp, before, after, pct_change in ts_changepoints:
+            pipeline.zadd(
+                zset_key, {get_changepoint_member(ts_name, timestamp): timestamp}
+            )
+            details.append(
+                {
+                    "timestamp": timestamp,
+                    "test_name": test_name,
+                    "before": before,
+                    "after": after,
+                    "pct_change": pct_change,
+                }
+            )
+        if len(details) > 0:
+            details.sort(key=lambda x: x["timestamp"])
+            pipeline.hset(series_key, ts_name, json.dumps(details))
+        elif previous is not None:
+            pipeline.hdel(series_key, ts_name)
+    pipeline.execute()
+
+
+def print_changepoints_table(changepoints, table_name):
+    table = []
+    for timestamp, test_name, ts_name, before, after, pct_change in changepoints:
+        table.append(
+            [
+                datetime.datetime.fromtimestamp(
+                    timestamp / 1000.0, datetime.timezone.utc
+                ).strftime("%Y-%m-%d %H:%M:%S"),
+                test_name,
+                ts_name,
+                "{:.3f}".format(before),
+                "{:.3f}".format(after),
+                "{:.1f}% ".format(pct_change),
+            ]
+        )
+    writer = MarkdownTableWriter(
+        table_name=table_name,
+        headers=[
+            "Date (UTC)",
+            "Test Case",
+            "Time-series",
+            "Median before",
+            "Median after",
+            "% change",
+        ],
+        value_matrix=table,
+    )
+    writer.write_table()
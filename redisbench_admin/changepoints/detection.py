@@ -0,0 +1,134 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import math
+import warnings
+
+import numpy as np
+
+from redisbench_admin.compare.stats import get_padded_matrix
+
+# noise estimate floor, as a fraction of the series median. avoids flagging
+# tiny steps on series with (almost) constant values
+CHANGEPOINTS_MIN_RELATIVE_NOISE = 0.001
+
+
+def get_noise_variance_batch(matrix, count):
+    """
+    Robust estimate of the noise variance of each row of a NaN padded matrix,
+    based on the median absolute deviation of the first differences, which is
+    insensitive to the level shifts being detected.
+    """
+    with warnings.catch_warnings(), np.errstate(all="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        diffs = matrix[:, 1:] - matrix[:, :-1]
+        diffs_median = np.nanmedian(diffs, axis=1)
+        mad = np.nanmedian(np.abs(diffs - diffs_median[:, None]), axis=1)
+        sigma = 1.4826 * mad / math.sqrt(2.0)
+        level = np.abs(np.nanmedian(matrix, axis=1))
+        sigma = np.fmax(sigma, CHANGEPOINTS_MIN_RELATIVE_NOISE * level)
+    return np.where(count > 1, sigma**2, np.nan)
+
+
+def get_best_splits(matrix, row, start, end):
+    """
+    For each segment [start, end) of the given matrix row, returns the split
+    position maximizing the reduction of the sum of squared errors when
+    modeling each side by its mean, along with that reduction and both means.
+    """
+    seg_len = end - start
+    ncols = int(seg_len.max())
+    offsets = np.arange(ncols)
+    valid = offsets[None, :] < seg_len[:, None]
+    idx = np.minimum(start[:, None] + offsets[None, :], matrix.shape[1] - 1)
+    values = np.where(valid, matrix[row[:, None], idx], 0.0)
+    csum = np.cumsum(values, axis=1)
+    total = csum[np.arange(len(row)), seg_len - 1]
+    # left side sizes 1..ncols-1
+    left_len = offsets[None, 1:].astype(np.float64)
+    right_len = seg_len[:, None] - left_len
+    left_sum = csum[:, :-1]
+    right_sum = total[:, None] - left_sum
+    with np.errstate(all="ignore"):
+        left_mean = left_sum / left_len
+        right_mean = right_sum / right_len
+        gain = (
+            left_sum * left_mean
+            + right_sum * right_mean
+            - (total**2 / seg_len)[:, None]
+        )
+    return gain, left_mean, right_mean
+
+
+def get_changepoints_batch(
+    values_list,
+    penalty_factor=3.0,
+    min_segment_size=5,
+    min_change_percent=5.0,
+):
+    """
+    Detects the mean shifts of every values array, returning for each one the
+    list of (index, median before, median after, % change) tuples, where index
+    is the position of the first value after the change.
+    Uses binary segmentation over the penalized L2 cost ( the same objective
+    minimized by PELT, with a BIC like penalty scaled by a robust noise
+    estimate ). Every round splits all the pending segments of all series at
+    once, so the work is vectorized across series instead of looping per series.
+    """
+    matrix, count = get_padded_matrix(values_list)
+    nrows = len(values_list)
+    changepoints = [[] for _ in range(nrows)]
+    if nrows == 0:
+        return changepoints
+    variance = get_noise_variance_batch(matrix, count)
+    with np.errstate(all="ignore"):
+        penalty = penalty_factor * variance * np.log(np.maximum(count, 2))
+    candidates = (count >= 2 * min_segment_size) & ~np.isnan(penalty)
+    row = np.flatnonzero(candidates)
+    start = np.zeros(len(row), dtype=np.int64)
+    end = count[row]
+    splits = [[] for _ in range(nrows)]
+    while len(row) > 0:
+        gain, left_mean, right_mean = get_best_splits(matrix, row, start, end)
+        left_len = np.arange(1, gain.shape[1] + 1)[None, :]
+        right_len = (end - start)[:, None] - left_len
+        with np.errstate(all="ignore"):
+            change_percent = np.abs(right_mean - left_mean) / np.abs(left_mean) * 100.0
+        admissible = (
+            (left_len >= min_segment_size)
+            & (right_len >= min_segment_size)
+            & (change_percent >= min_change_percent)
+        )
+        gain = np.where(admissible, gain, -np.inf)
+        best = np.argmax(gain, axis=1)
+        best_gain = gain[np.arange(len(row)), best]
+        accepted = best_gain > penalty[row]
+        split = start + best + 1
+        next_row, next_start, next_end = [], [], []
+        for pos in np.flatnonzero(accepted):
+            splits[row[pos]].append(int(split[pos]))
+            for seg_start, seg_end in [
+                (start[pos], split[pos]),
+                (split[pos], end[pos]),
+            ]:
+                if seg_end - seg_start >= 2 * min_segment_size:
+                    next_row.append(row[pos])
+                    next_start.append(seg_start)
+                    next_end.append(seg_end)
+        row = np.array(next_row, dtype=np.int64)
+        start = np.array(next_start, dtype=np.int64)
+        end = np.array(next_end, dtype=np.int64)
+    for pos, row_splits in enumerate(splits):
+        bounds = [0] + sorted(row_splits) + [int(count[pos])]
+        for seg_pos in range(1, len(bounds) - 1):
+            before = float(
+                np.median(matrix[pos, bounds[seg_pos - 1] : bounds[seg_pos]])
+            )
+            after = float(np.median(matrix[pos, bounds[seg_pos] : bounds[seg_pos + 1]]))
+            pct_change = float("nan")
+            if before != 0.0:
+                pct_change = (after - before) / abs(before) * 100.0
+            changepoints[pos].append((bounds[seg_pos], before, after, pct_change))
+    return changepoints
@@ -11,8 +11,14 @@ import sys
 import toml
 
 from redisbench_admin import __version__
+from redisbench_admin.changepoints.args import create_detect_changepoints_arguments
+from redisbench_admin.changepoints.changepoints import (
+    detect_changepoints_command_logic,
+)
 from redisbench_admin.compare.args import create_compare_arguments
 from redisbench_admin.compare.compare import compare_command_logic
+from redisbench_admin.dataset_cache.args import create_dataset_cache_arguments
+from redisbench_admin.dataset_cache.dataset_cache import dataset_cache_command_logic
 from redisbench_admin.deploy.args import create_deploy_arguments
 from redisbench_admin.deploy.deploy import deploy_command_logic
 from redisbench_admin.export.args import create_export_arguments
@@ -89,22 +95,28 @@ def main():
         parser = create_compare_arguments(parser)
     elif requested_tool == "watchdog":
         parser = create_watchdog_arguments(parser)
+    elif requested_tool == "detect-changepoints":
+        parser = create_detect_changepoints_arguments(parser)
     elif requested_tool == "grafana-api":
         parser = create_grafana_api_arguments(parser)
     elif requested_tool == "--version":
         print_version(project_name, project_version)
     elif requested_tool == "deploy":
         parser = create_deploy_arguments(parser)
+    elif requested_tool == "dataset-cache":
+        parser = create_dataset_cache_arguments(parser)
     elif requested_tool == "--help":
         print_help(project_name, project_version)
         sys.exit(0)
     else:
         valid_tool_options = [
             "compare",
+            "detect-changepoints",
             "run-local",
             "run-remote",
             "run-async",
             "deploy",
+            "dataset-cache",
             "export",
             "extract",
             "watchdog",
@@ -157,10 +169,14 @@ def main():
         watchdog_command_logic(args, project_name, project_version)
     if requested_tool == "compare":
         compare_command_logic(args, project_name, project_version)
+    if requested_tool == "detect-changepoints":
+        detect_changepoints_command_logic(args, project_name, project_version)
     if requested_tool == "deploy":
         deploy_command_logic(args, project_name, project_version)
     if requested_tool == "grafana-api":
         grafana_api_command_logic(args, project_name, project_version)
+    if requested_tool == "dataset-cache":
+        dataset_cache_command_logic(args, project_name, project_version)
 
 
 def print_stdout_effective_log_level():
@@ -206,8 +222,18 @@ def print_help(project_name, project_version):
             project_name=project_name
         )
     )
+    print(
+        "\t-) To know more on how to detect change points on the benchmark history: {project_name} detect-changepoints --help".format(
+            project_name=project_name
+        )
+    )
     print(
         "\t-) To know more on how to export benchmark results: {project_name} export --help".format(
             project_name=project_name
         )
     )
+    print(
+        "\t-) To know more on how to manage the dataset cache: {project_name} dataset-cache --help".format(
+            project_name=project_name
+        )
+    )
@@ -33,6 +33,20 @@ ARCH_X86 = "x86_64"
 ARCH_ARM = "aarch64"
 VALID_ARCHS = [ARCH_X86, ARCH_ARM]
 ARCH = os.getenv("ARCH", ARCH_X86)
+COMPARE_WORKERS = int(os.getenv("COMPARE_WORKERS", "8"))
+# minimum number of buckets a compaction tier needs to have within the compare
+# window to be used instead of the raw series
+COMPARE_COMPACTION_MIN_BUCKETS = int(os.getenv("COMPARE_COMPACTION_MIN_BUCKETS", "30"))
+OUTPUT_FORMAT_MARKDOWN = "markdown"
+OUTPUT_FORMAT_JSONL = "jsonl"
+DETECTION_METHOD_WATERLINE = "waterline"
+DETECTION_METHOD_BOOTSTRAP = "bootstrap"
+DETECTION_METHOD_MANN_WHITNEY = "mann-whitney"
+DETECTION_METHODS = [
+    DETECTION_METHOD_WATERLINE,
+    DETECTION_METHOD_BOOTSTRAP,
+    DETECTION_METHOD_MANN_WHITNEY,
+]
 
 
 def create_compare_arguments(parser):
@@ -124,6 +138,24 @@ def create_compare_arguments(parser):
     parser.add_argument("--baseline-tag", type=str, default=None, required=False)
     parser.add_argument("--comparison-branch", type=str, default=None, required=False)
     parser.add_argument("--comparison-tag", type=str, default=None, required=False)
+    parser.add_argument(
+        "--matrix-branches",
+        type=str,
+        default="",
+        help="comma separated list of branches to compare at once. Can be combined with --matrix-tags.",
+    )
+    parser.add_argument(
+        "--matrix-tags",
+        type=str,
+        default="",
+        help="comma separated list of version tags to compare at once. Can be combined with --matrix-branches.",
+    )
+    parser.add_argument(
+        "--matrix-reference",
+        type=str,
+        default=None,
+        help="branch or tag of the matrix the others are compared against. By default the first one.",
+    )
     parser.add_argument("--print-regressions-only", type=bool, default=False)
     parser.add_argument("--print-improvements-only", type=bool, default=False)
     parser.add_argument("--skip-unstable", type=bool, default=False)
@@ -137,6 +169,19 @@ def create_compare_arguments(parser):
         default=5.0,
         help="Only consider regressions with a percentage over the defined limit. (0-100)",
     )
+    parser.add_argument(
+        "--detection-method",
+        type=str,
+        default=DETECTION_METHOD_WATERLINE,
+        choices=DETECTION_METHODS,
+        help="How regressions and improvements are detected. 'waterline' compares the medians against --regressions-percent-lower-limit and the tests variance. 'bootstrap' ( confidence interval of the median ratio ) and 'mann-whitney' ( U test ) flag the changes that are statistically significant, adding p-value and effect size columns.",
+    )
+    parser.add_argument(
+        "--significance-level",
+        type=float,
+        default=0.05,
+        help="Maximum p-value for a change to be considered significant when using the bootstrap or mann-whitney detection methods.",
+    )
     parser.add_argument(
         "--redistimeseries_host", type=str, default=PERFORMANCE_RTS_HOST
     )
@@ -161,6 +206,71 @@ def create_compare_arguments(parser):
         type=str,
         default="https://benchmarksrediscom.grafana.net/d/",
     )
+    parser.add_argument(
+        "--per-test-fetch",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Fetch each test time-series individually (TS.QUERYINDEX + TS.REVRANGE) instead of bulk fetching all tests via TS.MREVRANGE.",
+    )
+    parser.add_argument(
+        "--compare-workers",
+        type=int,
+        default=COMPARE_WORKERS,
+        help="Number of threads used to fetch and compute the per test comparison values. Also bounds the number of connections to RedisTimeSeries.",
+    )
+    parser.add_argument(
+        "--compare-cache",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Keep a local cache of the fetched time-series datapoints under <--local-dir>/.redisbench-admin, only fetching the new datapoints on later runs. Implies fetching each time-series individually.",
+    )
+    parser.add_argument(
+        "--server-aggregation",
+        type=str,
+        default=None,
+        choices=["avg", "min", "max"],
+        help="Aggregate the datapoints on the server side, in buckets of --server-aggregation-bucket-ms, instead of reading every raw datapoint. Each bucket is used as a single, unweighted observation: the reported median/std.dev are bucket-level, and the raw sample variance thresholds ( UNSTABLE, waterline widening ) are skipped. Useful for long compare windows.",
+    )
+    parser.add_argument(
+        "--server-aggregation-bucket-ms",
+        type=int,
+        default=24 * 60 * 60 * 1000,
+        help="Bucket size of the server side aggregation. By default one day.",
+    )
+    parser.add_argument(
+        "--raw-series",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Always read the raw series, even when the defaults file specifies compaction tiers (exporter.redistimeseries.compaction) able to serve the compare window.",
+    )
+    parser.add_argument(
+        "--baseline-results",
+        type=str,
+        default=None,
+        help="Compare offline, without a datasink: directory ( or glob pattern ) with the baseline result JSON files produced by run-local/run-remote. Requires --comparison-results.",
+    )
+    parser.add_argument(
+        "--comparison-results",
+        type=str,
+        default=None,
+        help="Directory ( or glob pattern ) with the comparison result JSON files. Requires --baseline-results.",
+    )
+    parser.add_argument(
+        "--output-format",
+        type=str,
+        default=OUTPUT_FORMAT_MARKDOWN,
+        choices=[OUTPUT_FORMAT_MARKDOWN, OUTPUT_FORMAT_JSONL],
+        help="With jsonl, one JSON record per compared test is streamed to --output-file as soon as it's compared, instead of building the markdown table and pull request comment.",
+    )
+    parser.add_argument(
+        "--output-file",
+        type=str,
+        default="-",
+        help="File the jsonl records are written to. By default stdout.",
+    )
     parser.add_argument(
         "--auto-approve",
         required=False,
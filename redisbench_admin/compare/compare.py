@@ -5,8 +5,10 @@
 #
 import datetime
 import logging
+import math
 import re
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
 import redis
 import yaml
 from pytablewriter import MarkdownTableWriter
@@ -21,8 +23,44 @@ from redisbench_admin.run.common import get_start_time_vars, WH_TOKEN
 from redisbench_admin.run_remote.notifications import (
     generate_new_pr_comment_notification,
 )
-from redisbench_admin.utils.remote import get_overall_dashboard_keynames
-from redisbench_admin.compare.args import ARCH_X86
+from redisbench_admin.utils.benchmark_config import (
+    get_defaults,
+    parse_exporter_compaction_definition,
+)
+from redisbench_admin.utils.remote import (
+    COMPACTION_LABEL,
+    get_compaction_label_value,
+    get_overall_dashboard_keynames,
+)
+from redisbench_admin.compare.args import (
+    ARCH_X86,
+    COMPARE_COMPACTION_MIN_BUCKETS,
+    DETECTION_METHOD_WATERLINE,
+    DETECTION_METHOD_BOOTSTRAP,
+    OUTPUT_FORMAT_JSONL,
+)
+from redisbench_admin.compare.local_results import load_local_results
+from redisbench_admin.compare.output import (
+    COMPARE_OBSERVATIONS_BUCKETS,
+    COMPARE_OBSERVATIONS_DATAPOINTS,
+    CompareRecordsWriter,
+    get_compare_classification,
+    get_compare_record,
+)
+from redisbench_admin.compare.series_cache import load_series_cache
+from redisbench_admin.compare.significance import get_significance_batch
+from redisbench_admin.compare.stats import (
+    get_datapoints_stats,
+    get_datapoints_stats_batch,
+    get_datapoints_windows,
+)
+
+# maximum number of test names on each TS.MREVRANGE test name filter
+COMPARE_MRANGE_TEST_NAMES_CHUNK_SIZE = 100
+# number of tests fetched and compared at once
+COMPARE_TESTS_CHUNK_SIZE = 100
+# SSCAN COUNT hint used while discovering the project test names
+COMPARE_SSCAN_COUNT = 1000
 
 
 def get_project_compare_zsets(triggering_env, org, repo):
@@ -31,29 +69,90 @@ def get_project_compare_zsets(triggering_env, org, repo):
     )
 
 
+def get_defaults_comparison_metrics(comparison_dict):
+    """
+    Parses the exporter.comparison.metrics list of a defaults file. Each metric
+    is either a metric name/jsonpath, using the exporter.comparison.mode
+    direction, or a {metric: mode} mapping with its own direction.
+    Returns the metric names and a dict of metric name -> metric mode.
+    """
+    default_mode = comparison_dict.get("mode", None)
+    metrics = []
+    metric_modes = {}
+    for metric in comparison_dict["metrics"]:
+        mode = default_mode
+        if type(metric) == dict:
+            metric, mode = list(metric.items())[0]
+        if metric.startswith("$."):
+            metric = metric[2:]
+        logging.info("Will use metric: {}".format(metric))
+        metrics.append(metric)
+        if mode is not None:
+            metric_modes[metric] = mode
+    return metrics, metric_modes
+
+
 def compare_command_logic(args, project_name, project_version):
     logging.info(
         "Using: {project_name} {project_version}".format(
             project_name=project_name, project_version=project_version
         )
     )
-    logging.info(
-        "Checking connection to RedisTimeSeries with user: {}, host: {}, port: {}".format(
-            args.redistimeseries_user,
-            args.redistimeseries_host,
-            args.redistimeseries_port,
-        )
+    compare_workers = max(1, args.compare_workers)
+    local_results_mode = (
+        args.baseline_results is not None or args.comparison_results is not None
     )
-    rts = redis.Redis(
-        host=args.redistimeseries_host,
-        port=args.redistimeseries_port,
-        password=args.redistimeseries_pass,
-        username=args.redistimeseries_user,
-        retry_on_timeout=True,
+    rts = None
+    if local_results_mode:
+        if args.baseline_results is None or args.comparison_results is None:
+            logging.error(
+                "The offline compare requires both --baseline-results and --comparison-results. Exiting..."
+            )
+            exit(1)
+        logging.info(
+            "Comparing the local results {} and {}. Not using RedisTimeSeries.".format(
+                args.baseline_results, args.comparison_results
+            )
+        )
+    else:
+        logging.info(
+            "Checking connection to RedisTimeSeries with user: {}, host: {}, port: {}".format(
+                args.redistimeseries_user,
+                args.redistimeseries_host,
+                args.redistimeseries_port,
+            )
+        )
+        # bounded pool shared by the compare workers. a worker waits for a free
+        # connection instead of opening a new one
+        connection_pool = redis.BlockingConnectionPool(
+            max_connections=compare_workers,
+            host=args.redistimeseries_host,
+            port=args.redistimeseries_port,
+            password=args.redistimeseries_pass,
+            username=args.redistimeseries_user,
+            retry_on_timeout=True,
+        )
+        rts = redis.Redis(connection_pool=connection_pool)
+        rts.ping()
+    aggregation = get_compare_aggregation(
+        args.server_aggregation, args.server_aggregation_bucket_ms
     )
-    rts.ping()
+    if local_results_mode and aggregation is not None:
+        logging.warning(
+            "Each local result file is a single observation. Ignoring --server-aggregation."
+        )
+        aggregation = None
+    series_cache = None
+    if args.compare_cache and aggregation is not None:
+        logging.warning(
+            "The compare series cache only keeps raw datapoints. Ignoring --compare-cache given --server-aggregation was specified."
+        )
+    elif args.compare_cache and rts is not None:
+        series_cache = load_series_cache(rts, getattr(args, "local_dir", "./"))
     default_baseline_branch = None
     default_metrics_str = ""
+    default_metric_modes = {}
+    compaction_policy = None
     if args.defaults_filename != "" and os.path.exists(args.defaults_filename):
         logging.info(
             "Loading configuration from defaults file: {}".format(
@@ -64,18 +163,15 @@ def compare_command_logic(args, project_name, project_version):
             defaults_dict = yaml.safe_load(yaml_fd)
             if "exporter" in defaults_dict:
                 exporter_dict = defaults_dict["exporter"]
+                compaction_policy = parse_exporter_compaction_definition(exporter_dict)
                 if "comparison" in exporter_dict:
                     comparison_dict = exporter_dict["comparison"]
                     if "metrics" in comparison_dict:
-                        metrics = comparison_dict["metrics"]
                         logging.info("Detected defaults metrics info. reading metrics")
-                        default_metrics = []
-
-                        for metric in metrics:
-                            if metric.startswith("$."):
-                                metric = metric[2:]
-                            logging.info("Will use metric: {}".format(metric))
-                            default_metrics.append(metric)
+                        (
+                            default_metrics,
+                            default_metric_modes,
+                        ) = get_defaults_comparison_metrics(comparison_dict)
                         if len(default_metrics) == 1:
                             default_metrics_str = default_metrics[0]
                         if len(default_metrics) > 1:
@@ -189,6 +285,103 @@ def compare_command_logic(args, project_name, project_version):
     auto_approve = args.auto_approve
     running_platform = args.running_platform
     grafana_base_dashboard = args.grafana_base_dashboard
+    records_writer = None
+    if args.output_format == OUTPUT_FORMAT_JSONL:
+        if args.matrix_branches != "" or args.matrix_tags != "":
+            logging.error("The matrix compare only supports the markdown output.")
+            exit(1)
+        records_writer = CompareRecordsWriter(args.output_file)
+    local_results = None
+    if local_results_mode:
+        if args.matrix_branches != "" or args.matrix_tags != "":
+            logging.error("The matrix compare requires RedisTimeSeries.")
+            exit(1)
+        _, _, default_metrics, _, _, _ = get_defaults(args.defaults_filename)
+        (
+            baseline_by_metric,
+            comparison_by_metric,
+            inferred_baseline_branch,
+            inferred_comparison_branch,
+        ) = load_local_results(
+            args.baseline_results,
+            args.comparison_results,
+            get_multi_value_filter_values(metric_name),
+            default_metrics,
+            args.deployment_name,
+            tf_github_org,
+            tf_github_repo,
+            baseline_branch,
+            comparison_branch,
+            test.split(",") if test != "" else None,
+            use_metric_context_path,
+            compare_workers,
+        )
+        local_results = (baseline_by_metric, comparison_by_metric)
+        # the side labels come from the run names, not from the results paths
+        if baseline_branch is None and baseline_tag is None:
+            baseline_branch = inferred_baseline_branch
+        if comparison_branch is None and comparison_tag is None:
+            comparison_branch = inferred_comparison_branch
+    compaction_tier = None
+    if (
+        compaction_policy is not None
+        and args.raw_series is False
+        and local_results is None
+    ):
+        if (
+            max(
+                last_n_baseline,
+                last_n_comparison,
+                first_n_baseline,
+                first_n_comparison,
+            )
+            >= 0
+        ):
+            logging.info(
+                "The last_n/first_n options count raw datapoints. Reading the raw series instead of the compaction tiers."
+            )
+        else:
+            compaction_from_ts_ms, compaction_to_ts_ms = get_compare_time_range_ms(
+                from_date, from_ts_ms, to_date, to_ts_ms
+            )
+            compaction_tier = get_compaction_tier(
+                compaction_policy,
+                aggregation,
+                compaction_from_ts_ms,
+                compaction_to_ts_ms,
+            )
+    if args.matrix_branches != "" or args.matrix_tags != "":
+        # the matrix compare builds on this module helpers
+        from redisbench_admin.compare.matrix import compare_matrix_logic
+
+        compare_matrix_logic(
+            rts,
+            args.matrix_branches,
+            args.matrix_tags,
+            args.matrix_reference,
+            tf_github_org,
+            tf_github_repo,
+            tf_triggering_env,
+            metric_name,
+            metric_mode,
+            baseline_deployment_name,
+            test,
+            testname_regex,
+            use_metric_context_path,
+            from_date,
+            from_ts_ms,
+            to_date,
+            to_ts_ms,
+            last_n_baseline,
+            first_n_baseline,
+            regressions_percent_lower_limit,
+            simplify_table,
+            running_platform,
+            args.baseline_architecture,
+            aggregation,
+            compaction_tier,
+        )
+        return
     # using an access token
     is_actionable_pr = False
     contains_regression_comment = False
@@ -210,7 +403,11 @@ def compare_command_logic(args, project_name, project_version):
         webhook_client_slack = WebhookClient(webhook_url)
 
     old_regression_comment_body = ""
-    if github_token is not None:
+    if local_results is not None and pull_request is not None:
+        logging.warning(
+            "The offline compare doesn't update pull requests. Ignoring --pull-request."
+        )
+    if github_token is not None and local_results is None:
         logging.info("Detected github token")
         g = Github(github_token)
         if pull_request is not None and pull_request != "":
@@ -303,7 +500,40 @@ def compare_command_logic(args, project_name, project_version):
         comparison_architecture,
         first_n_baseline,
         first_n_comparison,
+        args.per_test_fetch is False,
+        compare_workers,
+        series_cache,
+        args.detection_method,
+        args.significance_level,
+        default_metric_modes,
+        aggregation,
+        compaction_tier,
+        records_writer,
+        local_results,
     )
+    if series_cache is not None:
+        series_cache.save()
+    if records_writer is not None:
+        records_writer.close()
+        logging.info(
+            "Wrote {} compare records to {}. {} regressions, {} improvements, {} stable and {} unstable tests.".format(
+                records_writer.total_records,
+                records_writer.output_file,
+                total_regressions,
+                total_improvements,
+                total_stable,
+                total_unstable,
+            )
+        )
+        return (
+            detected_regressions,
+            "",
+            total_improvements,
+            total_regressions,
+            total_stable,
+            total_unstable,
+            total_comparison_points,
+        )
     comment_body = ""
     if total_comparison_points > 0:
         comment_body = "### Automated performance analysis summary\n\n"
@@ -531,17 +761,25 @@ def compute_regression_table(
     comparison_architecture=ARCH_X86,
     first_n_baseline=-1,
     first_n_comparison=-1,
+    bulk_fetch=True,
+    compare_workers=1,
+    series_cache=None,
+    detection_method=DETECTION_METHOD_WATERLINE,
+    significance_level=0.05,
+    metric_modes=None,
+    aggregation=None,
+    compaction_tier=None,
+    records_writer=None,
+    local_results=None,
 ):
-    START_TIME_NOW_UTC, _, _ = get_start_time_vars()
-    START_TIME_LAST_MONTH_UTC = START_TIME_NOW_UTC - datetime.timedelta(days=31)
-    if from_date is None:
-        from_date = START_TIME_LAST_MONTH_UTC
-    if to_date is None:
-        to_date = START_TIME_NOW_UTC
-    if from_ts_ms is None:
-        from_ts_ms = int(from_date.timestamp() * 1000)
-    if to_ts_ms is None:
-        to_ts_ms = int(to_date.timestamp() * 1000)
+    """
+    When local_results ( the baseline and comparison dicts returned by
+    load_local_results ) are given the datapoints are read from them instead
+    of RedisTimeSeries.
+    """
+    from_ts_ms, to_ts_ms = get_compare_time_range_ms(
+        from_date, from_ts_ms, to_date, to_ts_ms
+    )
     from_human_str = humanize.naturaltime(
         dt.datetime.utcfromtimestamp(from_ts_ms / 1000)
     )
@@ -581,10 +819,48 @@ def compute_regression_table(
     if test != "":
         test_names = test.split(",")
         logging.info("Using test name {}".format(test_names))
+    elif local_results is not None:
+        test_names = get_local_results_compare_test_names(
+            local_results, tags_regex_string
+        )
+        logging.info(
+            "Based on the local results we have {} comparison points.".format(
+                len(test_names)
+            )
+        )
     else:
         test_names = get_test_names_from_db(
-            rts, tags_regex_string, test_names, used_key
+            rts, tags_regex_string, test_names, used_key, from_ts_ms
         )
+    multi_metric = check_multi_value_filter(metric_name)
+    metrics_totals = {}
+    regression_table_fn = from_rts_to_regression_table
+    regression_table_kwargs = {
+        "aggregation": aggregation,
+        "compaction_tier": compaction_tier,
+        "records_writer": records_writer,
+    }
+    if multi_metric:
+        regression_table_fn = from_rts_to_multi_metric_regression_table
+        regression_table_kwargs["metric_modes"] = metric_modes
+        regression_table_kwargs["metrics_totals"] = metrics_totals
+    if local_results is not None:
+        baseline_by_metric, comparison_by_metric = local_results
+        for by_metric in local_results:
+            for metric in get_multi_value_filter_values(metric_name):
+                by_test_name = by_metric.setdefault(metric, {})
+                for test_name in test_names:
+                    by_test_name.setdefault(test_name, {})
+        if multi_metric:
+            regression_table_kwargs["baseline_by_metric"] = baseline_by_metric
+            regression_table_kwargs["comparison_by_metric"] = comparison_by_metric
+        else:
+            regression_table_kwargs["baseline_timeseries_by_test_name"] = (
+                baseline_by_metric[metric_name]
+            )
+            regression_table_kwargs["comparison_timeseries_by_test_name"] = (
+                comparison_by_metric[metric_name]
+            )
     (
         detected_regressions,
         table,
@@ -593,7 +869,7 @@ def compute_regression_table(
         total_stable,
         total_unstable,
         total_comparison_points,
-    ) = from_rts_to_regression_table(
+    ) = regression_table_fn(
         baseline_deployment_name,
         comparison_deployment_name,
         baseline_str,
@@ -621,12 +897,35 @@ def compute_regression_table(
         comparison_architecture,
         first_n_baseline,
         first_n_comparison,
+        bulk_fetch,
+        compare_workers,
+        series_cache,
+        detection_method,
+        significance_level,
+        **regression_table_kwargs,
     )
     logging.info(
         "Printing differential analysis between {} and {}".format(
             baseline_str, comparison_str
         )
     )
+    bucket_level = is_bucket_level_compare(aggregation, compaction_tier)
+    observations_str = "median obs. +- std.dev"
+    if bucket_level:
+        observations_str = "median bucket +- std.dev across buckets"
+    headers = [
+        "Test Case",
+        "Baseline {} ({})".format(baseline_str, observations_str),
+        "Comparison {} ({})".format(comparison_str, observations_str),
+        "% change ({})".format(metric_mode),
+        "Note",
+    ]
+    if multi_metric:
+        headers[3] = "% change"
+        headers.insert(1, "Metric (mode)")
+    headers.extend(
+        get_significance_headers(detection_method, significance_level, bucket_level)
+    )
     writer = MarkdownTableWriter(
         table_name="Comparison between {} and {}.\n\nTime Period from {}. (environment used: {})\n".format(
             baseline_str,
@@ -634,13 +933,7 @@ def compute_regression_table(
             from_human_str,
             baseline_deployment_name,
         ),
-        headers=[
-            "Test Case",
-            "Baseline {} (median obs. +- std.dev)".format(baseline_str),
-            "Comparison {} (median obs. +- std.dev)".format(comparison_str),
-            "% change ({})".format(metric_mode),
-            "Note",
-        ],
+        headers=headers,
         value_matrix=table,
     )
     table_output = ""
@@ -656,6 +949,8 @@ def compute_regression_table(
     sys.stdout = old_stdout
 
     table_output = mystdout.getvalue()
+    if multi_metric:
+        table_output += get_metrics_totals_table_output(metrics_totals)
 
     return (
         detected_regressions,
@@ -668,6 +963,89 @@ def compute_regression_table(
     )
 
 
+def get_compare_aggregation(aggregation_type, bucket_size_ms):
+    """
+    Returns the (aggregation type, bucket size in ms) of server side aggregated
+    range reads, or None to read the raw datapoints. Each aggregated bucket is
+    then used as a single observation for the compare statistics.
+    """
+    if aggregation_type is None:
+        return None
+    if bucket_size_ms <= 0:
+        logging.error(
+            "--server-aggregation-bucket-ms needs to be positive. Got {}".format(
+                bucket_size_ms
+            )
+        )
+        exit(1)
+    logging.info(
+        "Using server side {} aggregation over {} ms buckets".format(
+            aggregation_type, bucket_size_ms
+        )
+    )
+    return aggregation_type, bucket_size_ms
+
+
+def is_bucket_level_compare(aggregation, compaction_tier):
+    return aggregation is not None or compaction_tier is not None
+
+
+def get_compaction_tier(
+    compaction_policy,
+    aggregation,
+    from_ts_ms,
+    to_ts_ms,
+    now_ms=None,
+    min_buckets=COMPARE_COMPACTION_MIN_BUCKETS,
+):
+    """
+    Returns the compaction label value of the coarsest tier able to serve the
+    [from_ts_ms, to_ts_ms] window, or None to read the raw series. A tier
+    needs to keep the requested aggregation ( avg when not using server side
+    aggregation ), to retain datapoints since from_ts_ms, and to have at
+    least min_buckets buckets within the window.
+    """
+    if compaction_policy is None:
+        return None
+    aggregation_type = "avg"
+    if aggregation is not None:
+        aggregation_type = aggregation[0]
+    if now_ms is None:
+        _, now_ms, _ = get_start_time_vars()
+    compaction_tier = None
+    for tier in compaction_policy["tiers"]:
+        if aggregation_type not in tier["aggregations"]:
+            continue
+        if tier["retention_ms"] > 0 and from_ts_ms < now_ms - tier["retention_ms"]:
+            continue
+        if to_ts_ms - from_ts_ms < min_buckets * tier["bucket_ms"]:
+            continue
+        compaction_tier = get_compaction_label_value(
+            aggregation_type, tier["bucket_ms"]
+        )
+    if compaction_tier is not None:
+        logging.info(
+            "Reading the {} compaction tier series given it can serve the compare window".format(
+                compaction_tier
+            )
+        )
+    return compaction_tier
+
+
+def get_compare_time_range_ms(from_date, from_ts_ms, to_date, to_ts_ms):
+    START_TIME_NOW_UTC, _, _ = get_start_time_vars()
+    START_TIME_LAST_MONTH_UTC = START_TIME_NOW_UTC - datetime.timedelta(days=31)
+    if from_date is None:
+        from_date = START_TIME_LAST_MONTH_UTC
+    if to_date is None:
+        to_date = START_TIME_NOW_UTC
+    if from_ts_ms is None:
+        from_ts_ms = int(from_date.timestamp() * 1000)
+    if to_ts_ms is None:
+        to_ts_ms = int(to_date.timestamp() * 1000)
+    return from_ts_ms, to_ts_ms
+
+
 def get_by_strings(
     baseline_branch,
     comparison_branch,
@@ -752,8 +1130,22 @@ def from_rts_to_regression_table(
     comparison_architecture=ARCH_X86,
     first_n_baseline=-1,
     first_n_comparison=-1,
+    bulk_fetch=True,
+    compare_workers=1,
+    series_cache=None,
+    detection_method=DETECTION_METHOD_WATERLINE,
+    significance_level=0.05,
+    baseline_timeseries_by_test_name=None,
+    comparison_timeseries_by_test_name=None,
+    aggregation=None,
+    compaction_tier=None,
+    records_writer=None,
 ):
     print_all = print_regressions_only is False and print_improvements_only is False
+    # with server side aggregation or compaction tiers each observation is a
+    # bucket aggregate, not a raw sample, so the raw sample variance based
+    # thresholds ( UNSTABLE, waterline widening ) don't apply
+    bucket_level = is_bucket_level_compare(aggregation, compaction_tier)
     table = []
     detected_regressions = []
     total_improvements = 0
@@ -762,221 +1154,505 @@ def from_rts_to_regression_table(
     total_regressions = 0
     total_comparison_points = 0
     noise_waterline = 3
+    filters_baseline_common = get_comparison_filters(
+        by_str_baseline,
+        baseline_str,
+        metric_name,
+        baseline_deployment_name,
+        tf_triggering_env,
+        running_platform,
+        baseline_architecture,
+        compaction_tier,
+    )
+    filters_comparison_common = get_comparison_filters(
+        by_str_comparison,
+        comparison_str,
+        metric_name,
+        comparison_deployment_name,
+        tf_triggering_env,
+        running_platform,
+        comparison_architecture,
+        compaction_tier,
+    )
+    if baseline_timeseries_by_test_name is not None:
+        # already bulk fetched by the caller
+        bulk_fetch = False
+    if bulk_fetch and series_cache is not None:
+        logging.info(
+            "Using the local compare series cache. Fetching each time-series incrementally."
+        )
+        bulk_fetch = False
     progress = tqdm(unit="benchmark time-series", total=len(test_names))
-    for test_name in test_names:
-        multi_value_baseline = check_multi_value_filter(baseline_str)
-        multi_value_comparison = check_multi_value_filter(comparison_str)
-
-        filters_baseline = [
-            "{}={}".format(by_str_baseline, baseline_str),
-            "metric={}".format(metric_name),
-            "{}={}".format(test_filter, test_name),
-            "deployment_name={}".format(baseline_deployment_name),
-            "triggering_env={}".format(tf_triggering_env),
-        ]
-        if running_platform is not None:
-            filters_baseline.append("running_platform={}".format(running_platform))
-        if baseline_architecture != ARCH_X86:
-            filters_baseline.append(f"arch={baseline_architecture}")
-        filters_comparison = [
-            "{}={}".format(by_str_comparison, comparison_str),
-            "metric={}".format(metric_name),
-            "{}={}".format(test_filter, test_name),
-            "deployment_name={}".format(comparison_deployment_name),
-            "triggering_env={}".format(tf_triggering_env),
-        ]
-        if running_platform is not None:
-            filters_comparison.append("running_platform={}".format(running_platform))
-        if comparison_architecture != ARCH_X86:
-            filters_comparison.append(f"arch={comparison_architecture}")
-        baseline_timeseries = rts.ts().queryindex(filters_baseline)
-        comparison_timeseries = rts.ts().queryindex(filters_comparison)
-
-        # avoiding target time-series
-        comparison_timeseries = [x for x in comparison_timeseries if "target" not in x]
-        baseline_timeseries = [x for x in baseline_timeseries if "target" not in x]
+
+    def compare_test(test_name):
+        baseline_datapoints_by_ts_name = None
+        comparison_datapoints_by_ts_name = None
+        if baseline_timeseries_by_test_name is not None:
+            baseline_datapoints_by_ts_name = baseline_timeseries_by_test_name[test_name]
+            comparison_datapoints_by_ts_name = comparison_timeseries_by_test_name[
+                test_name
+            ]
+        test_datapoints = get_test_comparison_datapoints(
+            rts,
+            test_name,
+            test_filter,
+            baseline_str,
+            comparison_str,
+            filters_baseline_common,
+            filters_comparison_common,
+            baseline_datapoints_by_ts_name,
+            comparison_datapoints_by_ts_name,
+            from_ts_ms,
+            to_ts_ms,
+            verbose,
+            series_cache,
+            aggregation,
+        )
         progress.update()
-        if verbose:
-            logging.info(
-                "Baseline timeseries for {}: {}. test={}".format(
-                    baseline_str, len(baseline_timeseries), test_name
+        return test_datapoints
+
+    # the tests are compared in chunks, bounding the datapoints held in memory
+    # and streaming the records of each chunk as soon as it's compared
+    for chunk_start in range(0, len(test_names), COMPARE_TESTS_CHUNK_SIZE):
+        chunk_test_names = test_names[
+            chunk_start : chunk_start + COMPARE_TESTS_CHUNK_SIZE
+        ]
+        if bulk_fetch:
+            try:
+                baseline_timeseries_by_test_name = get_timeseries_by_test_name(
+                    rts,
+                    filters_baseline_common,
+                    test_filter,
+                    chunk_test_names,
+                    from_ts_ms,
+                    to_ts_ms,
+                    aggregation,
                 )
-            )
-            logging.info(
-                "Comparison timeseries for {}: {}. test={}".format(
-                    comparison_str, len(comparison_timeseries), test_name
+                comparison_timeseries_by_test_name = get_timeseries_by_test_name(
+                    rts,
+                    filters_comparison_common,
+                    test_filter,
+                    chunk_test_names,
+                    from_ts_ms,
+                    to_ts_ms,
+                    aggregation,
                 )
-            )
-        if len(baseline_timeseries) > 1 and multi_value_baseline is False:
-            baseline_timeseries = get_only_Totals(baseline_timeseries)
-
-        if len(baseline_timeseries) != 1 and multi_value_baseline is False:
-            if verbose:
+            except redis.exceptions.ResponseError as e:
                 logging.warning(
-                    "Skipping this test given the value of timeseries !=1. Baseline timeseries {}".format(
-                        len(baseline_timeseries)
+                    "Unable to bulk fetch the comparison data via TS.MREVRANGE. Falling back to per test fetch. Error: {}".format(
+                        e.__str__()
                     )
                 )
-                if len(baseline_timeseries) > 1:
-                    logging.warning(
-                        "\t\tTime-series: {}".format(", ".join(baseline_timeseries))
-                    )
-            continue
-
-        if len(comparison_timeseries) > 1 and multi_value_comparison is False:
-            comparison_timeseries = get_only_Totals(comparison_timeseries)
-        if len(comparison_timeseries) != 1 and multi_value_comparison is False:
-            if verbose:
-                logging.warning(
-                    "Comparison timeseries {}".format(len(comparison_timeseries))
-                )
-            continue
-
-        baseline_v = "N/A"
-        comparison_v = "N/A"
-        baseline_values = []
-        baseline_datapoints = []
-        comparison_values = []
-        comparison_datapoints = []
-        percentage_change = 0.0
-        baseline_v_str = "N/A"
-        comparison_v_str = "N/A"
-        largest_variance = 0
-        baseline_pct_change = "N/A"
-        comparison_pct_change = "N/A"
-
-        note = ""
-        try:
-            for ts_name_baseline in baseline_timeseries:
-                datapoints_inner = rts.ts().revrange(
-                    ts_name_baseline, from_ts_ms, to_ts_ms
-                )
-                baseline_datapoints.extend(datapoints_inner)
-            (
-                baseline_pct_change,
-                baseline_v,
-                largest_variance,
-            ) = get_v_pct_change_and_largest_var(
-                baseline_datapoints,
-                baseline_pct_change,
-                baseline_v,
-                baseline_values,
-                largest_variance,
+                baseline_timeseries_by_test_name = None
+                comparison_timeseries_by_test_name = None
+                bulk_fetch = False
+        # the per test work is spread across the workers while the results are
+        # consumed in the test names order, keeping the output deterministic
+        with ThreadPoolExecutor(max_workers=max(1, compare_workers)) as executor:
+            tests_datapoints = list(executor.map(compare_test, chunk_test_names))
+        tests_stats = get_tests_datapoints_stats(
+            tests_datapoints,
+            last_n_baseline,
+            last_n_comparison,
+            first_n_baseline,
+            first_n_comparison,
+        )
+        tests_significance = [None for _ in chunk_test_names]
+        if detection_method != DETECTION_METHOD_WATERLINE:
+            tests_significance = get_tests_significance(
+                tests_datapoints,
                 last_n_baseline,
-                verbose,
+                last_n_comparison,
                 first_n_baseline,
+                first_n_comparison,
+                detection_method,
+                metric_mode,
+                significance_level,
             )
-            for ts_name_comparison in comparison_timeseries:
-                datapoints_inner = rts.ts().revrange(
-                    ts_name_comparison, from_ts_ms, to_ts_ms
-                )
-                comparison_datapoints.extend(datapoints_inner)
-
+        for test_name, test_datapoints, test_stats, test_significance in zip(
+            chunk_test_names, tests_datapoints, tests_stats, tests_significance
+        ):
+            if test_datapoints is None:
+                continue
+            baseline_datapoints, comparison_datapoints = test_datapoints
+            baseline_stats, comparison_stats = test_stats
             (
-                comparison_pct_change,
+                baseline_v,
                 comparison_v,
-                largest_variance,
-            ) = get_v_pct_change_and_largest_var(
-                comparison_datapoints,
+                baseline_pct_change,
                 comparison_pct_change,
-                comparison_v,
-                comparison_values,
-                largest_variance,
-                last_n_comparison,
+                baseline_nsamples,
+                comparison_nsamples,
+                note,
+                waterline,
+            ) = get_test_comparison_values(
+                baseline_datapoints,
+                comparison_datapoints,
+                baseline_stats,
+                comparison_stats,
+                regressions_percent_lower_limit,
                 verbose,
-                first_n_comparison,
-            )
-
-            waterline = regressions_percent_lower_limit
-            if regressions_percent_lower_limit < largest_variance:
-                note = "waterline={:.1f}%.".format(largest_variance)
-                waterline = largest_variance
-
-        except redis.exceptions.ResponseError:
-            pass
-        except ZeroDivisionError as e:
-            logging.error("Detected a ZeroDivisionError. {}".format(e.__str__()))
-            pass
-        unstable = False
-        if baseline_v != "N/A" and comparison_v != "N/A":
-            if comparison_pct_change > 10.0 or baseline_pct_change > 10.0:
-                note = "UNSTABLE (very high variance)"
-                unstable = True
-
-            baseline_v_str = prepare_value_str(
-                baseline_pct_change, baseline_v, baseline_values, simplify_table
-            )
-            comparison_v_str = prepare_value_str(
-                comparison_pct_change, comparison_v, comparison_values, simplify_table
             )
+            if detection_method != DETECTION_METHOD_WATERLINE or bucket_level:
+                note = ""
+                waterline = regressions_percent_lower_limit
+            percentage_change = 0.0
+            baseline_v_str = "N/A"
+            comparison_v_str = "N/A"
+            unstable = False
+            if baseline_v != "N/A" and comparison_v != "N/A":
+                if (
+                    detection_method == DETECTION_METHOD_WATERLINE
+                    and not bucket_level
+                    and (comparison_pct_change > 10.0 or baseline_pct_change > 10.0)
+                ):
+                    note = "UNSTABLE (very high variance)"
+                    unstable = True
+
+                baseline_v_str = prepare_value_str(
+                    baseline_pct_change,
+                    baseline_v,
+                    baseline_nsamples,
+                    simplify_table,
+                    bucket_level,
+                )
+                comparison_v_str = prepare_value_str(
+                    comparison_pct_change,
+                    comparison_v,
+                    comparison_nsamples,
+                    simplify_table,
+                    bucket_level,
+                )
 
-            if metric_mode == "higher-better":
-                percentage_change = (
-                    float(comparison_v) / float(baseline_v) - 1
-                ) * 100.0
-            else:
-                # lower-better
-                percentage_change = (
-                    float(baseline_v) / float(comparison_v) - 1
-                ) * 100.0
-        if baseline_v != "N/A" or comparison_v != "N/A":
-            detected_regression = False
-            detected_improvement = False
-            if percentage_change < 0.0 and not unstable:
-                if -waterline >= percentage_change:
-                    detected_regression = True
-                    total_regressions = total_regressions + 1
-                    note = note + " REGRESSION"
-                    detected_regressions.append(test_name)
-                elif percentage_change < -noise_waterline:
-                    if simplify_table is False:
-                        note = note + " potential REGRESSION"
+                if metric_mode == "higher-better":
+                    percentage_change = (
+                        float(comparison_v) / float(baseline_v) - 1
+                    ) * 100.0
                 else:
-                    if simplify_table is False:
-                        note = note + " No Change"
-
-            if percentage_change > 0.0 and not unstable:
-                if percentage_change > waterline:
-                    detected_improvement = True
-                    total_improvements = total_improvements + 1
-                    note = note + " IMPROVEMENT"
-                elif percentage_change > noise_waterline:
-                    if simplify_table is False:
-                        note = note + " potential IMPROVEMENT"
+                    # lower-better
+                    percentage_change = (
+                        float(baseline_v) / float(comparison_v) - 1
+                    ) * 100.0
+            if baseline_v != "N/A" or comparison_v != "N/A":
+                detected_regression = False
+                detected_improvement = False
+                if detection_method == DETECTION_METHOD_WATERLINE:
+                    if percentage_change < 0.0 and not unstable:
+                        if -waterline >= percentage_change:
+                            detected_regression = True
+                            total_regressions = total_regressions + 1
+                            note = note + " REGRESSION"
+                            detected_regressions.append(test_name)
+                        elif percentage_change < -noise_waterline:
+                            if simplify_table is False:
+                                note = note + " potential REGRESSION"
+                        else:
+                            if simplify_table is False:
+                                note = note + " No Change"
+
+                    if percentage_change > 0.0 and not unstable:
+                        if percentage_change > waterline:
+                            detected_improvement = True
+                            total_improvements = total_improvements + 1
+                            note = note + " IMPROVEMENT"
+                        elif percentage_change > noise_waterline:
+                            if simplify_table is False:
+                                note = note + " potential IMPROVEMENT"
+                        else:
+                            if simplify_table is False:
+                                note = note + " No Change"
                 else:
-                    if simplify_table is False:
+                    significant = (
+                        test_significance is not None
+                        and test_significance[0] < significance_level
+                    )
+                    if significant and percentage_change < 0.0:
+                        detected_regression = True
+                        total_regressions = total_regressions + 1
+                        note = note + " REGRESSION"
+                        detected_regressions.append(test_name)
+                    elif significant and percentage_change > 0.0:
+                        detected_improvement = True
+                        total_improvements = total_improvements + 1
+                        note = note + " IMPROVEMENT"
+                    elif simplify_table is False:
                         note = note + " No Change"
 
-            if (
-                detected_improvement is False
-                and detected_regression is False
-                and not unstable
-            ):
-                total_stable = total_stable + 1
-
-            if unstable:
-                total_unstable += 1
-
-            should_add_line = False
-            if print_regressions_only and detected_regression:
-                should_add_line = True
-            if print_improvements_only and detected_improvement:
-                should_add_line = True
-            if print_all:
-                should_add_line = True
-            if unstable and skip_unstable:
+                if (
+                    detected_improvement is False
+                    and detected_regression is False
+                    and not unstable
+                ):
+                    total_stable = total_stable + 1
+
+                if unstable:
+                    total_unstable += 1
+
                 should_add_line = False
+                if print_regressions_only and detected_regression:
+                    should_add_line = True
+                if print_improvements_only and detected_improvement:
+                    should_add_line = True
+                if print_all:
+                    should_add_line = True
+                if unstable and skip_unstable:
+                    should_add_line = False
+
+                if records_writer is not None:
+                    records_writer.write(
+                        get_compare_record(
+                            test_name,
+                            metric_name,
+                            metric_mode,
+                            test_datapoints,
+                            test_stats,
+                            percentage_change,
+                            get_compare_classification(
+                                baseline_v,
+                                comparison_v,
+                                detected_regression,
+                                detected_improvement,
+                                unstable,
+                            ),
+                            note,
+                            test_significance,
+                            (
+                                COMPARE_OBSERVATIONS_BUCKETS
+                                if bucket_level
+                                else COMPARE_OBSERVATIONS_DATAPOINTS
+                            ),
+                        )
+                    )
+                if should_add_line:
+                    total_comparison_points = total_comparison_points + 1
+                # streamed records replace the table rows
+                if should_add_line and records_writer is None:
+                    add_line(
+                        baseline_v_str,
+                        comparison_v_str,
+                        note,
+                        percentage_change,
+                        table,
+                        test_name,
+                        get_significance_columns(detection_method, test_significance),
+                    )
+    progress.close()
+    return (
+        detected_regressions,
+        table,
+        total_improvements,
+        total_regressions,
+        total_stable,
+        total_unstable,
+        total_comparison_points,
+    )
+
 
-            if should_add_line:
-                total_comparison_points = total_comparison_points + 1
-                add_line(
-                    baseline_v_str,
-                    comparison_v_str,
-                    note,
-                    percentage_change,
-                    table,
-                    test_name,
+def from_rts_to_multi_metric_regression_table(
+    baseline_deployment_name,
+    comparison_deployment_name,
+    baseline_str,
+    comparison_str,
+    by_str_baseline,
+    by_str_comparison,
+    from_ts_ms,
+    to_ts_ms,
+    last_n_baseline,
+    last_n_comparison,
+    metric_mode,
+    metric_name,
+    print_improvements_only,
+    print_regressions_only,
+    skip_unstable,
+    regressions_percent_lower_limit,
+    rts,
+    simplify_table,
+    test_filter,
+    test_names,
+    tf_triggering_env,
+    verbose,
+    running_platform=None,
+    baseline_architecture=ARCH_X86,
+    comparison_architecture=ARCH_X86,
+    first_n_baseline=-1,
+    first_n_comparison=-1,
+    bulk_fetch=True,
+    compare_workers=1,
+    series_cache=None,
+    detection_method=DETECTION_METHOD_WATERLINE,
+    significance_level=0.05,
+    metric_modes=None,
+    metrics_totals=None,
+    aggregation=None,
+    compaction_tier=None,
+    records_writer=None,
+    baseline_by_metric=None,
+    comparison_by_metric=None,
+):
+    """
+    Compares every metric of a multi value metric filter (e.g. "(rps,p50)"),
+    each one with its own direction ( metric_modes, defaulting to metric_mode ).
+    The tests are compared in COMPARE_TESTS_CHUNK_SIZE chunks, bulk fetching
+    all metrics of each chunk in a single pass, unless already given via
+    baseline_by_metric and comparison_by_metric. The table rows
+    gain a metric column and are grouped by test. The per metric
+    regressions/improvements/stable/unstable counters are stored in
+    metrics_totals. Detected regressions are reported as "<test> (<metric>)".
+    """
+    if metric_modes is None:
+        metric_modes = {}
+    if metrics_totals is None:
+        metrics_totals = {}
+    metric_names = get_multi_value_filter_values(metric_name)
+    preloaded = baseline_by_metric is not None
+    if preloaded:
+        bulk_fetch = False
+    detected_regressions = []
+    total_improvements = 0
+    total_regressions = 0
+    total_stable = 0
+    total_unstable = 0
+    total_comparison_points = 0
+    table = []
+    for metric in metric_names:
+        metrics_totals[metric] = {
+            "mode": metric_modes.get(metric, metric_mode),
+            "regressions": 0,
+            "improvements": 0,
+            "stable": 0,
+            "unstable": 0,
+        }
+    # the tests are compared in chunks, bounding the datapoints of all metrics
+    # held in memory at once
+    for chunk_start in range(0, len(test_names), COMPARE_TESTS_CHUNK_SIZE):
+        chunk_test_names = test_names[
+            chunk_start : chunk_start + COMPARE_TESTS_CHUNK_SIZE
+        ]
+        if not preloaded:
+            baseline_by_metric = {}
+            comparison_by_metric = {}
+        if bulk_fetch and series_cache is None:
+            try:
+                baseline_by_metric = get_timeseries_by_metric_and_test_name(
+                    rts,
+                    get_comparison_filters(
+                        by_str_baseline,
+                        baseline_str,
+                        metric_name,
+                        baseline_deployment_name,
+                        tf_triggering_env,
+                        running_platform,
+                        baseline_architecture,
+                        compaction_tier,
+                    ),
+                    test_filter,
+                    chunk_test_names,
+                    metric_names,
+                    from_ts_ms,
+                    to_ts_ms,
+                    aggregation,
+                )
+                comparison_by_metric = get_timeseries_by_metric_and_test_name(
+                    rts,
+                    get_comparison_filters(
+                        by_str_comparison,
+                        comparison_str,
+                        metric_name,
+                        comparison_deployment_name,
+                        tf_triggering_env,
+                        running_platform,
+                        comparison_architecture,
+                        compaction_tier,
+                    ),
+                    test_filter,
+                    chunk_test_names,
+                    metric_names,
+                    from_ts_ms,
+                    to_ts_ms,
+                    aggregation,
                 )
+            except redis.exceptions.ResponseError as e:
+                logging.warning(
+                    "Unable to bulk fetch the comparison data via TS.MREVRANGE. Falling back to per test fetch. Error: {}".format(
+                        e.__str__()
+                    )
+                )
+                baseline_by_metric = {}
+                comparison_by_metric = {}
+                bulk_fetch = False
+        rows_by_test_name = {}
+        for metric in metric_names:
+            mode = metrics_totals[metric]["mode"]
+            logging.info("Comparing metric {} ({})".format(metric, mode))
+            (
+                metric_regressions,
+                metric_table,
+                metric_improvements,
+                metric_total_regressions,
+                metric_stable,
+                metric_unstable,
+                metric_comparison_points,
+            ) = from_rts_to_regression_table(
+                baseline_deployment_name,
+                comparison_deployment_name,
+                baseline_str,
+                comparison_str,
+                by_str_baseline,
+                by_str_comparison,
+                from_ts_ms,
+                to_ts_ms,
+                last_n_baseline,
+                last_n_comparison,
+                mode,
+                metric,
+                print_improvements_only,
+                print_regressions_only,
+                skip_unstable,
+                regressions_percent_lower_limit,
+                rts,
+                simplify_table,
+                test_filter,
+                chunk_test_names,
+                tf_triggering_env,
+                verbose,
+                running_platform,
+                baseline_architecture,
+                comparison_architecture,
+                first_n_baseline,
+                first_n_comparison,
+                bulk_fetch,
+                compare_workers,
+                series_cache,
+                detection_method,
+                significance_level,
+                baseline_by_metric.get(metric),
+                comparison_by_metric.get(metric),
+                aggregation,
+                compaction_tier,
+                records_writer,
+            )
+            metric_totals = metrics_totals[metric]
+            metric_totals["regressions"] += metric_total_regressions
+            metric_totals["improvements"] += metric_improvements
+            metric_totals["stable"] += metric_stable
+            metric_totals["unstable"] += metric_unstable
+            detected_regressions.extend(
+                [
+                    "{} ({})".format(test_name, metric)
+                    for test_name in metric_regressions
+                ]
+            )
+            total_improvements = total_improvements + metric_improvements
+            total_regressions = total_regressions + metric_total_regressions
+            total_stable = total_stable + metric_stable
+            total_unstable = total_unstable + metric_unstable
+            total_comparison_points = total_comparison_points + metric_comparison_points
+            for row in metric_table:
+                rows_by_test_name.setdefault(row[0], []).append(
+                    [row[0], "{} ({})".format(metric, mode)] + row[1:]
+                )
+        for test_name in chunk_test_names:
+            table.extend(rows_by_test_name.get(test_name, []))
     return (
         detected_regressions,
         table,
@@ -988,6 +1664,507 @@ def from_rts_to_regression_table(
     )
 
 
+def get_metrics_totals_table_output(metrics_totals):
+    writer = MarkdownTableWriter(
+        table_name="Per metric summary",
+        headers=["Metric", "Mode", "Regressions", "Improvements", "Stable", "Unstable"],
+        value_matrix=[
+            [
+                metric,
+                totals["mode"],
+                totals["regressions"],
+                totals["improvements"],
+                totals["stable"],
+                totals["unstable"],
+            ]
+            for metric, totals in metrics_totals.items()
+        ],
+    )
+    return "\n" + writer.dumps()
+
+
+def get_test_comparison_datapoints(
+    rts,
+    test_name,
+    test_filter,
+    baseline_str,
+    comparison_str,
+    filters_baseline_common,
+    filters_comparison_common,
+    baseline_datapoints_by_ts_name,
+    comparison_datapoints_by_ts_name,
+    from_ts_ms,
+    to_ts_ms,
+    verbose,
+    series_cache=None,
+    aggregation=None,
+):
+    """
+    Selects the baseline and comparison time-series of a single test and fetches
+    their datapoints ( when not bulk fetched already ).
+    Returns None when the test should be skipped. A side is None if fetching it failed.
+    """
+    multi_value_baseline = check_multi_value_filter(baseline_str)
+    multi_value_comparison = check_multi_value_filter(comparison_str)
+    if baseline_datapoints_by_ts_name is not None:
+        baseline_timeseries = list(baseline_datapoints_by_ts_name.keys())
+        comparison_timeseries = list(comparison_datapoints_by_ts_name.keys())
+    else:
+        test_name_filter = "{}={}".format(test_filter, test_name)
+        baseline_timeseries = rts.ts().queryindex(
+            filters_baseline_common + [test_name_filter]
+        )
+        comparison_timeseries = rts.ts().queryindex(
+            filters_comparison_common + [test_name_filter]
+        )
+
+    # avoiding target time-series
+    comparison_timeseries = [x for x in comparison_timeseries if "target" not in x]
+    baseline_timeseries = [x for x in baseline_timeseries if "target" not in x]
+    if verbose:
+        logging.info(
+            "Baseline timeseries for {}: {}. test={}".format(
+                baseline_str, len(baseline_timeseries), test_name
+            )
+        )
+        logging.info(
+            "Comparison timeseries for {}: {}. test={}".format(
+                comparison_str, len(comparison_timeseries), test_name
+            )
+        )
+    if len(baseline_timeseries) > 1 and multi_value_baseline is False:
+        baseline_timeseries = get_only_Totals(baseline_timeseries)
+
+    if len(baseline_timeseries) != 1 and multi_value_baseline is False:
+        if verbose:
+            logging.warning(
+                "Skipping this test given the value of timeseries !=1. Baseline timeseries {}".format(
+                    len(baseline_timeseries)
+                )
+            )
+            if len(baseline_timeseries) > 1:
+                logging.warning(
+                    "\t\tTime-series: {}".format(", ".join(baseline_timeseries))
+                )
+        return None
+
+    if len(comparison_timeseries) > 1 and multi_value_comparison is False:
+        comparison_timeseries = get_only_Totals(comparison_timeseries)
+    if len(comparison_timeseries) != 1 and multi_value_comparison is False:
+        if verbose:
+            logging.warning(
+                "Comparison timeseries {}".format(len(comparison_timeseries))
+            )
+        return None
+
+    baseline_datapoints = []
+    comparison_datapoints = []
+    try:
+        for ts_name_baseline in baseline_timeseries:
+            datapoints_inner = get_timeseries_datapoints(
+                rts,
+                ts_name_baseline,
+                from_ts_ms,
+                to_ts_ms,
+                baseline_datapoints_by_ts_name,
+                series_cache,
+                aggregation,
+            )
+            baseline_datapoints.extend(datapoints_inner)
+    except redis.exceptions.ResponseError:
+        return None, None
+    try:
+        for ts_name_comparison in comparison_timeseries:
+            datapoints_inner = get_timeseries_datapoints(
+                rts,
+                ts_name_comparison,
+                from_ts_ms,
+                to_ts_ms,
+                comparison_datapoints_by_ts_name,
+                series_cache,
+                aggregation,
+            )
+            comparison_datapoints.extend(datapoints_inner)
+    except redis.exceptions.ResponseError:
+        comparison_datapoints = None
+    return baseline_datapoints, comparison_datapoints
+
+
+def get_tests_datapoints_stats(
+    tests_datapoints,
+    last_n_baseline,
+    last_n_comparison,
+    first_n_baseline,
+    first_n_comparison,
+):
+    """
+    Computes in a single batch the stats of every baseline and comparison
+    datapoints list. Returns a list of (baseline stats, comparison stats) per
+    test, following the tests_datapoints order.
+    """
+    datapoints_list = []
+    last_n_list = []
+    first_n_list = []
+    for test_datapoints in tests_datapoints:
+        if test_datapoints is None:
+            continue
+        for datapoints, last_n, first_n in zip(
+            test_datapoints,
+            [last_n_baseline, last_n_comparison],
+            [first_n_baseline, first_n_comparison],
+        ):
+            if datapoints is not None:
+                datapoints_list.append(datapoints)
+                last_n_list.append(last_n)
+                first_n_list.append(first_n)
+    median, std, cv, count = get_datapoints_stats_batch(
+        datapoints_list, last_n_list, first_n_list
+    )
+    tests_stats = []
+    pos = 0
+    for test_datapoints in tests_datapoints:
+        if test_datapoints is None:
+            tests_stats.append(None)
+            continue
+        test_stats = []
+        for datapoints in test_datapoints:
+            if datapoints is None:
+                test_stats.append(None)
+                continue
+            test_stats.append(
+                (float(median[pos]), float(std[pos]), float(cv[pos]), int(count[pos]))
+            )
+            pos = pos + 1
+        tests_stats.append(test_stats)
+    return tests_stats
+
+
+def get_tests_significance(
+    tests_datapoints,
+    last_n_baseline,
+    last_n_comparison,
+    first_n_baseline,
+    first_n_comparison,
+    detection_method,
+    metric_mode,
+    significance_level,
+):
+    """
+    Runs the significance engine in a single batch over all tests with both
+    baseline and comparison datapoints. Returns a list of
+    (p-value, effect size, ci low, ci high) per test, or None when not computed.
+    """
+    tests_pos = []
+    baseline_datapoints_list = []
+    comparison_datapoints_list = []
+    for pos, test_datapoints in enumerate(tests_datapoints):
+        if test_datapoints is None or None in test_datapoints:
+            continue
+        tests_pos.append(pos)
+        baseline_datapoints_list.append(test_datapoints[0])
+        comparison_datapoints_list.append(test_datapoints[1])
+    tests_significance = [None for _ in tests_datapoints]
+    if len(tests_pos) == 0:
+        return tests_significance
+    baseline_windows = get_datapoints_windows(
+        baseline_datapoints_list,
+        [last_n_baseline for _ in tests_pos],
+        [first_n_baseline for _ in tests_pos],
+    )
+    comparison_windows = get_datapoints_windows(
+        comparison_datapoints_list,
+        [last_n_comparison for _ in tests_pos],
+        [first_n_comparison for _ in tests_pos],
+    )
+    p_values, effect_sizes, ci_low, ci_high = get_significance_batch(
+        detection_method,
+        baseline_windows,
+        comparison_windows,
+        metric_mode,
+        1.0 - significance_level,
+    )
+    for batch_pos, pos in enumerate(tests_pos):
+        tests_significance[pos] = (
+            float(p_values[batch_pos]),
+            float(effect_sizes[batch_pos]),
+            float(ci_low[batch_pos]),
+            float(ci_high[batch_pos]),
+        )
+    return tests_significance
+
+
+def get_significance_headers(detection_method, significance_level, bucket_level=False):
+    headers = []
+    if detection_method != DETECTION_METHOD_WATERLINE:
+        headers = [
+            "p-value ({}{})".format(
+                detection_method, ", bucket-level" if bucket_level else ""
+            ),
+            "Effect size",
+        ]
+    if detection_method == DETECTION_METHOD_BOOTSTRAP:
+        headers.append(
+            "{:.0f}% CI of % change".format((1.0 - significance_level) * 100.0)
+        )
+    return headers
+
+
+def get_significance_columns(detection_method, test_significance):
+    columns = []
+    if detection_method == DETECTION_METHOD_WATERLINE:
+        return columns
+    p_value_str = "N/A"
+    effect_size_str = "N/A"
+    ci_str = "N/A"
+    if test_significance is not None:
+        p_value, effect_size, ci_low, ci_high = test_significance
+        if math.isnan(p_value) is False:
+            p_value_str = "{:.3f}".format(p_value)
+        if math.isnan(effect_size) is False:
+            effect_size_str = "{:.2f}".format(effect_size)
+        if math.isnan(ci_low) is False and math.isnan(ci_high) is False:
+            ci_str = "[{:.1f}%, {:.1f}%]".format(ci_low, ci_high)
+    columns = [p_value_str, effect_size_str]
+    if detection_method == DETECTION_METHOD_BOOTSTRAP:
+        columns.append(ci_str)
+    return columns
+
+
+def get_test_comparison_values(
+    baseline_datapoints,
+    comparison_datapoints,
+    baseline_stats,
+    comparison_stats,
+    regressions_percent_lower_limit,
+    verbose,
+):
+    waterline = regressions_percent_lower_limit
+    baseline_v = "N/A"
+    comparison_v = "N/A"
+    baseline_nsamples = 0
+    comparison_nsamples = 0
+    largest_variance = 0
+    baseline_pct_change = "N/A"
+    comparison_pct_change = "N/A"
+
+    note = ""
+    try:
+        if baseline_datapoints is not None:
+            (
+                baseline_pct_change,
+                baseline_v,
+                largest_variance,
+                baseline_nsamples,
+            ) = get_v_pct_change_and_largest_var(
+                baseline_datapoints,
+                baseline_pct_change,
+                baseline_v,
+                largest_variance,
+                verbose=verbose,
+                datapoints_stats=baseline_stats,
+            )
+            if comparison_datapoints is not None:
+                (
+                    comparison_pct_change,
+                    comparison_v,
+                    largest_variance,
+                    comparison_nsamples,
+                ) = get_v_pct_change_and_largest_var(
+                    comparison_datapoints,
+                    comparison_pct_change,
+                    comparison_v,
+                    largest_variance,
+                    verbose=verbose,
+                    datapoints_stats=comparison_stats,
+                )
+
+                waterline = regressions_percent_lower_limit
+                if regressions_percent_lower_limit < largest_variance:
+                    note = "waterline={:.1f}%.".format(largest_variance)
+                    waterline = largest_variance
+
+    except ZeroDivisionError as e:
+        logging.error("Detected a ZeroDivisionError. {}".format(e.__str__()))
+        pass
+    return (
+        baseline_v,
+        comparison_v,
+        baseline_pct_change,
+        comparison_pct_change,
+        baseline_nsamples,
+        comparison_nsamples,
+        note,
+        waterline,
+    )
+
+
+def get_comparison_filters(
+    by_str,
+    by_value_str,
+    metric_name,
+    deployment_name,
+    tf_triggering_env,
+    running_platform=None,
+    architecture=ARCH_X86,
+    compaction_tier=None,
+):
+    filters = [
+        "{}={}".format(by_str, by_value_str),
+        "metric={}".format(metric_name),
+        "deployment_name={}".format(deployment_name),
+        "triggering_env={}".format(tf_triggering_env),
+    ]
+    if running_platform is not None:
+        filters.append("running_platform={}".format(running_platform))
+    if architecture != ARCH_X86:
+        filters.append(f"arch={architecture}")
+    # without a compaction tier only the raw series match
+    if compaction_tier is None:
+        compaction_tier = ""
+    filters.append("{}={}".format(COMPACTION_LABEL, compaction_tier))
+    return filters
+
+
+def get_test_names_filter_chunks(
+    test_names, chunk_size=COMPARE_MRANGE_TEST_NAMES_CHUNK_SIZE
+):
+    chunks = []
+    chunk = []
+    for test_name in test_names:
+        # names that would break a multi value filter are queried on their own
+        if "," in test_name or "(" in test_name or ")" in test_name:
+            chunks.append([test_name])
+            continue
+        chunk.append(test_name)
+        if len(chunk) == chunk_size:
+            chunks.append(chunk)
+            chunk = []
+    if len(chunk) > 0:
+        chunks.append(chunk)
+    return chunks
+
+
+def get_timeseries_by_test_name(
+    rts, filters, test_filter, test_names, from_ts_ms, to_ts_ms, aggregation=None
+):
+    """
+    Fetches the datapoints of every time-series matching the filters for all
+    the given test names with a few TS.MREVRANGE calls.
+    Returns a dict of test name -> dict of time-series name -> datapoints,
+    keeping the server order ( the same used by TS.QUERYINDEX ).
+    When aggregation is given ( see get_compare_aggregation ) the datapoints
+    are the server side aggregated buckets.
+    """
+    timeseries_by_test_name = {}
+    for test_name in test_names:
+        timeseries_by_test_name[test_name] = {}
+    for labels, ts_name, datapoints in get_mrevrange_by_test_name_chunks(
+        rts, filters, test_filter, test_names, from_ts_ms, to_ts_ms, [], aggregation
+    ):
+        test_name = labels.get(test_filter)
+        if test_name in timeseries_by_test_name:
+            timeseries_by_test_name[test_name][ts_name] = datapoints
+    return timeseries_by_test_name
+
+
+def get_mrevrange_by_test_name_chunks(
+    rts,
+    filters,
+    test_filter,
+    test_names,
+    from_ts_ms,
+    to_ts_ms,
+    select_labels=[],
+    aggregation=None,
+):
+    """
+    Yields the (labels, time-series name, datapoints) of every time-series
+    matching the filters for the given test names, one TS.MREVRANGE per chunk.
+    """
+    aggregation_type = None
+    bucket_size_ms = 0
+    if aggregation is not None:
+        aggregation_type, bucket_size_ms = aggregation
+    for chunk in get_test_names_filter_chunks(test_names):
+        if len(chunk) == 1:
+            test_names_filter = "{}={}".format(test_filter, chunk[0])
+        else:
+            test_names_filter = "{}=({})".format(test_filter, ",".join(chunk))
+        reply = rts.ts().mrevrange(
+            from_ts_ms,
+            to_ts_ms,
+            filters + [test_names_filter],
+            aggregation_type=aggregation_type,
+            bucket_size_msec=bucket_size_ms,
+            select_labels=[test_filter] + select_labels,
+        )
+        for serie in reply:
+            for ts_name, (labels, datapoints) in serie.items():
+                yield labels, ts_name, datapoints
+
+
+def get_timeseries_by_metric_and_test_name(
+    rts,
+    filters,
+    test_filter,
+    test_names,
+    metric_names,
+    from_ts_ms,
+    to_ts_ms,
+    aggregation=None,
+):
+    """
+    Same as get_timeseries_by_test_name for a multi value metric filter,
+    splitting the time-series by their metric label.
+    Returns a dict of metric -> test name -> time-series name -> datapoints.
+    """
+    timeseries_by_metric = {}
+    for metric in metric_names:
+        timeseries_by_metric[metric] = {}
+        for test_name in test_names:
+            timeseries_by_metric[metric][test_name] = {}
+    for labels, ts_name, datapoints in get_mrevrange_by_test_name_chunks(
+        rts,
+        filters,
+        test_filter,
+        test_names,
+        from_ts_ms,
+        to_ts_ms,
+        ["metric"],
+        aggregation,
+    ):
+        test_name = labels.get(test_filter)
+        metric = labels.get("metric")
+        if metric in timeseries_by_metric and test_name in timeseries_by_metric[metric]:
+            timeseries_by_metric[metric][test_name][ts_name] = datapoints
+    return timeseries_by_metric
+
+
+def get_timeseries_datapoints(
+    rts,
+    ts_name,
+    from_ts_ms,
+    to_ts_ms,
+    datapoints_by_ts_name=None,
+    series_cache=None,
+    aggregation=None,
+):
+    if datapoints_by_ts_name is not None:
+        return datapoints_by_ts_name[ts_name]
+    if aggregation is not None:
+        aggregation_type, bucket_size_ms = aggregation
+        return rts.ts().revrange(
+            ts_name,
+            from_ts_ms,
+            to_ts_ms,
+            aggregation_type=aggregation_type,
+            bucket_size_msec=bucket_size_ms,
+        )
+    if series_cache is not None:
+        return series_cache.get_datapoints(rts, ts_name, from_ts_ms, to_ts_ms)
+    return rts.ts().revrange(ts_name, from_ts_ms, to_ts_ms)
+
+
 def get_only_Totals(baseline_timeseries):
     logging.warning("\t\tTime-series: {}".format(", ".join(baseline_timeseries)))
     logging.info("Checking if Totals will reduce timeseries.")
@@ -999,6 +2176,10 @@ def get_only_Totals(baseline_timeseries):
     return baseline_timeseries
 
 
+def get_multi_value_filter_values(filter_str):
+    return [x.strip() for x in filter_str.strip().strip("()").split(",")]
+
+
 def check_multi_value_filter(baseline_str):
     multi_value_baseline = False
     if "(" in baseline_str and "," in baseline_str and ")" in baseline_str:
@@ -1006,7 +2187,13 @@ def check_multi_value_filter(baseline_str):
     return multi_value_baseline
 
 
-def prepare_value_str(baseline_pct_change, baseline_v, baseline_values, simplify_table):
+def prepare_value_str(
+    baseline_pct_change,
+    baseline_v,
+    baseline_nsamples,
+    simplify_table,
+    bucket_level=False,
+):
     if baseline_v < 1.0:
         baseline_v_str = " {:.2f}".format(baseline_v)
     elif baseline_v < 10.0:
@@ -1014,29 +2201,91 @@ def prepare_value_str(baseline_pct_change, baseline_v, baseline_values, simplify
     else:
         baseline_v_str = " {:.0f}".format(baseline_v)
     stamp_b = ""
-    if baseline_pct_change > 10.0:
+    if baseline_pct_change > 10.0 and not bucket_level:
         stamp_b = "UNSTABLE "
-    if len(baseline_values) > 1:
+    if baseline_nsamples > 1:
         baseline_v_str += " +- {:.1f}% {}".format(
             baseline_pct_change,
             stamp_b,
         )
-    if simplify_table is False and len(baseline_values) > 1:
-        baseline_v_str += "({} datapoints)".format(len(baseline_values))
+    if simplify_table is False and baseline_nsamples > 1:
+        baseline_v_str += "({} {})".format(
+            baseline_nsamples, "buckets" if bucket_level else "datapoints"
+        )
     return baseline_v_str
 
 
-def get_test_names_from_db(rts, tags_regex_string, test_names, used_key):
+def get_regex_literal_prefix(regex_string):
+    """
+    Returns the literal prefix every string matching the ( re.search ) regex
+    starts with, or "" when the regex isn't anchored to the start.
+    """
+    if type(regex_string) is re.Pattern:
+        regex_string = regex_string.pattern
+    # alternations can match without the prefix
+    if regex_string.startswith("^") is False or "|" in regex_string:
+        return ""
+    prefix = ""
+    for char in regex_string[1:]:
+        if char in ".^$*+?{}[]\\|()":
+            # a quantifier makes the previous char optional
+            if char in "*?{" and len(prefix) > 0:
+                prefix = prefix[:-1]
+            break
+        prefix = prefix + char
+    return prefix
+
+
+def get_local_results_compare_test_names(local_results, tags_regex_string):
+    """
+    Returns the sorted names of the tests with local results on either side
+    that match the ( re.search ) regex.
+    """
+    test_names = set()
+    for by_metric in local_results:
+        for by_test_name in by_metric.values():
+            test_names.update(by_test_name.keys())
+    return sorted(
+        [x for x in test_names if re.search(tags_regex_string, x) is not None]
+    )
+
+
+def get_test_names_from_db(
+    rts, tags_regex_string, test_names, used_key, from_ts_ms=None
+):
+    """
+    Streams the project test names via SSCAN, pushing the literal prefix of
+    the regex into MATCH. When from_ts_ms is given and the test-cases sorted
+    set exists, only tests that ran since from_ts_ms are kept. Given that
+    sorted set scores each test by its last run, a test that ran within the
+    compare window and after it is kept as well.
+    """
     try:
-        test_names = rts.smembers(used_key)
-        test_names = list(test_names)
-        test_names.sort()
+        match = None
+        # the prefix has no regex special chars, so neither glob-style ones
+        prefix = get_regex_literal_prefix(tags_regex_string)
+        if prefix != "":
+            match = prefix + "*"
+        recent_test_names = None
+        zset_key = "{}:zset".format(used_key)
+        if from_ts_ms is not None and rts.exists(zset_key):
+            recent_test_names = set(rts.zrangebyscore(zset_key, from_ts_ms, "+inf"))
+            logging.info(
+                "{} tests ran since {} based on {}".format(
+                    len(recent_test_names), from_ts_ms, zset_key
+                )
+            )
         final_test_names = []
-        for test_name in test_names:
+        for test_name in rts.sscan_iter(
+            used_key, match=match, count=COMPARE_SSCAN_COUNT
+        ):
+            if recent_test_names is not None and test_name not in recent_test_names:
+                continue
             test_name = test_name.decode()
             match_obj = re.search(tags_regex_string, test_name)
             if match_obj is not None:
                 final_test_names.append(test_name)
+        final_test_names.sort()
         test_names = final_test_names
 
     except redis.exceptions.ResponseError as e:
@@ -1061,7 +2310,10 @@ def add_line(
     percentage_change,
     table,
     test_name,
+    extra_columns=None,
 ):
+    if extra_columns is None:
+        extra_columns = []
     percentage_change_str = "{:.1f}% ".format(percentage_change)
     table.append(
         [
@@ -1071,6 +2323,7 @@ def add_line(
             percentage_change_str,
             note.strip(),
         ]
+        + extra_columns
     )
 
 
@@ -1078,33 +2331,31 @@ def get_v_pct_change_and_largest_var(
     comparison_datapoints,
     comparison_pct_change,
     comparison_v,
-    comparison_values,
     largest_variance,
     last_n=-1,
     verbose=False,
     first_n=-1,
+    datapoints_stats=None,
 ):
-    comparison_nsamples = len(comparison_datapoints)
-    if comparison_nsamples > 0:
-        _, comparison_v = comparison_datapoints[0]
-
-        # Apply first_n and last_n boundaries
-        start_idx = 0 if first_n < 0 else max(0, min(first_n, comparison_nsamples))
-        end_idx = (
-            comparison_nsamples
-            if last_n < 0
-            else max(0, min(last_n, comparison_nsamples))
-        )
-
-        selected_data = comparison_datapoints[start_idx:end_idx]
-
-        for tuple in selected_data:
-            comparison_values.append(tuple[1])
-
-        comparison_df = pd.DataFrame(comparison_values)
-        comparison_median = float(comparison_df.median())
+    """
+    Uses the (median, std-dev, cv, count) datapoints_stats when already computed
+    in batch via get_datapoints_stats_batch, otherwise computes them.
+    Returns the pct change ( cv ), the median value, the largest variance and
+    the number of samples used.
+    """
+    comparison_nsamples = 0
+    if len(comparison_datapoints) > 0:
+        if datapoints_stats is None:
+            datapoints_stats = get_datapoints_stats(
+                comparison_datapoints, last_n, first_n
+            )
+        (
+            comparison_median,
+            comparison_std,
+            _,
+            comparison_nsamples,
+        ) = datapoints_stats
         comparison_v = comparison_median
-        comparison_std = float(comparison_df.std())
         if verbose:
             logging.info(
                 "comparison_datapoints: {} value: {}; std-dev: {}; median: {}".format(
@@ -1114,7 +2365,9 @@ def get_v_pct_change_and_largest_var(
                     comparison_median,
                 )
             )
-        comparison_pct_change = (comparison_std / comparison_median) * 100.0
+        if comparison_median == 0.0:
+            raise ZeroDivisionError("float division by zero")
+        comparison_pct_change = datapoints_stats[2]
         if comparison_pct_change > largest_variance:
             largest_variance = comparison_pct_change
-    return comparison_pct_change, comparison_v, largest_variance
+    return comparison_pct_change, comparison_v, largest_variance, comparison_nsamples
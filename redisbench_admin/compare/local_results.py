@@ -0,0 +1,299 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import datetime
+import glob
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from redisbench_admin.run.common import get_start_time_vars
+from redisbench_admin.run.metrics import extract_results_table
+
+# start time string of the run-local/run-remote result filenames
+LOCAL_RESULTS_START_TIME_REGEX = re.compile(r"\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}")
+LOCAL_RESULTS_START_TIME_FORMAT = "%Y-%m-%d-%H-%M-%S"
+
+
+def get_local_results_filenames(results_path):
+    """
+    Returns the sorted result JSON files of a directory, or the ones matching
+    a glob pattern.
+    """
+    if os.path.isdir(results_path):
+        results_path = os.path.join(results_path, "*.json")
+    return sorted(glob.glob(results_path))
+
+
+def get_local_result_run_info(filename, deployment_name, github_org, github_repo):
+    """
+    Parses a run-local ( <setup>-<start time>-<branch>-<test>.json ) or
+    run-remote ( <start time>-<org>-<repo>-<branch>-<test>-<setup>-<sha>.json )
+    result filename. Returns the run start time in ms and the run name
+    ( <branch>-<test> ), or None when the file isn't a result of deployment_name.
+    """
+    name = os.path.basename(filename)
+    if name.endswith(".json"):
+        name = name[: -len(".json")]
+    match = LOCAL_RESULTS_START_TIME_REGEX.search(name)
+    if match is None:
+        return None
+    start_time = datetime.datetime.strptime(
+        match.group(0), LOCAL_RESULTS_START_TIME_FORMAT
+    )
+    _, start_time_ms, _ = get_start_time_vars(start_time)
+    run_name = name[match.end() + 1 :]
+    if match.start() > 0:
+        if name[: match.start() - 1] != deployment_name:
+            return None
+    else:
+        project_prefix = "{}-{}-".format(github_org, github_repo)
+        if run_name.startswith(project_prefix):
+            run_name = run_name[len(project_prefix) :]
+        # the github sha has no dashes
+        run_name = run_name.rsplit("-", 1)[0]
+        setup_suffix = "-{}".format(deployment_name)
+        if run_name.endswith(setup_suffix) is False:
+            return None
+        run_name = run_name[: -len(setup_suffix)]
+    if run_name == "":
+        return None
+    return start_time_ms, run_name
+
+
+def get_local_results_common_prefix(run_names):
+    """
+    Returns the longest dash delimited prefix shared by all run names.
+    """
+    common_prefix = os.path.commonprefix(run_names)
+    return common_prefix[: common_prefix.rfind("-") + 1]
+
+
+def get_local_results_common_suffix(names):
+    """
+    Returns the longest dash delimited suffix shared by all names.
+    """
+    common = []
+    for segments in zip(*[x.split("-")[::-1] for x in names]):
+        if len(set(segments)) != 1:
+            break
+        common.append(segments[0])
+    return "-".join(common[::-1])
+
+
+def get_local_results_test_names(run_names, branch=None, test_names=None):
+    """
+    Returns a dict of run name -> test name. When test_names are given, a run
+    belongs to the longest test name it ends with, and runs matching none are
+    left out. Otherwise the branch prefix is removed when known.
+    """
+    run_test_names = {}
+    distinct_run_names = sorted(set(run_names))
+    prefix = ""
+    if branch is not None and all(
+        [x.startswith(branch + "-") for x in distinct_run_names]
+    ):
+        prefix = branch + "-"
+    for run_name in distinct_run_names:
+        if test_names is not None:
+            matches = [
+                test_name
+                for test_name in test_names
+                if run_name == test_name or run_name.endswith("-" + test_name)
+            ]
+            if len(matches) > 0:
+                run_test_names[run_name] = max(matches, key=len)
+            continue
+        run_test_names[run_name] = run_name[len(prefix) :]
+    return run_test_names
+
+
+def match_local_results_test_names(baseline_test_names, comparison_test_names):
+    """
+    Removes the branches that couldn't be removed up front from the run name ->
+    test name dicts, in place. The branch of a side is the part of the prefix
+    shared by all its runs that isn't shared by the other side runs as well,
+    given the tests themselves can share a prefix.
+    """
+    test_names_sides = [baseline_test_names, comparison_test_names]
+    prefixes = []
+    for test_names in test_names_sides:
+        if len(test_names) == 0:
+            return
+        prefixes.append(
+            get_local_results_common_prefix([x + "-" for x in test_names.values()])
+        )
+    shared = get_local_results_common_suffix([x[:-1] for x in prefixes])
+    shared_len = 0
+    if shared != "":
+        shared_len = len(shared) + 1
+    distinct_test_names = [set(x.values()) for x in test_names_sides]
+    for test_names, prefix in zip(test_names_sides, prefixes):
+        branch_prefix = prefix[: len(prefix) - shared_len]
+        for run_name, test_name in test_names.items():
+            test_names[run_name] = test_name[len(branch_prefix) :]
+    # a single test on each side can't be told apart from its branch, they
+    # are paired explicitly instead of leaving nothing to compare
+    matched_test_names = [set(x.values()) for x in test_names_sides]
+    if (
+        len(distinct_test_names[0]) == 1
+        and len(distinct_test_names[1]) == 1
+        and (
+            matched_test_names[0] != matched_test_names[1]
+            or "" in matched_test_names[0]
+        )
+    ):
+        paired_test_name = shared
+        if paired_test_name == "":
+            paired_test_name = "{} vs {}".format(
+                list(distinct_test_names[0])[0], list(distinct_test_names[1])[0]
+            )
+        for test_names in test_names_sides:
+            for run_name in test_names:
+                test_names[run_name] = paired_test_name
+
+
+def get_local_results_branch(results_path, run_test_names):
+    """
+    Returns the branch of a side: the part of its run names left once the
+    test names are removed, when all runs agree on it. Falls back to the
+    results directory name.
+    """
+    branches = set()
+    for run_name, test_name in run_test_names.items():
+        branch = ""
+        if run_name.endswith("-" + test_name):
+            branch = run_name[: -len(test_name) - 1]
+        branches.add(branch)
+    if len(branches) == 1 and "" not in branches:
+        return branches.pop()
+    results_dir = os.path.normpath(results_path)
+    if glob.has_magic(os.path.basename(results_dir)) or os.path.isfile(results_dir):
+        results_dir = os.path.dirname(results_dir)
+    return os.path.basename(os.path.abspath(results_dir))
+
+
+def load_local_result(filename, metrics):
+    """
+    Extracts the metrics of a single result JSON file with the same jsonpath
+    logic used when exporting the results. Returns None if it can't be read.
+    """
+    try:
+        with open(filename, "r") as json_file:
+            results_dict = json.load(json_file)
+    except (OSError, ValueError) as e:
+        logging.warning(
+            "Unable to read the results file {}. Error: {}".format(
+                filename, e.__str__()
+            )
+        )
+        return None
+    return extract_results_table(metrics, results_dict)
+
+
+def load_local_results(
+    baseline_results,
+    comparison_results,
+    metric_names,
+    default_metrics,
+    deployment_name,
+    github_org,
+    github_repo,
+    baseline_branch=None,
+    comparison_branch=None,
+    test_names=None,
+    use_metric_context_path=False,
+    workers=1,
+):
+    """
+    Loads the baseline and comparison result files, parsing them in parallel.
+    Returns, for each side, a dict of metric name -> test name -> series name ->
+    datapoints ( most recent first ), the same layout the bulk fetch produces,
+    followed by the baseline and comparison branches ( the given ones, or the
+    ones inferred from the run names ).
+    Each result file contributes one datapoint per series.
+    """
+    metrics = list(default_metrics)
+    for metric_name in metric_names:
+        metric_jsonpath = "$.{}".format(metric_name)
+        if metric_jsonpath not in metrics:
+            metrics.append(metric_jsonpath)
+    sides = []
+    for results_path, branch in [
+        (baseline_results, baseline_branch),
+        (comparison_results, comparison_branch),
+    ]:
+        runs = []
+        for filename in get_local_results_filenames(results_path):
+            run_info = get_local_result_run_info(
+                filename, deployment_name, github_org, github_repo
+            )
+            if run_info is not None:
+                runs.append((filename, run_info[0], run_info[1]))
+        logging.info(
+            "Found {} result files of deployment {} on {}".format(
+                len(runs), deployment_name, results_path
+            )
+        )
+        run_test_names = get_local_results_test_names(
+            [run_name for _, _, run_name in runs], branch, test_names
+        )
+        sides.append((runs, run_test_names))
+    if test_names is None:
+        match_local_results_test_names(sides[0][1], sides[1][1])
+    branches = []
+    for (_, run_test_names), results_path, branch in zip(
+        sides,
+        [baseline_results, comparison_results],
+        [baseline_branch, comparison_branch],
+    ):
+        if branch is None:
+            branch = get_local_results_branch(results_path, run_test_names)
+        branches.append(branch)
+    filenames = [filename for runs, _ in sides for filename, _, _ in runs]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results_tables = dict(
+            zip(
+                filenames,
+                executor.map(lambda x: load_local_result(x, metrics), filenames),
+            )
+        )
+    by_metric_sides = []
+    for runs, run_test_names in sides:
+        by_metric = {}
+        for metric_name in metric_names:
+            by_metric[metric_name] = {}
+        for filename, start_time_ms, run_name in runs:
+            if run_name not in run_test_names or results_tables[filename] is None:
+                continue
+            test_name = run_test_names[run_name]
+            for (
+                _,
+                metric_context_path,
+                metric_name,
+                metric_value,
+                _,
+                metric_has_context_path,
+            ) in results_tables[filename]:
+                if metric_name not in by_metric:
+                    continue
+                test_key = test_name
+                ts_name = metric_name
+                if metric_has_context_path:
+                    if use_metric_context_path:
+                        test_key = "{}:{}".format(test_name, metric_context_path)
+                    else:
+                        ts_name = "{}:{}".format(metric_context_path, metric_name)
+                by_metric[metric_name].setdefault(test_key, {}).setdefault(
+                    ts_name, []
+                ).append([start_time_ms, metric_value])
+        for by_test_name in by_metric.values():
+            for datapoints_by_ts_name in by_test_name.values():
+                for datapoints in datapoints_by_ts_name.values():
+                    datapoints.sort(key=lambda x: x[0], reverse=True)
+        by_metric_sides.append(by_metric)
+    return by_metric_sides[0], by_metric_sides[1], branches[0], branches[1]
@@ -0,0 +1,361 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import logging
+import re
+
+from pytablewriter import MarkdownTableWriter
+
+from redisbench_admin.compare.args import ARCH_X86
+from redisbench_admin.compare.compare import (
+    check_multi_value_filter,
+    get_compare_time_range_ms,
+    get_comparison_filters,
+    get_mrevrange_by_test_name_chunks,
+    get_only_Totals,
+    get_test_names_from_db,
+    is_bucket_level_compare,
+    prepare_value_str,
+)
+from redisbench_admin.compare.stats import get_datapoints_stats_batch
+from redisbench_admin.utils.remote import get_overall_dashboard_keynames
+
+
+def compare_matrix_logic(
+    rts,
+    branches_str,
+    tags_str,
+    reference,
+    tf_github_org,
+    tf_github_repo,
+    tf_triggering_env,
+    metric_name,
+    metric_mode,
+    deployment_name,
+    test="",
+    testname_regex=".*",
+    use_metric_context_path=False,
+    from_date=None,
+    from_ts_ms=None,
+    to_date=None,
+    to_ts_ms=None,
+    last_n=-1,
+    first_n=-1,
+    regressions_percent_lower_limit=5.0,
+    simplify_table=False,
+    running_platform=None,
+    architecture=ARCH_X86,
+    aggregation=None,
+    compaction_tier=None,
+):
+    if check_multi_value_filter(metric_name):
+        logging.error(
+            "The matrix compare supports a single metric. Use --metric_name to pick one of {}".format(
+                metric_name
+            )
+        )
+        exit(1)
+    entries, reference_entry = get_matrix_by_strings(branches_str, tags_str, reference)
+    from_ts_ms, to_ts_ms = get_compare_time_range_ms(
+        from_date, from_ts_ms, to_date, to_ts_ms
+    )
+    (
+        _,
+        testcases_setname,
+        _,
+        _,
+        _,
+        _,
+        _,
+        _,
+        testcases_metric_context_path_setname,
+        _,
+        _,
+        _,
+        _,
+        _,
+    ) = get_overall_dashboard_keynames(tf_github_org, tf_github_repo, tf_triggering_env)
+    test_filter = "test_name"
+    used_key = testcases_setname
+    if use_metric_context_path:
+        test_filter = "test_name:metric_context_path"
+        used_key = testcases_metric_context_path_setname
+    if test != "":
+        test_names = test.split(",")
+    else:
+        test_names = get_test_names_from_db(
+            rts, re.compile(testname_regex), [], used_key, from_ts_ms
+        )
+    table_output, totals = compute_matrix_regression_table(
+        rts,
+        entries,
+        reference_entry,
+        metric_name,
+        test_names,
+        deployment_name,
+        tf_triggering_env,
+        test_filter,
+        from_ts_ms,
+        to_ts_ms,
+        last_n,
+        first_n,
+        metric_mode,
+        regressions_percent_lower_limit,
+        simplify_table,
+        running_platform,
+        architecture,
+        aggregation,
+        compaction_tier,
+    )
+    for value, (total_regressions, total_improvements) in totals.items():
+        logging.info(
+            "{} vs {}: {} regressions and {} improvements above the water line {}".format(
+                value,
+                reference_entry[1],
+                total_regressions,
+                total_improvements,
+                regressions_percent_lower_limit,
+            )
+        )
+    print(table_output)
+    return table_output, totals
+
+
+def get_matrix_by_strings(branches_str, tags_str, reference=None):
+    """
+    Returns the list of (by string, value) matrix entries from the comma
+    separated lists of branches and tags, and the reference entry the others
+    are compared against ( the first entry when no reference is given ).
+    """
+    entries = []
+    for by_str, values_str in [("branch", branches_str), ("version", tags_str)]:
+        if values_str is None or values_str == "":
+            continue
+        for value in values_str.split(","):
+            value = value.strip()
+            if value != "" and (by_str, value) not in entries:
+                entries.append((by_str, value))
+    if len(entries) < 2:
+        logging.error(
+            "You need to provide at least 2 branches/tags to compare via --matrix-branches and/or --matrix-tags"
+        )
+        exit(1)
+    reference_entry = entries[0]
+    if reference is not None and reference != "":
+        matches = [entry for entry in entries if entry[1] == reference]
+        if len(matches) == 0:
+            logging.error(
+                "--matrix-reference {} is not part of the matrix branches/tags".format(
+                    reference
+                )
+            )
+            exit(1)
+        reference_entry = matches[0]
+    return entries, reference_entry
+
+
+def get_matrix_timeseries(
+    rts,
+    entries,
+    metric_name,
+    deployment_name,
+    tf_triggering_env,
+    test_filter,
+    test_names,
+    from_ts_ms,
+    to_ts_ms,
+    running_platform=None,
+    architecture=ARCH_X86,
+    aggregation=None,
+    compaction_tier=None,
+):
+    """
+    Fetches the datapoints of all matrix entries for all tests, with one
+    multi value filter (e.g. version=(7.0.0,7.2.0)) TS.MREVRANGE pass per
+    label kind. Returns a dict of test name -> entry -> time-series name ->
+    datapoints.
+    """
+    timeseries_by_test_name = {}
+    for test_name in test_names:
+        timeseries_by_test_name[test_name] = {}
+        for entry in entries:
+            timeseries_by_test_name[test_name][entry] = {}
+    for by_str in ["branch", "version"]:
+        values = [value for entry_by_str, value in entries if entry_by_str == by_str]
+        if len(values) == 0:
+            continue
+        by_value_str = values[0]
+        if len(values) > 1:
+            by_value_str = "({})".format(",".join(values))
+        filters = get_comparison_filters(
+            by_str,
+            by_value_str,
+            metric_name,
+            deployment_name,
+            tf_triggering_env,
+            running_platform,
+            architecture,
+            compaction_tier,
+        )
+        for labels, ts_name, datapoints in get_mrevrange_by_test_name_chunks(
+            rts,
+            filters,
+            test_filter,
+            test_names,
+            from_ts_ms,
+            to_ts_ms,
+            [by_str],
+            aggregation,
+        ):
+            test_name = labels.get(test_filter)
+            entry = (by_str, labels.get(by_str))
+            if (
+                test_name in timeseries_by_test_name
+                and entry in timeseries_by_test_name[test_name]
+            ):
+                timeseries_by_test_name[test_name][entry][ts_name] = datapoints
+    return timeseries_by_test_name
+
+
+def get_matrix_entry_datapoints(datapoints_by_ts_name):
+    """
+    Selects the time-series of a test entry the same way compare does: target
+    time-series are ignored and, when there are several, only Totals are used.
+    Returns None when there isn't a single time-series to use.
+    """
+    ts_names = [x for x in datapoints_by_ts_name.keys() if "target" not in x]
+    if len(ts_names) > 1:
+        ts_names = get_only_Totals(ts_names)
+    if len(ts_names) != 1:
+        return None
+    return datapoints_by_ts_name[ts_names[0]]
+
+
+def compute_matrix_regression_table(
+    rts,
+    entries,
+    reference_entry,
+    metric_name,
+    test_names,
+    deployment_name="oss-standalone",
+    tf_triggering_env="circleci",
+    test_filter="test_name",
+    from_ts_ms=None,
+    to_ts_ms=None,
+    last_n=-1,
+    first_n=-1,
+    metric_mode="higher-better",
+    regressions_percent_lower_limit=5.0,
+    simplify_table=False,
+    running_platform=None,
+    architecture=ARCH_X86,
+    aggregation=None,
+    compaction_tier=None,
+):
+    """
+    Compares N branches/versions at once: one column with the median of each
+    entry and one column with the % change of each entry against the
+    reference. Returns the markdown table and a dict of entry value ->
+    (total regressions, total improvements) against the reference.
+    """
+    timeseries_by_test_name = get_matrix_timeseries(
+        rts,
+        entries,
+        metric_name,
+        deployment_name,
+        tf_triggering_env,
+        test_filter,
+        test_names,
+        from_ts_ms,
+        to_ts_ms,
+        running_platform,
+        architecture,
+        aggregation,
+        compaction_tier,
+    )
+    others = [entry for entry in entries if entry != reference_entry]
+    ordered_entries = [reference_entry] + others
+    datapoints_list = []
+    positions = {}
+    for test_name in test_names:
+        for entry in ordered_entries:
+            datapoints = get_matrix_entry_datapoints(
+                timeseries_by_test_name[test_name][entry]
+            )
+            if datapoints is not None and len(datapoints) > 0:
+                positions[(test_name, entry)] = len(datapoints_list)
+                datapoints_list.append(datapoints)
+    median, _, cv, count = get_datapoints_stats_batch(
+        datapoints_list,
+        [last_n for _ in datapoints_list],
+        [first_n for _ in datapoints_list],
+    )
+    bucket_level = is_bucket_level_compare(aggregation, compaction_tier)
+    totals = {}
+    for entry in others:
+        totals[entry[1]] = [0, 0]
+    table = []
+    for test_name in test_names:
+        if (test_name, reference_entry) not in positions:
+            continue
+        row = [test_name]
+        changes = []
+        notes = []
+        reference_v = float(median[positions[(test_name, reference_entry)]])
+        for entry in ordered_entries:
+            if (test_name, entry) not in positions:
+                row.append("N/A")
+                if entry != reference_entry:
+                    changes.append("N/A")
+                continue
+            pos = positions[(test_name, entry)]
+            entry_v = float(median[pos])
+            row.append(
+                prepare_value_str(
+                    float(cv[pos]),
+                    entry_v,
+                    int(count[pos]),
+                    simplify_table,
+                    bucket_level,
+                )
+            )
+            if entry == reference_entry:
+                continue
+            divisor = reference_v if metric_mode == "higher-better" else entry_v
+            if divisor == 0.0:
+                changes.append("N/A")
+                continue
+            if metric_mode == "higher-better":
+                percentage_change = (entry_v / reference_v - 1) * 100.0
+            else:
+                # lower-better
+                percentage_change = (reference_v / entry_v - 1) * 100.0
+            changes.append("{:.1f}% ".format(percentage_change))
+            if percentage_change <= -regressions_percent_lower_limit:
+                totals[entry[1]][0] += 1
+                notes.append("REGRESSION on {}".format(entry[1]))
+            elif percentage_change >= regressions_percent_lower_limit:
+                totals[entry[1]][1] += 1
+                notes.append("IMPROVEMENT on {}".format(entry[1]))
+        table.append(row + changes + [", ".join(notes)])
+    observations_str = "median obs. +- std.dev"
+    if bucket_level:
+        observations_str = "median bucket +- std.dev across buckets"
+    headers = ["Test Case"]
+    for _, value in ordered_entries:
+        headers.append("{} ({})".format(value, observations_str))
+    for _, value in others:
+        headers.append(
+            "% change {} vs {} ({})".format(value, reference_entry[1], metric_mode)
+        )
+    headers.append("Note")
+    writer = MarkdownTableWriter(
+        table_name="Comparison between {}. Reference: {}\n".format(
+            ", ".join([value for _, value in ordered_entries]), reference_entry[1]
+        ),
+        headers=headers,
+        value_matrix=table,
+    )
+    return writer.dumps(), {k: tuple(v) for k, v in totals.items()}
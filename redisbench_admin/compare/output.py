@@ -0,0 +1,117 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import json
+import math
+import sys
+
+COMPARE_CLASSIFICATION_REGRESSION = "regression"
+COMPARE_CLASSIFICATION_IMPROVEMENT = "improvement"
+COMPARE_CLASSIFICATION_UNSTABLE = "unstable"
+COMPARE_CLASSIFICATION_STABLE = "stable"
+COMPARE_CLASSIFICATION_NO_DATA = "no-data"
+# what each sample of the stats is: a raw datapoint or an aggregated bucket
+COMPARE_OBSERVATIONS_DATAPOINTS = "datapoints"
+COMPARE_OBSERVATIONS_BUCKETS = "buckets"
+
+
+class CompareRecordsWriter:
+    """
+    Writes one JSON Lines record per compared test, flushing each record so
+    that consumers can follow the output while the compare is still running.
+    """
+
+    def __init__(self, output_file="-"):
+        self.output_file = output_file
+        self.total_records = 0
+        if output_file == "-":
+            self.fd = sys.stdout
+        else:
+            self.fd = open(output_file, "w")
+
+    def write(self, record):
+        self.fd.write(json.dumps(record) + "\n")
+        self.fd.flush()
+        self.total_records = self.total_records + 1
+
+    def close(self):
+        if self.fd is not sys.stdout:
+            self.fd.close()
+
+
+def get_compare_classification(
+    baseline_v, comparison_v, detected_regression, detected_improvement, unstable
+):
+    if baseline_v == "N/A" or comparison_v == "N/A":
+        return COMPARE_CLASSIFICATION_NO_DATA
+    if detected_regression:
+        return COMPARE_CLASSIFICATION_REGRESSION
+    if detected_improvement:
+        return COMPARE_CLASSIFICATION_IMPROVEMENT
+    if unstable:
+        return COMPARE_CLASSIFICATION_UNSTABLE
+    return COMPARE_CLASSIFICATION_STABLE
+
+
+def get_side_record(datapoints, stats):
+    """
+    Returns the raw number of samples fetched and, when computed, the median,
+    cv (%) and number of samples used after the last_n/first_n windowing.
+    """
+    side = {"raw_samples": 0, "samples": 0, "median": None, "cv_pct": None}
+    if datapoints is not None:
+        side["raw_samples"] = len(datapoints)
+    if stats is not None:
+        median, _, cv, count = stats
+        side["samples"] = count
+        if count > 0:
+            side["median"] = get_float_or_none(median)
+            side["cv_pct"] = get_float_or_none(cv)
+    return side
+
+
+def get_float_or_none(value):
+    # NaN and inf are not valid JSON numbers
+    if value is None or not math.isfinite(value):
+        return None
+    return float(value)
+
+
+def get_compare_record(
+    test_name,
+    metric_name,
+    metric_mode,
+    test_datapoints,
+    test_stats,
+    percentage_change,
+    classification,
+    note,
+    test_significance=None,
+    observations=COMPARE_OBSERVATIONS_DATAPOINTS,
+):
+    baseline_datapoints, comparison_datapoints = test_datapoints
+    baseline_stats, comparison_stats = test_stats
+    record = {
+        "test_name": test_name,
+        "metric": metric_name,
+        "metric_mode": metric_mode,
+        "baseline": get_side_record(baseline_datapoints, baseline_stats),
+        "comparison": get_side_record(comparison_datapoints, comparison_stats),
+        "pct_change": None,
+        "classification": classification,
+        "note": note.strip(),
+        "observations": observations,
+    }
+    if classification != COMPARE_CLASSIFICATION_NO_DATA:
+        record["pct_change"] = get_float_or_none(percentage_change)
+    if test_significance is not None:
+        p_value, effect_size, ci_low, ci_high = test_significance
+        record["p_value"] = get_float_or_none(p_value)
+        record["effect_size"] = get_float_or_none(effect_size)
+        record["pct_change_ci"] = [
+            get_float_or_none(ci_low),
+            get_float_or_none(ci_high),
+        ]
+    return record
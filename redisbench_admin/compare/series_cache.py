@@ -0,0 +1,256 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from redisbench_admin.utils.schema_cache import SCHEMA_CACHE_DIRNAME, get_datasink_id
+
+# environment variables
+SERIES_CACHE_TTL_SECS = int(
+    os.getenv("COMPARE_SERIES_CACHE_TTL_SECS", "{}".format(24 * 60 * 60))
+)
+SERIES_CACHE_MAX_BYTES = int(
+    os.getenv("COMPARE_SERIES_CACHE_MAX_BYTES", "{}".format(512 * 1024 * 1024))
+)
+SERIES_CACHE_INDEX_FILENAME = "index.json"
+# on disk datapoint record
+DATAPOINT_DTYPE = np.dtype([("ts", "<i8"), ("value", "<f8")])
+
+
+def get_series_cache_dirname(rts, local_dir="./"):
+    return os.path.join(
+        local_dir,
+        SCHEMA_CACHE_DIRNAME,
+        "compare-series-cache-{}".format(get_datasink_id(rts)),
+    )
+
+
+def load_series_cache(
+    rts,
+    local_dir="./",
+    ttl_secs=SERIES_CACHE_TTL_SECS,
+    max_bytes=SERIES_CACHE_MAX_BYTES,
+):
+    series_cache = SeriesCache(
+        get_series_cache_dirname(rts, local_dir), ttl_secs, max_bytes
+    )
+    series_cache.load()
+    return series_cache
+
+
+def to_datapoints_array(datapoints):
+    return np.array([tuple(x) for x in datapoints], dtype=DATAPOINT_DTYPE)
+
+
+class SeriesCache:
+    def __init__(
+        self,
+        dirname,
+        ttl_secs=SERIES_CACHE_TTL_SECS,
+        max_bytes=SERIES_CACHE_MAX_BYTES,
+    ):
+        """
+        Local cache of the datapoints of the compared time-series.
+        The datapoints of each series, from the first requested timestamp up to
+        the series last timestamp, are kept in a binary file of
+        (int64 timestamp, float64 value) records. The index maps the series name
+        to its file, the covered from timestamp, the TS.INFO lastTimestamp and
+        totalSamples the cached data matches, its size and fetch/use times.
+        """
+        self.dirname = dirname
+        self.index_filename = os.path.join(dirname, SERIES_CACHE_INDEX_FILENAME)
+        self.ttl_secs = ttl_secs
+        self.max_bytes = max_bytes
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.fetched_datapoints = 0
+        self.cached_datapoints = 0
+
+    def load(self):
+        if os.path.exists(self.index_filename) is False:
+            return
+        try:
+            with open(self.index_filename, "r") as index_fd:
+                self.entries = json.load(index_fd)
+            logging.info(
+                "Loaded {} cached time-series from {}".format(
+                    len(self.entries), self.dirname
+                )
+            )
+        except (ValueError, OSError) as e:
+            logging.warning(
+                "Ignoring unreadable compare series cache index {}. Error: {}".format(
+                    self.index_filename, e.__str__()
+                )
+            )
+            self.entries = {}
+
+    def save(self):
+        self.evict()
+        os.makedirs(self.dirname, exist_ok=True)
+        fd, tmp_filename = tempfile.mkstemp(dir=self.dirname, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as index_fd:
+                json.dump(self.entries, index_fd)
+            os.replace(tmp_filename, self.index_filename)
+        except OSError as e:
+            logging.warning(
+                "Unable to persist compare series cache index {}. Error: {}".format(
+                    self.index_filename, e.__str__()
+                )
+            )
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+        logging.info(
+            "Compare series cache {}: {} series. {} hits, {} misses. Fetched {} datapoints and reused {} cached ones.".format(
+                self.dirname,
+                len(self.entries),
+                self.hits,
+                self.misses,
+                self.fetched_datapoints,
+                self.cached_datapoints,
+            )
+        )
+
+    def get_data_filename(self, ts_name):
+        return os.path.join(
+            self.dirname, "{}.bin".format(hashlib.sha1(ts_name.encode()).hexdigest())
+        )
+
+    def read_datapoints(self, ts_name):
+        try:
+            return np.fromfile(self.get_data_filename(ts_name), dtype=DATAPOINT_DTYPE)
+        except (ValueError, OSError):
+            return None
+
+    def write_datapoints(self, ts_name, datapoints):
+        os.makedirs(self.dirname, exist_ok=True)
+        fd, tmp_filename = tempfile.mkstemp(dir=self.dirname, suffix=".tmp")
+        with os.fdopen(fd, "wb") as data_fd:
+            datapoints.tofile(data_fd)
+        os.replace(tmp_filename, self.get_data_filename(ts_name))
+        return datapoints.nbytes
+
+    def invalidate(self, ts_name):
+        with self.lock:
+            entry = self.entries.pop(ts_name, None)
+        if entry is not None and os.path.exists(self.get_data_filename(ts_name)):
+            os.remove(self.get_data_filename(ts_name))
+
+    def evict(self):
+        with self.lock:
+            total_bytes = sum([entry["size"] for entry in self.entries.values()])
+            if total_bytes <= self.max_bytes:
+                return
+            # least recently used first
+            lru_names = sorted(
+                self.entries, key=lambda name: self.entries[name]["last_used"]
+            )
+            evicted = []
+            for ts_name in lru_names:
+                if total_bytes <= self.max_bytes:
+                    break
+                total_bytes = total_bytes - self.entries[ts_name]["size"]
+                evicted.append(ts_name)
+        for ts_name in evicted:
+            self.invalidate(ts_name)
+        logging.info(
+            "Evicted {} least recently used time-series from the compare series cache".format(
+                len(evicted)
+            )
+        )
+
+    def get_datapoints(self, rts, ts_name, from_ts_ms, to_ts_ms):
+        """
+        Equivalent to rts.ts().revrange(ts_name, from_ts_ms, to_ts_ms), only
+        fetching the datapoints that are not cached yet.
+        """
+        from_ts_ms = int(from_ts_ms)
+        to_ts_ms = int(to_ts_ms)
+        now = time.time()
+        info = rts.ts().info(ts_name)
+        with self.lock:
+            entry = self.entries.get(ts_name)
+        datapoints = None
+        changed = True
+        if (
+            entry is not None
+            and entry["from_ts"] <= from_ts_ms
+            and now - entry["fetched_at"] <= self.ttl_secs
+        ):
+            cached = self.read_datapoints(ts_name)
+            if cached is not None:
+                datapoints, changed = self.refresh_datapoints(
+                    rts, ts_name, entry, cached, info
+                )
+        if datapoints is None:
+            datapoints = to_datapoints_array(rts.ts().range(ts_name, from_ts_ms, "+"))
+            with self.lock:
+                self.misses += 1
+                self.fetched_datapoints += len(datapoints)
+            entry = {"from_ts": from_ts_ms, "fetched_at": now}
+        else:
+            with self.lock:
+                self.hits += 1
+        entry = {
+            "from_ts": entry["from_ts"],
+            "last_ts": info.last_timestamp,
+            "total_samples": info.total_samples,
+            "size": datapoints.nbytes,
+            "fetched_at": entry["fetched_at"],
+            "last_used": now,
+        }
+        if changed:
+            self.write_datapoints(ts_name, datapoints)
+        with self.lock:
+            self.entries[ts_name] = entry
+        selected = datapoints[
+            (datapoints["ts"] >= from_ts_ms) & (datapoints["ts"] <= to_ts_ms)
+        ][::-1]
+        return list(zip(selected["ts"].tolist(), selected["value"].tolist()))
+
+    def refresh_datapoints(self, rts, ts_name, entry, cached, info):
+        """
+        Fetches the datapoints from the last cached timestamp onwards. The last
+        cached timestamp is fetched again given it might have been overwritten
+        (ON_DUPLICATE LAST). Returns None when the series changed in a way
+        that can't be applied incrementally ( samples added before the last
+        cached timestamp, deleted or expired ), detected via TS.INFO totalSamples
+        and lastTimestamp.
+        """
+        since_ts = max(entry["from_ts"], entry["last_ts"])
+        fetched = to_datapoints_array(rts.ts().range(ts_name, since_ts, "+"))
+        new_samples = int(np.count_nonzero(fetched["ts"] > entry["last_ts"]))
+        expected_last_ts = entry["last_ts"]
+        if new_samples > 0:
+            expected_last_ts = int(fetched["ts"][-1])
+        if (
+            info.total_samples != entry["total_samples"] + new_samples
+            or info.last_timestamp != expected_last_ts
+        ):
+            logging.info(
+                "Cached time-series {} changed on the datasink. Fetching it again.".format(
+                    ts_name
+                )
+            )
+            return None, True
+        kept = cached[cached["ts"] < since_ts]
+        with self.lock:
+            self.fetched_datapoints += len(fetched)
+            self.cached_datapoints += len(kept)
+        changed = np.array_equal(cached[cached["ts"] >= since_ts], fetched) is False
+        if changed is False:
+            return cached, False
+        return np.concatenate([kept, fetched]), True
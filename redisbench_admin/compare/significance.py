@@ -0,0 +1,250 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import functools
+import math
+import os
+import warnings
+
+import numpy as np
+
+from redisbench_admin.compare.args import DETECTION_METHOD_BOOTSTRAP
+from redisbench_admin.compare.stats import get_concatenated_windows, get_padded_matrix
+
+# environment variables
+BOOTSTRAP_ITERATIONS = int(os.getenv("COMPARE_BOOTSTRAP_ITERATIONS", "1000"))
+# bound the memory used by the resampling matrices ( number of float64 elements )
+BOOTSTRAP_MAX_CHUNK_ELEMENTS = 4 * 1024 * 1024
+# use the exact U distribution up to this number of samples ( when there are no ties )
+MANN_WHITNEY_EXACT_MAX_SAMPLES = 30
+
+
+@functools.lru_cache(maxsize=None)
+def get_mann_whitney_u_frequencies(n1, n2):
+    """
+    Number of orderings of n1 and n2 samples leading to each U value (0..n1*n2)
+    under the null hypothesis, where U counts the pairs in which the n1 sample wins.
+    """
+    if n1 == 0 or n2 == 0:
+        return (1,)
+    frequencies = [0] * (n1 * n2 + 1)
+    # the largest value either belongs to the first sample, winning n2 pairs
+    for u, frequency in enumerate(get_mann_whitney_u_frequencies(n1 - 1, n2)):
+        frequencies[u + n2] += frequency
+    # or to the second one
+    for u, frequency in enumerate(get_mann_whitney_u_frequencies(n1, n2 - 1)):
+        frequencies[u] += frequency
+    return tuple(frequencies)
+
+
+def get_mann_whitney_exact_p_value(u, n1, n2):
+    frequencies = np.array(get_mann_whitney_u_frequencies(n1, n2), dtype=np.float64)
+    total = frequencies.sum()
+    u = int(round(u))
+    p_lower = frequencies[: u + 1].sum() / total
+    p_upper = frequencies[u:].sum() / total
+    return min(1.0, 2.0 * min(p_lower, p_upper))
+
+
+def get_segments_mann_whitney_u(baseline_values, baseline_rows, values, rows, nrows):
+    """
+    U statistic of the comparison values of each row from the rank sum of
+    the pooled values of the row ( ties get their average rank ), and
+    sum(t^3 - t) over each group of t tied values of the row. Every row is
+    ranked at once, via a single sort by ( row, value ).
+    """
+    pooled = np.concatenate([baseline_values, values])
+    pooled_rows = np.concatenate([baseline_rows, rows])
+    is_comparison = np.concatenate(
+        [np.zeros(len(baseline_values), dtype=bool), np.ones(len(values), dtype=bool)]
+    )
+    order = np.lexsort((pooled, pooled_rows))
+    pooled = pooled[order]
+    pooled_rows = pooled_rows[order]
+    is_comparison = is_comparison[order]
+    pooled_count = np.bincount(pooled_rows, minlength=nrows)
+    offsets = np.concatenate([[0], np.cumsum(pooled_count)[:-1]]).astype(np.int64)
+    ranks = np.arange(len(pooled)) - offsets[pooled_rows] + 1.0
+    # a tie group starts on every new row or value
+    group_starts = np.ones(len(pooled), dtype=bool)
+    group_starts[1:] = (pooled[1:] != pooled[:-1]) | (
+        pooled_rows[1:] != pooled_rows[:-1]
+    )
+    groups = np.cumsum(group_starts) - 1
+    tied = np.bincount(groups).astype(np.float64)
+    average_ranks = ranks[group_starts] + (tied - 1) / 2.0
+    n1 = np.bincount(rows, minlength=nrows).astype(np.float64)
+    rank_sum = np.bincount(
+        pooled_rows[is_comparison],
+        weights=average_ranks[groups[is_comparison]],
+        minlength=nrows,
+    )
+    u = rank_sum - n1 * (n1 + 1) / 2.0
+    tie_term = np.bincount(
+        pooled_rows[group_starts], weights=tied**3 - tied, minlength=nrows
+    )
+    return u, tie_term
+
+
+def get_mann_whitney_u_batch(baseline_windows, comparison_windows):
+    """
+    Two-sided Mann-Whitney U test of each comparison values array against
+    its baseline one. Returns the U statistic of the comparison sample, the
+    p-values and the Cliff's delta effect size ( in [-1, 1], positive when
+    the comparison values are larger ).
+    All rows are ranked at once over their concatenated values, in
+    O(n log n) of the total number of values. Uses the exact U distribution
+    for small samples without ties and the tie corrected normal
+    approximation otherwise. NaN values are ignored.
+    """
+    nrows = len(baseline_windows)
+    baseline_values, baseline_rows, _ = get_concatenated_windows(baseline_windows)
+    values, rows, _ = get_concatenated_windows(comparison_windows)
+    # NaN values are ignored, as missing datapoints
+    baseline_valid = ~np.isnan(baseline_values)
+    baseline_values = baseline_values[baseline_valid]
+    baseline_rows = baseline_rows[baseline_valid]
+    valid = ~np.isnan(values)
+    values = values[valid]
+    rows = rows[valid]
+    n1 = np.bincount(rows, minlength=nrows).astype(np.float64)
+    n2 = np.bincount(baseline_rows, minlength=nrows).astype(np.float64)
+    u, tie_term = get_segments_mann_whitney_u(
+        baseline_values, baseline_rows, values, rows, nrows
+    )
+    non_empty = (n1 > 0) & (n2 > 0)
+    u[~non_empty] = np.nan
+    p_values = np.full(nrows, np.nan)
+    with warnings.catch_warnings(), np.errstate(all="ignore"):
+        # empty rows are expected to produce NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        # ( greater - lower ) / n1 * n2, with U = greater + ties / 2
+        effect_size = (2.0 * u - n1 * n2) / (n1 * n2)
+        n = n1 + n2
+        variance = n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1)))
+        z = np.maximum(np.abs(u - n1 * n2 / 2.0) - 0.5, 0.0) / np.sqrt(variance)
+    normal = non_empty & (variance > 0)
+    p_values[normal] = [math.erfc(value / math.sqrt(2.0)) for value in z[normal]]
+    # all values are equal
+    p_values[non_empty & ~(variance > 0)] = 1.0
+    exact = non_empty & (n <= MANN_WHITNEY_EXACT_MAX_SAMPLES) & (tie_term == 0)
+    for pos in np.flatnonzero(exact):
+        p_values[pos] = get_mann_whitney_exact_p_value(
+            u[pos], int(n1[pos]), int(n2[pos])
+        )
+    return u, p_values, effect_size
+
+
+def get_bootstrap_medians(matrix, count, iterations, rng):
+    nrows, ncols = matrix.shape
+    idx = np.floor(rng.random((nrows, iterations, ncols)) * count[:, None, None])
+    samples = matrix[np.arange(nrows)[:, None, None], idx.astype(np.int64)]
+    # each resample has the same number of values as the original sample
+    padding = np.arange(ncols)[None, None, :] >= count[:, None, None]
+    return np.nanmedian(np.where(padding, np.nan, samples), axis=2)
+
+
+def get_bootstrap_chunks(lengths, iterations):
+    """
+    Groups the rows, ordered by length, into chunks whose resampling
+    matrices stay within BOOTSTRAP_MAX_CHUNK_ELEMENTS ( at least one row per
+    chunk ), so that rows are only padded to the longest row of their chunk.
+    """
+    chunks = []
+    chunk = []
+    for pos in np.argsort(lengths, kind="stable"):
+        ncols = max(1, int(lengths[pos]))
+        if len(chunk) > 0 and (len(chunk) + 1) * iterations * ncols > (
+            BOOTSTRAP_MAX_CHUNK_ELEMENTS
+        ):
+            chunks.append(chunk)
+            chunk = []
+        chunk.append(int(pos))
+    if len(chunk) > 0:
+        chunks.append(chunk)
+    return chunks
+
+
+def get_bootstrap_median_ratio_batch(
+    baseline_windows,
+    comparison_windows,
+    iterations=BOOTSTRAP_ITERATIONS,
+    seed=0,
+):
+    """
+    Bootstrap distribution of the comparison/baseline median ratio of each row,
+    as a (rows, iterations) matrix. Resampling uses a fixed seed so that the
+    same data always produces the same result.
+    """
+    rng = np.random.default_rng(seed)
+    nrows = len(baseline_windows)
+    ratios = np.full((nrows, iterations), np.nan)
+    lengths = np.array(
+        [
+            max(len(baseline), len(comparison))
+            for baseline, comparison in zip(baseline_windows, comparison_windows)
+        ],
+        dtype=np.int64,
+    )
+    with warnings.catch_warnings(), np.errstate(all="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for chunk in get_bootstrap_chunks(lengths, iterations):
+            baseline, baseline_count = get_padded_matrix(
+                [baseline_windows[pos] for pos in chunk]
+            )
+            comparison, comparison_count = get_padded_matrix(
+                [comparison_windows[pos] for pos in chunk]
+            )
+            baseline_medians = get_bootstrap_medians(
+                baseline, baseline_count, iterations, rng
+            )
+            comparison_medians = get_bootstrap_medians(
+                comparison, comparison_count, iterations, rng
+            )
+            ratios[chunk] = comparison_medians / baseline_medians
+    return ratios
+
+
+def get_significance_batch(
+    detection_method,
+    baseline_windows,
+    comparison_windows,
+    metric_mode="higher-better",
+    confidence=0.95,
+    iterations=BOOTSTRAP_ITERATIONS,
+):
+    """
+    Computes, for every (baseline, comparison) pair of values arrays, the
+    p-value of the selected method, the Cliff's delta effect size and, for the
+    bootstrap method, the confidence interval of the median % change.
+    Effect sizes and % changes are oriented by the metric mode: positive means
+    an improvement. Returns four arrays (p-value, effect size, ci low, ci high).
+    """
+    _, p_values, effect_size = get_mann_whitney_u_batch(
+        baseline_windows, comparison_windows
+    )
+    ci_low = np.full(len(baseline_windows), np.nan)
+    ci_high = np.full(len(baseline_windows), np.nan)
+    if metric_mode != "higher-better":
+        effect_size = -effect_size
+    if detection_method == DETECTION_METHOD_BOOTSTRAP:
+        ratios = get_bootstrap_median_ratio_batch(
+            baseline_windows, comparison_windows, iterations
+        )
+        with warnings.catch_warnings(), np.errstate(all="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)
+            if metric_mode == "higher-better":
+                pct_changes = (ratios - 1.0) * 100.0
+            else:
+                pct_changes = (1.0 / ratios - 1.0) * 100.0
+            alpha = (1.0 - confidence) / 2.0
+            ci_low = np.nanquantile(pct_changes, alpha, axis=1)
+            ci_high = np.nanquantile(pct_changes, 1.0 - alpha, axis=1)
+            valid = ~np.isnan(pct_changes)
+            nvalid = valid.sum(axis=1)
+            p_lower = (valid & (pct_changes <= 0.0)).sum(axis=1) / nvalid
+            p_upper = (valid & (pct_changes >= 0.0)).sum(axis=1) / nvalid
+            p_values = np.minimum(1.0, 2.0 * np.minimum(p_lower, p_upper))
+    return p_values, effect_size, ci_low, ci_high
@@ -0,0 +1,126 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import warnings
+
+import numpy as np
+
+
+def get_window_bounds(nsamples, last_n=-1, first_n=-1):
+    start_idx = 0 if first_n < 0 else max(0, min(first_n, nsamples))
+    end_idx = nsamples if last_n < 0 else max(0, min(last_n, nsamples))
+    return start_idx, end_idx
+
+
+def get_datapoints_values(datapoints):
+    """
+    Returns the values of a list of (timestamp, value) datapoints as a float array.
+    """
+    if len(datapoints) == 0:
+        return np.empty(0, dtype=np.float64)
+    return np.asarray(datapoints, dtype=np.float64).reshape(-1, 2)[:, 1]
+
+
+def get_datapoints_windows(datapoints_list, last_n_list, first_n_list):
+    """
+    Returns the values of each datapoints list within its [first_n:last_n] window.
+    """
+    windows = []
+    for pos, datapoints in enumerate(datapoints_list):
+        values = get_datapoints_values(datapoints)
+        start_idx, end_idx = get_window_bounds(
+            len(values), last_n_list[pos], first_n_list[pos]
+        )
+        windows.append(values[start_idx:end_idx])
+    return windows
+
+
+def get_padded_matrix(windows):
+    """
+    Stacks arrays of different lengths into a single NaN padded matrix.
+    Returns the matrix and the number of values of each row.
+    """
+    nrows = len(windows)
+    count = np.array([len(window) for window in windows], dtype=np.int64)
+    ncols = max(1, int(count.max())) if nrows > 0 else 1
+    matrix = np.full((nrows, ncols), np.nan)
+    for pos, window in enumerate(windows):
+        matrix[pos, : len(window)] = window
+    return matrix, count
+
+
+def get_concatenated_windows(windows):
+    """
+    Concatenates arrays of different lengths into a single 1-D array, so
+    that the memory is proportional to the total number of values. Returns
+    the values, the row of each value and the number of values of each row.
+    """
+    count = np.array([len(window) for window in windows], dtype=np.int64)
+    if len(windows) == 0 or count.sum() == 0:
+        return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64), count
+    values = np.concatenate(
+        [np.asarray(window, dtype=np.float64) for window in windows]
+    )
+    rows = np.repeat(np.arange(len(windows), dtype=np.int64), count)
+    return values, rows, count
+
+
+def get_segments_median(values, rows, nrows):
+    """
+    Median of the values of each row, via a single sort by ( row, value ).
+    Rows without values yield NaN.
+    """
+    values_count = np.bincount(rows, minlength=nrows)
+    offsets = np.concatenate([[0], np.cumsum(values_count)[:-1]]).astype(np.int64)
+    sorted_values = values[np.lexsort((values, rows))]
+    median = np.full(nrows, np.nan)
+    non_empty = values_count > 0
+    low = offsets + (values_count - 1) // 2
+    high = offsets + values_count // 2
+    median[non_empty] = (
+        sorted_values[low[non_empty]] + sorted_values[high[non_empty]]
+    ) / 2.0
+    return median
+
+
+def get_datapoints_stats_batch(datapoints_list, last_n_list, first_n_list):
+    """
+    Computes, for each datapoints array after applying its [first_n:last_n]
+    window, the median, the sample standard deviation, the coefficient of
+    variation (in %) and the number of samples.
+    All windows are reduced at once over their concatenated values, so one
+    long window doesn't inflate the memory used by the others.
+    Empty windows yield NaN median/std, as do single samples for the std.
+    """
+    windows = get_datapoints_windows(datapoints_list, last_n_list, first_n_list)
+    nrows = len(windows)
+    values, rows, count = get_concatenated_windows(windows)
+    # NaN values are ignored, as missing datapoints
+    valid = ~np.isnan(values)
+    values = values[valid]
+    rows = rows[valid]
+    with warnings.catch_warnings(), np.errstate(all="ignore"):
+        # empty rows and single sample std-devs are expected to produce NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = get_segments_median(values, rows, nrows)
+        values_count = np.bincount(rows, minlength=nrows).astype(np.float64)
+        mean = np.bincount(rows, weights=values, minlength=nrows) / values_count
+        squared_deviations = np.bincount(
+            rows, weights=(values - mean[rows]) ** 2, minlength=nrows
+        )
+        std = np.where(
+            values_count > 1,
+            np.sqrt(squared_deviations / (values_count - 1)),
+            np.nan,
+        )
+        cv = std / median * 100.0
+    return median, std, cv, count
+
+
+def get_datapoints_stats(datapoints, last_n=-1, first_n=-1):
+    median, std, cv, count = get_datapoints_stats_batch(
+        [datapoints], [last_n], [first_n]
+    )
+    return float(median[0]), float(std[0]), float(cv[0]), int(count[0])
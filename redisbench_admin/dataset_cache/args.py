@@ -0,0 +1,87 @@
+#  Apache License Version 2.0
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+from redisbench_admin.run.args import (
+    BENCHMARK_GLOB,
+    BENCHMARK_REGEX,
+    BENCHMARK_RUNNER_GROUP_M_ID,
+    BENCHMARK_RUNNER_GROUP_TOTAL,
+)
+from redisbench_admin.utils.dataset_cache import (
+    DATASET_CACHE_DIR,
+    DATASET_CACHE_MAX_BYTES,
+)
+
+DATASET_CACHE_ACTIONS = ["ls", "prune", "prefetch"]
+
+
+def create_dataset_cache_arguments(parser):
+    parser.add_argument(
+        "action",
+        type=str,
+        choices=DATASET_CACHE_ACTIONS,
+        help="ls lists the cached datasets, prune removes the invalid entries and evicts the least recently used ones above the byte budget, prefetch downloads the datasets of the selected tests.",
+    )
+    parser.add_argument(
+        "--dataset-cache-dir",
+        type=str,
+        default=DATASET_CACHE_DIR,
+        help="dataset cache directory.",
+    )
+    parser.add_argument(
+        "--dataset-cache-max-bytes",
+        type=int,
+        default=DATASET_CACHE_MAX_BYTES,
+        help="dataset cache byte budget. 0 means unlimited. Can also be set via the DATASET_CACHE_MAX_BYTES env var.",
+    )
+    parser.add_argument(
+        "--verify",
+        default=False,
+        action="store_true",
+        help="on prune, also checks the sha256 of every entry, removing the corrupted ones.",
+    )
+    parser.add_argument(
+        "--prefetch-workers",
+        type=int,
+        default=4,
+        help="on prefetch, number of datasets to download in parallel.",
+    )
+    parser.add_argument(
+        "--test",
+        type=str,
+        default="",
+        help="on prefetch, specify a test to prefetch the dataset of. By default will prefetch all of them.",
+    )
+    parser.add_argument(
+        "--test-glob",
+        type=str,
+        default=BENCHMARK_GLOB,
+        help="on prefetch, specify a test glob pattern to use on the tests directory. If --test is defined this options has no effect.",
+    )
+    parser.add_argument(
+        "--test-regex",
+        type=str,
+        default=BENCHMARK_REGEX,
+        help="on prefetch, specify a test regex pattern to use on the tests directory. If --test is defined this options has no effect.",
+    )
+    parser.add_argument(
+        "--runner-group-member-id",
+        type=int,
+        default=BENCHMARK_RUNNER_GROUP_M_ID,
+        help="Split test files evenly among a runner group. This is the id of the runner.",
+    )
+    parser.add_argument(
+        "--runner-group-total-members",
+        type=int,
+        default=BENCHMARK_RUNNER_GROUP_TOTAL,
+        help="Split test files evenly among a runner group. This is the total number of elements of the runner group",
+    )
+    parser.add_argument(
+        "--defaults_filename",
+        type=str,
+        default="defaults.yml",
+        help="specify the defaults file containing spec topologies, common metric extractions,etc...",
+    )
+    return parser
@@ -0,0 +1,140 @@
+#  Apache License Version 2.0
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import datetime as dt
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import humanize
+from pytablewriter import MarkdownTableWriter
+
+from redisbench_admin.utils.benchmark_config import prepare_benchmark_definitions
+from redisbench_admin.utils.dataset_cache import (
+    fetch_dataset,
+    get_dataset_cache_entries,
+    prune_dataset_cache,
+)
+from redisbench_admin.utils.local import (
+    get_dataset_from_config,
+    get_dataset_sha256_from_config,
+)
+
+
+def dataset_cache_command_logic(args, project_name, project_version):
+    logging.info(
+        "Using: {project_name} {project_version}".format(
+            project_name=project_name, project_version=project_version
+        )
+    )
+    cache_dir = args.dataset_cache_dir
+    max_bytes = args.dataset_cache_max_bytes
+    if args.action == "ls":
+        print(get_dataset_cache_table(cache_dir))
+    if args.action == "prune":
+        removed = prune_dataset_cache(cache_dir, max_bytes, args.verify, [], True)
+        logging.info(
+            "Removed {} dataset cache entries, freeing {}".format(
+                len(removed),
+                humanize.naturalsize(sum([entry["size"] for entry in removed])),
+            )
+        )
+    if args.action == "prefetch":
+        result, benchmark_definitions, _, _, _, _ = prepare_benchmark_definitions(args)
+        if result is False:
+            logging.error("Unable to read all the benchmark definitions")
+            exit(1)
+        datasets = get_remote_datasets(benchmark_definitions)
+        logging.info(
+            "Prefetching {} remote datasets of {} tests".format(
+                len(datasets), len(benchmark_definitions)
+            )
+        )
+        prefetch_datasets(
+            datasets,
+            cache_dir,
+            max_bytes,
+            args.prefetch_workers,
+            get_remote_datasets_sha256(benchmark_definitions),
+        )
+
+
+def get_remote_datasets(benchmark_definitions):
+    """
+    Returns the sorted distinct remote datasets of the benchmark definitions.
+    """
+    datasets = set()
+    for benchmark_config in benchmark_definitions.values():
+        dataset, _ = get_dataset_from_config(benchmark_config)
+        if dataset is not None and dataset.startswith("http"):
+            datasets.add(dataset)
+    return sorted(datasets)
+
+
+def get_remote_datasets_sha256(benchmark_definitions):
+    """
+    Returns a dict of remote dataset -> expected sha256, for the datasets
+    whose benchmark definitions set dataset_sha256.
+    """
+    datasets_sha256 = {}
+    for benchmark_config in benchmark_definitions.values():
+        dataset, _ = get_dataset_from_config(benchmark_config)
+        dataset_sha256 = get_dataset_sha256_from_config(benchmark_config)
+        if dataset is None or dataset_sha256 is None:
+            continue
+        if datasets_sha256.get(dataset, dataset_sha256) != dataset_sha256:
+            raise Exception(
+                "Conflicting dataset_sha256 values for the dataset {}".format(dataset)
+            )
+        datasets_sha256[dataset] = dataset_sha256
+    return datasets_sha256
+
+
+def prefetch_datasets(datasets, cache_dir, max_bytes, workers=4, datasets_sha256=None):
+    """
+    Downloads the datasets into the dataset cache in parallel, verifying the
+    ones with an expected sha256 in datasets_sha256. Returns the list of
+    local paths, following the datasets order.
+    """
+    if len(datasets) == 0:
+        return []
+    if datasets_sha256 is None:
+        datasets_sha256 = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return list(
+            executor.map(
+                lambda x: fetch_dataset(
+                    x, cache_dir, max_bytes, datasets_sha256.get(x)
+                ),
+                datasets,
+            )
+        )
+
+
+def get_dataset_cache_table(cache_dir):
+    table = []
+    entries = get_dataset_cache_entries(cache_dir)
+    # most recently used first
+    for entry in reversed(entries):
+        table.append(
+            [
+                entry["key"][:12],
+                entry["url"],
+                humanize.naturalsize(entry["size"]),
+                entry["sha256"][:12],
+                dt.datetime.fromtimestamp(
+                    entry["last_access"], dt.timezone.utc
+                ).strftime("%Y-%m-%d %H:%M:%S"),
+            ]
+        )
+    writer = MarkdownTableWriter(
+        table_name="Dataset cache {}: {} entries, {} total\n".format(
+            cache_dir,
+            len(entries),
+            humanize.naturalsize(sum([entry["size"] for entry in entries])),
+        ),
+        headers=["Key", "URL", "Size", "sha256", "Last access (UTC)"],
+        value_matrix=table,
+    )
+    return writer.dumps()
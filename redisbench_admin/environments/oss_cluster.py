@@ -3,18 +3,31 @@
 #  Copyright (c) 2021., Redis Labs Modules
 #  All rights reserved.
 #
+import datetime
 import logging
 import subprocess
-from time import sleep
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import redis
 
+from redisbench_admin.run.placement import (
+    PLACEMENT_NUMA_NODE_KEY,
+    get_local_placement_command_prefix,
+    get_server_cpus,
+    get_shards_cpus,
+)
 from redisbench_admin.utils.utils import (
-    wait_for_conn,
+    wait_for_conns_ready,
     redis_server_config_module_part,
     generate_common_server_args,
 )
 
+CLUSTER_SLOTS = 16384
+CLUSTER_CONVERGENCE_TIMEOUT_SECS = 60
+CLUSTER_CONVERGENCE_INITIAL_BACKOFF_SECS = 0.001
+CLUSTER_CONVERGENCE_MAX_BACKOFF_SECS = 0.1
+
 
 def spin_up_local_redis_cluster(
     binary,
@@ -27,10 +40,17 @@ def spin_up_local_redis_cluster(
     dataset_load_timeout_secs=60,
     modules_configuration_parameters_map={},
     redis_7=True,
+    placement_policy=None,
 ):
+    """
+    Launches all shard processes at once and then waits for all of them to
+    be ready in parallel. With a placement policy the server cores are split
+    among the shards. Returns the shard processes and connections.
+    """
     redis_processes = []
     redis_conns = []
-
+    shards_cpus = get_shards_cpus(get_server_cpus(placement_policy), shard_count)
+    spin_up_start_time = datetime.datetime.now()
     for master_shard_id in range(1, shard_count + 1):
         shard_port = master_shard_id + start_port - 1
         binary = binary
@@ -50,20 +70,37 @@ def spin_up_local_redis_cluster(
             "yes",
             redis_7,
         )
+        if placement_policy is not None:
+            command = (
+                get_local_placement_command_prefix(
+                    shards_cpus[master_shard_id - 1],
+                    placement_policy[PLACEMENT_NUMA_NODE_KEY],
+                )
+                + command
+            )
 
         logging.info(
             "Running local redis-server cluster with the following args: {}".format(
                 " ".join(command)
             )
         )
-        redis_process = subprocess.Popen(command)
-        r = redis.Redis(port=shard_port)
-        result = wait_for_conn(r, dataset_load_timeout_secs)
+        redis_processes.append(subprocess.Popen(command))
+        redis_conns.append(redis.Redis(port=shard_port))
+    results = wait_for_conns_ready(
+        redis_conns, dataset_load_timeout_secs, redis_processes
+    )
+    for master_shard_id, (result, r, redis_process) in enumerate(
+        zip(results, redis_conns, redis_processes), start=1
+    ):
         if result is True:
             logging.info("Redis available. pid={}".format(redis_process.pid))
             r.client_setname("redisbench-admin-cluster-#{}".format(master_shard_id))
-        redis_conns.append(r)
-        redis_processes.append(redis_process)
+    logging.info(
+        "Spun up {} shards in {:.3f} secs".format(
+            shard_count,
+            (datetime.datetime.now() - spin_up_start_time).total_seconds(),
+        )
+    )
     return redis_processes, redis_conns
 
 
@@ -72,8 +109,9 @@ def setup_redis_cluster_from_conns(redis_conns, shard_count, shard_host, start_p
     meet_cmds = generate_meet_cmds(shard_count, shard_host, start_port)
     status = setup_oss_cluster_from_conns(meet_cmds, redis_conns, shard_count)
     if status is True:
-        for conn in redis_conns:
-            conn.execute_command("CLUSTER SAVECONFIG")
+        run_on_all_conns(
+            redis_conns, lambda conn: conn.execute_command("CLUSTER SAVECONFIG")
+        )
     return status
 
 
@@ -86,59 +124,136 @@ def generate_meet_cmds(shard_count, shard_host, start_port):
     return meet_cmds
 
 
-def setup_oss_cluster_from_conns(meet_cmds, redis_conns, shard_count):
-    status = False
+def generate_cluster_slots_ranges(shard_count):
+    """
+    Returns the inclusive ( start, end ) slots range of each primary. The
+    slots are evenly split and the last primary gets the remainder.
+    """
+    slots_per_node = int(CLUSTER_SLOTS / shard_count)
+    slots_ranges = []
+    for n in range(shard_count):
+        node_slots_start = n * slots_per_node
+        node_slots_end_exclusive_slot = (n + 1) * slots_per_node
+        if n == (shard_count - 1):
+            node_slots_end_exclusive_slot = CLUSTER_SLOTS
+        slots_ranges.append((node_slots_start, node_slots_end_exclusive_slot - 1))
+    return slots_ranges
+
+
+def run_on_all_conns(redis_conns, fn):
+    """
+    Runs fn against all connections concurrently, re-raising the first error.
+    Returns the list of results, following the connections order.
+    """
+    if len(redis_conns) == 0:
+        return []
+    with ThreadPoolExecutor(max_workers=len(redis_conns)) as executor:
+        return list(executor.map(fn, redis_conns))
+
+
+def cluster_meet(redis_conn, meet_cmds):
+    pipe = redis_conn.pipeline(transaction=False)
+    for cmd in meet_cmds:
+        pipe.execute_command(cmd)
+    return pipe.execute()
+
+
+def cluster_addslots_range(redis_conn, slots_start, slots_end):
+    """
+    Assigns the inclusive slots range with a single CLUSTER ADDSLOTSRANGE
+    ( redis >= 7.0 ), falling back to CLUSTER ADDSLOTS on older servers.
+    """
     try:
-        for primary_pos, redis_conn in enumerate(redis_conns):
+        return redis_conn.execute_command(
+            "CLUSTER ADDSLOTSRANGE", slots_start, slots_end
+        )
+    except redis.exceptions.ResponseError as e:
+        if "subcommand" not in e.__str__().lower():
+            raise
+        logging.info("CLUSTER ADDSLOTSRANGE not supported. Using CLUSTER ADDSLOTS")
+    return redis_conn.execute_command(
+        "CLUSTER ADDSLOTS", *range(slots_start, slots_end + 1)
+    )
+
+
+def is_cluster_info_converged(cluster_info):
+    return (
+        int(cluster_info["cluster_slots_ok"]) == CLUSTER_SLOTS
+        and cluster_info["cluster_state"] == "ok"
+    )
+
+
+def wait_for_cluster_convergence(
+    redis_conns,
+    timeout_secs=CLUSTER_CONVERGENCE_TIMEOUT_SECS,
+    initial_backoff_secs=CLUSTER_CONVERGENCE_INITIAL_BACKOFF_SECS,
+    max_backoff_secs=CLUSTER_CONVERGENCE_MAX_BACKOFF_SECS,
+):
+    """
+    Polls CLUSTER INFO of all nodes concurrently until every node sees all
+    slots ok and cluster_state ok, with an exponential backoff
+    ( initial_backoff_secs doubling up to max_backoff_secs ).
+    Returns True if the cluster converged within timeout_secs.
+    """
+    deadline = time.monotonic() + timeout_secs
+    backoff_secs = initial_backoff_secs
+    start_time = time.monotonic()
+    while True:
+        cluster_infos = run_on_all_conns(
+            redis_conns, lambda conn: conn.execute_command("CLUSTER INFO")
+        )
+        pending = [
+            (n, cluster_info)
+            for n, cluster_info in enumerate(cluster_infos)
+            if is_cluster_info_converged(cluster_info) is False
+        ]
+        if len(pending) == 0:
             logging.info(
-                "Sending to primary #{} a total of {} MEET commands".format(
-                    primary_pos, len(meet_cmds)
+                "Cluster of {} primaries converged in {:.3f} secs".format(
+                    len(redis_conns), time.monotonic() - start_time
                 )
             )
-            for cmd in meet_cmds:
-                redis_conn.execute_command(cmd)
-
-        end_exclusive_slot = 16384
-        slots_per_node = int(end_exclusive_slot / shard_count)
-        logging.info("Slots per node {}".format(slots_per_node))
-
-        for n, redis_conn in enumerate(redis_conns):
-            node_slots_start = int((n) * slots_per_node)
-            node_slots_end_exclusive_slot = int((n + 1) * slots_per_node)
-            if n == (shard_count - 1):
-                node_slots_end_exclusive_slot = end_exclusive_slot
-            logging.info(
-                "Node {}. slots {}-{}".format(
-                    n, node_slots_start, node_slots_end_exclusive_slot - 1
+            return True
+        remaining_secs = deadline - time.monotonic()
+        if remaining_secs <= 0:
+            for n, cluster_info in pending:
+                logging.error(
+                    "Node {}: cluster_slots_ok {} cluster_state {}".format(
+                        n,
+                        cluster_info["cluster_slots_ok"],
+                        cluster_info["cluster_state"],
+                    )
+                )
+            logging.error(
+                "Cluster did not converge within the timeout of {} secs".format(
+                    timeout_secs
                 )
             )
-            shard_slots_str = " ".join(
-                [
-                    "{}".format(x)
-                    for x in range(node_slots_start, node_slots_end_exclusive_slot)
-                ]
+            return False
+        time.sleep(min(backoff_secs, remaining_secs))
+        backoff_secs = min(backoff_secs * 2, max_backoff_secs)
+
+
+def setup_oss_cluster_from_conns(meet_cmds, redis_conns, shard_count):
+    status = False
+    try:
+        logging.info(
+            "Sending to {} primaries a total of {} MEET commands each".format(
+                len(redis_conns), len(meet_cmds)
             )
-            redis_conn.execute_command("CLUSTER ADDSLOTS {}".format(shard_slots_str))
+        )
+        run_on_all_conns(redis_conns, lambda conn: cluster_meet(conn, meet_cmds))
 
-        for n, redis_conn in enumerate(redis_conns):
-            cluster_slots_ok = 0
-            while cluster_slots_ok < end_exclusive_slot:
-                cluster_slots_ok = int(
-                    redis_conn.execute_command("cluster info")["cluster_slots_ok"]
-                )
-                logging.info(
-                    "Node {}: Total cluster_slots_ok {}".format(n, cluster_slots_ok)
-                )
-                sleep(1)
-        for n, redis_conn in enumerate(redis_conns):
-            cluster_state_ok = False
-            while cluster_state_ok is False:
-                cluster_state_ok = bool(
-                    redis_conn.execute_command("cluster info")["cluster_state"]
-                )
-                logging.info("Node {}: cluster_state {}".format(n, cluster_state_ok))
-                sleep(1)
-        status = True
+        slots_ranges = generate_cluster_slots_ranges(shard_count)
+        for n, (node_slots_start, node_slots_end) in enumerate(slots_ranges):
+            logging.info(
+                "Node {}. slots {}-{}".format(n, node_slots_start, node_slots_end)
+            )
+        run_on_all_conns(
+            list(zip(redis_conns, slots_ranges)),
+            lambda x: cluster_addslots_range(x[0], x[1][0], x[1][1]),
+        )
+        status = wait_for_cluster_convergence(redis_conns)
     except redis.exceptions.RedisError as e:
         logging.warning("Received an error {}".format(e.__str__()))
         status = False
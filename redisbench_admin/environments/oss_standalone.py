@@ -8,8 +8,13 @@ import subprocess
 
 import redis
 
+from redisbench_admin.run.placement import (
+    PLACEMENT_NUMA_NODE_KEY,
+    get_local_placement_command_prefix,
+    get_server_cpus,
+)
 from redisbench_admin.utils.utils import (
-    wait_for_conn,
+    wait_for_conn_ready,
     redis_server_config_module_part,
     generate_common_server_args,
 )
@@ -25,6 +30,7 @@ def spin_up_local_redis(
     dataset_load_timeout_secs=120,
     modules_configuration_parameters_map={},
     redis_7=True,
+    placement_policy=None,
 ):
     command = generate_standalone_redis_server_args(
         binary,
@@ -37,6 +43,14 @@ def spin_up_local_redis(
         "yes",
         redis_7,
     )
+    if placement_policy is not None:
+        command = (
+            get_local_placement_command_prefix(
+                get_server_cpus(placement_policy),
+                placement_policy[PLACEMENT_NUMA_NODE_KEY],
+            )
+            + command
+        )
 
     logging.info(
         "Running local redis-server with the following args: {}".format(
@@ -44,7 +58,7 @@ def spin_up_local_redis(
         )
     )
     redis_process = subprocess.Popen(command)
-    result = wait_for_conn(redis.Redis(port=port), dataset_load_timeout_secs)
+    result = wait_for_conn_ready(redis.Redis(port=port), dataset_load_timeout_secs)
     if result is True:
         logging.info("Redis available")
     return [redis_process]
@@ -9,6 +9,8 @@ from redisbench_admin.utils.remote import (
     PERFORMANCE_RTS_HOST,
     PERFORMANCE_RTS_PORT,
     PERFORMANCE_RTS_AUTH,
+    PERFORMANCE_RTS_PUSH_BATCH_SIZE,
+    PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW,
 )
 
 
@@ -88,6 +90,24 @@ def create_export_arguments(parser):
         "--redistimeseries_pass", type=str, default=PERFORMANCE_RTS_AUTH
     )
     parser.add_argument("--redistimeseries_user", type=str, default=None)
+    parser.add_argument(
+        "--datasink_push_batch_size",
+        type=int,
+        default=PERFORMANCE_RTS_PUSH_BATCH_SIZE,
+        help="Maximum number of datapoints sent on each TS.MADD command when pushing results to RedisTimeSeries.",
+    )
+    parser.add_argument(
+        "--datasink_push_pipeline_window",
+        type=int,
+        default=PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW,
+        help="Maximum number of TS.MADD commands in flight on each pipeline round-trip when pushing results to RedisTimeSeries.",
+    )
+    parser.add_argument(
+        "--datasink_secondary_keys_transaction",
+        default=False,
+        action="store_true",
+        help="Wrap the secondary keys updates ( test sets, branches, versions, etc. ) in a MULTI/EXEC transaction.",
+    )
     parser.add_argument(
         "--override-test-time",
         type=lambda s: datetime.datetime.strptime(s, "%Y-%m-%d %H:%M:%S"),
@@ -23,9 +23,11 @@ from redisbench_admin.run.git import git_vars_crosscheck
 from redisbench_admin.run.redistimeseries import timeseries_test_sucess_flow
 from redisbench_admin.utils.benchmark_config import (
     get_defaults,
+    get_defaults_compaction_policy,
     parse_exporter_timemetric,
 )
 from redisbench_admin.utils.remote import get_ts_tags_and_name
+from redisbench_admin.utils.schema_cache import load_schema_cache
 
 
 def export_command_logic(args, project_name, project_version):
@@ -59,6 +61,7 @@ def export_command_logic(args, project_name, project_version):
             "You need to specify at least one (or more) of --deployment-version --github_branch arguments"
         )
         exit(1)
+    compaction_policy = None
     non_required_spec = ["csv", "pyperf-json", "google.benchmark"]
     if results_format not in non_required_spec:
         if exporter_spec_file is None:
@@ -77,6 +80,7 @@ def export_command_logic(args, project_name, project_version):
                 _,
                 _,
             ) = get_defaults(exporter_spec_file)
+            compaction_policy = get_defaults_compaction_policy(exporter_spec_file)
 
     extra_tags_dict = split_tags_string(args.extra_tags)
     logging.info("Using the following extra tags: {}".format(extra_tags_dict))
@@ -183,6 +187,7 @@ def export_command_logic(args, project_name, project_version):
             )
         )
         exit(1)
+    schema_cache = load_schema_cache(rts, getattr(args, "local_dir", "./"))
 
     benchmark_duration_seconds = None
 
@@ -208,6 +213,12 @@ def export_command_logic(args, project_name, project_version):
         None,
         None,
         timeseries_dict,
+        args.datasink_push_batch_size,
+        args.datasink_push_pipeline_window,
+        schema_cache,
+        None,
+        args.datasink_secondary_keys_transaction,
+        compaction_policy,
     )
 
 
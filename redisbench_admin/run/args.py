@@ -16,6 +16,8 @@ from redisbench_admin.utils.remote import (
     PERFORMANCE_RTS_HOST,
     PERFORMANCE_RTS_PORT,
     PERFORMANCE_RTS_AUTH,
+    PERFORMANCE_RTS_PUSH_BATCH_SIZE,
+    PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW,
     PERFORMANCE_RTS_PUSH,
 )
 
@@ -195,6 +197,30 @@ def common_run_args(parser):
         action="store_true",
         help="uploads the results to RedisTimeSeries. Proper credentials are required",
     )
+    parser.add_argument(
+        "--datasink_push_batch_size",
+        type=int,
+        default=PERFORMANCE_RTS_PUSH_BATCH_SIZE,
+        help="Maximum number of datapoints sent on each TS.MADD command when pushing results to RedisTimeSeries.",
+    )
+    parser.add_argument(
+        "--datasink_push_pipeline_window",
+        type=int,
+        default=PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW,
+        help="Maximum number of TS.MADD commands in flight on each pipeline round-trip when pushing results to RedisTimeSeries.",
+    )
+    parser.add_argument(
+        "--datasink_secondary_keys_transaction",
+        default=False,
+        action="store_true",
+        help="Wrap the secondary keys updates ( test sets, branches, versions, etc. ) in a MULTI/EXEC transaction.",
+    )
+    parser.add_argument(
+        "--datasink_defer_secondary_keys",
+        default=False,
+        action="store_true",
+        help="Defer the secondary keys updates until the end of the benchmark suite, sending them all in a single pipeline.",
+    )
     parser.add_argument(
         "--collect_commandstats",
         type=bool,
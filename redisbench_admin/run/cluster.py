@@ -8,6 +8,12 @@ import logging
 from redisbench_admin.utils.remote import execute_remote_commands
 
 from redisbench_admin.environments.oss_cluster import generate_cluster_redis_server_args
+from redisbench_admin.run.placement import (
+    PLACEMENT_NUMA_NODE_KEY,
+    generate_placement_command_prefix,
+    get_server_cpus,
+    get_shards_cpus,
+)
 from redisbench_admin.utils.utils import wait_for_conn
 
 
@@ -114,11 +120,13 @@ def spin_up_redis_cluster_remote_redis(
     modules_configuration_parameters_map,
     logname,
     redis_7=True,
+    placement_policy=None,
 ):
     logging.info("Generating the remote redis-server command arguments")
     redis_process_commands = []
     logfiles = []
     logname_prefix = logname[: len(logname) - 4] + "-"
+    shards_cpus = get_shards_cpus(get_server_cpus(placement_policy), shard_count)
     for master_shard_id in range(1, shard_count + 1):
         shard_port = master_shard_id + start_port - 1
 
@@ -135,6 +143,14 @@ def spin_up_redis_cluster_remote_redis(
             "yes",
             redis_7,
         )
+        if placement_policy is not None:
+            command = (
+                generate_placement_command_prefix(
+                    shards_cpus[master_shard_id - 1],
+                    placement_policy[PLACEMENT_NUMA_NODE_KEY],
+                )
+                + command
+            )
         logging.error(
             "Remote primary shard {} command: {}".format(
                 master_shard_id, " ".join(command)
@@ -187,18 +187,38 @@ BENCHMARK_RUNNING_GLOBAL = False
 BENCHMARK_CPU_STATS_GLOBAL = {}
 
 
-def collect_cpu_data(redis_conns=[], delta_secs: float = 5.0, delay_start: float = 1.0):
+def collect_cpu_data(
+    redis_conns=[],
+    delta_secs: float = 5.0,
+    delay_start: float = 1.0,
+    cpu_stats=None,
+    benchmark_running=None,
+):
+    """
+    Samples the INFO of every shard each delta_secs while the benchmark runs.
+    By default into BENCHMARK_CPU_STATS_GLOBAL while BENCHMARK_RUNNING_GLOBAL
+    is set. Concurrent benchmarks pass their own cpu_stats map and
+    benchmark_running threading.Event instead.
+    """
     global BENCHMARK_CPU_STATS_GLOBAL
     global BENCHMARK_RUNNING_GLOBAL
     import time
 
+    if cpu_stats is None:
+        cpu_stats = BENCHMARK_CPU_STATS_GLOBAL
+
+    def is_benchmark_running():
+        if benchmark_running is None:
+            return BENCHMARK_RUNNING_GLOBAL
+        return benchmark_running.is_set()
+
     counter = 0
     time.sleep(delay_start)
-    while BENCHMARK_RUNNING_GLOBAL:
+    while is_benchmark_running():
         for shard_n, redis_conn in enumerate(redis_conns, 1):
             keyname = "{}".format(shard_n)
-            if keyname not in BENCHMARK_CPU_STATS_GLOBAL:
-                BENCHMARK_CPU_STATS_GLOBAL[keyname] = []
-            BENCHMARK_CPU_STATS_GLOBAL[keyname].append(redis_conn.info())
+            if keyname not in cpu_stats:
+                cpu_stats[keyname] = []
+            cpu_stats[keyname].append(redis_conn.info())
         time.sleep(delta_secs)
         counter += 1
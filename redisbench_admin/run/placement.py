@@ -0,0 +1,203 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import logging
+import shutil
+
+PLACEMENT_KEY = "placement"
+PLACEMENT_SERVER_CORES_KEY = "server_cores"
+PLACEMENT_IO_THREADS_CORES_KEY = "io_threads_cores"
+PLACEMENT_CLIENT_CORES_KEY = "client_cores"
+PLACEMENT_NUMA_NODE_KEY = "numa_node"
+PLACEMENT_CORES_KEYS = [
+    PLACEMENT_SERVER_CORES_KEY,
+    PLACEMENT_IO_THREADS_CORES_KEY,
+    PLACEMENT_CLIENT_CORES_KEY,
+]
+
+
+def parse_cpu_list(cpu_list):
+    """
+    Parses a cpu list: an integer, a list of integers or a taskset like
+    string ( e.g. "0-3,8" ). Returns the sorted list of cpus.
+    """
+    if type(cpu_list) == int:
+        return [cpu_list]
+    cpus = set()
+    if type(cpu_list) == list:
+        for cpu in cpu_list:
+            cpus.update(parse_cpu_list(cpu))
+        return sorted(cpus)
+    for cpu_range in "{}".format(cpu_list).split(","):
+        cpu_range = cpu_range.strip()
+        try:
+            if "-" in cpu_range:
+                start, end = cpu_range.split("-")
+                cpus.update(range(int(start), int(end) + 1))
+            else:
+                cpus.add(int(cpu_range))
+        except ValueError:
+            raise Exception("Invalid cpu list: {}".format(cpu_list))
+    return sorted(cpus)
+
+
+def format_cpu_list(cpus):
+    """
+    Returns the taskset like representation of a list of cpus ( e.g. "0-3,8" ).
+    """
+    ranges = []
+    for cpu in sorted(cpus):
+        if len(ranges) > 0 and ranges[-1][1] == cpu - 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(
+        [
+            "{}".format(start) if start == end else "{}-{}".format(start, end)
+            for start, end in ranges
+        ]
+    )
+
+
+def split_cpus(cpus, parts):
+    """
+    Partitions the cpus into parts contiguous sets, as even as possible.
+    Raises an Exception when there are fewer cpus than parts.
+    """
+    if parts > len(cpus):
+        raise Exception(
+            "Unable to partition {} cpus into {} sets".format(len(cpus), parts)
+        )
+    cpus_sets = []
+    start = 0
+    for part_n in range(parts):
+        end = start + len(cpus) // parts + (1 if part_n < len(cpus) % parts else 0)
+        cpus_sets.append(cpus[start:end])
+        start = end
+    return cpus_sets
+
+
+def get_placement_policy(benchmark_config):
+    """
+    Returns the placement policy of a benchmark, with the cpus of the redis
+    server, its io-threads and the client tools, and the NUMA node to bind
+    them to. Unset entries are None. Returns None when there is no policy.
+    """
+    if benchmark_config is None or PLACEMENT_KEY not in benchmark_config:
+        return None
+    placement = benchmark_config[PLACEMENT_KEY]
+    if type(placement) != dict:
+        raise Exception(
+            "The '{}' property needs to be a map. Got: {}".format(
+                PLACEMENT_KEY, placement
+            )
+        )
+    placement_policy = {}
+    for cores_key in PLACEMENT_CORES_KEYS:
+        placement_policy[cores_key] = None
+        if placement.get(cores_key) is not None:
+            placement_policy[cores_key] = parse_cpu_list(placement[cores_key])
+    placement_policy[PLACEMENT_NUMA_NODE_KEY] = None
+    if placement.get(PLACEMENT_NUMA_NODE_KEY) is not None:
+        placement_policy[PLACEMENT_NUMA_NODE_KEY] = int(
+            placement[PLACEMENT_NUMA_NODE_KEY]
+        )
+    if all([value is None for value in placement_policy.values()]):
+        return None
+    return placement_policy
+
+
+def merge_default_placement(benchmark_config, default_placement):
+    """
+    Fills the placement entries the benchmark doesn't define with the
+    defaults file ones.
+    """
+    if default_placement is None:
+        return
+    placement = dict(default_placement)
+    if PLACEMENT_KEY in benchmark_config:
+        if type(benchmark_config[PLACEMENT_KEY]) != dict:
+            return
+        placement.update(benchmark_config[PLACEMENT_KEY])
+    benchmark_config[PLACEMENT_KEY] = placement
+
+
+def get_server_cpus(placement_policy):
+    """
+    Redis pins its main thread and io-threads to the same cpu list
+    ( server_cpulist ), so the server runs on both sets of cores.
+    """
+    if placement_policy is None:
+        return None
+    server_cpus = set()
+    for cores_key in [PLACEMENT_SERVER_CORES_KEY, PLACEMENT_IO_THREADS_CORES_KEY]:
+        if placement_policy[cores_key] is not None:
+            server_cpus.update(placement_policy[cores_key])
+    if len(server_cpus) == 0:
+        return None
+    return sorted(server_cpus)
+
+
+def get_client_cpus(placement_policy):
+    if placement_policy is None:
+        return None
+    return placement_policy[PLACEMENT_CLIENT_CORES_KEY]
+
+
+def get_shards_cpus(cpus, shard_count):
+    """
+    Splits the server cpus among the cluster shards when there are enough of
+    them, otherwise all shards share the cpus.
+    """
+    if cpus is None or len(cpus) < shard_count:
+        return [cpus for _ in range(shard_count)]
+    return split_cpus(cpus, shard_count)
+
+
+def generate_placement_command_prefix(cpus, numa_node=None):
+    """
+    Returns the command arguments that run a process on the given cpus and
+    with its memory bound to the given NUMA node ( via numactl when a NUMA
+    node is set, otherwise via taskset ). Empty when there is nothing to pin.
+    """
+    if numa_node is not None:
+        prefix = ["numactl", "--membind={}".format(numa_node)]
+        if cpus is None:
+            prefix.append("--cpunodebind={}".format(numa_node))
+        else:
+            prefix.append("--physcpubind={}".format(format_cpu_list(cpus)))
+        return prefix
+    if cpus is not None:
+        return ["taskset", "-c", format_cpu_list(cpus)]
+    return []
+
+
+def get_local_placement_command_prefix(cpus, numa_node=None):
+    prefix = generate_placement_command_prefix(cpus, numa_node)
+    if len(prefix) > 0:
+        if shutil.which(prefix[0]) is None:
+            raise Exception(
+                "The placement policy requires {} to be available. Aborting...".format(
+                    prefix[0]
+                )
+            )
+        logging.info("Pinning process via: {}".format(" ".join(prefix)))
+    return prefix
+
+
+def get_placement_metadata_tags(placement_policy):
+    metadata_tags = {}
+    if placement_policy is None:
+        return metadata_tags
+    for cores_key in PLACEMENT_CORES_KEYS:
+        if placement_policy[cores_key] is not None:
+            metadata_tags["placement_{}".format(cores_key)] = format_cpu_list(
+                placement_policy[cores_key]
+            )
+    if placement_policy[PLACEMENT_NUMA_NODE_KEY] is not None:
+        metadata_tags["placement_{}".format(PLACEMENT_NUMA_NODE_KEY)] = "{}".format(
+            placement_policy[PLACEMENT_NUMA_NODE_KEY]
+        )
+    return metadata_tags
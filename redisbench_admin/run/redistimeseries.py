@@ -18,6 +18,8 @@ from redisbench_admin.utils.remote import (
     get_overall_dashboard_keynames,
     exporter_create_ts,
     push_data_to_redistimeseries,
+    PERFORMANCE_RTS_PUSH_BATCH_SIZE,
+    PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW,
 )
 from redisbench_admin.utils.utils import get_ts_metric_name
 
@@ -93,6 +95,8 @@ def add_standardized_metric_bybranch(
     metadata_tags={},
     build_variant_name=None,
     running_platform=None,
+    schema_cache=None,
+    pipeline=None,
 ):
     if metric_value is not None:
         tsname_use_case_duration = get_ts_metric_name(
@@ -132,9 +136,11 @@ def add_standardized_metric_bybranch(
             )
         )
         ts = {"labels": labels}
-        exporter_create_ts(rts, ts, tsname_use_case_duration)
+        exporter_create_ts(rts, ts, tsname_use_case_duration, schema_cache)
+        if pipeline is None:
+            pipeline = rts.ts()
         logging.error(labels)
-        rts.ts().add(
+        pipeline.add(
             tsname_use_case_duration,
             start_time_ms,
             metric_value,
@@ -163,6 +169,8 @@ def add_standardized_metric_byversion(
     metadata_tags={},
     build_variant_name=None,
     running_platform=None,
+    schema_cache=None,
+    pipeline=None,
 ):
     if metric_value is not None:
         tsname_use_case_duration = get_ts_metric_name(
@@ -201,8 +209,10 @@ def add_standardized_metric_byversion(
             )
         )
         ts = {"labels": labels}
-        exporter_create_ts(rts, ts, tsname_use_case_duration)
-        rts.ts().add(
+        exporter_create_ts(rts, ts, tsname_use_case_duration, schema_cache)
+        if pipeline is None:
+            pipeline = rts.ts()
+        pipeline.add(
             tsname_use_case_duration,
             start_time_ms,
             metric_value,
@@ -238,6 +248,15 @@ def timeseries_test_sucess_flow(
     build_variant_name=None,
     running_platform=None,
     timeseries_dict=None,
+    push_batch_size=PERFORMANCE_RTS_PUSH_BATCH_SIZE,
+    push_pipeline_window=PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW,
+    schema_cache=None,
+    secondary_keys_pipeline=None,
+    secondary_keys_transaction=False,
+    compaction_policy=None,
+    spin_up_duration_seconds=None,
+    dataset_restore_duration_seconds=None,
+    slot=None,
 ):
     testcase_metric_context_paths = []
     version_target_tables = None
@@ -273,7 +292,15 @@ def timeseries_test_sucess_flow(
                 len(timeseries_dict.keys()), deployment_name, deployment_type
             )
         )
-        push_data_to_redistimeseries(rts, timeseries_dict)
+        push_data_to_redistimeseries(
+            rts,
+            timeseries_dict,
+            0,
+            push_batch_size,
+            push_pipeline_window,
+            schema_cache,
+            compaction_policy,
+        )
         if version_target_tables is not None:
             logging.info(
                 "There are a total of {} distinct target tables by version".format(
@@ -314,6 +341,13 @@ def timeseries_test_sucess_flow(
                 rts.hset(
                     branch_target_table_keyname, None, None, branch_target_table_dict
                 )
+        # all secondary keys updates of this test ( or of the whole run, when
+        # the caller provides a deferred pipeline ) are sent in one round-trip
+        pipeline = secondary_keys_pipeline
+        if pipeline is None:
+            pipeline = get_secondary_result_keys_pipeline(
+                rts, secondary_keys_transaction
+            )
         if test_name is not None:
             if type(test_name) is str:
                 update_secondary_result_keys(
@@ -333,6 +367,11 @@ def timeseries_test_sucess_flow(
                     tf_github_org,
                     tf_github_repo,
                     tf_triggering_env,
+                    schema_cache,
+                    pipeline,
+                    spin_up_duration_seconds,
+                    dataset_restore_duration_seconds,
+                    slot,
                 )
             if type(test_name) is list:
                 for inner_test_name in test_name:
@@ -353,6 +392,11 @@ def timeseries_test_sucess_flow(
                         tf_github_org,
                         tf_github_repo,
                         tf_triggering_env,
+                        schema_cache,
+                        pipeline,
+                        spin_up_duration_seconds,
+                        dataset_restore_duration_seconds,
+                        slot,
                     )
         else:
             update_secondary_result_keys(
@@ -372,7 +416,16 @@ def timeseries_test_sucess_flow(
                 tf_github_org,
                 tf_github_repo,
                 tf_triggering_env,
+                schema_cache,
+                pipeline,
+                spin_up_duration_seconds,
+                dataset_restore_duration_seconds,
+                slot,
             )
+        if secondary_keys_pipeline is None:
+            execute_secondary_result_keys_pipeline(pipeline)
+        if schema_cache is not None:
+            schema_cache.save()
     return version_target_tables, branch_target_tables
 
 
@@ -393,7 +446,31 @@ def update_secondary_result_keys(
     tf_github_org,
     tf_github_repo,
     tf_triggering_env,
+    schema_cache=None,
+    pipeline=None,
+    spin_up_duration_seconds=None,
+    dataset_restore_duration_seconds=None,
+    slot=None,
 ):
+    """
+    Queues the ZADD/SADD/TS.INCRBY/TS.ADD commands that keep the project
+    secondary keys up to date. When no pipeline is given one is created
+    and executed before returning, otherwise the caller is responsible
+    for executing it ( allowing to batch several tests/runs together ).
+    The dataset load, spin up and dataset restore durations are only
+    tracked when measured ( not None ). So is the parallel slot the test
+    ran on, next to its other per run metrics.
+    """
+    optional_metrics = [
+        ("dataset_load_duration", dataset_load_duration_seconds),
+        ("spin_up_duration", spin_up_duration_seconds),
+        ("dataset_restore_duration", dataset_restore_duration_seconds),
+        ("slot", slot),
+    ]
+    execute_pipeline = False
+    if pipeline is None:
+        pipeline = get_secondary_result_keys_pipeline(rts)
+        execute_pipeline = True
     (
         _,
         testcases_setname,
@@ -418,7 +495,7 @@ def update_secondary_result_keys(
         test_name,
     )
     try:
-        rts.zadd(deployment_name_zsetname, {deployment_name: start_time_ms})
+        pipeline.zadd(deployment_name_zsetname, {deployment_name: start_time_ms})
         if test_name is not None:
             deployment_name_zsetname_testnames = (
                 deployment_name_zsetname
@@ -426,46 +503,50 @@ def update_secondary_result_keys(
                     deployment_name_zsetname, deployment_name
                 )
             )
-            rts.zadd(deployment_name_zsetname_testnames, {test_name: start_time_ms})
-            rts.sadd(testcases_setname, test_name)
+            pipeline.zadd(
+                deployment_name_zsetname_testnames, {test_name: start_time_ms}
+            )
+            pipeline.sadd(testcases_setname, test_name)
             testcases_zsetname = testcases_setname + ":zset"
-            rts.zadd(testcases_zsetname, {test_name: start_time_ms})
+            pipeline.zadd(testcases_zsetname, {test_name: start_time_ms})
             if "component" in metadata_tags:
                 testcases_zsetname_component = "{}:zset:component:{}".format(
                     testcases_setname, metadata_tags["component"]
                 )
-                rts.zadd(testcases_zsetname_component, {test_name: start_time_ms})
+                pipeline.zadd(testcases_zsetname_component, {test_name: start_time_ms})
         if "arch" in metadata_tags:
-            rts.sadd(project_archs_setname, metadata_tags["arch"])
+            pipeline.sadd(project_archs_setname, metadata_tags["arch"])
         if "os" in metadata_tags:
-            rts.sadd(project_oss_setname, metadata_tags["os"])
+            pipeline.sadd(project_oss_setname, metadata_tags["os"])
         if "compiler" in metadata_tags:
-            rts.sadd(project_compilers_setname, metadata_tags["compiler"])
+            pipeline.sadd(project_compilers_setname, metadata_tags["compiler"])
         if tf_github_branch is not None and tf_github_branch != "":
-            rts.sadd(project_branches_setname, tf_github_branch)
+            pipeline.sadd(project_branches_setname, tf_github_branch)
             project_branches_zsetname = project_branches_setname + ":zset"
-            rts.zadd(project_branches_zsetname, {tf_github_branch: start_time_ms})
+            pipeline.zadd(project_branches_zsetname, {tf_github_branch: start_time_ms})
         if artifact_version is not None and artifact_version != "":
-            rts.sadd(project_versions_setname, artifact_version)
+            pipeline.sadd(project_versions_setname, artifact_version)
             project_versions_zsetname = project_versions_setname + ":zset"
-            rts.zadd(project_versions_zsetname, {artifact_version: start_time_ms})
+            pipeline.zadd(project_versions_zsetname, {artifact_version: start_time_ms})
         if running_platform is not None:
-            rts.sadd(running_platforms_setname, running_platform)
+            pipeline.sadd(running_platforms_setname, running_platform)
             running_platforms_szetname = running_platforms_setname + ":zset"
-            rts.zadd(running_platforms_szetname, {running_platform: start_time_ms})
+            pipeline.zadd(running_platforms_szetname, {running_platform: start_time_ms})
         if build_variant_name is not None:
-            rts.sadd(build_variant_setname, build_variant_name)
+            pipeline.sadd(build_variant_setname, build_variant_name)
             build_variant_zsetname = build_variant_setname + ":zset"
-            rts.zadd(build_variant_zsetname, {build_variant_name: start_time_ms})
+            pipeline.zadd(build_variant_zsetname, {build_variant_name: start_time_ms})
         if testcase_metric_context_paths is not None:
             for metric_context_path in testcase_metric_context_paths:
                 if testcases_metric_context_path_setname != "":
-                    rts.sadd(testcases_metric_context_path_setname, metric_context_path)
-                    rts.sadd(
+                    pipeline.sadd(
+                        testcases_metric_context_path_setname, metric_context_path
+                    )
+                    pipeline.sadd(
                         testcases_and_metric_context_path_setname,
                         "{}:{}".format(test_name, metric_context_path),
                     )
-        rts.ts().incrby(
+        pipeline.incrby(
             tsname_project_total_success,
             1,
             timestamp=start_time_ms,
@@ -496,23 +577,30 @@ def update_secondary_result_keys(
                 metadata_tags,
                 build_variant_name,
                 running_platform,
+                schema_cache,
+                pipeline,
             )
-            add_standardized_metric_bybranch(
-                "dataset_load_duration",
-                dataset_load_duration_seconds,
-                str(tf_github_branch),
-                deployment_name,
-                deployment_type,
-                rts,
-                start_time_ms,
-                test_name,
-                tf_github_org,
-                tf_github_repo,
-                tf_triggering_env,
-                metadata_tags,
-                build_variant_name,
-                running_platform,
-            )
+            for metric_name, metric_value in optional_metrics:
+                if metric_value is None:
+                    continue
+                add_standardized_metric_bybranch(
+                    metric_name,
+                    metric_value,
+                    str(tf_github_branch),
+                    deployment_name,
+                    deployment_type,
+                    rts,
+                    start_time_ms,
+                    test_name,
+                    tf_github_org,
+                    tf_github_repo,
+                    tf_triggering_env,
+                    metadata_tags,
+                    build_variant_name,
+                    running_platform,
+                    schema_cache,
+                    pipeline,
+                )
         if artifact_version is not None and artifact_version != "":
             add_standardized_metric_byversion(
                 "benchmark_duration",
@@ -529,28 +617,77 @@ def update_secondary_result_keys(
                 metadata_tags,
                 build_variant_name,
                 running_platform,
+                schema_cache,
+                pipeline,
             )
-            add_standardized_metric_byversion(
-                "dataset_load_duration",
-                dataset_load_duration_seconds,
-                artifact_version,
-                deployment_name,
-                deployment_type,
-                rts,
-                start_time_ms,
-                test_name,
-                tf_github_org,
-                tf_github_repo,
-                tf_triggering_env,
-                metadata_tags,
-                build_variant_name,
-                running_platform,
-            )
+            for metric_name, metric_value in optional_metrics:
+                if metric_value is None:
+                    continue
+                add_standardized_metric_byversion(
+                    metric_name,
+                    metric_value,
+                    artifact_version,
+                    deployment_name,
+                    deployment_type,
+                    rts,
+                    start_time_ms,
+                    test_name,
+                    tf_github_org,
+                    tf_github_repo,
+                    tf_triggering_env,
+                    metadata_tags,
+                    build_variant_name,
+                    running_platform,
+                    schema_cache,
+                    pipeline,
+                )
     except redis.exceptions.ResponseError as e:
         logging.warning(
             "Error while updating secondary data structures {}. ".format(e.__str__())
         )
         pass
+    if execute_pipeline:
+        execute_secondary_result_keys_pipeline(pipeline)
+
+
+def get_secondary_result_keys_pipeline(rts, transaction=False):
+    return rts.ts().pipeline(transaction=transaction)
+
+
+def execute_secondary_result_keys_pipeline(pipeline):
+    """
+    Sends all queued secondary keys commands in a single round-trip.
+    Errors are handled per command: a failing command is logged and
+    does not prevent the remaining ones from being applied.
+    Returns the number of commands that failed and the number of commands sent.
+    """
+    commands = [args for args, _ in pipeline.command_stack]
+    errors = 0
+    if len(commands) == 0:
+        return errors, len(commands)
+    try:
+        replies = pipeline.execute(raise_on_error=False)
+    except redis.exceptions.ResponseError as e:
+        # a transaction aborted by EXEC has no per command replies
+        logging.warning(
+            "Error while updating secondary data structures {}. ".format(e.__str__())
+        )
+        pipeline.reset()
+        return len(commands), len(commands)
+    for command, reply in zip(commands, replies):
+        if isinstance(reply, Exception):
+            errors = errors + 1
+            logging.warning(
+                "Error while updating secondary data structures with command {} {}. {}".format(
+                    command[0], command[1], reply.__str__()
+                )
+            )
+    logging.info(
+        "Updated secondary data structures with {} commands ({} errors).".format(
+            len(commands), errors
+        )
+    )
+    return errors, len(commands)
 
 
 def timeseries_test_failure_flow(
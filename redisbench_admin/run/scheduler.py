@@ -0,0 +1,304 @@
+#  Apache License Version 2.0
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import datetime
+import json
+import logging
+
+import redis
+from pytablewriter import MarkdownTableWriter
+
+from redisbench_admin.run.common import check_dbconfig_tool_requirement
+from redisbench_admin.run.placement import PLACEMENT_CLIENT_CORES_KEY, PLACEMENT_KEY
+from redisbench_admin.run_remote.consts import min_recommended_benchmark_duration
+from redisbench_admin.utils.local import get_dataset_from_config
+from redisbench_admin.utils.remote import COMPACTION_LABEL
+
+# how an already spun environment is brought back to a test initial state
+BENCHMARK_RESET_RELOAD = "reload"
+BENCHMARK_RESET_FLUSH = "flush"
+BENCHMARK_RESET_RESPIN = "respin"
+BENCHMARK_RESET_SNAPSHOT = "snapshot"
+
+# datasink metrics used to estimate the cost of each step of the schedule
+SCHEDULE_COST_METRICS = [
+    "benchmark_duration",
+    "dataset_load_duration",
+    "dataset_restore_duration",
+    "spin_up_duration",
+]
+SCHEDULE_COST_HISTORY_DAYS = 30
+SCHEDULE_COST_HISTORY_LAST_N = 5
+# used when there is no history for a test
+DEFAULT_BENCHMARK_DURATION_SECS = min_recommended_benchmark_duration
+DEFAULT_DATASET_LOAD_DURATION_SECS = 10
+DEFAULT_SPIN_UP_DURATION_SECS = 1
+
+
+def get_dbconfig_fingerprint(benchmark_config):
+    # the server placement is part of the environment as well
+    server_placement = dict(benchmark_config.get(PLACEMENT_KEY) or {})
+    server_placement.pop(PLACEMENT_CLIENT_CORES_KEY, None)
+    return json.dumps(
+        [benchmark_config.get("dbconfig"), server_placement],
+        sort_keys=True,
+        default=str,
+    )
+
+
+def define_benchmark_schedule(benchmark_runs_plan):
+    """
+    Turns the benchmark plan ( type -> dataset -> setup -> tests ) into the
+    execution order: one group per dataset, setup and db config, whatever the
+    benchmark type, so that a single environment serves the entire group.
+    Within a group the read-only tests run before the ones writing to the
+    dataset. Returns the list of groups, each with its dataset name, setup
+    name, setup settings and ordered ( test name, benchmark type, config ).
+    """
+    groups = {}
+    for benchmark_type, bench_by_dataset_map in benchmark_runs_plan.items():
+        for dataset_name, bench_by_setup_map in bench_by_dataset_map.items():
+            for setup_name, setup_details in bench_by_setup_map.items():
+                for test_name, benchmark_config in setup_details["benchmarks"].items():
+                    group_key = (
+                        dataset_name,
+                        setup_name,
+                        get_dbconfig_fingerprint(benchmark_config),
+                    )
+                    if group_key not in groups:
+                        groups[group_key] = {
+                            "dataset_name": dataset_name,
+                            "setup_name": setup_name,
+                            "setup_settings": setup_details["setup_settings"],
+                            "benchmarks": [],
+                        }
+                    groups[group_key]["benchmarks"].append(
+                        (test_name, benchmark_type, benchmark_config)
+                    )
+    schedule = list(groups.values())
+    for group in schedule:
+        # stable, keeps the plan order within read-only and writer tests
+        group["benchmarks"].sort(key=lambda x: x[1] != "read-only")
+    return schedule
+
+
+def get_benchmark_reset_type(benchmark_config):
+    """
+    Returns how to reset an environment a writer test ran on: reloading the
+    RDB dataset, flushing when the test starts from an empty dataset, or a
+    full respin when the data is loaded by a client tool.
+    """
+    dataset, _ = get_dataset_from_config(benchmark_config)
+    if dataset is not None:
+        return BENCHMARK_RESET_RELOAD
+    if check_dbconfig_tool_requirement(benchmark_config):
+        return BENCHMARK_RESET_RESPIN
+    return BENCHMARK_RESET_FLUSH
+
+
+def get_historical_durations(
+    rts,
+    test_names,
+    tf_github_org,
+    tf_github_repo,
+    tf_triggering_env,
+    history_days=SCHEDULE_COST_HISTORY_DAYS,
+    last_n=SCHEDULE_COST_HISTORY_LAST_N,
+    tf_github_branch=None,
+    running_platform=None,
+):
+    """
+    Fetches the recent benchmark, dataset load and spin up durations of the
+    tests from the datasink, for the given branch and running platform only.
+    Returns a dict of ( metric, test name, setup name ) -> median of the
+    last_n datapoints. Empty if unavailable.
+    """
+    from redisbench_admin.compare.compare import get_mrevrange_by_test_name_chunks
+    from redisbench_admin.compare.stats import get_datapoints_stats_batch
+
+    if rts is None or len(test_names) == 0:
+        return {}
+    from_ts_ms = int(
+        (
+            datetime.datetime.now(datetime.timezone.utc)
+            - datetime.timedelta(days=history_days)
+        ).timestamp()
+        * 1000
+    )
+    filters = [
+        "metric=({})".format(",".join(SCHEDULE_COST_METRICS)),
+        "github_org={}".format(tf_github_org),
+        "github_repo={}".format(tf_github_repo),
+        "triggering_env={}".format(tf_triggering_env),
+        # only the raw series, not their compaction tiers
+        "{}=".format(COMPACTION_LABEL),
+        # the series of every datapoint are pushed both by.branch and by.version,
+        # without a branch only the by.version ones are used
+        "branch={}".format(tf_github_branch if tf_github_branch else ""),
+        # an empty value matches the series without a running platform
+        "running_platform={}".format(
+            running_platform if running_platform is not None else ""
+        ),
+    ]
+    datapoints_by_key = {}
+    try:
+        for labels, _, datapoints in get_mrevrange_by_test_name_chunks(
+            rts,
+            filters,
+            "test_name",
+            test_names,
+            from_ts_ms,
+            "+",
+            ["deployment_name", "metric"],
+        ):
+            key = (
+                labels.get("metric"),
+                labels.get("test_name"),
+                labels.get("deployment_name"),
+            )
+            datapoints_by_key.setdefault(key, []).extend(datapoints[:last_n])
+    except redis.exceptions.RedisError as e:
+        logging.warning(
+            "Unable to fetch the historical durations from the datasink. Error: {}".format(
+                e.__str__()
+            )
+        )
+        return {}
+    keys = list(datapoints_by_key.keys())
+    medians, _, _, counts = get_datapoints_stats_batch(
+        [datapoints_by_key[key] for key in keys],
+        [-1 for _ in keys],
+        [-1 for _ in keys],
+    )
+    return {
+        key: float(median)
+        for key, median, count in zip(keys, medians, counts)
+        if count > 0
+    }
+
+
+def get_step_duration(durations, metric_name, test_name, setup_name, default):
+    return durations.get((metric_name, test_name, setup_name), default)
+
+
+def estimate_benchmark_group(group, durations, repetitions=1, dataset_snapshot=False):
+    """
+    Estimates the duration of a schedule group, replaying the environment
+    reuse rules of the runners. With dataset_snapshot, the datasets that
+    would require a respin are reset by restoring their golden snapshot. A
+    spin up already includes its dataset load, which is only added on top of
+    it when estimating a spin up without history. Returns the estimated
+    duration, spins and resets, and the estimated duration and spins when
+    respinning the environment for every test that isn't read-only.
+    """
+    setup_name = group["setup_name"]
+    estimated_secs = 0.0
+    baseline_secs = 0.0
+    spins = 0
+    resets = 0
+    baseline_spins = 0
+    env = False
+    dirty = False
+    baseline_env = False
+    for test_name, benchmark_type, benchmark_config in group["benchmarks"]:
+        dataset_load_secs = 0
+        dataset, _ = get_dataset_from_config(benchmark_config)
+        if dataset is not None or check_dbconfig_tool_requirement(benchmark_config):
+            dataset_load_secs = DEFAULT_DATASET_LOAD_DURATION_SECS
+        dataset_load_secs = get_step_duration(
+            durations, "dataset_load_duration", test_name, setup_name, dataset_load_secs
+        )
+        spin_up_secs = get_step_duration(
+            durations,
+            "spin_up_duration",
+            test_name,
+            setup_name,
+            DEFAULT_SPIN_UP_DURATION_SECS + dataset_load_secs,
+        )
+        benchmark_secs = get_step_duration(
+            durations,
+            "benchmark_duration",
+            test_name,
+            setup_name,
+            DEFAULT_BENCHMARK_DURATION_SECS,
+        )
+        reset_type = get_benchmark_reset_type(benchmark_config)
+        if dataset_snapshot and reset_type == BENCHMARK_RESET_RESPIN:
+            reset_type = BENCHMARK_RESET_SNAPSHOT
+        # without history a restore is assumed to cost as much as a load
+        dataset_restore_secs = get_step_duration(
+            durations,
+            "dataset_restore_duration",
+            test_name,
+            setup_name,
+            dataset_load_secs,
+        )
+        for _ in range(repetitions):
+            if env is False or (dirty and reset_type == BENCHMARK_RESET_RESPIN):
+                estimated_secs += spin_up_secs
+                spins += 1
+            elif dirty:
+                if reset_type == BENCHMARK_RESET_RELOAD:
+                    estimated_secs += dataset_load_secs
+                if reset_type == BENCHMARK_RESET_SNAPSHOT:
+                    estimated_secs += dataset_restore_secs
+                resets += 1
+            env = True
+            dirty = benchmark_type != "read-only"
+            estimated_secs += benchmark_secs
+            if baseline_env is False or benchmark_type != "read-only":
+                baseline_secs += spin_up_secs
+                baseline_spins += 1
+            baseline_env = True
+            baseline_secs += benchmark_secs
+    return estimated_secs, spins, resets, baseline_secs, baseline_spins
+
+
+def print_benchmark_schedule(
+    schedule, durations, repetitions=1, dataset_snapshot=False
+):
+    """
+    Prints the schedule and its estimated total duration. Returns the
+    estimated total duration and the one without the environment reuse.
+    """
+    table = []
+    total_secs = 0.0
+    total_baseline_secs = 0.0
+    for group in schedule:
+        (
+            estimated_secs,
+            spins,
+            resets,
+            baseline_secs,
+            baseline_spins,
+        ) = estimate_benchmark_group(group, durations, repetitions, dataset_snapshot)
+        total_secs += estimated_secs
+        total_baseline_secs += baseline_secs
+        table.append(
+            [
+                group["dataset_name"],
+                group["setup_name"],
+                ", ".join([test_name for test_name, _, _ in group["benchmarks"]]),
+                "{} ( {} without reuse )".format(spins, baseline_spins),
+                resets,
+                "{:.0f}".format(estimated_secs),
+            ]
+        )
+    writer = MarkdownTableWriter(
+        table_name="Benchmark schedule. Estimated total time {:.0f} secs ( {:.0f} secs without environment reuse )\n".format(
+            total_secs, total_baseline_secs
+        ),
+        headers=[
+            "Dataset",
+            "Setup",
+            "Tests (in order)",
+            "Spins",
+            "Resets",
+            "Estimated secs",
+        ],
+        value_matrix=table,
+    )
+    writer.write_table()
+    return total_secs, total_baseline_secs
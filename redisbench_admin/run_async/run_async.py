@@ -34,6 +34,8 @@ from redisbench_admin.utils.remote import (
     check_ec2_env,
     get_project_ts_tags,
     push_data_to_redistimeseries,
+    PERFORMANCE_RTS_PUSH_BATCH_SIZE,
+    PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW,
     execute_remote_commands,
     copy_file_to_remote_setup,
 )
@@ -379,6 +381,9 @@ def export_redis_metrics(
     tf_triggering_env,
     metadata_dict=None,
     expire_ms=0,
+    push_batch_size=PERFORMANCE_RTS_PUSH_BATCH_SIZE,
+    push_pipeline_window=PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW,
+    schema_cache=None,
 ):
     datapoint_errors = 0
     datapoint_inserts = 0
@@ -446,7 +451,14 @@ def export_redis_metrics(
                 ),
                 "data": {end_time_ms: metric_value},
             }
-    i_errors, i_inserts = push_data_to_redistimeseries(rts, timeseries_dict, expire_ms)
+    i_errors, i_inserts = push_data_to_redistimeseries(
+        rts,
+        timeseries_dict,
+        expire_ms,
+        push_batch_size,
+        push_pipeline_window,
+        schema_cache,
+    )
     datapoint_errors = datapoint_errors + i_errors
     datapoint_inserts = datapoint_inserts + i_inserts
     return datapoint_errors, datapoint_inserts
@@ -4,6 +4,7 @@
 #  All rights reserved.
 #
 import os
+import tempfile
 
 from redisbench_admin.run.args import common_run_args
 from redisbench_admin.run.common import REDIS_BINARY
@@ -14,6 +15,13 @@ SKIP_REDIS_SPIN = bool(int(os.getenv("SKIP_REDIS_SPIN", "0")))
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 REDIS_AUTH = os.getenv("REDIS_AUTH", None)
 REDIS_HOST = os.getenv("REDIS_HOST", "127.0.0.1")
+PARALLEL_SLOTS = int(os.getenv("PARALLEL_SLOTS", "1"))
+DATASET_SNAPSHOT = bool(int(os.getenv("DATASET_SNAPSHOT", "0")))
+# golden snapshots are kept on tmpfs when available
+DATASET_SNAPSHOT_DIR = os.getenv(
+    "DATASET_SNAPSHOT_DIR",
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+)
 
 
 def create_run_local_arguments(parser):
@@ -40,4 +48,29 @@ def create_run_local_arguments(parser):
         default=IGNORE_KEYSPACE_ERRORS,
         help="Ignore keyspace check errors. Will still log them as errors",
     )
+    parser.add_argument(
+        "--dataset-snapshot",
+        type=bool,
+        default=DATASET_SNAPSHOT,
+        help="Keep a golden snapshot of the datasets loaded via a client tool or --dbdir_folder and restore it between the tests that write to it, instead of respinning",
+    )
+    parser.add_argument(
+        "--dataset-snapshot-dir",
+        type=str,
+        default=DATASET_SNAPSHOT_DIR,
+        help="Directory where the golden dataset snapshots are kept",
+    )
+    parser.add_argument(
+        "--parallel-slots",
+        type=int,
+        default=PARALLEL_SLOTS,
+        help="Partition the machine into N slots, each with its own port range, temporary dir and CPU set, running independent tests concurrently. Results are tagged with the slot",
+    )
+    parser.add_argument(
+        "--plan-only",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Print the benchmark schedule and its estimated total time ( based on the datasink history when pushing results to it ) without running it",
+    )
     return parser
@@ -4,8 +4,12 @@
 #  All rights reserved.
 #
 import logging
+import os
+import shutil
 import tempfile
 import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import redis
 
@@ -20,19 +24,29 @@ from redisbench_admin.environments.oss_cluster import (
     setup_redis_cluster_from_conns,
 )
 from redisbench_admin.environments.oss_standalone import spin_up_local_redis
-from redisbench_admin.run.cluster import cluster_init_steps
+from redisbench_admin.run.cluster import cluster_init_steps, debug_reload_rdb
+from redisbench_admin.run.placement import get_placement_policy
 from redisbench_admin.run.common import (
     run_redis_pre_steps,
     check_dbconfig_tool_requirement,
     prepare_benchmark_parameters,
     dbconfig_keyspacelen_check,
+    execute_init_commands,
 )
 from redisbench_admin.utils.benchmark_config import extract_redis_dbconfig_parameters
 from redisbench_admin.utils.local import (
     check_dataset_local_requirements,
+    check_if_needs_remote_fetch,
+    get_dataset_from_config,
+    get_dataset_sha256_from_config,
     is_process_alive,
+    place_dataset_file,
+    place_dataset_files,
 )
 
+BGSAVE_POLL_INITIAL_BACKOFF_SECS = 0.001
+BGSAVE_POLL_MAX_BACKOFF_SECS = 0.1
+
 
 def local_db_spin(
     binary,
@@ -48,11 +62,16 @@ def local_db_spin(
     shard_count,
     flushall_on_every_test_start=False,
     ignore_keyspace_errors=False,
+    temporary_dir_root=None,
 ):
     redis_conns = []
     artifact_version = "n/a"
     result = True
-    temporary_dir = tempfile.mkdtemp()
+    spin_up_duration_seconds = None
+    # the spin up covers the dataset load as well ( RDB or client tool )
+    spin_up_start_time = None
+    temporary_dir = tempfile.mkdtemp(dir=temporary_dir_root)
+    placement_policy = get_placement_policy(benchmark_config)
     cluster_api_enabled = False
     if setup_type == "oss-cluster":
         cluster_api_enabled = True
@@ -64,6 +83,8 @@ def local_db_spin(
         "dbconfig",
         shard_count,
         cluster_api_enabled,
+        False,
+        args.port,
     )
 
     if args.skip_db_setup:
@@ -77,6 +98,7 @@ def local_db_spin(
                 cluster_api_enabled,
                 redis_conns,
                 redis_processes,
+                spin_up_duration_seconds,
             )
     else:
         if args.skip_redis_spin is False:
@@ -111,6 +133,7 @@ def local_db_spin(
                 )
             )
 
+            spin_up_start_time = datetime.datetime.now()
             if setup_type == "oss-cluster":
                 cluster_api_enabled = True
                 redis_processes, redis_conns = spin_up_local_redis_cluster(
@@ -124,6 +147,7 @@ def local_db_spin(
                     dataset_load_timeout_secs,
                     modules_configuration_parameters_map,
                     redis_7,
+                    placement_policy,
                 )
 
                 status = setup_redis_cluster_from_conns(
@@ -143,6 +167,7 @@ def local_db_spin(
                     dataset_load_timeout_secs,
                     modules_configuration_parameters_map,
                     redis_7,
+                    placement_policy,
                 )
             if setup_type == "oss-cluster":
                 for shardn, redis_process in enumerate(redis_processes):
@@ -201,7 +226,7 @@ def local_db_spin(
 
         # run the benchmark
         load_via_benchmark_start_time = datetime.datetime.now()
-        run_local_benchmark(benchmark_tool, command)
+        run_local_benchmark(benchmark_tool, command, placement_policy)
         load_via_benchmark_end_time = datetime.datetime.now()
         load_via_benchmark_duration_seconds = calculate_client_tool_duration_and_check(
             load_via_benchmark_end_time, load_via_benchmark_start_time
@@ -211,10 +236,215 @@ def local_db_spin(
                 load_via_benchmark_duration_seconds
             )
         )
+    if spin_up_start_time is not None:
+        spin_up_duration_seconds = (
+            datetime.datetime.now() - spin_up_start_time
+        ).total_seconds()
+        logging.info(
+            "Redis spin up, including the dataset load, took {:.3f} secs.".format(
+                spin_up_duration_seconds
+            )
+        )
     dbconfig_keyspacelen_check(benchmark_config, redis_conns, ignore_keyspace_errors)
 
     artifact_version = run_redis_pre_steps(
         benchmark_config, redis_conns[0], required_modules
     )
 
-    return result, artifact_version, cluster_api_enabled, redis_conns, redis_processes
+    return (
+        result,
+        artifact_version,
+        cluster_api_enabled,
+        redis_conns,
+        redis_processes,
+        spin_up_duration_seconds,
+    )
+
+
+def local_db_reset(
+    benchmark_config,
+    redis_conns,
+    dirname=".",
+    ignore_keyspace_errors=False,
+    clusterconfig=None,
+    local_module_file=None,
+):
+    """
+    Brings an already spun environment back to the benchmark initial state
+    without a respin. The data is freed in the background via FLUSHALL ASYNC
+    and, when the benchmark uses an RDB dataset, it is placed again on every
+    shard and loaded via DEBUG RELOAD. As on a spin up, the cluster init
+    commands ( when a clusterconfig is given ) and the dbconfig init commands
+    are sent again afterwards. Returns the reset duration in seconds.
+    """
+    reset_start_time = datetime.datetime.now()
+    dataset, _ = get_dataset_from_config(benchmark_config)
+    (
+        _,
+        _,
+        _,
+        dataset_load_timeout_secs,
+        _,
+    ) = extract_redis_dbconfig_parameters(benchmark_config, "dbconfig")
+    for shard_n, shard_conn in enumerate(redis_conns):
+        logging.info("Flushing all in shard {}...".format(shard_n))
+        shard_conn.flushall(asynchronous=True)
+    if dataset is not None:
+        full_path = check_if_needs_remote_fetch(
+            dataset,
+            "./datasets",
+            dirname,
+            expected_sha256=get_dataset_sha256_from_config(benchmark_config),
+            use_dataset_cache=True,
+        )
+        place_dataset_files(
+            full_path, [get_rdb_path(shard_conn) for shard_conn in redis_conns]
+        )
+        debug_reload_rdb(dataset_load_timeout_secs, redis_conns)
+    if clusterconfig is not None:
+        cluster_init_steps(clusterconfig, redis_conns, local_module_file)
+    dbconfig_keyspacelen_check(benchmark_config, redis_conns, ignore_keyspace_errors)
+    # e.g. a FT.CREATE index is gone along with the flushed data
+    execute_init_commands(benchmark_config, redis_conns[0])
+    reset_duration_seconds = (
+        datetime.datetime.now() - reset_start_time
+    ).total_seconds()
+    logging.info("Redis reset took {:.3f} secs.".format(reset_duration_seconds))
+    return reset_duration_seconds
+
+
+def get_rdb_path(conn):
+    return os.path.join(
+        conn.config_get("dir")["dir"], conn.config_get("dbfilename")["dbfilename"]
+    )
+
+
+def wait_for_bgsave(conn, timeout_secs, check_status=True):
+    """
+    Waits for the background save in progress ( if any ) of conn to complete,
+    polling with exponential backoff. Raises an Exception on timeout or, with
+    check_status, when the last background save failed.
+    """
+    start_time = time.monotonic()
+    backoff_secs = BGSAVE_POLL_INITIAL_BACKOFF_SECS
+    persistence_info = conn.info("persistence")
+    while persistence_info["rdb_bgsave_in_progress"] == 1:
+        if time.monotonic() - start_time > timeout_secs:
+            raise Exception(
+                "The background save did not complete within {} secs".format(
+                    timeout_secs
+                )
+            )
+        time.sleep(backoff_secs)
+        backoff_secs = min(backoff_secs * 2, BGSAVE_POLL_MAX_BACKOFF_SECS)
+        persistence_info = conn.info("persistence")
+    if check_status and persistence_info["rdb_last_bgsave_status"] != "ok":
+        raise Exception(
+            "The background save failed with status {}".format(
+                persistence_info["rdb_last_bgsave_status"]
+            )
+        )
+
+
+def local_db_snapshot(benchmark_config, redis_conns, snapshot_dir):
+    """
+    Takes a golden snapshot of the freshly loaded dataset: every shard saves
+    it via BGSAVE ( concurrently, without blocking the servers ) and its RDB
+    is placed into snapshot_dir, ideally on a tmpfs. Returns the snapshot RDB
+    path of each shard and the snapshot duration in seconds. The snapshot
+    paths are None when snapshot_dir lacks the space to hold the dataset.
+    """
+    snapshot_start_time = datetime.datetime.now()
+    required_bytes = get_dataset_used_memory(redis_conns)
+    free_bytes = shutil.disk_usage(snapshot_dir).free
+    if free_bytes < required_bytes:
+        logging.warning(
+            "Skipping the dataset snapshot: {} has {} free bytes and the dataset uses {} bytes.".format(
+                snapshot_dir, free_bytes, required_bytes
+            )
+        )
+        return None, 0
+    (
+        _,
+        _,
+        _,
+        dataset_load_timeout_secs,
+        _,
+    ) = extract_redis_dbconfig_parameters(benchmark_config, "dbconfig")
+
+    def snapshot_shard(shard_n):
+        shard_conn = redis_conns[shard_n]
+        wait_for_bgsave(shard_conn, dataset_load_timeout_secs, False)
+        shard_conn.bgsave()
+        wait_for_bgsave(shard_conn, dataset_load_timeout_secs)
+        snapshot_path = os.path.join(snapshot_dir, "shard-{}.rdb".format(shard_n))
+        place_dataset_file(get_rdb_path(shard_conn), snapshot_path)
+        return snapshot_path
+
+    with ThreadPoolExecutor(max_workers=max(1, len(redis_conns))) as executor:
+        snapshot_paths = list(executor.map(snapshot_shard, range(len(redis_conns))))
+    snapshot_duration_seconds = (
+        datetime.datetime.now() - snapshot_start_time
+    ).total_seconds()
+    logging.info(
+        "Dataset snapshot into {} took {:.3f} secs.".format(
+            snapshot_dir, snapshot_duration_seconds
+        )
+    )
+    return snapshot_paths, snapshot_duration_seconds
+
+
+def get_dataset_used_memory(redis_conns):
+    """
+    Returns the memory used by the dataset of all shards, an upper bound of
+    the size of their RDBs.
+    """
+    used_memory = 0
+    for shard_conn in redis_conns:
+        memory_info = shard_conn.info("memory")
+        used_memory += int(
+            memory_info.get("used_memory_dataset", memory_info.get("used_memory", 0))
+        )
+    return used_memory
+
+
+def local_db_restore(
+    benchmark_config,
+    redis_conns,
+    snapshot_paths,
+    ignore_keyspace_errors=False,
+):
+    """
+    Restores the golden snapshot taken via local_db_snapshot: the snapshot
+    RDB of every shard is placed again, the current data is freed in the
+    background via FLUSHALL ASYNC and the snapshot is loaded via DEBUG RELOAD.
+    Returns the restore duration in seconds.
+    """
+    restore_start_time = datetime.datetime.now()
+    (
+        _,
+        _,
+        _,
+        dataset_load_timeout_secs,
+        _,
+    ) = extract_redis_dbconfig_parameters(benchmark_config, "dbconfig")
+    with ThreadPoolExecutor(max_workers=max(1, len(redis_conns))) as executor:
+        list(
+            executor.map(
+                lambda x: place_dataset_file(x[1], get_rdb_path(x[0])),
+                zip(redis_conns, snapshot_paths),
+            )
+        )
+    for shard_conn in redis_conns:
+        shard_conn.flushall(asynchronous=True)
+    debug_reload_rdb(dataset_load_timeout_secs, redis_conns)
+    dbconfig_keyspacelen_check(benchmark_config, redis_conns, ignore_keyspace_errors)
+    restore_duration_seconds = (
+        datetime.datetime.now() - restore_start_time
+    ).total_seconds()
+    logging.info(
+        "Dataset restore from snapshot took {:.3f} secs.".format(
+            restore_duration_seconds
+        )
+    )
+    return restore_duration_seconds
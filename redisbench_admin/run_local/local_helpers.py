@@ -9,16 +9,31 @@ import shutil
 import subprocess
 import sys
 
-import wget
-
+from redisbench_admin.run.placement import (
+    PLACEMENT_NUMA_NODE_KEY,
+    get_client_cpus,
+    get_local_placement_command_prefix,
+)
 from redisbench_admin.run.redis_benchmark.redis_benchmark import (
     redis_benchmark_ensure_min_version_local,
 )
-from redisbench_admin.utils.benchmark_config import extract_benchmark_tool_settings
+from redisbench_admin.utils.benchmark_config import (
+    extract_benchmark_tool_settings,
+    extract_benchmark_tool_source_sha256,
+)
+from redisbench_admin.utils.download import download_file
 from redisbench_admin.utils.utils import get_decompressed_filename, decompress_file
 
 
-def run_local_benchmark(benchmark_tool, command):
+def run_local_benchmark(benchmark_tool, command, placement_policy=None):
+    if placement_policy is not None:
+        command = (
+            get_local_placement_command_prefix(
+                get_client_cpus(placement_policy),
+                placement_policy[PLACEMENT_NUMA_NODE_KEY],
+            )
+            + command
+        )
     try:
         if benchmark_tool == "redis-benchmark" or benchmark_tool == "ycsb":
             benchmark_client_process = subprocess.Popen(
@@ -83,6 +98,7 @@ def check_benchmark_binaries_local_requirements(
                 tool_source,
                 tool_source_bin_path,
                 which_benchmark_tool,
+                extract_benchmark_tool_source_sha256(benchmark_config, config_key),
             )
         else:
             logging.info(
@@ -120,6 +136,7 @@ def fetch_benchmark_tool_from_source_to_local(
     tool_source,
     bin_path,
     which_benchmark_tool,
+    tool_source_sha256=None,
 ):
     benchmark_tool_workdir = benchmark_tool_workdir
     which_benchmark_tool = None
@@ -141,7 +158,7 @@ def fetch_benchmark_tool_from_source_to_local(
                             tool_source, full_path, binaries_localtemp_dir
                         )
                     )
-                    wget.download(tool_source, full_path)
+                    download_file(tool_source, full_path, tool_source_sha256)
                 logging.info(
                     "Decompressing {} into {}.".format(
                         full_path, binaries_localtemp_dir
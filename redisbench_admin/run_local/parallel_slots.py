@@ -0,0 +1,103 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import logging
+import os
+import queue
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from redisbench_admin.run.placement import split_cpus
+
+# each slot owns [port, port + PARALLEL_SLOT_PORT_RANGE) ( and the cluster bus
+# ports 10000 above them ), enough for clusters of up to that many shards
+PARALLEL_SLOT_PORT_RANGE = 100
+PARALLEL_SLOT_TMP_PREFIX = "redisbench-admin-slot-"
+
+
+def get_available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count()))
+
+
+def get_parallel_slots_cpus(slots, cpus):
+    """
+    Partitions the cpus into slots contiguous sets, as even as possible.
+    Raises an Exception when there are fewer cpus than slots.
+    """
+    return split_cpus(cpus, slots)
+
+
+def get_parallel_slots(slots, start_port, cpus=None, tmp_dir=None):
+    """
+    Returns the definition of each slot: its number, port range start,
+    cpu set and a dedicated temporary dir ( see remove_parallel_slots ).
+    """
+    if cpus is None:
+        cpus = get_available_cpus()
+    parallel_slots = []
+    for slot_n, slot_cpus in enumerate(get_parallel_slots_cpus(slots, cpus)):
+        parallel_slots.append(
+            {
+                "slot": slot_n,
+                "port": start_port + slot_n * PARALLEL_SLOT_PORT_RANGE,
+                "cpus": slot_cpus,
+                "dir": tempfile.mkdtemp(
+                    prefix="{}{}-".format(PARALLEL_SLOT_TMP_PREFIX, slot_n),
+                    dir=tmp_dir,
+                ),
+            }
+        )
+        logging.info(
+            "Slot #{}: ports starting at {}, cpus {}, temporary dir {}".format(
+                slot_n,
+                parallel_slots[-1]["port"],
+                slot_cpus,
+                parallel_slots[-1]["dir"],
+            )
+        )
+    return parallel_slots
+
+
+def remove_parallel_slots(parallel_slots):
+    for slot in parallel_slots:
+        shutil.rmtree(slot["dir"], ignore_errors=True)
+
+
+def run_in_parallel_slots(parallel_slots, tasks, fn):
+    """
+    Runs fn(task, slot) for every task, each slot running one task at a time
+    and picking the next pending one once done. Each slot runs on its own
+    thread pinned to the slot cpus via sched_setaffinity, an affinity that
+    every process spawned from it ( redis-server, benchmark tools ) inherits.
+    Returns the list of results, following the tasks order.
+    """
+    pending = queue.Queue()
+    for task_n, task in enumerate(tasks):
+        pending.put((task_n, task))
+    results = [None for _ in tasks]
+
+    def run_slot(slot):
+        if hasattr(os, "sched_setaffinity"):
+            # pid 0 is the calling thread, not the whole process
+            os.sched_setaffinity(0, slot["cpus"])
+        else:
+            logging.warning(
+                "CPU affinity is not supported on this platform. Slot #{} won't be pinned".format(
+                    slot["slot"]
+                )
+            )
+        while True:
+            try:
+                task_n, task = pending.get_nowait()
+            except queue.Empty:
+                return
+            results[task_n] = fn(task, slot)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(parallel_slots))) as executor:
+        list(executor.map(run_slot, parallel_slots))
+    return results
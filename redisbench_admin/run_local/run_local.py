@@ -4,27 +4,33 @@
 #  All rights reserved.
 #
 
+import copy
 import json
 import logging
 import os
+import shutil
 import sys
+import tempfile
 import datetime
 import traceback
 import redis
 from redisbench_admin.run.git import git_vars_crosscheck
 
+from redisbench_admin.utils.schema_cache import load_schema_cache
 from redisbench_admin.utils.remote import (
     get_project_ts_tags,
     push_data_to_redistimeseries,
+    PERFORMANCE_RTS_PUSH_BATCH_SIZE,
+    PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW,
 )
 
-import redisbench_admin.run.metrics
 from redisbench_admin.profilers.perf import PERF_CALLGRAPH_MODE
 from redisbench_admin.profilers.profilers_schema import (
     local_profilers_print_artifacts_table,
 )
 from redisbench_admin.run.args import PROFILE_FREQ
 from redisbench_admin.run.common import (
+    check_dbconfig_tool_requirement,
     prepare_benchmark_parameters,
     get_start_time_vars,
     BENCHMARK_REPETITIONS,
@@ -32,6 +38,11 @@ from redisbench_admin.run.common import (
     dso_check,
     print_results_table_stdout,
 )
+from redisbench_admin.dataset_cache.dataset_cache import (
+    get_remote_datasets,
+    get_remote_datasets_sha256,
+    prefetch_datasets,
+)
 from redisbench_admin.run.metrics import (
     from_info_to_overall_shard_cpu,
     collect_redis_metrics,
@@ -41,12 +52,35 @@ from redisbench_admin.run.metrics import (
 from redisbench_admin.run.redistimeseries import (
     datasink_profile_tabular_data,
     timeseries_test_sucess_flow,
+    get_secondary_result_keys_pipeline,
+    execute_secondary_result_keys_pipeline,
+)
+from redisbench_admin.run.placement import (
+    get_placement_metadata_tags,
+    get_placement_policy,
 )
 from redisbench_admin.run.run import (
     calculate_client_tool_duration_and_check,
     define_benchmark_plan,
 )
-from redisbench_admin.run_local.local_db import local_db_spin
+from redisbench_admin.run.scheduler import (
+    BENCHMARK_RESET_RESPIN,
+    define_benchmark_schedule,
+    get_benchmark_reset_type,
+    get_historical_durations,
+    print_benchmark_schedule,
+)
+from redisbench_admin.run_local.local_db import (
+    local_db_reset,
+    local_db_restore,
+    local_db_snapshot,
+    local_db_spin,
+)
+from redisbench_admin.run_local.parallel_slots import (
+    get_parallel_slots,
+    remove_parallel_slots,
+    run_in_parallel_slots,
+)
 from redisbench_admin.run_local.local_helpers import (
     run_local_benchmark,
     check_benchmark_binaries_local_requirements,
@@ -61,6 +95,11 @@ from redisbench_admin.utils.benchmark_config import (
     prepare_benchmark_definitions,
     results_dict_kpi_check,
     get_metadata_tags,
+    get_defaults_compaction_policy,
+)
+from redisbench_admin.utils.dataset_cache import (
+    DATASET_CACHE_DIR,
+    DATASET_CACHE_MAX_BYTES,
 )
 from redisbench_admin.utils.local import (
     get_local_run_full_filename,
@@ -119,6 +158,9 @@ def run_local_command_logic(args, project_name, project_version):
     logging.info("Using the following modules {}".format(local_module_file))
 
     rts = None
+    schema_cache = None
+    compaction_policy = None
+    secondary_keys_pipeline = None
     if args.push_results_redistimeseries:
         logging.info(
             "Checking connection to RedisTimeSeries to host: {}:{}".format(
@@ -132,6 +174,12 @@ def run_local_command_logic(args, project_name, project_version):
             retry_on_timeout=True,
         )
         rts.ping()
+        schema_cache = load_schema_cache(rts, getattr(args, "local_dir", "./"))
+        compaction_policy = get_defaults_compaction_policy(args.defaults_filename)
+        if args.datasink_defer_secondary_keys:
+            secondary_keys_pipeline = get_secondary_result_keys_pipeline(
+                rts, args.datasink_secondary_keys_transaction
+            )
 
     dso = dso_check(args.dso, local_module_file)
     # start the profile
@@ -154,397 +202,604 @@ def run_local_command_logic(args, project_name, project_version):
     profilers_artifacts_matrix = []
     # we have a map of test-type, dataset-name, topology, test-name
     benchmark_runs_plan = define_benchmark_plan(benchmark_definitions, default_specs)
-    for benchmark_type, bench_by_dataset_map in benchmark_runs_plan.items():
-        for (
-            dataset_name,
-            bench_by_dataset_and_setup_map,
-        ) in bench_by_dataset_map.items():
-            for setup_name, setup_details in bench_by_dataset_and_setup_map.items():
-                setup_settings = setup_details["setup_settings"]
-                benchmarks_map = setup_details["benchmarks"]
-                # we start with an empty per bench-type/setup-name
-                setup_details["env"] = None
-                for test_name, benchmark_config in benchmarks_map.items():
-                    for repetition in range(1, BENCHMARK_REPETITIONS + 1):
-                        logging.info(
-                            "Repetition {} of {}. Running test {}".format(
-                                repetition, BENCHMARK_REPETITIONS, test_name
-                            )
-                        )
+    benchmark_schedule = define_benchmark_schedule(benchmark_runs_plan)
+    if args.plan_only:
+        durations = get_historical_durations(
+            rts,
+            [
+                test_name
+                for setup_details in benchmark_schedule
+                for test_name, _, _ in setup_details["benchmarks"]
+            ],
+            github_org_name,
+            github_repo_name,
+            tf_triggering_env,
+            tf_github_branch=github_branch,
+        )
+        print_benchmark_schedule(
+            benchmark_schedule,
+            durations,
+            BENCHMARK_REPETITIONS,
+            args.dataset_snapshot,
+        )
+        exit(0)
+
+    # datasink pipelines and the schema cache are shared by concurrent slots
+    datasink_lock = threading.Lock()
+
+    def run_benchmark_group(setup_details, args, slot=None):
+        """
+        Runs all tests of a schedule group on its shared environment. When
+        running in a parallel slot, args carries the slot port and the slot
+        is tagged on the results. Returns the group return code.
+        """
+        return_code = 0
+        setup_settings = setup_details["setup_settings"]
+        # the environment is shared by all tests of the group
+        setup_details["env"] = None
+        group_has_writers = any(
+            benchmark_type != "read-only"
+            for _, benchmark_type, _ in setup_details["benchmarks"]
+        )
+        for test_name, benchmark_type, benchmark_config in setup_details["benchmarks"]:
+            for repetition in range(1, BENCHMARK_REPETITIONS + 1):
+                logging.info(
+                    "Repetition {} of {}. Running test {}".format(
+                        repetition, BENCHMARK_REPETITIONS, test_name
+                    )
+                )
 
-                        (
-                            setup_name,
-                            setup_type,
-                            shard_count,
-                        ) = get_setup_type_and_primaries_count(setup_settings)
-                        if args.allowed_setups != "":
-                            allowed_setups = args.allowed_setups.split(",")
-                            logging.info(
-                                "Checking if setup named {} of topology type {}. Total primaries: {} is in the allowed list of setups {}".format(
-                                    setup_name, setup_type, shard_count, allowed_setups
-                                )
+                (
+                    setup_name,
+                    setup_type,
+                    shard_count,
+                ) = get_setup_type_and_primaries_count(setup_settings)
+                if args.allowed_setups != "":
+                    allowed_setups = args.allowed_setups.split(",")
+                    logging.info(
+                        "Checking if setup named {} of topology type {}. Total primaries: {} is in the allowed list of setups {}".format(
+                            setup_name, setup_type, shard_count, allowed_setups
+                        )
+                    )
+                    if setup_name not in allowed_setups:
+                        logging.warning(
+                            "SKIPPING setup named {} of topology type {}.".format(
+                                setup_name, setup_type
                             )
-                            if setup_name not in allowed_setups:
-                                logging.warning(
-                                    "SKIPPING setup named {} of topology type {}.".format(
-                                        setup_name, setup_type
+                        )
+                        continue
+                if setup_type in args.allowed_envs:
+                    redis_processes = []
+                    redis_conns = []
+                    # only measured when the setup is spun for this test
+                    spin_up_duration_seconds = None
+                    # only measured when a reused environment reloads its dataset,
+                    # a fresh spin reports the load within its spin up duration
+                    dataset_load_duration_seconds = None
+                    # only measured when the golden snapshot is restored for this test
+                    dataset_restore_duration_seconds = None
+                    # after we've spinned Redis, even on error we should always teardown
+                    # in case of some unexpected error we fail the test
+                    # noinspection PyBroadException
+                    try:
+                        dirname = "."
+                        if (
+                            setup_details["env"] is not None
+                            and setup_details["env"]["dirty"]
+                        ):
+                            reset_type = get_benchmark_reset_type(benchmark_config)
+                            if dbdir_folder is not None:
+                                # the dbdir content is only restored by a respin
+                                reset_type = BENCHMARK_RESET_RESPIN
+                            if setup_details["env"]["snapshot_paths"] is not None:
+                                logging.info(
+                                    "The previous benchmark changed the dataset of setup {}. Restoring its golden snapshot.".format(
+                                        setup_name
                                     )
                                 )
-                                continue
-                        if setup_type in args.allowed_envs:
-                            redis_processes = []
-                            redis_conns = []
-                            # after we've spinned Redis, even on error we should always teardown
-                            # in case of some unexpected error we fail the test
-                            # noinspection PyBroadException
-                            try:
-                                dirname = "."
-                                if setup_details["env"] is None:
-                                    logging.info(
-                                        "Starting setup named {} of topology type {}. Total primaries: {}".format(
-                                            setup_name, setup_type, shard_count
-                                        )
-                                    )
-                                    binary = args.redis_binary
-                                    if " " in binary:
-                                        binary = binary.split(" ")
-                                    (
-                                        result_db_spin,
-                                        artifact_version,
-                                        cluster_api_enabled,
-                                        redis_conns,
-                                        redis_processes,
-                                    ) = local_db_spin(
-                                        binary,
-                                        args,
-                                        benchmark_config,
-                                        clusterconfig,
-                                        dbdir_folder,
-                                        dirname,
-                                        local_module_file,
-                                        redis_processes,
-                                        required_modules,
-                                        setup_type,
-                                        shard_count,
-                                        flushall_on_every_test_start,
-                                        ignore_keyspace_errors,
-                                    )
-                                    if result_db_spin is False:
-                                        logging.warning(
-                                            "Skipping this test given DB spin stage failed..."
-                                        )
-                                        continue
-                                    if benchmark_type == "read-only":
-                                        logging.info(
-                                            "Given the benchmark for this setup is ready-only we will prepare to reuse it on the next read-only benchmarks (if any )."
-                                        )
-                                        setup_details["env"] = {}
-                                        setup_details["env"][
-                                            "cluster_api_enabled"
-                                        ] = cluster_api_enabled
-                                        setup_details["env"][
-                                            "redis_conns"
-                                        ] = redis_conns
-                                        setup_details["env"][
-                                            "redis_processes"
-                                        ] = redis_processes
-                                else:
-                                    assert benchmark_type == "read-only"
-                                    logging.info(
-                                        "Given the benchmark for this setup is ready-only, and this setup was already spinned we will reuse the previous, conns and process info."
-                                    )
-                                    cluster_api_enabled = setup_details["env"][
-                                        "cluster_api_enabled"
-                                    ]
-                                    redis_conns = setup_details["env"]["redis_conns"]
-                                    redis_processes = setup_details["env"][
-                                        "redis_processes"
-                                    ]
-
-                                # setup the benchmark
-                                (
-                                    start_time,
-                                    start_time_ms,
-                                    start_time_str,
-                                ) = get_start_time_vars()
-                                local_benchmark_output_filename = (
-                                    get_local_run_full_filename(
-                                        start_time_str,
-                                        github_branch,
-                                        test_name,
-                                        setup_name,
-                                    )
+                                dataset_restore_duration_seconds = local_db_restore(
+                                    benchmark_config,
+                                    setup_details["env"]["redis_conns"],
+                                    setup_details["env"]["snapshot_paths"],
+                                    ignore_keyspace_errors,
                                 )
+                                setup_details["env"]["dirty"] = False
+                            elif reset_type == BENCHMARK_RESET_RESPIN:
                                 logging.info(
-                                    "Will store benchmark json output to local file {}".format(
-                                        local_benchmark_output_filename
+                                    "The previous benchmark changed the dataset of setup {} and it can only be restored via a respin.".format(
+                                        setup_name
                                     )
                                 )
-
-                                (
-                                    benchmark_tool,
-                                    full_benchmark_path,
-                                    benchmark_tool_workdir,
-                                ) = check_benchmark_binaries_local_requirements(
-                                    benchmark_config, args.allowed_tools
-                                )
-
-                                # prepare the benchmark command
-                                command, command_str = prepare_benchmark_parameters(
-                                    benchmark_config,
-                                    full_benchmark_path,
-                                    args.port,
-                                    args.host,
-                                    local_benchmark_output_filename,
-                                    False,
-                                    benchmark_tool_workdir,
-                                    cluster_api_enabled,
-                                    "clientconfig",
-                                    None,
-                                    None,
-                                    None,
-                                    None,
-                                    args.password,
-                                )
-                                redis_pids = [
-                                    redis_process.pid
-                                    for redis_process in redis_processes
-                                ]
-                                # start the profile
-                                (
-                                    profiler_name,
-                                    profilers_map,
-                                ) = profilers_start_if_required(
-                                    profilers_enabled,
-                                    profilers_list,
-                                    redis_pids,
+                                teardown_local_setup(
+                                    setup_details["env"]["redis_conns"],
+                                    setup_details["env"]["redis_processes"],
                                     setup_name,
-                                    start_time_str,
-                                    test_name,
-                                    PROFILE_FREQ,
-                                    PERF_CALLGRAPH_MODE,
                                 )
-
-                                # run the benchmark
-                                cpu_stats_thread = threading.Thread(
-                                    target=collect_cpu_data,
-                                    args=(redis_conns, 5.0, 1.0),
+                                teardown_local_snapshot(setup_details["env"])
+                                setup_details["env"] = None
+                            else:
+                                logging.info(
+                                    "The previous benchmark changed the dataset of setup {}. Resetting it via {}.".format(
+                                        setup_name, reset_type
+                                    )
                                 )
-                                redisbench_admin.run.metrics.BENCHMARK_RUNNING_GLOBAL = (
-                                    True
+                                dataset_load_duration_seconds = local_db_reset(
+                                    benchmark_config,
+                                    setup_details["env"]["redis_conns"],
+                                    dirname,
+                                    ignore_keyspace_errors,
+                                    (
+                                        clusterconfig
+                                        if setup_details["env"]["cluster_api_enabled"]
+                                        else None
+                                    ),
+                                    local_module_file,
                                 )
-                                cpu_stats_thread.start()
-                                benchmark_start_time = datetime.datetime.now()
-                                stdout, stderr = run_local_benchmark(
-                                    benchmark_tool, command
+                                setup_details["env"]["dirty"] = False
+                        if setup_details["env"] is None:
+                            logging.info(
+                                "Starting setup named {} of topology type {}. Total primaries: {}".format(
+                                    setup_name, setup_type, shard_count
                                 )
-                                benchmark_end_time = datetime.datetime.now()
-                                redisbench_admin.run.metrics.BENCHMARK_RUNNING_GLOBAL = (
-                                    False
+                            )
+                            binary = args.redis_binary
+                            if " " in binary:
+                                binary = binary.split(" ")
+                            (
+                                result_db_spin,
+                                artifact_version,
+                                cluster_api_enabled,
+                                redis_conns,
+                                redis_processes,
+                                spin_up_duration_seconds,
+                            ) = local_db_spin(
+                                binary,
+                                args,
+                                benchmark_config,
+                                clusterconfig,
+                                dbdir_folder,
+                                dirname,
+                                local_module_file,
+                                redis_processes,
+                                required_modules,
+                                setup_type,
+                                shard_count,
+                                flushall_on_every_test_start,
+                                ignore_keyspace_errors,
+                                None if slot is None else slot["dir"],
+                            )
+                            if result_db_spin is False:
+                                logging.warning(
+                                    "Skipping this test given DB spin stage failed..."
                                 )
-                                cpu_stats_thread.join()
-                                (
-                                    total_shards_cpu_usage,
-                                    cpu_usage_map,
-                                ) = from_info_to_overall_shard_cpu(
-                                    redisbench_admin.run.metrics.BENCHMARK_CPU_STATS_GLOBAL
+                                continue
+                            setup_details["env"] = {
+                                "artifact_version": artifact_version,
+                                "cluster_api_enabled": cluster_api_enabled,
+                                "redis_conns": redis_conns,
+                                "redis_processes": redis_processes,
+                                "dirty": False,
+                                "snapshot_dir": None,
+                                "snapshot_paths": None,
+                            }
+                            # only the datasets that would require a respin, RDB
+                            # datasets are reloaded just as fast from their file
+                            if (
+                                args.dataset_snapshot
+                                and group_has_writers
+                                and (
+                                    get_benchmark_reset_type(benchmark_config)
+                                    == BENCHMARK_RESET_RESPIN
+                                    or dbdir_folder is not None
                                 )
-                                logging.info(
-                                    "Total CPU usage ({:.3f} %)".format(
-                                        total_shards_cpu_usage
-                                    )
+                            ):
+                                snapshot_dir = tempfile.mkdtemp(
+                                    prefix="redisbench-admin-snapshot-",
+                                    dir=args.dataset_snapshot_dir,
                                 )
-                                logging.info(
-                                    "CPU MAP: {}".format(
-                                        json.dumps(cpu_usage_map, indent=2)
-                                    )
+                                setup_details["env"]["snapshot_dir"] = snapshot_dir
+                                (
+                                    setup_details["env"]["snapshot_paths"],
+                                    _,
+                                ) = local_db_snapshot(
+                                    benchmark_config, redis_conns, snapshot_dir
                                 )
-                                benchmark_duration_seconds = (
-                                    calculate_client_tool_duration_and_check(
-                                        benchmark_end_time, benchmark_start_time
-                                    )
+                                if setup_details["env"]["snapshot_paths"] is None:
+                                    teardown_local_snapshot(setup_details["env"])
+                        else:
+                            logging.info(
+                                "Reusing the already spun setup {} and its conns and process info.".format(
+                                    setup_name
                                 )
+                            )
+                            artifact_version = setup_details["env"]["artifact_version"]
+                            cluster_api_enabled = setup_details["env"][
+                                "cluster_api_enabled"
+                            ]
+                            redis_conns = setup_details["env"]["redis_conns"]
+                            redis_processes = setup_details["env"]["redis_processes"]
+
+                        # setup the benchmark
+                        (
+                            start_time,
+                            start_time_ms,
+                            start_time_str,
+                        ) = get_start_time_vars()
+                        local_benchmark_output_filename = get_local_run_full_filename(
+                            start_time_str,
+                            github_branch,
+                            test_name,
+                            setup_name,
+                        )
+                        logging.info(
+                            "Will store benchmark json output to local file {}".format(
+                                local_benchmark_output_filename
+                            )
+                        )
 
-                                logging.info("Extracting the benchmark results")
-                                logging.info("stdout: {}".format(stdout))
-                                logging.info("stderr: {}".format(stderr))
+                        (
+                            benchmark_tool,
+                            full_benchmark_path,
+                            benchmark_tool_workdir,
+                        ) = check_benchmark_binaries_local_requirements(
+                            benchmark_config, args.allowed_tools
+                        )
 
-                                (
-                                    _,
-                                    overall_tabular_data_map,
-                                ) = profilers_stop_if_required(
-                                    args.upload_results_s3,
-                                    benchmark_duration_seconds,
-                                    collection_summary_str,
-                                    dso,
-                                    github_org_name,
-                                    github_repo_name,
-                                    profiler_name,
-                                    profilers_artifacts_matrix,
-                                    profilers_enabled,
-                                    profilers_map,
-                                    redis_pids,
-                                    s3_bucket_name,
-                                    test_name,
-                                )
+                        # prepare the benchmark command
+                        command, command_str = prepare_benchmark_parameters(
+                            benchmark_config,
+                            full_benchmark_path,
+                            args.port,
+                            args.host,
+                            local_benchmark_output_filename,
+                            False,
+                            benchmark_tool_workdir,
+                            cluster_api_enabled,
+                            "clientconfig",
+                            None,
+                            None,
+                            None,
+                            None,
+                            args.password,
+                        )
+                        redis_pids = [
+                            redis_process.pid for redis_process in redis_processes
+                        ]
+                        # start the profile
+                        (
+                            profiler_name,
+                            profilers_map,
+                        ) = profilers_start_if_required(
+                            profilers_enabled,
+                            profilers_list,
+                            redis_pids,
+                            setup_name,
+                            start_time_str,
+                            test_name,
+                            PROFILE_FREQ,
+                            PERF_CALLGRAPH_MODE,
+                        )
 
-                                (
-                                    end_time_ms,
-                                    _,
-                                    overall_end_time_metrics,
-                                ) = collect_redis_metrics(
-                                    redis_conns,
-                                    ["memory"],
-                                    {
-                                        "memory": [
-                                            "used_memory",
-                                            "used_memory_dataset",
-                                        ]
-                                    },
-                                )
+                        # run the benchmark
+                        cpu_stats = {}
+                        benchmark_running = threading.Event()
+                        cpu_stats_thread = threading.Thread(
+                            target=collect_cpu_data,
+                            args=(
+                                redis_conns,
+                                5.0,
+                                1.0,
+                                cpu_stats,
+                                benchmark_running,
+                            ),
+                        )
+                        benchmark_running.set()
+                        cpu_stats_thread.start()
+                        benchmark_start_time = datetime.datetime.now()
+                        stdout, stderr = run_local_benchmark(
+                            benchmark_tool,
+                            command,
+                            get_placement_policy(benchmark_config),
+                        )
+                        benchmark_end_time = datetime.datetime.now()
+                        if benchmark_type != "read-only":
+                            setup_details["env"]["dirty"] = True
+                        benchmark_running.clear()
+                        cpu_stats_thread.join()
+                        (
+                            total_shards_cpu_usage,
+                            cpu_usage_map,
+                        ) = from_info_to_overall_shard_cpu(cpu_stats)
+                        logging.info(
+                            "Total CPU usage ({:.3f} %)".format(total_shards_cpu_usage)
+                        )
+                        logging.info(
+                            "CPU MAP: {}".format(json.dumps(cpu_usage_map, indent=2))
+                        )
+                        benchmark_duration_seconds = (
+                            calculate_client_tool_duration_and_check(
+                                benchmark_end_time, benchmark_start_time
+                            )
+                        )
 
-                                if (
-                                    profilers_enabled
-                                    and args.push_results_redistimeseries
-                                ):
-                                    datasink_profile_tabular_data(
-                                        github_branch,
-                                        github_org_name,
-                                        github_repo_name,
-                                        github_sha,
-                                        overall_tabular_data_map,
-                                        rts,
-                                        setup_type,
-                                        start_time_ms,
-                                        start_time_str,
-                                        test_name,
-                                        tf_triggering_env,
-                                    )
+                        logging.info("Extracting the benchmark results")
+                        logging.info("stdout: {}".format(stdout))
+                        logging.info("stderr: {}".format(stderr))
 
-                                post_process_benchmark_results(
-                                    benchmark_tool,
-                                    local_benchmark_output_filename,
-                                    start_time_ms,
-                                    start_time_str,
-                                    stdout,
-                                )
-                                results_dict = {}
-                                with open(
-                                    local_benchmark_output_filename, "r"
-                                ) as json_file:
-                                    results_dict = json.load(json_file)
-                                    print_results_table_stdout(
-                                        benchmark_config,
-                                        default_metrics,
-                                        results_dict,
-                                        setup_name,
-                                        setup_type,
-                                        test_name,
-                                        total_shards_cpu_usage,
-                                        overall_end_time_metrics,
-                                        [
-                                            "memory_used_memory",
-                                            "memory_used_memory_dataset",
-                                        ],
-                                    )
-                                    export_redis_metrics(
-                                        artifact_version,
-                                        end_time_ms,
-                                        overall_end_time_metrics,
-                                        rts,
-                                        setup_name,
-                                        setup_type,
-                                        test_name,
-                                        tf_github_branch,
-                                        tf_github_org,
-                                        tf_github_repo,
-                                        tf_triggering_env,
-                                        {"metric-type": "redis-metrics"},
-                                        0,
-                                    )
+                        (
+                            _,
+                            overall_tabular_data_map,
+                        ) = profilers_stop_if_required(
+                            args.upload_results_s3,
+                            benchmark_duration_seconds,
+                            collection_summary_str,
+                            dso,
+                            github_org_name,
+                            github_repo_name,
+                            profiler_name,
+                            profilers_artifacts_matrix,
+                            profilers_enabled,
+                            profilers_map,
+                            redis_pids,
+                            s3_bucket_name,
+                            test_name,
+                        )
 
-                                    # check KPIs
-                                    return_code = results_dict_kpi_check(
-                                        benchmark_config, results_dict, return_code
-                                    )
+                        (
+                            end_time_ms,
+                            _,
+                            overall_end_time_metrics,
+                        ) = collect_redis_metrics(
+                            redis_conns,
+                            ["memory"],
+                            {
+                                "memory": [
+                                    "used_memory",
+                                    "used_memory_dataset",
+                                ]
+                            },
+                        )
 
-                                metadata_tags = get_metadata_tags(benchmark_config)
-                                (
-                                    _,
-                                    branch_target_tables,
-                                ) = timeseries_test_sucess_flow(
-                                    args.push_results_redistimeseries,
+                        if profilers_enabled and args.push_results_redistimeseries:
+                            datasink_profile_tabular_data(
+                                github_branch,
+                                github_org_name,
+                                github_repo_name,
+                                github_sha,
+                                overall_tabular_data_map,
+                                rts,
+                                setup_type,
+                                start_time_ms,
+                                start_time_str,
+                                test_name,
+                                tf_triggering_env,
+                            )
+
+                        post_process_benchmark_results(
+                            benchmark_tool,
+                            local_benchmark_output_filename,
+                            start_time_ms,
+                            start_time_str,
+                            stdout,
+                        )
+                        results_dict = {}
+                        with open(local_benchmark_output_filename, "r") as json_file:
+                            results_dict = json.load(json_file)
+                            print_results_table_stdout(
+                                benchmark_config,
+                                default_metrics,
+                                results_dict,
+                                setup_name,
+                                setup_type,
+                                test_name,
+                                total_shards_cpu_usage,
+                                overall_end_time_metrics,
+                                [
+                                    "memory_used_memory",
+                                    "memory_used_memory_dataset",
+                                ],
+                            )
+                            with datasink_lock:
+                                export_redis_metrics(
                                     artifact_version,
-                                    benchmark_config,
-                                    benchmark_duration_seconds,
-                                    0,
-                                    default_metrics,
+                                    end_time_ms,
+                                    overall_end_time_metrics,
+                                    rts,
                                     setup_name,
                                     setup_type,
-                                    exporter_timemetric_path,
-                                    results_dict,
-                                    rts,
-                                    start_time_ms,
                                     test_name,
-                                    github_branch,
-                                    github_org_name,
-                                    github_repo_name,
+                                    tf_github_branch,
+                                    tf_github_org,
+                                    tf_github_repo,
                                     tf_triggering_env,
-                                    metadata_tags,
+                                    {"metric-type": "redis-metrics"},
+                                    0,
+                                    args.datasink_push_batch_size,
+                                    args.datasink_push_pipeline_window,
+                                    schema_cache,
                                 )
 
-                                if setup_details["env"] is None:
-                                    if args.keep_env_and_topo is False:
-                                        for conn in redis_conns:
-                                            conn.shutdown(save=False)
-                                    else:
-                                        logging.info(
-                                            "Keeping environment and topology active upon request."
-                                        )
-
-                            except:
-                                return_code |= 1
-                                logging.critical(
-                                    "Some unexpected exception was caught "
-                                    "during local work. Failing test...."
-                                )
-                                logging.critical(sys.exc_info()[0])
-                                print("-" * 60)
-                                traceback.print_exc(file=sys.stdout)
-                                print("-" * 60)
-                                setup_details["env"] = None
+                            # check KPIs
+                            return_code = results_dict_kpi_check(
+                                benchmark_config, results_dict, return_code
+                            )
 
-                            # tear-down
-                            if setup_details["env"] is None:
-                                if args.keep_env_and_topo is False:
-                                    teardown_local_setup(
-                                        redis_conns, redis_processes, setup_name
-                                    )
-                                else:
-                                    logging.info(
-                                        "Keeping environment and topology active upon request."
-                                    )
+                        metadata_tags = copy.copy(get_metadata_tags(benchmark_config))
+                        metadata_tags.update(
+                            get_placement_metadata_tags(
+                                get_placement_policy(benchmark_config)
+                            )
+                        )
+                        with datasink_lock:
+                            (
+                                _,
+                                branch_target_tables,
+                            ) = timeseries_test_sucess_flow(
+                                args.push_results_redistimeseries,
+                                artifact_version,
+                                benchmark_config,
+                                benchmark_duration_seconds,
+                                dataset_load_duration_seconds,
+                                default_metrics,
+                                setup_name,
+                                setup_type,
+                                exporter_timemetric_path,
+                                results_dict,
+                                rts,
+                                start_time_ms,
+                                test_name,
+                                github_branch,
+                                github_org_name,
+                                github_repo_name,
+                                tf_triggering_env,
+                                metadata_tags,
+                                None,
+                                None,
+                                None,
+                                args.datasink_push_batch_size,
+                                args.datasink_push_pipeline_window,
+                                schema_cache,
+                                secondary_keys_pipeline,
+                                args.datasink_secondary_keys_transaction,
+                                compaction_policy,
+                                spin_up_duration_seconds,
+                                dataset_restore_duration_seconds,
+                                # a metric rather than a label, so that every
+                                # run keeps the slot it ran on ( noisy-neighbour
+                                # analysis )
+                                None if slot is None else slot["slot"],
+                            )
 
+                    except:
+                        return_code |= 1
+                        logging.critical(
+                            "Some unexpected exception was caught "
+                            "during local work. Failing test...."
+                        )
+                        logging.critical(sys.exc_info()[0])
+                        print("-" * 60)
+                        traceback.print_exc(file=sys.stdout)
+                        print("-" * 60)
+                        teardown_local_snapshot(setup_details["env"])
+                        if setup_details["env"] is not None:
+                            # e.g. a failed reset, the shared processes are
+                            # still running and holding the setup ports
+                            redis_conns = setup_details["env"]["redis_conns"]
+                            redis_processes = setup_details["env"]["redis_processes"]
+                        setup_details["env"] = None
+
+                    # tear-down
+                    if setup_details["env"] is None:
+                        if args.keep_env_and_topo is False:
+                            teardown_local_setup(
+                                redis_conns, redis_processes, setup_name
+                            )
                         else:
                             logging.info(
-                                "Setup type {} not in allowed envs: {}".format(
-                                    setup_type, args.allowed_envs
-                                )
+                                "Keeping environment and topology active upon request."
                             )
-                if setup_details["env"] is not None:
-                    if args.keep_env_and_topo is False:
-                        teardown_local_setup(redis_conns, redis_processes, setup_name)
-                        setup_details["env"] = None
-                    else:
-                        logging.info(
-                            "Keeping environment and topology active upon request."
-                        )
 
+                else:
+                    logging.info(
+                        "Setup type {} not in allowed envs: {}".format(
+                            setup_type, args.allowed_envs
+                        )
+                    )
+        teardown_local_snapshot(setup_details["env"])
+        if setup_details["env"] is not None:
+            if args.keep_env_and_topo is False:
+                teardown_local_setup(
+                    setup_details["env"]["redis_conns"],
+                    setup_details["env"]["redis_processes"],
+                    setup_details["setup_name"],
+                )
+                setup_details["env"] = None
+            else:
+                logging.info("Keeping environment and topology active upon request.")
+        return return_code
+
+    try:
+        if args.parallel_slots > 1:
+            if profilers_enabled or args.skip_redis_spin or args.skip_db_setup:
+                logging.error(
+                    "Parallel slots require spinning a dedicated DB per slot ( no --skip-redis-spin or --skip-db-setup ) and can't be used with profilers."
+                )
+                exit(1)
+            for test_name, benchmark_config in benchmark_definitions.items():
+                if get_placement_policy(benchmark_config) is not None:
+                    logging.error(
+                        "Parallel slots pin each slot to its own cpus and can't be used with a placement policy ( test {} ).".format(
+                            test_name
+                        )
+                    )
+                    exit(1)
+            try:
+                parallel_slots = get_parallel_slots(args.parallel_slots, args.port)
+            except Exception as e:
+                logging.error(e.__str__())
+                exit(1)
+            for slot in parallel_slots:
+                slot["args"] = copy.copy(args)
+                slot["args"].port = slot["port"]
+            try:
+                prepare_parallel_slots_requirements(
+                    benchmark_definitions, args.allowed_tools
+                )
+                for group_return_code in run_in_parallel_slots(
+                    parallel_slots,
+                    benchmark_schedule,
+                    lambda group, slot: run_benchmark_group(group, slot["args"], slot),
+                ):
+                    return_code |= group_return_code
+            finally:
+                remove_parallel_slots(parallel_slots)
+        else:
+            for setup_details in benchmark_schedule:
+                return_code |= run_benchmark_group(setup_details, args)
+    finally:
+        # also on the early exits, so that no queued update is lost
+        if secondary_keys_pipeline is not None:
+            execute_secondary_result_keys_pipeline(secondary_keys_pipeline)
     if profilers_enabled:
         local_profilers_print_artifacts_table(profilers_artifacts_matrix)
     exit(return_code)
 
 
+def prepare_parallel_slots_requirements(benchmark_definitions, allowed_tools):
+    """
+    Retrieves the remote datasets and benchmark tools of all tests upfront,
+    so that concurrent slots only read them.
+    """
+    prefetch_datasets(
+        get_remote_datasets(benchmark_definitions),
+        DATASET_CACHE_DIR,
+        DATASET_CACHE_MAX_BYTES,
+        datasets_sha256=get_remote_datasets_sha256(benchmark_definitions),
+    )
+    for test_name, benchmark_config in benchmark_definitions.items():
+        try:
+            check_benchmark_binaries_local_requirements(benchmark_config, allowed_tools)
+            if check_dbconfig_tool_requirement(benchmark_config):
+                check_benchmark_binaries_local_requirements(
+                    benchmark_config, allowed_tools, "./binaries", "dbconfig"
+                )
+        except Exception as e:
+            # the test itself will fail on its slot
+            logging.warning(
+                "Unable to prepare the benchmark tools of test {}. Error: {}".format(
+                    test_name, e.__str__()
+                )
+            )
+
+
+def teardown_local_snapshot(env):
+    if env is not None and env["snapshot_dir"] is not None:
+        logging.info("Removing the dataset snapshot {}".format(env["snapshot_dir"]))
+        shutil.rmtree(env["snapshot_dir"], ignore_errors=True)
+        env["snapshot_dir"] = None
+        env["snapshot_paths"] = None
+
+
 def teardown_local_setup(redis_conns, redis_processes, setup_name):
     logging.info("Tearing down setup {}".format(setup_name))
     for redis_process in redis_processes:
@@ -569,6 +824,9 @@ def export_redis_metrics(
     tf_triggering_env,
     metadata_dict=None,
     expire_ms=0,
+    push_batch_size=PERFORMANCE_RTS_PUSH_BATCH_SIZE,
+    push_pipeline_window=PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW,
+    schema_cache=None,
 ):
     datapoint_errors = 0
     datapoint_inserts = 0
@@ -648,7 +906,14 @@ def export_redis_metrics(
                 ),
                 "data": {end_time_ms: metric_value},
             }
-    i_errors, i_inserts = push_data_to_redistimeseries(rts, timeseries_dict, expire_ms)
+    i_errors, i_inserts = push_data_to_redistimeseries(
+        rts,
+        timeseries_dict,
+        expire_ms,
+        push_batch_size,
+        push_pipeline_window,
+        schema_cache,
+    )
     datapoint_errors = datapoint_errors + i_errors
     datapoint_inserts = datapoint_inserts + i_inserts
     return datapoint_errors, datapoint_inserts
@@ -20,6 +20,7 @@ from redisbench_admin.run.common import (
     dbconfig_keyspacelen_check,
     run_redis_pre_steps,
 )
+from redisbench_admin.run.placement import get_placement_policy
 from redisbench_admin.run.ssh import ssh_tunnel_redisconn
 from redisbench_admin.run_remote.consts import (
     remote_module_file_dir,
@@ -113,6 +114,7 @@ def remote_db_spin(
         dataset_load_timeout_secs,
         modules_configuration_parameters_map,
     ) = extract_redis_dbconfig_parameters(benchmark_config, "dbconfig")
+    placement_policy = get_placement_policy(benchmark_config)
 
     full_logfiles = []
     cluster_enabled = False
@@ -157,6 +159,7 @@ def remote_db_spin(
                 modules_configuration_parameters_map,
                 logname,
                 redis_7,
+                placement_policy,
             )
         try:
             for p in range(cluster_start_port, cluster_start_port + shard_count):
@@ -207,6 +210,7 @@ def remote_db_spin(
                     db_ssh_port,
                     modules_configuration_parameters_map,
                     redis_7,
+                    placement_policy,
                 )
                 full_logfiles.append(full_logfile)
             local_redis_conn, ssh_tunnel = ssh_tunnel_redisconn(
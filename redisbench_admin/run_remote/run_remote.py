@@ -3,6 +3,7 @@
 #  Copyright (c) 2021., Redis Labs Modules
 #  All rights reserved.
 #
+import copy
 import logging
 import random
 import string
@@ -35,8 +36,14 @@ from redisbench_admin.run.common import (
 from redisbench_admin.run.git import git_vars_crosscheck
 from redisbench_admin.run.grafana import generate_artifacts_table_grafana_redis
 from redisbench_admin.run.modules import redis_modules_check
+from redisbench_admin.run.placement import (
+    get_placement_metadata_tags,
+    get_placement_policy,
+)
 from redisbench_admin.run.redistimeseries import (
     timeseries_test_sucess_flow,
+    get_secondary_result_keys_pipeline,
+    execute_secondary_result_keys_pipeline,
     timeseries_test_failure_flow,
 )
 from redisbench_admin.run.run import define_benchmark_plan
@@ -60,14 +67,18 @@ from redisbench_admin.utils.benchmark_config import (
     prepare_benchmark_definitions,
     get_metadata_tags,
     process_benchmark_definitions_remote_timeouts,
+    get_defaults_compaction_policy,
 )
 from redisbench_admin.utils.redisgraph_benchmark_go import setup_remote_benchmark_agent
+from redisbench_admin.utils.schema_cache import load_schema_cache
 from redisbench_admin.utils.remote import (
     get_run_full_filename,
     get_overall_dashboard_keynames,
     check_ec2_env,
     get_project_ts_tags,
     push_data_to_redistimeseries,
+    PERFORMANCE_RTS_PUSH_BATCH_SIZE,
+    PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW,
     fetch_remote_id_from_config,
 )
 
@@ -264,6 +275,9 @@ def run_remote_command_logic(args, project_name, project_version):
         _,
     ) = get_overall_dashboard_keynames(tf_github_org, tf_github_repo, tf_triggering_env)
     rts = None
+    schema_cache = None
+    compaction_policy = None
+    secondary_keys_pipeline = None
     allowed_tools = args.allowed_tools
 
     if args.push_results_redistimeseries:
@@ -279,6 +293,12 @@ def run_remote_command_logic(args, project_name, project_version):
             retry_on_timeout=True,
         )
         rts.ping()
+        schema_cache = load_schema_cache(rts, getattr(args, "local_dir", "./"))
+        compaction_policy = get_defaults_compaction_policy(args.defaults_filename)
+        if args.datasink_defer_secondary_keys:
+            secondary_keys_pipeline = get_secondary_result_keys_pipeline(
+                rts, args.datasink_secondary_keys_transaction
+            )
 
     remote_envs_timeout = process_benchmark_definitions_remote_timeouts(
         benchmark_definitions
@@ -319,437 +339,448 @@ def run_remote_command_logic(args, project_name, project_version):
     ts_key_full_price = f"ts:{tf_triggering_env}:tests:full_price"
     ts_key_architecture = f"ts:{tf_triggering_env}:tests:arch:{architecture}"
 
-    for benchmark_type, bench_by_dataset_map in benchmark_runs_plan.items():
-        if return_code != 0 and args.fail_fast:
-            logging.warning(
-                "Given you've selected fail fast skipping benchmark_type {}".format(
-                    benchmark_type
-                )
-            )
-            continue
-        logging.info("Running benchmarks of type {}.".format(benchmark_type))
-        for (
-            dataset_name,
-            bench_by_dataset_and_setup_map,
-        ) in bench_by_dataset_map.items():
+    try:
+        for benchmark_type, bench_by_dataset_map in benchmark_runs_plan.items():
             if return_code != 0 and args.fail_fast:
                 logging.warning(
-                    "Given you've selected fail fast skipping dataset {}".format(
-                        dataset_name
+                    "Given you've selected fail fast skipping benchmark_type {}".format(
+                        benchmark_type
                     )
                 )
                 continue
-            logging.info("Running benchmarks for dataset {}.".format(dataset_name))
-            for setup_name, setup_details in bench_by_dataset_and_setup_map.items():
+            logging.info("Running benchmarks of type {}.".format(benchmark_type))
+            for (
+                dataset_name,
+                bench_by_dataset_and_setup_map,
+            ) in bench_by_dataset_map.items():
                 if return_code != 0 and args.fail_fast:
                     logging.warning(
-                        "Given you've selected fail fast skipping setup {}".format(
-                            setup_name
+                        "Given you've selected fail fast skipping dataset {}".format(
+                            dataset_name
                         )
                     )
                     continue
-
-                setup_settings = setup_details["setup_settings"]
-                benchmarks_map = setup_details["benchmarks"]
-                # we start with an empty per bench-type/setup-name
-                setup_details["env"] = None
-
-                # map from setup name to overall target-tables ( if any target is defined )
-                overall_tables[setup_name] = {}
-
-                for test_name, benchmark_config in benchmarks_map.items():
+                logging.info("Running benchmarks for dataset {}.".format(dataset_name))
+                for setup_name, setup_details in bench_by_dataset_and_setup_map.items():
                     if return_code != 0 and args.fail_fast:
                         logging.warning(
-                            "Given you've selected fail fast skipping test {}".format(
-                                test_name
+                            "Given you've selected fail fast skipping setup {}".format(
+                                setup_name
                             )
                         )
                         continue
-                    metadata_tags = get_metadata_tags(benchmark_config)
-                    if "arch" not in metadata_tags:
-                        metadata_tags["arch"] = architecture
-                    logging.info(
-                        "Including the extra metadata tags into this test generated time-series: {}".format(
-                            metadata_tags
-                        )
-                    )
-                    for repetition in range(1, BENCHMARK_REPETITIONS + 1):
+
+                    setup_settings = setup_details["setup_settings"]
+                    benchmarks_map = setup_details["benchmarks"]
+                    # we start with an empty per bench-type/setup-name
+                    setup_details["env"] = None
+
+                    # map from setup name to overall target-tables ( if any target is defined )
+                    overall_tables[setup_name] = {}
+
+                    for test_name, benchmark_config in benchmarks_map.items():
                         if return_code != 0 and args.fail_fast:
                             logging.warning(
-                                "Given you've selected fail fast skipping repetition {}".format(
-                                    repetition
+                                "Given you've selected fail fast skipping test {}".format(
+                                    test_name
                                 )
                             )
                             continue
-                        remote_perf = None
-                        logging.info(
-                            "Repetition {} of {}. Running test {}".format(
-                                repetition, BENCHMARK_REPETITIONS, test_name
+                        metadata_tags = copy.copy(get_metadata_tags(benchmark_config))
+                        if "arch" not in metadata_tags:
+                            metadata_tags["arch"] = architecture
+                        metadata_tags.update(
+                            get_placement_metadata_tags(
+                                get_placement_policy(benchmark_config)
                             )
                         )
-                        (
-                            setup_name,
-                            setup_type,
-                            shard_count,
-                        ) = get_setup_type_and_primaries_count(setup_settings)
-                        if args.allowed_setups != "":
-                            allowed_setups = args.allowed_setups.split(",")
-                            logging.info(
-                                "Checking if setup named {} of topology type {}. Total primaries: {} is in the allowed list of setups {}".format(
-                                    setup_name, setup_type, shard_count, allowed_setups
-                                )
+                        logging.info(
+                            "Including the extra metadata tags into this test generated time-series: {}".format(
+                                metadata_tags
                             )
-                            if setup_name not in allowed_setups:
+                        )
+                        for repetition in range(1, BENCHMARK_REPETITIONS + 1):
+                            if return_code != 0 and args.fail_fast:
                                 logging.warning(
-                                    "SKIPPING setup named {} of topology type {}.".format(
-                                        setup_name, setup_type
+                                    "Given you've selected fail fast skipping repetition {}".format(
+                                        repetition
                                     )
                                 )
                                 continue
-                        s3_bucket_path = get_test_s3_bucket_path(
-                            s3_bucket_name, test_name, tf_github_org, tf_github_repo
-                        )
-                        if setup_type in args.allowed_envs:
+                            remote_perf = None
                             logging.info(
-                                "Starting setup named {} of topology type {}. Total primaries: {}".format(
-                                    setup_name, setup_type, shard_count
+                                "Repetition {} of {}. Running test {}".format(
+                                    repetition, BENCHMARK_REPETITIONS, test_name
                                 )
                             )
-                            if "remote" in benchmark_config:
-                                remote_id = fetch_remote_id_from_config(
-                                    benchmark_config["remote"]
+                            (
+                                setup_name,
+                                setup_type,
+                                shard_count,
+                            ) = get_setup_type_and_primaries_count(setup_settings)
+                            if args.allowed_setups != "":
+                                allowed_setups = args.allowed_setups.split(",")
+                                logging.info(
+                                    "Checking if setup named {} of topology type {}. Total primaries: {} is in the allowed list of setups {}".format(
+                                        setup_name,
+                                        setup_type,
+                                        shard_count,
+                                        allowed_setups,
+                                    )
                                 )
-                                tf_timeout_secs = remote_envs_timeout[remote_id]
-                                client_artifacts = []
-                                client_artifacts_map = {}
-                                temporary_dir = get_tmp_folder_rnd()
-                                (
-                                    client_public_ip,
-                                    server_plaintext_port,
-                                    server_private_ip,
-                                    server_public_ip,
-                                    db_ssh_port,
-                                    client_ssh_port,
-                                    username,
-                                    spot_instance_error,
-                                    spot_price_counter,
-                                    full_price_counter,
-                                ) = remote_env_setup(
-                                    args,
-                                    benchmark_config,
-                                    remote_envs,
-                                    repetition,
-                                    test_name,
-                                    tf_bin_path,
-                                    tf_github_actor,
-                                    tf_github_org,
-                                    tf_github_repo,
-                                    tf_github_sha,
-                                    tf_setup_name_sufix,
-                                    tf_triggering_env,
-                                    tf_timeout_secs,
-                                    TF_OVERRIDE_NAME,
-                                    TF_OVERRIDE_REMOTE,
-                                    spot_instance_error,
-                                    0,
-                                    0,
-                                    architecture,
+                                if setup_name not in allowed_setups:
+                                    logging.warning(
+                                        "SKIPPING setup named {} of topology type {}.".format(
+                                            setup_name, setup_type
+                                        )
+                                    )
+                                    continue
+                            s3_bucket_path = get_test_s3_bucket_path(
+                                s3_bucket_name, test_name, tf_github_org, tf_github_repo
+                            )
+                            if setup_type in args.allowed_envs:
+                                logging.info(
+                                    "Starting setup named {} of topology type {}. Total primaries: {}".format(
+                                        setup_name, setup_type, shard_count
+                                    )
                                 )
-
-                                # after we've created the env, even on error we should always teardown
-                                # in case of some unexpected error we fail the test
-                                try:
+                                if "remote" in benchmark_config:
+                                    remote_id = fetch_remote_id_from_config(
+                                        benchmark_config["remote"]
+                                    )
+                                    tf_timeout_secs = remote_envs_timeout[remote_id]
+                                    client_artifacts = []
+                                    client_artifacts_map = {}
+                                    temporary_dir = get_tmp_folder_rnd()
                                     (
-                                        _,
-                                        start_time_setup_ms,
-                                        testcase_start_time_str,
-                                    ) = get_start_time_vars()
-                                    if args.push_results_redistimeseries:
-                                        logging.info(
-                                            f"Updating overall arch tests counter {ts_key_architecture}"
-                                        )
-                                        rts.ts().add(
-                                            ts_key_architecture,
+                                        client_public_ip,
+                                        server_plaintext_port,
+                                        server_private_ip,
+                                        server_public_ip,
+                                        db_ssh_port,
+                                        client_ssh_port,
+                                        username,
+                                        spot_instance_error,
+                                        spot_price_counter,
+                                        full_price_counter,
+                                    ) = remote_env_setup(
+                                        args,
+                                        benchmark_config,
+                                        remote_envs,
+                                        repetition,
+                                        test_name,
+                                        tf_bin_path,
+                                        tf_github_actor,
+                                        tf_github_org,
+                                        tf_github_repo,
+                                        tf_github_sha,
+                                        tf_setup_name_sufix,
+                                        tf_triggering_env,
+                                        tf_timeout_secs,
+                                        TF_OVERRIDE_NAME,
+                                        TF_OVERRIDE_REMOTE,
+                                        spot_instance_error,
+                                        0,
+                                        0,
+                                        architecture,
+                                    )
+
+                                    # after we've created the env, even on error we should always teardown
+                                    # in case of some unexpected error we fail the test
+                                    try:
+                                        (
+                                            _,
                                             start_time_setup_ms,
-                                            1,
-                                            duplicate_policy="sum",
-                                        )
-                                        logging.info(
-                                            f"Updating overall spot price tests counter {ts_key_spot_price}"
+                                            testcase_start_time_str,
+                                        ) = get_start_time_vars()
+                                        if args.push_results_redistimeseries:
+                                            logging.info(
+                                                f"Updating overall arch tests counter {ts_key_architecture}"
+                                            )
+                                            rts.ts().add(
+                                                ts_key_architecture,
+                                                start_time_setup_ms,
+                                                1,
+                                                duplicate_policy="sum",
+                                            )
+                                            logging.info(
+                                                f"Updating overall spot price tests counter {ts_key_spot_price}"
+                                            )
+                                            rts.ts().add(
+                                                ts_key_spot_price,
+                                                start_time_setup_ms,
+                                                spot_price_counter,
+                                                duplicate_policy="sum",
+                                            )
+                                            logging.info(
+                                                f"Updating overall spot price full counter {ts_key_spot_price}"
+                                            )
+                                            rts.ts().add(
+                                                ts_key_full_price,
+                                                start_time_setup_ms,
+                                                full_price_counter,
+                                                duplicate_policy="sum",
+                                            )
+                                        logname = "{}_{}.log".format(
+                                            test_name, testcase_start_time_str
                                         )
-                                        rts.ts().add(
-                                            ts_key_spot_price,
-                                            start_time_setup_ms,
-                                            spot_price_counter,
-                                            duplicate_policy="sum",
+                                        remote_results_file = (
+                                            "/tmp/benchmark-result-{}_{}.out".format(
+                                                test_name, testcase_start_time_str
+                                            )
                                         )
+
                                         logging.info(
-                                            f"Updating overall spot price full counter {ts_key_spot_price}"
-                                        )
-                                        rts.ts().add(
-                                            ts_key_full_price,
-                                            start_time_setup_ms,
-                                            full_price_counter,
-                                            duplicate_policy="sum",
+                                            "Starting common steps to cluster and standalone..."
                                         )
-                                    logname = "{}_{}.log".format(
-                                        test_name, testcase_start_time_str
-                                    )
-                                    remote_results_file = (
-                                        "/tmp/benchmark-result-{}_{}.out".format(
-                                            test_name, testcase_start_time_str
-                                        )
-                                    )
-
-                                    logging.info(
-                                        "Starting common steps to cluster and standalone..."
-                                    )
-                                    full_logfiles = []
-                                    if setup_details["env"] is None:
-                                        if skip_remote_db_setup is False:
-                                            # ensure /tmp folder is free of benchmark data from previous runs
-                                            remote_tmpdir_prune(
+                                        full_logfiles = []
+                                        if setup_details["env"] is None:
+                                            if skip_remote_db_setup is False:
+                                                # ensure /tmp folder is free of benchmark data from previous runs
+                                                remote_tmpdir_prune(
+                                                    server_public_ip,
+                                                    db_ssh_port,
+                                                    temporary_dir,
+                                                    username,
+                                                    private_key,
+                                                )
+                                                logging.info(
+                                                    "Starting setup named {} of topology type {}. Total primaries: {}".format(
+                                                        setup_name,
+                                                        setup_type,
+                                                        shard_count,
+                                                    )
+                                                )
+                                            (
+                                                artifact_version,
+                                                cluster_enabled,
+                                                dataset_load_duration_seconds,
+                                                full_logfiles,
+                                                redis_conns,
+                                                return_code,
+                                                server_plaintext_port,
+                                                ssh_tunnel,
+                                            ) = remote_db_spin(
+                                                allowed_tools,
+                                                benchmark_config,
+                                                client_public_ip,
+                                                clusterconfig,
+                                                dbdir_folder,
+                                                dirname,
+                                                local_module_files,
+                                                logname,
+                                                required_modules,
+                                                return_code,
+                                                server_plaintext_port,
+                                                server_private_ip,
                                                 server_public_ip,
+                                                setup_name,
+                                                setup_type,
+                                                shard_count,
                                                 db_ssh_port,
+                                                client_ssh_port,
                                                 temporary_dir,
+                                                test_name,
+                                                testcase_start_time_str,
+                                                tf_github_branch,
+                                                tf_github_org,
+                                                tf_github_repo,
+                                                tf_github_sha,
                                                 username,
                                                 private_key,
+                                                s3_bucket_name,
+                                                s3_bucket_path,
+                                                redis_7,
+                                                skip_remote_db_setup,
+                                                cluster_start_port,
+                                                redis_password,
+                                                flushall_on_every_test_start,
+                                                ignore_keyspace_errors,
+                                                continue_on_module_check_error,
+                                                60,
+                                                architecture,
                                             )
-                                            logging.info(
-                                                "Starting setup named {} of topology type {}. Total primaries: {}".format(
-                                                    setup_name, setup_type, shard_count
+                                            if benchmark_type == "read-only":
+                                                ro_benchmark_set(
+                                                    artifact_version,
+                                                    cluster_enabled,
+                                                    dataset_load_duration_seconds,
+                                                    redis_conns,
+                                                    return_code,
+                                                    server_plaintext_port,
+                                                    setup_details,
+                                                    ssh_tunnel,
+                                                    full_logfiles,
                                                 )
-                                            )
-                                        (
-                                            artifact_version,
-                                            cluster_enabled,
-                                            dataset_load_duration_seconds,
-                                            full_logfiles,
-                                            redis_conns,
-                                            return_code,
-                                            server_plaintext_port,
-                                            ssh_tunnel,
-                                        ) = remote_db_spin(
-                                            allowed_tools,
-                                            benchmark_config,
-                                            client_public_ip,
-                                            clusterconfig,
-                                            dbdir_folder,
-                                            dirname,
-                                            local_module_files,
-                                            logname,
-                                            required_modules,
-                                            return_code,
-                                            server_plaintext_port,
-                                            server_private_ip,
-                                            server_public_ip,
-                                            setup_name,
-                                            setup_type,
-                                            shard_count,
-                                            db_ssh_port,
-                                            client_ssh_port,
-                                            temporary_dir,
-                                            test_name,
-                                            testcase_start_time_str,
-                                            tf_github_branch,
-                                            tf_github_org,
-                                            tf_github_repo,
-                                            tf_github_sha,
-                                            username,
-                                            private_key,
-                                            s3_bucket_name,
-                                            s3_bucket_path,
-                                            redis_7,
-                                            skip_remote_db_setup,
-                                            cluster_start_port,
-                                            redis_password,
-                                            flushall_on_every_test_start,
-                                            ignore_keyspace_errors,
-                                            continue_on_module_check_error,
-                                            60,
-                                            architecture,
-                                        )
-                                        if benchmark_type == "read-only":
-                                            ro_benchmark_set(
+                                        else:
+                                            (
                                                 artifact_version,
                                                 cluster_enabled,
                                                 dataset_load_duration_seconds,
+                                                full_logfiles,
                                                 redis_conns,
                                                 return_code,
                                                 server_plaintext_port,
-                                                setup_details,
                                                 ssh_tunnel,
+                                            ) = ro_benchmark_reuse(
+                                                artifact_version,
+                                                benchmark_type,
+                                                cluster_enabled,
+                                                dataset_load_duration_seconds,
                                                 full_logfiles,
+                                                redis_conns,
+                                                return_code,
+                                                server_plaintext_port,
+                                                setup_details,
+                                                ssh_tunnel,
                                             )
-                                    else:
-                                        (
-                                            artifact_version,
-                                            cluster_enabled,
-                                            dataset_load_duration_seconds,
-                                            full_logfiles,
-                                            redis_conns,
-                                            return_code,
-                                            server_plaintext_port,
-                                            ssh_tunnel,
-                                        ) = ro_benchmark_reuse(
-                                            artifact_version,
-                                            benchmark_type,
-                                            cluster_enabled,
-                                            dataset_load_duration_seconds,
-                                            full_logfiles,
-                                            redis_conns,
-                                            return_code,
-                                            server_plaintext_port,
-                                            setup_details,
-                                            ssh_tunnel,
-                                        )
-
-                                    if profilers_enabled:
-                                        setup_remote_benchmark_agent(
-                                            server_public_ip,
-                                            username,
-                                            private_key,
-                                            db_ssh_port,
-                                        )
 
-                                    for pos, redis_conn in enumerate(redis_conns):
-                                        logging.info(
-                                            "Resetting commmandstats for shard {}".format(
-                                                pos
+                                        if profilers_enabled:
+                                            setup_remote_benchmark_agent(
+                                                server_public_ip,
+                                                username,
+                                                private_key,
+                                                db_ssh_port,
                                             )
-                                        )
-                                        try:
-                                            redis_conn.config_resetstat()
-                                        except redis.exceptions.ResponseError as e:
-                                            logging.warning(
-                                                "Catched an error while resetting status: {}".format(
-                                                    e.__str__()
+
+                                        for pos, redis_conn in enumerate(redis_conns):
+                                            logging.info(
+                                                "Resetting commmandstats for shard {}".format(
+                                                    pos
                                                 )
                                             )
+                                            try:
+                                                redis_conn.config_resetstat()
+                                            except redis.exceptions.ResponseError as e:
+                                                logging.warning(
+                                                    "Catched an error while resetting status: {}".format(
+                                                        e.__str__()
+                                                    )
+                                                )
 
-                                    (
-                                        start_time,
-                                        start_time_ms,
-                                        start_time_str,
-                                    ) = get_start_time_vars()
+                                        (
+                                            start_time,
+                                            start_time_ms,
+                                            start_time_str,
+                                        ) = get_start_time_vars()
 
-                                    local_bench_fname = get_run_full_filename(
-                                        start_time_str,
-                                        setup_name,
-                                        tf_github_org,
-                                        tf_github_repo,
-                                        tf_github_branch,
-                                        test_name,
-                                        tf_github_sha,
-                                    )
-                                    if profilers_enabled:
-                                        remote_perf = PerfDaemonRemoteCaller(
-                                            "{}:5000".format(server_public_ip),
-                                            test_name=test_name,
-                                            setup_name=setup_name,
-                                            github_actor=tf_github_actor,
-                                            github_branch=tf_github_branch,
-                                            github_repo_name=tf_github_repo,
-                                            github_org_name=tf_github_org,
-                                            github_sha=tf_github_sha,
-                                            aws_access_key_id=EC2_ACCESS_KEY,
-                                            aws_secret_access_key=EC2_SECRET_KEY,
-                                            region_name=EC2_REGION,
+                                        local_bench_fname = get_run_full_filename(
+                                            start_time_str,
+                                            setup_name,
+                                            tf_github_org,
+                                            tf_github_repo,
+                                            tf_github_branch,
+                                            test_name,
+                                            tf_github_sha,
                                         )
-                                        primary_one_pid = redis_conns[0].info()[
-                                            "process_id"
-                                        ]
-                                        start_profile_result = (
-                                            remote_perf.start_profile(
-                                                primary_one_pid,
-                                                "",
-                                                PROFILE_FREQ,
-                                                PERF_CALLGRAPH_MODE,
+                                        if profilers_enabled:
+                                            remote_perf = PerfDaemonRemoteCaller(
+                                                "{}:5000".format(server_public_ip),
+                                                test_name=test_name,
+                                                setup_name=setup_name,
+                                                github_actor=tf_github_actor,
+                                                github_branch=tf_github_branch,
+                                                github_repo_name=tf_github_repo,
+                                                github_org_name=tf_github_org,
+                                                github_sha=tf_github_sha,
+                                                aws_access_key_id=EC2_ACCESS_KEY,
+                                                aws_secret_access_key=EC2_SECRET_KEY,
+                                                region_name=EC2_REGION,
                                             )
-                                        )
-                                        if start_profile_result is True:
-                                            logging.info(
-                                                "Successfully started remote profile for Redis with PID: {}. Used call-graph mode {}".format(
-                                                    primary_one_pid, PERF_CALLGRAPH_MODE
+                                            primary_one_pid = redis_conns[0].info()[
+                                                "process_id"
+                                            ]
+                                            start_profile_result = (
+                                                remote_perf.start_profile(
+                                                    primary_one_pid,
+                                                    "",
+                                                    PROFILE_FREQ,
+                                                    PERF_CALLGRAPH_MODE,
                                                 )
                                             )
+                                            if start_profile_result is True:
+                                                logging.info(
+                                                    "Successfully started remote profile for Redis with PID: {}. Used call-graph mode {}".format(
+                                                        primary_one_pid,
+                                                        PERF_CALLGRAPH_MODE,
+                                                    )
+                                                )
 
-                                    logging.info(
-                                        "Will store benchmark json output to local file {}".format(
-                                            local_bench_fname
+                                        logging.info(
+                                            "Will store benchmark json output to local file {}".format(
+                                                local_bench_fname
+                                            )
                                         )
-                                    )
 
-                                    (
-                                        artifact_version,
-                                        benchmark_duration_seconds,
-                                        local_bench_fname,
-                                        remote_run_result,
-                                        results_dict,
-                                        return_code,
-                                        client_output_artifacts,
-                                    ) = run_remote_client_tool(
-                                        allowed_tools,
-                                        artifact_version,
-                                        benchmark_config,
-                                        client_public_ip,
-                                        cluster_enabled,
-                                        local_bench_fname,
-                                        remote_results_file,
-                                        return_code,
-                                        server_plaintext_port,
-                                        server_private_ip,
-                                        start_time_ms,
-                                        start_time_str,
-                                        username,
-                                        "clientconfig",
-                                        "linux",
-                                        "amd64",
-                                        "Benchmark",
-                                        min_recommended_benchmark_duration,
-                                        client_ssh_port,
-                                        private_key,
-                                        True,
-                                        redis_conns,
-                                        True,
-                                        redis_password,
-                                        architecture,
-                                    )
+                                        (
+                                            artifact_version,
+                                            benchmark_duration_seconds,
+                                            local_bench_fname,
+                                            remote_run_result,
+                                            results_dict,
+                                            return_code,
+                                            client_output_artifacts,
+                                        ) = run_remote_client_tool(
+                                            allowed_tools,
+                                            artifact_version,
+                                            benchmark_config,
+                                            client_public_ip,
+                                            cluster_enabled,
+                                            local_bench_fname,
+                                            remote_results_file,
+                                            return_code,
+                                            server_plaintext_port,
+                                            server_private_ip,
+                                            start_time_ms,
+                                            start_time_str,
+                                            username,
+                                            "clientconfig",
+                                            "linux",
+                                            "amd64",
+                                            "Benchmark",
+                                            min_recommended_benchmark_duration,
+                                            client_ssh_port,
+                                            private_key,
+                                            True,
+                                            redis_conns,
+                                            True,
+                                            redis_password,
+                                            architecture,
+                                        )
 
-                                    if profilers_enabled:
-                                        logging.info("Stopping remote profiler")
-                                        profiler_result = remote_perf.stop_profile()
-                                        if profiler_result is False:
-                                            logging.error(
-                                                "Unsuccessful profiler stop."
-                                                + " Fetching remote perf-daemon logfile {}".format(
-                                                    PERF_DAEMON_LOGNAME
+                                        if profilers_enabled:
+                                            logging.info("Stopping remote profiler")
+                                            profiler_result = remote_perf.stop_profile()
+                                            if profiler_result is False:
+                                                logging.error(
+                                                    "Unsuccessful profiler stop."
+                                                    + " Fetching remote perf-daemon logfile {}".format(
+                                                        PERF_DAEMON_LOGNAME
+                                                    )
                                                 )
-                                            )
-                                            failed_remote_run_artifact_store(
-                                                args.upload_results_s3,
-                                                server_public_ip,
-                                                dirname,
-                                                PERF_DAEMON_LOGNAME,
-                                                logname,
-                                                s3_bucket_name,
-                                                s3_bucket_path,
-                                                username,
-                                                private_key,
-                                            )
-                                            return_code |= 1
-                                        (
-                                            perf_stop_status,
-                                            profile_artifacts,
-                                            _,
-                                        ) = remote_perf.generate_outputs(test_name)
-                                        if len(profile_artifacts) == 0:
-                                            logging.error(
-                                                "No profiler artifact was retrieved"
-                                            )
-                                        else:
-                                            https_link = (
-                                                generate_artifacts_table_grafana_redis(
+                                                failed_remote_run_artifact_store(
+                                                    args.upload_results_s3,
+                                                    server_public_ip,
+                                                    dirname,
+                                                    PERF_DAEMON_LOGNAME,
+                                                    logname,
+                                                    s3_bucket_name,
+                                                    s3_bucket_path,
+                                                    username,
+                                                    private_key,
+                                                )
+                                                return_code |= 1
+                                            (
+                                                perf_stop_status,
+                                                profile_artifacts,
+                                                _,
+                                            ) = remote_perf.generate_outputs(test_name)
+                                            if len(profile_artifacts) == 0:
+                                                logging.error(
+                                                    "No profiler artifact was retrieved"
+                                                )
+                                            else:
+                                                https_link = generate_artifacts_table_grafana_redis(
                                                     args.push_results_redistimeseries,
                                                     grafana_profile_dashboard,
                                                     profile_artifacts,
@@ -763,141 +794,92 @@ def run_remote_command_logic(args, project_name, project_version):
                                                     tf_github_sha,
                                                     tf_github_branch,
                                                 )
+                                                profiler_dashboard_links.append(
+                                                    [
+                                                        setup_name,
+                                                        test_name,
+                                                        " {} ".format(https_link),
+                                                    ]
+                                                )
+                                                logging.info(
+                                                    "Published new profile info for this testcase. Access it via: {}".format(
+                                                        https_link
+                                                    )
+                                                )
+
+                                        total_shards_cpu_usage = None
+                                        if skip_remote_db_setup is False:
+                                            (
+                                                total_shards_cpu_usage,
+                                                cpu_usage_map,
+                                            ) = from_info_to_overall_shard_cpu(
+                                                redisbench_admin.run.metrics.BENCHMARK_CPU_STATS_GLOBAL
                                             )
-                                            profiler_dashboard_links.append(
-                                                [
-                                                    setup_name,
-                                                    test_name,
-                                                    " {} ".format(https_link),
-                                                ]
+                                        if total_shards_cpu_usage is None:
+                                            total_shards_cpu_usage_str = "n/a"
+                                        else:
+                                            total_shards_cpu_usage_str = (
+                                                "{:.3f}".format(total_shards_cpu_usage)
                                             )
-                                            logging.info(
-                                                "Published new profile info for this testcase. Access it via: {}".format(
-                                                    https_link
-                                                )
+                                        logging.info(
+                                            "Total CPU usage ({} %)".format(
+                                                total_shards_cpu_usage_str
                                             )
-
-                                    total_shards_cpu_usage = None
-                                    if skip_remote_db_setup is False:
-                                        (
-                                            total_shards_cpu_usage,
-                                            cpu_usage_map,
-                                        ) = from_info_to_overall_shard_cpu(
-                                            redisbench_admin.run.metrics.BENCHMARK_CPU_STATS_GLOBAL
-                                        )
-                                    if total_shards_cpu_usage is None:
-                                        total_shards_cpu_usage_str = "n/a"
-                                    else:
-                                        total_shards_cpu_usage_str = "{:.3f}".format(
-                                            total_shards_cpu_usage
-                                        )
-                                    logging.info(
-                                        "Total CPU usage ({} %)".format(
-                                            total_shards_cpu_usage_str
-                                        )
-                                    )
-
-                                    if remote_run_result is False:
-                                        db_error_artifacts(
-                                            db_ssh_port,
-                                            dirname,
-                                            full_logfiles,
-                                            logname,
-                                            private_key,
-                                            s3_bucket_name,
-                                            s3_bucket_path,
-                                            server_public_ip,
-                                            temporary_dir,
-                                            args.upload_results_s3,
-                                            username,
-                                        )
-                                        return_code |= 1
-                                        raise Exception(
-                                            "Failed to run remote benchmark."
                                         )
 
-                                    else:
-                                        if (
-                                            args.push_results_redistimeseries
-                                            and is_important_data(
-                                                tf_github_branch, artifact_version
+                                        if remote_run_result is False:
+                                            db_error_artifacts(
+                                                db_ssh_port,
+                                                dirname,
+                                                full_logfiles,
+                                                logname,
+                                                private_key,
+                                                s3_bucket_name,
+                                                s3_bucket_path,
+                                                server_public_ip,
+                                                temporary_dir,
+                                                args.upload_results_s3,
+                                                username,
                                             )
-                                        ):
-                                            try:
-                                                (
-                                                    end_time_ms,
-                                                    _,
-                                                    overall_end_time_metrics,
-                                                ) = collect_redis_metrics(
-                                                    redis_conns,
-                                                    ["memory"],
-                                                    {
-                                                        "memory": [
-                                                            "used_memory",
-                                                            "used_memory_dataset",
-                                                        ]
-                                                    },
-                                                )
-                                                if total_shards_cpu_usage is not None:
-                                                    overall_end_time_metrics[
-                                                        "total_shards_used_cpu_pct"
-                                                    ] = total_shards_cpu_usage
-                                                expire_ms = 7 * 24 * 60 * 60 * 1000
-                                                export_redis_metrics(
-                                                    artifact_version,
-                                                    end_time_ms,
-                                                    overall_end_time_metrics,
-                                                    rts,
-                                                    setup_name,
-                                                    setup_type,
-                                                    test_name,
-                                                    tf_github_branch,
-                                                    tf_github_org,
-                                                    tf_github_repo,
-                                                    tf_triggering_env,
-                                                    {
-                                                        "metric-type": "redis-metrics",
-                                                        "arch": architecture,
-                                                    },
-                                                    expire_ms,
+                                            return_code |= 1
+                                            raise Exception(
+                                                "Failed to run remote benchmark."
+                                            )
+
+                                        else:
+                                            if (
+                                                args.push_results_redistimeseries
+                                                and is_important_data(
+                                                    tf_github_branch, artifact_version
                                                 )
-                                                if collect_commandstats:
+                                            ):
+                                                try:
                                                     (
                                                         end_time_ms,
                                                         _,
-                                                        overall_commandstats_metrics,
+                                                        overall_end_time_metrics,
                                                     ) = collect_redis_metrics(
-                                                        redis_conns, ["commandstats"]
-                                                    )
-                                                    export_redis_metrics(
-                                                        artifact_version,
-                                                        end_time_ms,
-                                                        overall_commandstats_metrics,
-                                                        rts,
-                                                        setup_name,
-                                                        setup_type,
-                                                        test_name,
-                                                        tf_github_branch,
-                                                        tf_github_org,
-                                                        tf_github_repo,
-                                                        tf_triggering_env,
+                                                        redis_conns,
+                                                        ["memory"],
                                                         {
-                                                            "metric-type": "commandstats",
-                                                            "arch": architecture,
+                                                            "memory": [
+                                                                "used_memory",
+                                                                "used_memory_dataset",
+                                                            ]
                                                         },
-                                                        expire_ms,
-                                                    )
-                                                    (
-                                                        end_time_ms,
-                                                        _,
-                                                        overall_commandstats_metrics,
-                                                    ) = collect_redis_metrics(
-                                                        redis_conns, ["latencystats"]
                                                     )
+                                                    if (
+                                                        total_shards_cpu_usage
+                                                        is not None
+                                                    ):
+                                                        overall_end_time_metrics[
+                                                            "total_shards_used_cpu_pct"
+                                                        ] = total_shards_cpu_usage
+                                                    expire_ms = 7 * 24 * 60 * 60 * 1000
                                                     export_redis_metrics(
                                                         artifact_version,
                                                         end_time_ms,
-                                                        overall_commandstats_metrics,
+                                                        overall_end_time_metrics,
                                                         rts,
                                                         setup_name,
                                                         setup_type,
@@ -907,224 +889,309 @@ def run_remote_command_logic(args, project_name, project_version):
                                                         tf_github_repo,
                                                         tf_triggering_env,
                                                         {
-                                                            "metric-type": "latencystats",
+                                                            "metric-type": "redis-metrics",
                                                             "arch": architecture,
                                                         },
                                                         expire_ms,
+                                                        args.datasink_push_batch_size,
+                                                        args.datasink_push_pipeline_window,
+                                                        schema_cache,
                                                     )
-                                            except (
-                                                redis.exceptions.ConnectionError
-                                            ) as e:
-                                                db_error_artifacts(
-                                                    db_ssh_port,
-                                                    dirname,
-                                                    full_logfiles,
-                                                    logname,
-                                                    private_key,
-                                                    s3_bucket_name,
-                                                    s3_bucket_path,
-                                                    server_public_ip,
-                                                    temporary_dir,
-                                                    args.upload_results_s3,
-                                                    username,
-                                                )
-                                                return_code |= 1
-                                                raise Exception(
-                                                    "Failed to run remote benchmark. {}".format(
-                                                        e.__str__()
+                                                    if collect_commandstats:
+                                                        (
+                                                            end_time_ms,
+                                                            _,
+                                                            overall_commandstats_metrics,
+                                                        ) = collect_redis_metrics(
+                                                            redis_conns,
+                                                            ["commandstats"],
+                                                        )
+                                                        export_redis_metrics(
+                                                            artifact_version,
+                                                            end_time_ms,
+                                                            overall_commandstats_metrics,
+                                                            rts,
+                                                            setup_name,
+                                                            setup_type,
+                                                            test_name,
+                                                            tf_github_branch,
+                                                            tf_github_org,
+                                                            tf_github_repo,
+                                                            tf_triggering_env,
+                                                            {
+                                                                "metric-type": "commandstats",
+                                                                "arch": architecture,
+                                                            },
+                                                            expire_ms,
+                                                            args.datasink_push_batch_size,
+                                                            args.datasink_push_pipeline_window,
+                                                            schema_cache,
+                                                        )
+                                                        (
+                                                            end_time_ms,
+                                                            _,
+                                                            overall_commandstats_metrics,
+                                                        ) = collect_redis_metrics(
+                                                            redis_conns,
+                                                            ["latencystats"],
+                                                        )
+                                                        export_redis_metrics(
+                                                            artifact_version,
+                                                            end_time_ms,
+                                                            overall_commandstats_metrics,
+                                                            rts,
+                                                            setup_name,
+                                                            setup_type,
+                                                            test_name,
+                                                            tf_github_branch,
+                                                            tf_github_org,
+                                                            tf_github_repo,
+                                                            tf_triggering_env,
+                                                            {
+                                                                "metric-type": "latencystats",
+                                                                "arch": architecture,
+                                                            },
+                                                            expire_ms,
+                                                            args.datasink_push_batch_size,
+                                                            args.datasink_push_pipeline_window,
+                                                            schema_cache,
+                                                        )
+                                                except (
+                                                    redis.exceptions.ConnectionError
+                                                ) as e:
+                                                    db_error_artifacts(
+                                                        db_ssh_port,
+                                                        dirname,
+                                                        full_logfiles,
+                                                        logname,
+                                                        private_key,
+                                                        s3_bucket_name,
+                                                        s3_bucket_path,
+                                                        server_public_ip,
+                                                        temporary_dir,
+                                                        args.upload_results_s3,
+                                                        username,
+                                                    )
+                                                    return_code |= 1
+                                                    raise Exception(
+                                                        "Failed to run remote benchmark. {}".format(
+                                                            e.__str__()
+                                                        )
                                                     )
-                                                )
 
-                                        if setup_details["env"] is None:
-                                            if (
-                                                keep_env_and_topo is False
-                                                and skip_remote_db_setup is False
-                                            ):
-                                                shutdown_remote_redis(
-                                                    redis_conns, ssh_tunnel
-                                                )
-                                            else:
-                                                logging.info(
-                                                    "Keeping environment and topology active upon request."
-                                                )
-                                                logging.info(
-                                                    "client_public_ip = {}".format(
-                                                        client_public_ip
+                                            if setup_details["env"] is None:
+                                                if (
+                                                    keep_env_and_topo is False
+                                                    and skip_remote_db_setup is False
+                                                ):
+                                                    shutdown_remote_redis(
+                                                        redis_conns, ssh_tunnel
                                                     )
-                                                )
-                                                logging.info(
-                                                    "server_public_ip = {}".format(
-                                                        server_private_ip
+                                                else:
+                                                    logging.info(
+                                                        "Keeping environment and topology active upon request."
                                                     )
-                                                )
-                                                logging.info(
-                                                    "server_private_ip = {}".format(
-                                                        server_public_ip
+                                                    logging.info(
+                                                        "client_public_ip = {}".format(
+                                                            client_public_ip
+                                                        )
                                                     )
+                                                    logging.info(
+                                                        "server_public_ip = {}".format(
+                                                            server_private_ip
+                                                        )
+                                                    )
+                                                    logging.info(
+                                                        "server_private_ip = {}".format(
+                                                            server_public_ip
+                                                        )
+                                                    )
+
+                                            (
+                                                _,
+                                                branch_target_tables,
+                                            ) = timeseries_test_sucess_flow(
+                                                args.push_results_redistimeseries,
+                                                artifact_version,
+                                                benchmark_config,
+                                                benchmark_duration_seconds,
+                                                dataset_load_duration_seconds,
+                                                default_metrics,
+                                                setup_name,
+                                                setup_type,
+                                                exporter_timemetric_path,
+                                                results_dict,
+                                                rts,
+                                                start_time_ms,
+                                                test_name,
+                                                tf_github_branch,
+                                                tf_github_org,
+                                                tf_github_repo,
+                                                tf_triggering_env,
+                                                metadata_tags,
+                                                None,
+                                                None,
+                                                None,
+                                                args.datasink_push_batch_size,
+                                                args.datasink_push_pipeline_window,
+                                                schema_cache,
+                                                secondary_keys_pipeline,
+                                                args.datasink_secondary_keys_transaction,
+                                                compaction_policy,
+                                            )
+                                            if branch_target_tables is not None:
+                                                for (
+                                                    branch_tt_keyname,
+                                                    branch_target_table,
+                                                ) in branch_target_tables.items():
+                                                    if (
+                                                        "contains-target"
+                                                        not in branch_target_table
+                                                    ):
+                                                        continue
+                                                    if (
+                                                        branch_target_table[
+                                                            "contains-target"
+                                                        ]
+                                                        is True
+                                                    ):
+                                                        row = []
+                                                        metric_name = (
+                                                            branch_target_table[
+                                                                "metric-name"
+                                                            ]
+                                                        )
+                                                        header = []
+                                                        for (
+                                                            k,
+                                                            v,
+                                                        ) in (
+                                                            branch_target_table.items()
+                                                        ):
+                                                            if k != "contains-target":
+                                                                header.append(k)
+                                                                row.append(v)
+                                                        if (
+                                                            metric_name
+                                                            not in overall_tables[
+                                                                setup_name
+                                                            ]
+                                                        ):
+                                                            overall_tables[setup_name][
+                                                                metric_name
+                                                            ] = {
+                                                                "header": header,
+                                                                "rows": [row],
+                                                            }
+                                                        else:
+                                                            assert (
+                                                                header
+                                                                == overall_tables[
+                                                                    setup_name
+                                                                ][metric_name]["header"]
+                                                            )
+                                                            overall_tables[setup_name][
+                                                                metric_name
+                                                            ]["rows"].append(row)
+
+                                            print_results_table_stdout(
+                                                benchmark_config,
+                                                default_metrics,
+                                                results_dict,
+                                                setup_name,
+                                                setup_type,
+                                                test_name,
+                                                total_shards_cpu_usage,
+                                            )
+                                        client_artifacts.append(local_bench_fname)
+                                        client_artifacts.extend(client_output_artifacts)
+
+                                        if args.upload_results_s3:
+                                            logging.info(
+                                                "Uploading CLIENT results to s3. s3 bucket name: {}. s3 bucket path: {}".format(
+                                                    s3_bucket_name, s3_bucket_path
+                                                )
+                                            )
+                                            client_artifacts_map = (
+                                                upload_artifacts_to_s3(
+                                                    client_artifacts,
+                                                    s3_bucket_name,
+                                                    s3_bucket_path,
+                                                )
+                                            )
+
+                                        benchmark_artifacts_table_headers = [
+                                            "Setup",
+                                            "Test-case",
+                                            "Artifact",
+                                            "link",
+                                        ]
+                                        for client_artifact in client_artifacts:
+                                            client_artifact_link = "- n/a -"
+                                            if client_artifact in client_artifacts_map:
+                                                client_artifact_link = (
+                                                    client_artifacts_map[
+                                                        client_artifact
+                                                    ]
                                                 )
+                                            benchmark_artifacts_links.append(
+                                                [
+                                                    setup_name,
+                                                    test_name,
+                                                    client_artifact,
+                                                    " {} ".format(client_artifact_link),
+                                                ]
+                                            )
 
+                                    except KeyboardInterrupt:
+                                        logging.critical(
+                                            "Detected Keyboard interruput...Destroy all remote envs and exiting right away!"
+                                        )
+                                        if args.inventory is None:
+                                            terraform_destroy(
+                                                remote_envs, keep_env_and_topo
+                                            )
+                                        exit(1)
+                                    except:
                                         (
-                                            _,
-                                            branch_target_tables,
-                                        ) = timeseries_test_sucess_flow(
-                                            args.push_results_redistimeseries,
-                                            artifact_version,
-                                            benchmark_config,
-                                            benchmark_duration_seconds,
-                                            dataset_load_duration_seconds,
-                                            default_metrics,
+                                            start_time,
+                                            start_time_ms,
+                                            start_time_str,
+                                        ) = get_start_time_vars()
+                                        timeseries_test_failure_flow(
+                                            args,
                                             setup_name,
                                             setup_type,
-                                            exporter_timemetric_path,
-                                            results_dict,
                                             rts,
                                             start_time_ms,
-                                            test_name,
-                                            tf_github_branch,
                                             tf_github_org,
                                             tf_github_repo,
                                             tf_triggering_env,
-                                            metadata_tags,
+                                            tsname_project_total_failures,
                                         )
-                                        if branch_target_tables is not None:
-                                            for (
-                                                branch_tt_keyname,
-                                                branch_target_table,
-                                            ) in branch_target_tables.items():
-                                                if (
-                                                    "contains-target"
-                                                    not in branch_target_table
-                                                ):
-                                                    continue
-                                                if (
-                                                    branch_target_table[
-                                                        "contains-target"
-                                                    ]
-                                                    is True
-                                                ):
-                                                    row = []
-                                                    metric_name = branch_target_table[
-                                                        "metric-name"
-                                                    ]
-                                                    header = []
-                                                    for (
-                                                        k,
-                                                        v,
-                                                    ) in branch_target_table.items():
-                                                        if k != "contains-target":
-                                                            header.append(k)
-                                                            row.append(v)
-                                                    if (
-                                                        metric_name
-                                                        not in overall_tables[
-                                                            setup_name
-                                                        ]
-                                                    ):
-                                                        overall_tables[setup_name][
-                                                            metric_name
-                                                        ] = {
-                                                            "header": header,
-                                                            "rows": [row],
-                                                        }
-                                                    else:
-                                                        assert (
-                                                            header
-                                                            == overall_tables[
-                                                                setup_name
-                                                            ][metric_name]["header"]
-                                                        )
-                                                        overall_tables[setup_name][
-                                                            metric_name
-                                                        ]["rows"].append(row)
-
-                                        print_results_table_stdout(
-                                            benchmark_config,
-                                            default_metrics,
-                                            results_dict,
-                                            setup_name,
-                                            setup_type,
-                                            test_name,
-                                            total_shards_cpu_usage,
+                                        return_code |= 1
+                                        failure_reason = "Some unexpected exception was caught during remote work on test named {}".format(
+                                            test_name
                                         )
-                                    client_artifacts.append(local_bench_fname)
-                                    client_artifacts.extend(client_output_artifacts)
-
-                                    if args.upload_results_s3:
-                                        logging.info(
-                                            "Uploading CLIENT results to s3. s3 bucket name: {}. s3 bucket path: {}".format(
-                                                s3_bucket_name, s3_bucket_path
+                                        logging.critical(
+                                            "{}. Failing test....".format(
+                                                failure_reason
                                             )
                                         )
-                                        client_artifacts_map = upload_artifacts_to_s3(
-                                            client_artifacts,
-                                            s3_bucket_name,
-                                            s3_bucket_path,
-                                        )
 
-                                    benchmark_artifacts_table_headers = [
-                                        "Setup",
-                                        "Test-case",
-                                        "Artifact",
-                                        "link",
-                                    ]
-                                    for client_artifact in client_artifacts:
-                                        client_artifact_link = "- n/a -"
-                                        if client_artifact in client_artifacts_map:
-                                            client_artifact_link = client_artifacts_map[
-                                                client_artifact
-                                            ]
-                                        benchmark_artifacts_links.append(
-                                            [
-                                                setup_name,
-                                                test_name,
-                                                client_artifact,
-                                                " {} ".format(client_artifact_link),
-                                            ]
-                                        )
+                                        logging.critical(sys.exc_info()[0])
+                                        print("-" * 60)
+                                        traceback.print_exc(file=sys.stdout)
+                                        print("-" * 60)
 
-                                except KeyboardInterrupt:
-                                    logging.critical(
-                                        "Detected Keyboard interruput...Destroy all remote envs and exiting right away!"
-                                    )
-                                    if args.inventory is None:
-                                        terraform_destroy(
-                                            remote_envs, keep_env_and_topo
-                                        )
-                                    exit(1)
-                                except:
-                                    (
-                                        start_time,
-                                        start_time_ms,
-                                        start_time_str,
-                                    ) = get_start_time_vars()
-                                    timeseries_test_failure_flow(
-                                        args,
-                                        setup_name,
-                                        setup_type,
-                                        rts,
-                                        start_time_ms,
-                                        tf_github_org,
-                                        tf_github_repo,
-                                        tf_triggering_env,
-                                        tsname_project_total_failures,
-                                    )
-                                    return_code |= 1
-                                    failure_reason = "Some unexpected exception was caught during remote work on test named {}".format(
-                                        test_name
-                                    )
-                                    logging.critical(
-                                        "{}. Failing test....".format(failure_reason)
+                                else:
+                                    logging.info(
+                                        f"Test {test_name} does not have remote config. Skipping test."
                                     )
-
-                                    logging.critical(sys.exc_info()[0])
-                                    print("-" * 60)
-                                    traceback.print_exc(file=sys.stdout)
-                                    print("-" * 60)
-
-                            else:
-                                logging.info(
-                                    f"Test {test_name} does not have remote config. Skipping test."
-                                )
+    finally:
+        # also when interrupted, so that no queued update is lost
+        if secondary_keys_pipeline is not None:
+            execute_secondary_result_keys_pipeline(secondary_keys_pipeline)
 
     if len(benchmark_artifacts_links) > 0:
         writer = MarkdownTableWriter(
@@ -1291,6 +1358,9 @@ def export_redis_metrics(
     tf_triggering_env,
     metadata_dict=None,
     expire_ms=0,
+    push_batch_size=PERFORMANCE_RTS_PUSH_BATCH_SIZE,
+    push_pipeline_window=PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW,
+    schema_cache=None,
 ):
     datapoint_errors = 0
     datapoint_inserts = 0
@@ -1369,7 +1439,14 @@ def export_redis_metrics(
                 ),
                 "data": {end_time_ms: metric_value},
             }
-    i_errors, i_inserts = push_data_to_redistimeseries(rts, timeseries_dict, expire_ms)
+    i_errors, i_inserts = push_data_to_redistimeseries(
+        rts,
+        timeseries_dict,
+        expire_ms,
+        push_batch_size,
+        push_pipeline_window,
+        schema_cache,
+    )
     datapoint_errors = datapoint_errors + i_errors
     datapoint_inserts = datapoint_inserts + i_inserts
     return datapoint_errors, datapoint_inserts
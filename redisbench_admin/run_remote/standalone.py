@@ -7,6 +7,11 @@
 import logging
 import os
 
+from redisbench_admin.run.placement import (
+    PLACEMENT_NUMA_NODE_KEY,
+    generate_placement_command_prefix,
+    get_server_cpus,
+)
 from redisbench_admin.utils.remote import (
     copy_file_to_remote_setup,
     execute_remote_commands,
@@ -26,6 +31,7 @@ def spin_up_standalone_remote_redis(
     port=22,
     modules_configuration_parameters_map={},
     redis_7=True,
+    placement_policy=None,
 ):
     full_logfile, initial_redis_cmd = generate_remote_standalone_redis_cmd(
         logfile,
@@ -34,6 +40,8 @@ def spin_up_standalone_remote_redis(
         temporary_dir,
         modules_configuration_parameters_map,
         redis_7,
+        "yes",
+        placement_policy,
     )
 
     # start redis-server
@@ -154,6 +162,7 @@ def generate_remote_standalone_redis_cmd(
     modules_configuration_parameters_map,
     enable_redis_7_config_directives=True,
     enable_debug_command="yes",
+    placement_policy=None,
 ):
     initial_redis_cmd = "redis-server --save '' --logfile {} --dir {} --daemonize yes --protected-mode no ".format(
         logfile, temporary_dir
@@ -186,4 +195,11 @@ def generate_remote_standalone_redis_cmd(
                 )
     if remote_module_files is not None:
         initial_redis_cmd += " " + " ".join(command)
+    if placement_policy is not None:
+        placement_prefix = generate_placement_command_prefix(
+            get_server_cpus(placement_policy),
+            placement_policy[PLACEMENT_NUMA_NODE_KEY],
+        )
+        if len(placement_prefix) > 0:
+            initial_redis_cmd = " ".join(placement_prefix) + " " + initial_redis_cmd
     return full_logfile, initial_redis_cmd
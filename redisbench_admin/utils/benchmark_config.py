@@ -12,12 +12,21 @@ import re
 import yaml
 from jsonpath_ng import parse
 
+from redisbench_admin.run.placement import PLACEMENT_KEY, merge_default_placement
 from redisbench_admin.utils.remote import (
     validate_result_expectations,
     fetch_remote_id_from_config,
 )
 
 CONFIG_PARAMS_KEY = "module-configuration-parameters"
+DURATION_UNITS_MS = {
+    "ms": 1,
+    "s": 1000,
+    "m": 60 * 1000,
+    "h": 60 * 60 * 1000,
+    "d": 24 * 60 * 60 * 1000,
+    "w": 7 * 24 * 60 * 60 * 1000,
+}
 
 
 def parse_exporter_metrics_definition(
@@ -40,6 +49,83 @@ def parse_exporter_timemetric_definition(
     return metric_path
 
 
+def parse_duration_ms(duration):
+    """
+    Converts a duration in ms (e.g. 86400000) or with a unit suffix
+    (e.g. 1d, 12h, 2w) to ms.
+    """
+    if type(duration) is int:
+        return duration
+    duration = str(duration).strip()
+    match = re.match(r"^(\d+)\s*(ms|s|m|h|d|w)?$", duration)
+    if match is None:
+        raise ValueError("Unable to parse duration {}".format(duration))
+    unit = match.group(2)
+    if unit is None:
+        unit = "ms"
+    return int(match.group(1)) * DURATION_UNITS_MS[unit]
+
+
+def parse_exporter_compaction_definition(
+    exporter_config: dict, configkey: str = "redistimeseries"
+):
+    """
+    Returns the retention of the raw series and the compaction tiers
+    ( sorted from the finest to the coarsest bucket ), or None when no
+    compaction is specified.
+    """
+    compaction_policy = None
+    if configkey in exporter_config and "compaction" in exporter_config[configkey]:
+        retention_ms = None
+        if "retention" in exporter_config[configkey]:
+            retention_ms = parse_duration_ms(exporter_config[configkey]["retention"])
+        tiers = []
+        for tier in exporter_config[configkey]["compaction"]:
+            tiers.append(
+                {
+                    "bucket_ms": parse_duration_ms(tier["bucket"]),
+                    "aggregations": tier.get("aggregations", ["avg"]),
+                    "retention_ms": parse_duration_ms(tier.get("retention", 0)),
+                }
+            )
+        tiers.sort(key=lambda x: x["bucket_ms"])
+        compaction_policy = {"retention_ms": retention_ms, "tiers": tiers}
+    return compaction_policy
+
+
+def get_defaults_compaction_policy(defaults_filename):
+    compaction_policy = None
+    if defaults_filename is not None and os.path.exists(defaults_filename):
+        with open(defaults_filename, "r") as stream:
+            default_config = yaml.safe_load(stream)
+            if default_config is not None and "exporter" in default_config:
+                compaction_policy = parse_exporter_compaction_definition(
+                    default_config["exporter"]
+                )
+    if compaction_policy is not None:
+        logging.info(
+            "Found RedisTimeSeries compaction tiers specification. Will maintain {} downsampled series per metric series".format(
+                sum([len(x["aggregations"]) for x in compaction_policy["tiers"]])
+            )
+        )
+    return compaction_policy
+
+
+def get_defaults_placement(defaults_filename):
+    default_placement = None
+    if defaults_filename is not None and os.path.exists(defaults_filename):
+        with open(defaults_filename, "r") as stream:
+            default_config = yaml.safe_load(stream)
+            if default_config is not None and PLACEMENT_KEY in default_config:
+                logging.info(
+                    "Loading default placement policy from file: {}".format(
+                        defaults_filename
+                    )
+                )
+                default_placement = default_config[PLACEMENT_KEY]
+    return default_placement
+
+
 def parse_exporter_timemetric(metric_path: str, results_dict: dict):
     datapoints_timestamp = None
     try:
@@ -76,6 +162,7 @@ def prepare_benchmark_definitions(args):
         default_specs,
         clusterconfig,
     ) = get_defaults(defaults_filename)
+    default_placement = get_defaults_placement(defaults_filename)
     for usecase_filename in files:
         with open(usecase_filename, "r", encoding="utf8") as stream:
             test_result, benchmark_config, test_name = get_final_benchmark_config(
@@ -83,6 +170,7 @@ def prepare_benchmark_definitions(args):
             )
             result &= test_result
             if test_result:
+                merge_default_placement(benchmark_config, default_placement)
                 benchmark_definitions[test_name] = benchmark_config
     return (
         result,
@@ -448,6 +536,25 @@ def extract_benchmark_tool_settings(benchmark_config, config_key="clientconfig")
     )
 
 
+def extract_benchmark_tool_source_sha256(benchmark_config, config_key="clientconfig"):
+    """
+    Returns the expected sha256 of the tool_source remote ( its sha256 entry ),
+    or None when not set.
+    """
+    tool_source_sha256 = None
+    entries = benchmark_config.get(config_key)
+    if type(entries) == dict:
+        entries = [entries]
+    if type(entries) == list:
+        for entry in entries:
+            if type(entry) != dict or "tool_source" not in entry:
+                continue
+            for inner_entry in entry["tool_source"]:
+                if "sha256" in inner_entry:
+                    tool_source_sha256 = "{}".format(inner_entry["sha256"]).lower()
+    return tool_source_sha256
+
+
 def tool_entry_check(
     benchmark_min_tool_version_major,
     benchmark_min_tool_version_minor,
@@ -0,0 +1,273 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import requests
+
+from redisbench_admin.utils.download import download_file, get_file_sha256
+
+DATASET_CACHE_DIR = "./datasets"
+# byte budget of the dataset cache. 0 means unlimited
+DATASET_CACHE_MAX_BYTES = int(
+    os.getenv("DATASET_CACHE_MAX_BYTES", "{}".format(100 * 1024 * 1024 * 1024))
+)
+DATASET_CACHE_METADATA_FILENAME = "metadata.json"
+DATASET_CACHE_TMP_PREFIX = ".tmp-"
+DATASET_CACHE_HTTP_TIMEOUT_SECS = 30
+
+
+def get_dataset_cache_key(url, etag=None):
+    """
+    Returns the cache key of a remote dataset: the sha256 of its url and, when
+    known, its ETag, so that a changed remote object gets a new entry.
+    """
+    key_str = "{}\n{}".format(url, "" if etag is None else etag)
+    return hashlib.sha256(key_str.encode()).hexdigest()
+
+
+def get_remote_etag(url):
+    """
+    Returns the ETag of a remote object, or None when the server doesn't
+    provide one or can't be reached.
+    """
+    etag = None
+    try:
+        response = requests.head(
+            url, allow_redirects=True, timeout=DATASET_CACHE_HTTP_TIMEOUT_SECS
+        )
+        if response.status_code == 200:
+            etag = response.headers.get("ETag")
+    except requests.exceptions.RequestException as e:
+        logging.warning(
+            "Unable to retrieve the ETag of {}. Error: {}".format(url, e.__str__())
+        )
+    if etag is not None:
+        etag = etag.strip('"')
+    return etag
+
+
+def write_json_atomically(filename, data):
+    dirname = os.path.dirname(filename)
+    fd, tmp_filename = tempfile.mkstemp(prefix=DATASET_CACHE_TMP_PREFIX, dir=dirname)
+    try:
+        with os.fdopen(fd, "w") as json_file:
+            json.dump(data, json_file)
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+
+
+def get_dataset_cache_entries(cache_dir=DATASET_CACHE_DIR):
+    """
+    Returns the metadata of all cache entries, least recently used first.
+    Each entry has its key, url, etag, filename, size, sha256, created and
+    last_access times.
+    """
+    entries = []
+    if not os.path.isdir(cache_dir):
+        return entries
+    for key in os.listdir(cache_dir):
+        metadata_filename = os.path.join(
+            cache_dir, key, DATASET_CACHE_METADATA_FILENAME
+        )
+        if not os.path.isfile(metadata_filename):
+            continue
+        try:
+            with open(metadata_filename, "r") as json_file:
+                entry = json.load(json_file)
+        except (OSError, ValueError) as e:
+            logging.warning(
+                "Unable to read the dataset cache entry {}. Error: {}".format(
+                    metadata_filename, e.__str__()
+                )
+            )
+            continue
+        entry["key"] = key
+        entry["path"] = os.path.join(cache_dir, key, entry["filename"])
+        entries.append(entry)
+    entries.sort(key=lambda x: x["last_access"])
+    return entries
+
+
+def is_dataset_cache_entry_valid(entry, verify_sha256=False):
+    """
+    Checks that the entry data is present with the expected size and,
+    optionally, the expected sha256 ( which requires reading all of it ).
+    """
+    if not os.path.isfile(entry["path"]):
+        return False
+    if os.path.getsize(entry["path"]) != entry["size"]:
+        return False
+    if verify_sha256 and get_file_sha256(entry["path"]) != entry["sha256"]:
+        return False
+    return True
+
+
+def touch_dataset_cache_entry(cache_dir, entry):
+    entry["last_access"] = time.time()
+    metadata = {k: v for k, v in entry.items() if k not in ["key", "path"]}
+    write_json_atomically(
+        os.path.join(cache_dir, entry["key"], DATASET_CACHE_METADATA_FILENAME),
+        metadata,
+    )
+
+
+def remove_dataset_cache_entry(cache_dir, entry):
+    # removing the metadata first invalidates the entry for concurrent readers
+    entry_dir = os.path.join(cache_dir, entry["key"])
+    metadata_filename = os.path.join(entry_dir, DATASET_CACHE_METADATA_FILENAME)
+    if os.path.exists(metadata_filename):
+        os.remove(metadata_filename)
+    shutil.rmtree(entry_dir, ignore_errors=True)
+
+
+def lookup_dataset_cache(cache_dir, url, etag=None):
+    """
+    Returns the valid cache entry of url ( and etag, when known ), or None.
+    Without an etag the most recently used entry of url is returned.
+    """
+    entries = [
+        entry
+        for entry in get_dataset_cache_entries(cache_dir)
+        if entry["url"] == url and (etag is None or entry["etag"] == etag)
+    ]
+    for entry in reversed(entries):
+        if is_dataset_cache_entry_valid(entry):
+            return entry
+    return None
+
+
+def add_to_dataset_cache(cache_dir, url, etag=None, expected_sha256=None):
+    """
+    Downloads url straight into its entry, whose metadata is only written once
+    the data is complete, so that an interrupted download never leaves a
+    partial entry behind and is resumed by the next attempt.
+    Raises an Exception if the data doesn't match expected_sha256.
+    """
+    key = get_dataset_cache_key(url, etag)
+    entry_dir = os.path.join(cache_dir, key)
+    filename = url.split("?")[0].split("/")[-1]
+    if not os.path.isdir(entry_dir):
+        os.makedirs(entry_dir, exist_ok=True)
+    logging.info(
+        "Retrieving remote file from {} into the dataset cache {}.".format(
+            url, cache_dir
+        )
+    )
+    sha256 = download_file(url, os.path.join(entry_dir, filename), expected_sha256)
+    now = time.time()
+    entry = {
+        "url": url,
+        "etag": etag,
+        "filename": filename,
+        "size": os.path.getsize(os.path.join(entry_dir, filename)),
+        "sha256": sha256,
+        "created": now,
+        "last_access": now,
+    }
+    write_json_atomically(
+        os.path.join(entry_dir, DATASET_CACHE_METADATA_FILENAME), entry
+    )
+    entry["key"] = key
+    entry["path"] = os.path.join(entry_dir, filename)
+    return entry
+
+
+def prune_dataset_cache(
+    cache_dir=DATASET_CACHE_DIR,
+    max_bytes=DATASET_CACHE_MAX_BYTES,
+    verify_sha256=False,
+    keep_keys=[],
+    remove_leftovers=False,
+):
+    """
+    Removes the invalid entries ( and, with remove_leftovers, the partial data
+    of interrupted downloads, so only when no download is in progress ),
+    and then evicts the least recently used entries until the cache fits
+    max_bytes ( 0 means unlimited ). Entries in keep_keys are never evicted.
+    Returns the list of removed entries.
+    """
+    removed = []
+    if not os.path.isdir(cache_dir):
+        return removed
+    if remove_leftovers:
+        for name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, name)
+            if os.path.isdir(path) and not os.path.isfile(
+                os.path.join(path, DATASET_CACHE_METADATA_FILENAME)
+            ):
+                logging.info("Removing interrupted download leftovers {}".format(name))
+                shutil.rmtree(path, ignore_errors=True)
+    entries = []
+    for entry in get_dataset_cache_entries(cache_dir):
+        if is_dataset_cache_entry_valid(entry, verify_sha256):
+            entries.append(entry)
+        else:
+            logging.warning(
+                "Removing invalid dataset cache entry of {} ( {} )".format(
+                    entry["url"], entry["key"]
+                )
+            )
+            remove_dataset_cache_entry(cache_dir, entry)
+            removed.append(entry)
+    total_bytes = sum([entry["size"] for entry in entries])
+    if max_bytes > 0:
+        for entry in entries:
+            if total_bytes <= max_bytes:
+                break
+            if entry["key"] in keep_keys:
+                continue
+            logging.info(
+                "Evicting dataset cache entry of {} ( {} bytes )".format(
+                    entry["url"], entry["size"]
+                )
+            )
+            remove_dataset_cache_entry(cache_dir, entry)
+            removed.append(entry)
+            total_bytes = total_bytes - entry["size"]
+        if total_bytes > max_bytes:
+            logging.warning(
+                "The dataset cache uses {} bytes, above its budget of {} bytes".format(
+                    total_bytes, max_bytes
+                )
+            )
+    return removed
+
+
+def fetch_dataset(
+    url,
+    cache_dir=DATASET_CACHE_DIR,
+    max_bytes=DATASET_CACHE_MAX_BYTES,
+    expected_sha256=None,
+):
+    """
+    Returns the local path of the remote dataset url, downloading it into the
+    dataset cache on a miss and evicting the least recently used entries
+    above max_bytes.
+    """
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+    etag = get_remote_etag(url)
+    entry = lookup_dataset_cache(cache_dir, url, etag)
+    if entry is not None and (
+        expected_sha256 is None or entry["sha256"] == expected_sha256
+    ):
+        logging.info(
+            "Reusing cached remote file (located at {} ).".format(entry["path"])
+        )
+        touch_dataset_cache_entry(cache_dir, entry)
+        return entry["path"]
+    entry = add_to_dataset_cache(cache_dir, url, etag, expected_sha256)
+    prune_dataset_cache(cache_dir, max_bytes, False, [entry["key"]])
+    return entry["path"]
@@ -0,0 +1,255 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# objects above DOWNLOAD_PART_SIZE are fetched in parallel ranges of that size
+DOWNLOAD_PART_SIZE = int(os.getenv("DOWNLOAD_PART_SIZE", "{}".format(64 * 1024 * 1024)))
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "8"))
+DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "5"))
+DOWNLOAD_RETRY_BACKOFF_SECS = 1.0
+DOWNLOAD_HTTP_TIMEOUT_SECS = 30
+# a dropped connection loses at most the chunk being read
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# data is written to <filename>.part and its progress to <filename>.part.json
+DOWNLOAD_PARTIAL_SUFFIX = ".part"
+DOWNLOAD_STATE_SUFFIX = ".part.json"
+
+
+def get_file_sha256(filename):
+    sha256 = hashlib.sha256()
+    with open(filename, "rb") as fd:
+        for chunk in iter(lambda: fd.read(DOWNLOAD_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def get_download_info(url):
+    """
+    Returns the size, the ETag and whether the server accepts range requests
+    for url. The size and ETag are None when not provided.
+    """
+    response = requests.head(
+        url, allow_redirects=True, timeout=DOWNLOAD_HTTP_TIMEOUT_SECS
+    )
+    response.raise_for_status()
+    size = response.headers.get("Content-Length")
+    if size is not None:
+        size = int(size)
+    etag = response.headers.get("ETag")
+    if etag is not None:
+        etag = etag.strip('"')
+    accept_ranges = response.headers.get("Accept-Ranges", "none") == "bytes"
+    return size, etag, accept_ranges
+
+
+def get_download_parts(size, part_size):
+    """
+    Returns the list of inclusive ( start, end ) byte ranges of an object.
+    """
+    return [
+        (start, min(start + part_size, size) - 1) for start in range(0, size, part_size)
+    ]
+
+
+def read_download_state(state_filename, url, size, etag, part_size):
+    """
+    Returns the set of parts already downloaded by a previous attempt, as long
+    as it was fetching the same object with the same part size.
+    """
+    try:
+        with open(state_filename, "r") as json_file:
+            state = json.load(json_file)
+    except (OSError, ValueError):
+        return set()
+    if [state.get(k) for k in ["url", "size", "etag", "part_size"]] != [
+        url,
+        size,
+        etag,
+        part_size,
+    ]:
+        return set()
+    return set(state.get("done_parts", []))
+
+
+def write_download_state(state_filename, url, size, etag, part_size, done_parts):
+    tmp_state_filename = "{}.tmp".format(state_filename)
+    with open(tmp_state_filename, "w") as json_file:
+        json.dump(
+            {
+                "url": url,
+                "size": size,
+                "etag": etag,
+                "part_size": part_size,
+                "done_parts": sorted(done_parts),
+            },
+            json_file,
+        )
+    os.replace(tmp_state_filename, state_filename)
+
+
+def download_range(url, filename, start, end=None, retries=DOWNLOAD_RETRIES):
+    """
+    Writes the inclusive byte range [start, end] of url ( until the end of the
+    object when end is None ) at the same offset of filename. On errors, the
+    request is retried from the last byte written.
+    """
+    offset = start
+    attempt = 0
+    while True:
+        range_str = "bytes={}-".format(offset)
+        if end is not None:
+            range_str = "bytes={}-{}".format(offset, end)
+        try:
+            with requests.get(
+                url,
+                headers={"Range": range_str},
+                stream=True,
+                timeout=DOWNLOAD_HTTP_TIMEOUT_SECS,
+            ) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise requests.exceptions.RequestException(
+                        "Expected a partial content reply for range {}, got status {}".format(
+                            range_str, response.status_code
+                        )
+                    )
+                with open(filename, "r+b") as fd:
+                    fd.seek(offset)
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        fd.write(chunk)
+                        offset = offset + len(chunk)
+            if end is None or offset > end:
+                return offset - start
+            raise requests.exceptions.RequestException(
+                "Range {} ended early, at byte {}".format(range_str, offset)
+            )
+        except requests.exceptions.RequestException as e:
+            attempt = attempt + 1
+            if attempt > retries:
+                raise
+            logging.warning(
+                "Error while downloading {} ( {} ). Retrying from byte {}. Error: {}".format(
+                    url, range_str, offset, e.__str__()
+                )
+            )
+            time.sleep(DOWNLOAD_RETRY_BACKOFF_SECS * attempt)
+
+
+def download_file(
+    url,
+    filename,
+    expected_sha256=None,
+    workers=DOWNLOAD_WORKERS,
+    part_size=DOWNLOAD_PART_SIZE,
+    retries=DOWNLOAD_RETRIES,
+):
+    """
+    Downloads url into filename, which only shows up once complete.
+    When the server accepts range requests, the object is fetched in parallel
+    part_size ranges and an interrupted download is resumed from the parts
+    already on disk, otherwise in a single stream. Returns the sha256
+    of the data, raising an Exception if it doesn't match expected_sha256.
+    """
+    partial_filename = "{}{}".format(filename, DOWNLOAD_PARTIAL_SUFFIX)
+    state_filename = "{}{}".format(filename, DOWNLOAD_STATE_SUFFIX)
+    try:
+        size, etag, accept_ranges = get_download_info(url)
+    except requests.exceptions.RequestException as e:
+        logging.warning(
+            "Unable to retrieve the size of {}. Error: {}".format(url, e.__str__())
+        )
+        size, etag, accept_ranges = None, None, False
+    start_time = time.monotonic()
+    if size is None or accept_ranges is False:
+        logging.info("Downloading {} in a single stream".format(url))
+        download_single_stream(url, partial_filename, retries)
+    else:
+        parts = get_download_parts(size, part_size)
+        done_parts = set()
+        if os.path.exists(partial_filename) and os.path.getsize(partial_filename) == (
+            size
+        ):
+            done_parts = read_download_state(state_filename, url, size, etag, part_size)
+        else:
+            if os.path.exists(state_filename):
+                os.remove(state_filename)
+            with open(partial_filename, "wb") as fd:
+                fd.truncate(size)
+        pending_parts = [n for n in range(len(parts)) if n not in done_parts]
+        logging.info(
+            "Downloading {} ( {} bytes ) in {} ranges of up to {} bytes. {} ranges already downloaded".format(
+                url, size, len(parts), part_size, len(done_parts)
+            )
+        )
+        state_lock = threading.Lock()
+
+        def download_part(n):
+            download_range(url, partial_filename, parts[n][0], parts[n][1], retries)
+            with state_lock:
+                done_parts.add(n)
+                write_download_state(
+                    state_filename, url, size, etag, part_size, done_parts
+                )
+
+        if len(pending_parts) > 0:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                list(executor.map(download_part, pending_parts))
+    sha256 = get_file_sha256(partial_filename)
+    if expected_sha256 is not None and sha256 != expected_sha256:
+        os.remove(partial_filename)
+        if os.path.exists(state_filename):
+            os.remove(state_filename)
+        raise Exception(
+            "The sha256 of {} ( {} ) doesn't match the expected one ( {} )".format(
+                url, sha256, expected_sha256
+            )
+        )
+    os.replace(partial_filename, filename)
+    if os.path.exists(state_filename):
+        os.remove(state_filename)
+    logging.info(
+        "Downloaded {} into {} in {:.3f} secs".format(
+            url, filename, time.monotonic() - start_time
+        )
+    )
+    return sha256
+
+
+def download_single_stream(url, partial_filename, retries=DOWNLOAD_RETRIES):
+    """
+    Downloads url in a single request. Without a known size or range support,
+    a partial file from a previous attempt can't be trusted, so it restarts
+    from zero.
+    """
+    attempt = 0
+    while True:
+        try:
+            with requests.get(
+                url, stream=True, timeout=DOWNLOAD_HTTP_TIMEOUT_SECS
+            ) as response:
+                response.raise_for_status()
+                with open(partial_filename, "wb") as fd:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        fd.write(chunk)
+            return
+        except requests.exceptions.RequestException as e:
+            attempt = attempt + 1
+            if attempt > retries:
+                raise
+            logging.warning(
+                "Error while downloading {}. Retrying. Error: {}".format(
+                    url, e.__str__()
+                )
+            )
+            time.sleep(DOWNLOAD_RETRY_BACKOFF_SECS * attempt)
@@ -6,11 +6,55 @@
 
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from shutil import copyfile
 
-import wget
-
 from redisbench_admin.environments.oss_cluster import get_cluster_dbfilename
+from redisbench_admin.utils.dataset_cache import fetch_dataset
+from redisbench_admin.utils.download import download_file
+
+DATASET_PLACEMENT_HARDLINK = "hardlink"
+DATASET_PLACEMENT_REFLINK = "reflink"
+DATASET_PLACEMENT_COPY = "copy"
+# linux FICLONE ioctl ( btrfs, xfs, ... copy-on-write clone of a whole file )
+FICLONE = 0x40049409
+
+
+def get_dataset_from_config(benchmark_config, dbconfig_keyname="dbconfig"):
+    """
+    Returns the dataset ( local path or url ) and the dataset name of a
+    benchmark config, or None for each when not set.
+    """
+    dataset = None
+    dataset_name = None
+    if dbconfig_keyname in benchmark_config:
+        entries = benchmark_config[dbconfig_keyname]
+        if type(entries) == dict:
+            entries = [entries]
+        if type(entries) == list:
+            for k in entries:
+                if "dataset" in k:
+                    dataset = k["dataset"]
+                if "dataset_name" in k:
+                    dataset_name = k["dataset_name"]
+    return dataset, dataset_name
+
+
+def get_dataset_sha256_from_config(benchmark_config, dbconfig_keyname="dbconfig"):
+    """
+    Returns the expected sha256 of the dataset of a benchmark config
+    ( dataset_sha256 ), or None when not set.
+    """
+    dataset_sha256 = None
+    if dbconfig_keyname in benchmark_config:
+        entries = benchmark_config[dbconfig_keyname]
+        if type(entries) == dict:
+            entries = [entries]
+        if type(entries) == list:
+            for k in entries:
+                if "dataset_sha256" in k:
+                    dataset_sha256 = "{}".format(k["dataset_sha256"]).lower()
+    return dataset_sha256
 
 
 def check_dataset_local_requirements(
@@ -22,55 +66,133 @@ def check_dataset_local_requirements(
     number_primaries=1,
     is_cluster=False,
     is_remote=False,
+    start_port=6379,
 ):
-    dataset = None
-    dataset_name = None
     full_path = None
     tmp_path = None
-    if dbconfig_keyname in benchmark_config:
-        entry_type = type(benchmark_config[dbconfig_keyname])
-        if entry_type == list:
-            for k in benchmark_config[dbconfig_keyname]:
-                if "dataset" in k:
-                    dataset = k["dataset"]
-                    full_path = k["dataset"]
-                if "dataset_name" in k:
-                    dataset_name = k["dataset_name"]
-        if entry_type == dict:
-            k = benchmark_config[dbconfig_keyname]
-            if "dataset" in k:
-                dataset = k["dataset"]
-                full_path = k["dataset"]
-            if "dataset_name" in k:
-                dataset_name = k["dataset_name"]
-        if dataset is not None and is_remote is False:
+    dataset, dataset_name = get_dataset_from_config(benchmark_config, dbconfig_keyname)
+    if dataset is not None:
+        full_path = dataset
+        if is_remote is False:
             full_path = check_if_needs_remote_fetch(
-                dataset, datasets_localtemp_dir, dirname, None, is_remote
+                dataset,
+                datasets_localtemp_dir,
+                dirname,
+                None,
+                is_remote,
+                get_dataset_sha256_from_config(benchmark_config, dbconfig_keyname),
+                use_dataset_cache=True,
             )
 
             if is_cluster is False:
-                tmp_path = "{}/dump.rdb".format(redis_dbdir)
-                logging.info("Copying rdb from {} to {}".format(full_path, tmp_path))
-                copyfile(full_path, tmp_path)
+                tmp_paths = ["{}/dump.rdb".format(redis_dbdir)]
             else:
-                start_port = 6379
-                for primary_number in range(number_primaries):
-                    primary_port = start_port + primary_number
-                    tmp_path = "{}/{}".format(
-                        redis_dbdir, get_cluster_dbfilename(primary_port)
+                tmp_paths = [
+                    "{}/{}".format(
+                        redis_dbdir, get_cluster_dbfilename(start_port + primary_number)
                     )
-                    logging.info(
-                        "Copying rdb from {} to {}".format(full_path, tmp_path)
-                    )
-                    copyfile(full_path, tmp_path)
+                    for primary_number in range(number_primaries)
+                ]
+            place_dataset_files(full_path, tmp_paths)
+            tmp_path = tmp_paths[-1]
 
     return dataset, dataset_name, full_path, tmp_path
 
 
+def reflink_file(src, dst):
+    """
+    Clones src into dst sharing the same extents ( copy-on-write ). Raises
+    OSError when the platform or the filesystem doesn't support it.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("reflinks are not supported on this platform")
+    with open(src, "rb") as src_fd, open(dst, "wb") as dst_fd:
+        try:
+            fcntl.ioctl(dst_fd.fileno(), FICLONE, src_fd.fileno())
+        except OSError:
+            dst_fd.close()
+            os.remove(dst)
+            raise
+
+
+def place_dataset_file(src, dst):
+    """
+    Places the dataset src at dst avoiding to copy its data when possible:
+    via a hardlink ( redis-server replaces its RDB via rename, so it never
+    writes into the shared inode ), then via a reflink, and only then via a
+    full copy. Returns the placement method and the number of bytes copied.
+    """
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+        return DATASET_PLACEMENT_HARDLINK, 0
+    except OSError as e:
+        logging.debug("Unable to hardlink {} to {}: {}".format(src, dst, e))
+    try:
+        reflink_file(src, dst)
+        return DATASET_PLACEMENT_REFLINK, 0
+    except OSError as e:
+        logging.debug("Unable to reflink {} to {}: {}".format(src, dst, e))
+    copyfile(src, dst)
+    return DATASET_PLACEMENT_COPY, os.path.getsize(dst)
+
+
+def place_dataset_files(src, dsts, workers=None):
+    """
+    Places the dataset src at all dsts ( e.g. one RDB per cluster primary ).
+    The first destination is placed from src and the remaining ones from it,
+    in parallel, so that at most one copy is made when src is on another
+    filesystem. Returns the total bytes copied and the total bytes linked.
+    """
+    if len(dsts) == 0:
+        return 0, 0
+    dataset_size = os.path.getsize(src)
+    placements = [place_dataset_file(src, dsts[0])]
+    if len(dsts) > 1:
+        if workers is None:
+            workers = len(dsts) - 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            placements.extend(
+                executor.map(lambda x: place_dataset_file(dsts[0], x), dsts[1:])
+            )
+    bytes_copied = sum([copied for _, copied in placements])
+    bytes_linked = dataset_size * len(dsts) - bytes_copied
+    logging.info(
+        "Placed rdb {} into {} files ({}). {} bytes copied, {} bytes linked".format(
+            src,
+            len(dsts),
+            ", ".join(
+                sorted(set([placement_method for placement_method, _ in placements]))
+            ),
+            bytes_copied,
+            bytes_linked,
+        )
+    )
+    return bytes_copied, bytes_linked
+
+
 def check_if_needs_remote_fetch(
-    property, localtemp_dir, dirname, full_path=None, is_remote=False
+    property,
+    localtemp_dir,
+    dirname,
+    full_path=None,
+    is_remote=False,
+    expected_sha256=None,
+    use_dataset_cache=False,
 ):
+    """
+    Returns the local path of property, downloading it to localtemp_dir when
+    it's a url. With use_dataset_cache, localtemp_dir is the ( size bounded )
+    dataset cache the remote file is fetched into.
+    """
     if property.startswith("http"):
+        if use_dataset_cache and full_path is None and is_remote is False:
+            return fetch_dataset(
+                property, localtemp_dir, expected_sha256=expected_sha256
+            )
         if not os.path.isdir(localtemp_dir):
             os.mkdir(localtemp_dir)
         if full_path is None:
@@ -82,7 +204,7 @@ def check_if_needs_remote_fetch(
                     property, full_path, localtemp_dir
                 )
             )
-            wget.download(property, full_path)
+            download_file(property, full_path, expected_sha256)
         else:
             logging.info(
                 "Reusing cached remote file (located at {} ).".format(full_path)
@@ -5,6 +5,7 @@
 #
 
 import configparser
+import hashlib
 import logging
 import os
 import sys
@@ -21,6 +22,7 @@ from tqdm import tqdm
 
 from redisbench_admin.environments.oss_cluster import get_cluster_dbfilename
 from redisbench_admin.run.metrics import extract_results_table
+from redisbench_admin.utils.download import DOWNLOAD_PARTIAL_SUFFIX, DOWNLOAD_RETRIES
 from redisbench_admin.utils.local import check_dataset_local_requirements
 from redisbench_admin.utils.utils import (
     get_ts_metric_name,
@@ -46,7 +48,17 @@ REDIS_AUTH_SERVER_HOST = os.getenv("REDIS_AUTH_SERVER_HOST", "localhost")
 REDIS_AUTH_SERVER_PORT = int(os.getenv("REDIS_AUTH_SERVER_PORT", "6380"))
 REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "15"))
 REDIS_SOCKET_TIMEOUT = int(os.getenv("REDIS_SOCKET_TIMEOUT", "300"))
+# datapoints per TS.MADD and TS.MADD commands per pipeline round-trip
+PERFORMANCE_RTS_PUSH_BATCH_SIZE = int(
+    os.getenv("PERFORMANCE_RTS_PUSH_BATCH_SIZE", "500")
+)
+PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW = int(
+    os.getenv("PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW", "8")
+)
 TERRAFORM_BIN_PATH = os.getenv("TERRAFORM_BIN_PATH", "terraform")
+# label set on the downsampled companion series, e.g. compaction=avg_86400000.
+# raw series reads filter on "compaction=" ( label not present )
+COMPACTION_LABEL = "compaction"
 
 
 def get_git_root(path):
@@ -182,6 +194,27 @@ def connect_remote_ssh(port, private_key, server_public_ip, username):
     return c
 
 
+def generate_remote_dataset_download_cmd(url, dst, retries=DOWNLOAD_RETRIES):
+    """
+    Downloads the dataset into a partial file specific to its url, resuming a
+    previously interrupted download of it, and only then renames it into dst.
+    """
+    partial_dst = "{}.{}{}".format(
+        dst, hashlib.sha256(url.encode()).hexdigest()[:16], DOWNLOAD_PARTIAL_SUFFIX
+    )
+    return "wget -c --tries={retries} -O {partial_dst} {url} && mv {partial_dst} {dst}".format(
+        retries=retries, partial_dst=partial_dst, url=url, dst=dst
+    )
+
+
+def generate_remote_dataset_placement_cmd(src, dst):
+    """
+    Hardlinks the remote dataset, falling back to a reflink ( when the
+    filesystem supports it ) or a copy.
+    """
+    return "ln -f {src} {dst} || cp --reflink=auto {src} {dst}".format(src=src, dst=dst)
+
+
 def check_dataset_remote_requirements(
     benchmark_config,
     server_public_ip,
@@ -231,7 +264,9 @@ def check_dataset_remote_requirements(
                 )
             )
             commands = []
-            commands.append("wget -O {} {}".format(remote_dataset_file, dataset))
+            commands.append(
+                generate_remote_dataset_download_cmd(dataset, remote_dataset_file)
+            )
             execute_remote_commands(
                 server_public_ip, username, private_key, commands, db_ssh_port
             )
@@ -253,15 +288,14 @@ def check_dataset_remote_requirements(
                     remote_dataset_folder, get_cluster_dbfilename(primary_port)
                 )
                 logging.info(
-                    "For primary #{}, reusing the already present rdb in {} and duplicating it into :{}".format(
+                    "For primary #{}, reusing the already present rdb in {} and linking it into :{}".format(
                         master_shard_id,
                         remote_dataset_file,
                         second_forward_remote_dataset_file,
                     )
                 )
-                # start redis-server
                 commands.append(
-                    "cp {} {}".format(
+                    generate_remote_dataset_placement_cmd(
                         remote_dataset_file, second_forward_remote_dataset_file
                     )
                 )
@@ -620,63 +654,179 @@ def fetch_remote_setup_from_config(
     return terraform_working_dir, setup_type, setup
 
 
-def push_data_to_redistimeseries(rts, time_series_dict: dict, expire_msecs=0):
+def push_data_to_redistimeseries(
+    rts,
+    time_series_dict: dict,
+    expire_msecs=0,
+    batch_size=PERFORMANCE_RTS_PUSH_BATCH_SIZE,
+    pipeline_window=PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW,
+    schema_cache=None,
+    compaction_policy=None,
+):
     datapoint_errors = 0
     datapoint_inserts = 0
     if rts is not None and time_series_dict is not None:
         progress = tqdm(
             unit="benchmark time-series", total=len(time_series_dict.values())
         )
+        datapoints = []
+        timeseries_labels = {}
+        expire_timeseries_names = []
         for timeseries_name, time_series in time_series_dict.items():
             try:
-                exporter_create_ts(rts, time_series, timeseries_name)
+                exporter_create_ts(
+                    rts, time_series, timeseries_name, schema_cache, compaction_policy
+                )
+                timeseries_labels[timeseries_name] = time_series["labels"]
                 for timestamp, value in time_series["data"].items():
-                    try:
-                        if timestamp is None:
-                            logging.warning(
-                                "The provided timestamp is null. Using auto-ts"
-                            )
-                            rts.ts().add(
-                                timeseries_name,
-                                value,
-                                duplicate_policy="last",
-                            )
-                        else:
-                            rts.ts().add(
-                                timeseries_name,
-                                timestamp,
-                                value,
-                                duplicate_policy="last",
-                            )
-                        datapoint_inserts += 1
-                    except redis.exceptions.DataError:
+                    if is_valid_datapoint_value(value) is False:
                         logging.warning(
                             "Error while inserting datapoint ({} : {}) in timeseries named {}. ".format(
                                 timestamp, value, timeseries_name
                             )
                         )
                         datapoint_errors += 1
-                        pass
-                    except redis.exceptions.ResponseError:
-                        logging.warning(
-                            "Error while inserting datapoint ({} : {}) in timeseries named {}. ".format(
-                                timestamp, value, timeseries_name
-                            )
-                        )
-                        datapoint_errors += 1
-                        pass
+                        continue
+                    if timestamp is None:
+                        logging.warning("The provided timestamp is null. Using auto-ts")
+                        timestamp = "*"
+                    datapoints.append((timeseries_name, timestamp, value))
                 if expire_msecs > 0:
-                    rts.pexpire(timeseries_name, expire_msecs)
+                    expire_timeseries_names.append(timeseries_name)
             except redis.exceptions.TimeoutError:
                 logging.error(
                     f"Error while working in timeseries named {timeseries_name}. "
                 )
                 datapoint_errors += 1
             progress.update()
+        i_errors, i_inserts = bulk_add_datapoints_to_redistimeseries(
+            rts,
+            datapoints,
+            batch_size,
+            pipeline_window,
+            timeseries_labels,
+            schema_cache,
+        )
+        datapoint_errors += i_errors
+        datapoint_inserts += i_inserts
+        if len(expire_timeseries_names) > 0:
+            pipe = rts.pipeline(transaction=False)
+            for timeseries_name in expire_timeseries_names:
+                pipe.pexpire(timeseries_name, expire_msecs)
+            pipe.execute(raise_on_error=False)
+        if schema_cache is not None:
+            schema_cache.save()
+    return datapoint_errors, datapoint_inserts
+
+
+def is_valid_datapoint_value(value):
+    # the same types redis-py accepts on the wire. Anything else raises a
+    # DataError client side and would abort the entire pipeline
+    if value is None or type(value) is bool:
+        return False
+    return isinstance(value, (bytes, str, int, float))
+
+
+def bulk_add_datapoints_to_redistimeseries(
+    rts,
+    datapoints: list,
+    batch_size=PERFORMANCE_RTS_PUSH_BATCH_SIZE,
+    pipeline_window=PERFORMANCE_RTS_PUSH_PIPELINE_WINDOW,
+    timeseries_labels={},
+    schema_cache=None,
+):
+    datapoint_errors = 0
+    datapoint_inserts = 0
+    batch_size = max(1, batch_size)
+    pipeline_window = max(1, pipeline_window)
+    batches = [
+        datapoints[pos : pos + batch_size]
+        for pos in range(0, len(datapoints), batch_size)
+    ]
+    logging.debug(
+        "Pushing {} datapoints using {} TS.MADD batches of up to {} datapoints ({} batches in flight)".format(
+            len(datapoints), len(batches), batch_size, pipeline_window
+        )
+    )
+    for window_start in range(0, len(batches), pipeline_window):
+        window = batches[window_start : window_start + pipeline_window]
+        pipe = rts.ts().pipeline(transaction=False)
+        for batch in window:
+            pipe.madd(batch)
+        try:
+            replies = pipe.execute(raise_on_error=False)
+        except redis.exceptions.TimeoutError:
+            window_datapoints = sum([len(batch) for batch in window])
+            logging.error(
+                "Timeout while pushing a window of {} datapoints. ".format(
+                    window_datapoints
+                )
+            )
+            datapoint_errors += window_datapoints
+            continue
+        rejected_datapoints = []
+        for batch, reply in zip(window, replies):
+            if isinstance(reply, Exception):
+                reply = [reply for _ in batch]
+            for datapoint, datapoint_reply in zip(batch, reply):
+                if isinstance(datapoint_reply, Exception):
+                    rejected_datapoints.append(datapoint)
+                else:
+                    datapoint_inserts += 1
+        if len(rejected_datapoints) > 0:
+            i_errors, i_inserts = add_rejected_datapoints_to_redistimeseries(
+                rts, rejected_datapoints, timeseries_labels, schema_cache
+            )
+            datapoint_errors += i_errors
+            datapoint_inserts += i_inserts
+    return datapoint_errors, datapoint_inserts
+
+
+def add_rejected_datapoints_to_redistimeseries(
+    rts, datapoints: list, timeseries_labels={}, schema_cache=None
+):
+    # TS.MADD has no ON_DUPLICATE override, so series created with the server
+    # default duplicate policy (BLOCK) reject re-pushed timestamps.
+    # We retry those via TS.ADD ON_DUPLICATE LAST to keep the previous semantics.
+    # The labels are only used if the series no longer exists (e.g. expired
+    # after being cached as known by the schema cache)
+    datapoint_errors = 0
+    datapoint_inserts = 0
+    pipe = rts.ts().pipeline(transaction=False)
+    for timeseries_name, timestamp, value in datapoints:
+        pipe.add(
+            timeseries_name,
+            timestamp,
+            value,
+            duplicate_policy="last",
+            labels=timeseries_labels.get(timeseries_name),
+        )
+    try:
+        replies = pipe.execute(raise_on_error=False)
+    except redis.exceptions.TimeoutError:
+        logging.error(
+            "Timeout while retrying {} rejected datapoints. ".format(len(datapoints))
+        )
+        return len(datapoints), 0
+    for datapoint, reply in zip(datapoints, replies):
+        if isinstance(reply, Exception):
+            timeseries_name, timestamp, value = datapoint
+            logging.warning(
+                "Error while inserting datapoint ({} : {}) in timeseries named {}. {}".format(
+                    timestamp, value, timeseries_name, reply.__str__()
+                )
+            )
+            datapoint_errors += 1
+            if schema_cache is not None:
+                schema_cache.invalidate(timeseries_name)
+        else:
+            datapoint_inserts += 1
     return datapoint_errors, datapoint_inserts
 
 
-def exporter_create_ts(rts, time_series, timeseries_name):
+def exporter_create_ts(
+    rts, time_series, timeseries_name, schema_cache=None, compaction_policy=None
+):
     updated_create = False
     final_labels = {}
     for label_name, value in time_series["labels"].items():
@@ -686,6 +836,13 @@ def exporter_create_ts(rts, time_series, timeseries_name):
             logging.warning(f"The label {label_name} value was None. skipping it...")
 
     time_series["labels"] = final_labels
+    # avoiding target time-series
+    if "target" in timeseries_name:
+        compaction_policy = None
+    if schema_cache is not None and schema_cache.is_current(
+        timeseries_name, time_series["labels"], compaction_policy
+    ):
+        return updated_create
     try:
         if rts.exists(timeseries_name):
             updated_create = check_rts_labels(rts, time_series, timeseries_name)
@@ -695,9 +852,15 @@ def exporter_create_ts(rts, time_series, timeseries_name):
                     timeseries_name, time_series["labels"]
                 )
             )
-
+            retention_msecs = None
+            if compaction_policy is not None:
+                retention_msecs = compaction_policy["retention_ms"]
             rts.ts().create(
-                timeseries_name, labels=time_series["labels"], chunk_size=128
+                timeseries_name,
+                labels=time_series["labels"],
+                retention_msecs=retention_msecs,
+                chunk_size=128,
+                duplicate_policy="last",
             )
             updated_create = True
     except redis.exceptions.DataError as e:
@@ -722,9 +885,98 @@ def exporter_create_ts(rts, time_series, timeseries_name):
                 )
             )
             raise
+    if compaction_policy is not None:
+        exporter_create_compaction_rules(
+            rts,
+            timeseries_name,
+            time_series["labels"],
+            compaction_policy,
+            updated_create,
+        )
+    if schema_cache is not None:
+        schema_cache.update(timeseries_name, time_series["labels"], compaction_policy)
     return updated_create
 
 
+def get_compaction_label_value(aggregation, bucket_ms):
+    return "{}_{}".format(aggregation, bucket_ms)
+
+
+def get_compaction_ts_name(timeseries_name, aggregation, bucket_ms):
+    return "{}:{}".format(
+        timeseries_name, get_compaction_label_value(aggregation, bucket_ms)
+    )
+
+
+def exporter_create_compaction_rules(
+    rts, timeseries_name, labels, compaction_policy, updated_labels=False
+):
+    """
+    Maintains the downsampled companion series of timeseries_name: one series
+    per tier bucket and aggregation, with the source labels plus the compaction
+    label, fed by a TS.CREATERULE rule. Companion series created for a source
+    that already has samples are backfilled with its closed buckets ( the
+    still open one is aggregated by the rule ).
+    Returns the number of created rules.
+    """
+    last_sample = rts.ts().get(timeseries_name)
+    last_timestamp = None
+    if last_sample is not None and len(last_sample) > 0:
+        last_timestamp = int(last_sample[0])
+    existing_rules = []
+    for rule in rts.ts().info(timeseries_name).rules:
+        dest_name = rule[0]
+        if type(dest_name) is bytes:
+            dest_name = dest_name.decode()
+        existing_rules.append(dest_name)
+    created_rules = 0
+    for tier in compaction_policy["tiers"]:
+        bucket_ms = tier["bucket_ms"]
+        for aggregation in tier["aggregations"]:
+            dest_name = get_compaction_ts_name(timeseries_name, aggregation, bucket_ms)
+            dest_labels = labels.copy()
+            dest_labels[COMPACTION_LABEL] = get_compaction_label_value(
+                aggregation, bucket_ms
+            )
+            if dest_name in existing_rules:
+                if updated_labels:
+                    rts.ts().alter(dest_name, labels=dest_labels)
+                continue
+            logging.debug(
+                "Creating compaction rule {} {}ms from {} to {}".format(
+                    aggregation, bucket_ms, timeseries_name, dest_name
+                )
+            )
+            if rts.exists(dest_name):
+                rts.ts().alter(dest_name, labels=dest_labels)
+            else:
+                rts.ts().create(
+                    dest_name,
+                    labels=dest_labels,
+                    retention_msecs=tier["retention_ms"],
+                    chunk_size=128,
+                    duplicate_policy="last",
+                )
+            buckets = []
+            if last_timestamp is not None:
+                open_bucket_start = last_timestamp - last_timestamp % bucket_ms
+                if open_bucket_start > 0:
+                    buckets = rts.ts().range(
+                        timeseries_name,
+                        "-",
+                        open_bucket_start - 1,
+                        aggregation_type=aggregation,
+                        bucket_size_msec=bucket_ms,
+                    )
+            if len(buckets) > 0:
+                rts.ts().madd(
+                    [(dest_name, timestamp, value) for timestamp, value in buckets]
+                )
+            rts.ts().createrule(timeseries_name, dest_name, aggregation, bucket_ms)
+            created_rules += 1
+    return created_rules
+
+
 def check_rts_labels(rts, time_series, timeseries_name):
     updated_create = False
     logging.debug(
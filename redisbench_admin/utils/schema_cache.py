@@ -0,0 +1,196 @@
+#  Apache License Version 2.0
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+# environment variables
+SCHEMA_CACHE_ENABLED = bool(int(os.getenv("PERFORMANCE_RTS_SCHEMA_CACHE", "1")))
+SCHEMA_CACHE_TTL_SECS = int(
+    os.getenv("PERFORMANCE_RTS_SCHEMA_CACHE_TTL_SECS", "{}".format(7 * 24 * 60 * 60))
+)
+SCHEMA_CACHE_MAX_ENTRIES = int(
+    os.getenv("PERFORMANCE_RTS_SCHEMA_CACHE_MAX_ENTRIES", "200000")
+)
+SCHEMA_CACHE_DIRNAME = ".redisbench-admin"
+# avoid rewriting the cache file only to refresh the last used timestamps
+SCHEMA_CACHE_LAST_USED_RESOLUTION_SECS = 60 * 60
+
+
+def get_labels_hash(labels: dict, compaction_policy=None):
+    # RedisTimeSeries stores every label value as a string
+    labels_str = json.dumps(
+        sorted([(str(k), str(v)) for k, v in labels.items()]), separators=(",", ":")
+    )
+    # the compaction rules are part of the validated schema as well, so that
+    # a policy change is applied to the already cached series
+    if compaction_policy is not None:
+        labels_str += json.dumps(
+            compaction_policy, sort_keys=True, separators=(",", ":")
+        )
+    return hashlib.sha1(labels_str.encode()).hexdigest()
+
+
+def get_datasink_id(rts):
+    connection_kwargs = rts.connection_pool.connection_kwargs
+    datasink_id = "{}_{}_{}".format(
+        connection_kwargs.get("host", "localhost"),
+        connection_kwargs.get("port", 6379),
+        connection_kwargs.get("db", 0),
+    )
+    return datasink_id.replace("/", "_")
+
+
+def get_schema_cache_filename(rts, local_dir="./"):
+    return os.path.join(
+        local_dir,
+        SCHEMA_CACHE_DIRNAME,
+        "rts-schema-cache-{}.json".format(get_datasink_id(rts)),
+    )
+
+
+def load_schema_cache(
+    rts,
+    local_dir="./",
+    ttl_secs=SCHEMA_CACHE_TTL_SECS,
+    max_entries=SCHEMA_CACHE_MAX_ENTRIES,
+):
+    schema_cache = None
+    if SCHEMA_CACHE_ENABLED and rts is not None:
+        schema_cache = SchemaCache(
+            get_schema_cache_filename(rts, local_dir), ttl_secs, max_entries
+        )
+        schema_cache.load()
+    return schema_cache
+
+
+class SchemaCache:
+    def __init__(
+        self,
+        filename,
+        ttl_secs=SCHEMA_CACHE_TTL_SECS,
+        max_entries=SCHEMA_CACHE_MAX_ENTRIES,
+    ):
+        """
+        Local cache of the time-series already known to exist on the datasink
+        with a given label set. Entries map the series name to
+        [labels hash, validated at, last used] (timestamps in seconds).
+        """
+        self.filename = filename
+        self.ttl_secs = ttl_secs
+        self.max_entries = max_entries
+        self.entries = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        if os.path.exists(self.filename) is False:
+            return
+        try:
+            with open(self.filename, "r") as cache_fd:
+                self.entries = json.load(cache_fd)
+            logging.info(
+                "Loaded {} time-series schemas from cache file {}".format(
+                    len(self.entries), self.filename
+                )
+            )
+        except (ValueError, OSError) as e:
+            logging.warning(
+                "Ignoring unreadable schema cache file {}. Error: {}".format(
+                    self.filename, e.__str__()
+                )
+            )
+            self.entries = {}
+        self.expire()
+
+    def save(self):
+        if self.dirty is False:
+            return
+        self.expire()
+        self.evict()
+        dirname = os.path.dirname(self.filename)
+        if dirname != "" and os.path.isdir(dirname) is False:
+            os.makedirs(dirname, exist_ok=True)
+        # write to a temporary file and rename, so concurrent runners never
+        # read a partially written cache
+        fd, tmp_filename = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as cache_fd:
+                json.dump(self.entries, cache_fd)
+            os.replace(tmp_filename, self.filename)
+            self.dirty = False
+        except OSError as e:
+            logging.warning(
+                "Unable to persist schema cache to {}. Error: {}".format(
+                    self.filename, e.__str__()
+                )
+            )
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+        logging.info(
+            "Schema cache {}: {} entries. {} hits, {} misses.".format(
+                self.filename, len(self.entries), self.hits, self.misses
+            )
+        )
+
+    def is_current(self, timeseries_name, labels: dict, compaction_policy=None):
+        now = time.time()
+        entry = self.entries.get(timeseries_name)
+        if (
+            entry is None
+            or entry[0] != get_labels_hash(labels, compaction_policy)
+            or now - entry[1] > self.ttl_secs
+        ):
+            self.misses += 1
+            return False
+        if now - entry[2] > SCHEMA_CACHE_LAST_USED_RESOLUTION_SECS:
+            entry[2] = now
+            self.dirty = True
+        self.hits += 1
+        return True
+
+    def update(self, timeseries_name, labels: dict, compaction_policy=None):
+        now = time.time()
+        self.entries[timeseries_name] = [
+            get_labels_hash(labels, compaction_policy),
+            now,
+            now,
+        ]
+        self.dirty = True
+
+    def invalidate(self, timeseries_name):
+        if self.entries.pop(timeseries_name, None) is not None:
+            self.dirty = True
+
+    def expire(self):
+        now = time.time()
+        expired = [
+            timeseries_name
+            for timeseries_name, entry in self.entries.items()
+            if now - entry[1] > self.ttl_secs
+        ]
+        for timeseries_name in expired:
+            del self.entries[timeseries_name]
+        if len(expired) > 0:
+            self.dirty = True
+
+    def evict(self):
+        overflow = len(self.entries) - self.max_entries
+        if overflow > 0:
+            # least recently used first
+            lru_names = sorted(self.entries, key=lambda name: self.entries[name][2])
+            for timeseries_name in lru_names[:overflow]:
+                del self.entries[timeseries_name]
+            logging.info(
+                "Evicted {} least recently used entries from schema cache".format(
+                    overflow
+                )
+            )
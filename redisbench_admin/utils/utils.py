@@ -13,6 +13,7 @@ import os
 import os.path
 import tarfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 from functools import reduce
 from urllib.parse import quote_plus
 from zipfile import ZipFile
@@ -23,6 +24,9 @@ import requests
 from tqdm import tqdm
 
 EPOCH = dt.datetime.utcfromtimestamp(0)
+# readiness polling backoff of wait_for_conn_ready
+WAIT_FOR_CONN_INITIAL_BACKOFF_SECS = 0.01
+WAIT_FOR_CONN_MAX_BACKOFF_SECS = 0.5
 
 
 def redis_server_config_module_part(
@@ -401,6 +405,71 @@ def wait_for_conn(conn, retries=20, command="PING", should_be=True, initial_slee
     return result
 
 
+def wait_for_conn_ready(
+    conn,
+    timeout_secs=20,
+    command="PING",
+    should_be=True,
+    process=None,
+    initial_backoff_secs=WAIT_FOR_CONN_INITIAL_BACKOFF_SECS,
+    max_backoff_secs=WAIT_FOR_CONN_MAX_BACKOFF_SECS,
+):
+    """
+    Waits until a given Redis connection replies should_be to command, polling
+    with an exponential backoff ( initial_backoff_secs doubling up to
+    max_backoff_secs ) instead of fixed 1 sec sleeps.
+    Gives up early if the given ( non daemonized ) process exits.
+    Returns True if ready within timeout_secs.
+    """
+    deadline = time.monotonic() + timeout_secs
+    backoff_secs = initial_backoff_secs
+    while True:
+        try:
+            if conn.execute_command(command) == should_be:
+                return True
+        except redis.exceptions.BusyLoadingError:
+            logging.debug("Redis is loading the dataset")
+        except redis.ConnectionError as err:
+            logging.debug("Catched error while waiting for connection {}".format(err))
+        except redis.ResponseError as err:
+            if not str(err).startswith("DENIED"):
+                raise
+        if process is not None and process.poll() is not None:
+            logging.error(
+                "Redis process with pid={} exited with code {} while waiting for it".format(
+                    process.pid, process.returncode
+                )
+            )
+            return False
+        remaining_secs = deadline - time.monotonic()
+        if remaining_secs <= 0:
+            logging.error(
+                "Redis was not ready within the timeout of {} secs".format(timeout_secs)
+            )
+            return False
+        time.sleep(min(backoff_secs, remaining_secs))
+        backoff_secs = min(backoff_secs * 2, max_backoff_secs)
+
+
+def wait_for_conns_ready(conns, timeout_secs=20, processes=None):
+    """
+    Checks the readiness of all connections in parallel ( see
+    wait_for_conn_ready ). Returns the list of results, following the
+    connections order.
+    """
+    if processes is None:
+        processes = [None for _ in conns]
+    if len(conns) == 0:
+        return []
+    with ThreadPoolExecutor(max_workers=len(conns)) as executor:
+        return list(
+            executor.map(
+                lambda x: wait_for_conn_ready(x[0], timeout_secs, process=x[1]),
+                zip(conns, processes),
+            )
+        )
+
+
 def make_dashboard_callback(
     callback_url,
     return_code,
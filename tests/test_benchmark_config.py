@@ -14,6 +14,8 @@ from redisbench_admin.utils.benchmark_config import (
     prepare_benchmark_definitions,
     process_benchmark_definitions_remote_timeouts,
     get_testfiles_to_process,
+    get_defaults_compaction_policy,
+    parse_duration_ms,
 )
 
 
@@ -319,3 +321,40 @@ def test_get_testfiles_to_process():
     assert (
         test_files_to_process_all[4:6] == test_files_to_process_all_glob_group_member_5
     )
+
+
+def test_parse_duration_ms():
+    assert parse_duration_ms(1000) == 1000
+    assert parse_duration_ms("1000") == 1000
+    assert parse_duration_ms("10s") == 10000
+    assert parse_duration_ms("1d") == 24 * 60 * 60 * 1000
+    assert parse_duration_ms("2w") == 14 * 24 * 60 * 60 * 1000
+    try:
+        parse_duration_ms("1 year")
+        assert False
+    except ValueError:
+        pass
+
+
+def test_get_defaults_compaction_policy():
+    assert get_defaults_compaction_policy("./tests/test_data/defaults.yml") is None
+    assert get_defaults_compaction_policy("./tests/test_data/missing.yml") is None
+    compaction_policy = get_defaults_compaction_policy(
+        "./tests/test_data/defaults-compaction.yml"
+    )
+    day_ms = 24 * 60 * 60 * 1000
+    assert compaction_policy == {
+        "retention_ms": 90 * day_ms,
+        "tiers": [
+            {
+                "bucket_ms": day_ms,
+                "aggregations": ["avg", "min", "max"],
+                "retention_ms": 365 * day_ms,
+            },
+            {
+                "bucket_ms": 7 * day_ms,
+                "aggregations": ["avg", "min", "max"],
+                "retention_ms": 0,
+            },
+        ],
+    }
@@ -0,0 +1,143 @@
+import argparse
+import json
+
+import numpy as np
+import redis
+
+from redisbench_admin.changepoints.args import create_detect_changepoints_arguments
+from redisbench_admin.changepoints.changepoints import (
+    detect_changepoints,
+    get_changepoints_filters,
+    get_project_changepoints_keys,
+)
+from redisbench_admin.changepoints.detection import get_changepoints_batch
+
+
+def test_get_changepoints_batch():
+    rng = np.random.default_rng(0)
+    two_steps = np.concatenate(
+        [
+            100.0 + rng.normal(0, 2, 60),
+            85.0 + rng.normal(0, 2, 40),
+            110.0 + rng.normal(0, 2, 50),
+        ]
+    )
+    noise = 100.0 + rng.normal(0, 3, 150)
+    # a shift below --min-change-percent is ignored
+    small_step = np.concatenate([100.0 + rng.normal(0, 0.1, 50), np.full(50, 102.0)])
+    changepoints = get_changepoints_batch(
+        [two_steps, noise, np.full(30, 5.0), small_step, np.array([1.0]), []]
+    )
+    assert len(changepoints[0]) == 2
+    assert abs(changepoints[0][0][0] - 60) <= 1
+    assert abs(changepoints[0][1][0] - 100) <= 1
+    index, before, after, pct_change = changepoints[0][0]
+    assert abs(before - 100.0) < 2.0
+    assert abs(after - 85.0) < 2.0
+    assert round(pct_change, 6) == round((after - before) / before * 100.0, 6)
+    assert changepoints[1:] == [[], [], [], [], []]
+    # change points need --min-segment-size samples on each side
+    short = np.concatenate([np.full(6, 100.0), np.full(3, 80.0)])
+    assert get_changepoints_batch([short], min_segment_size=5) == [[]]
+    assert get_changepoints_batch([short], min_segment_size=3) == [
+        [(6, 100.0, 80.0, -20.0)]
+    ]
+
+
+def test_get_changepoints_filters():
+    assert get_changepoints_filters("org", "repo", "circleci", "branch", "master") == [
+        "github_org=org",
+        "github_repo=repo",
+        "triggering_env=circleci",
+        "branch=master",
+        "compaction=",
+    ]
+    assert get_changepoints_filters(
+        "org",
+        "repo",
+        "circleci",
+        "version",
+        "1.0",
+        "rps",
+        "oss-standalone",
+        None,
+        ["arch=aarch64"],
+    )[3:] == [
+        "version=1.0",
+        "compaction=",
+        "metric=rps",
+        "deployment_name=oss-standalone",
+        "arch=aarch64",
+    ]
+
+
+def test_detect_changepoints_args():
+    parser = argparse.ArgumentParser()
+    parser = create_detect_changepoints_arguments(parser)
+    args = parser.parse_args(
+        args=["--extra-filter", "arch=aarch64", "--extra-filter", "os=linux"]
+    )
+    assert args.branch == "master"
+    assert args.extra_filter == ["arch=aarch64", "os=linux"]
+    assert args.dry_run is False
+
+
+def test_detect_changepoints(tmp_path):
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        rng = np.random.default_rng(0)
+        for test_name, step in [("test1", -20.0), ("test2", 0.0), ("test,3", 30.0)]:
+            ts_name = (
+                "ci.benchmarks.redislabs/by.branch/circleci/org/repo/{}:rps".format(
+                    test_name
+                )
+            )
+            rts.ts().create(
+                ts_name,
+                labels={
+                    "github_org": "org",
+                    "github_repo": "repo",
+                    "triggering_env": "circleci",
+                    "branch": "master",
+                    "test_name": test_name,
+                },
+            )
+            values = 100.0 + rng.normal(0, 1, 40)
+            values[25:] += step
+            for timestamp, value in enumerate(values):
+                rts.ts().add(ts_name, (timestamp + 1) * 1000, float(value))
+        filters = get_changepoints_filters(
+            "org", "repo", "circleci", "branch", "master"
+        )
+        zset_key, series_key = get_project_changepoints_keys("circleci", "org", "repo")
+        for workers in [1, 2]:
+            total_series, changepoints = detect_changepoints(
+                rts,
+                filters,
+                ["test1", "test2", "test,3"],
+                0,
+                100000,
+                workers=workers,
+                zset_key=zset_key,
+                series_key=series_key,
+                chunk_size=1,
+            )
+            assert total_series == 3
+            assert [(x[0], x[1]) for x in changepoints] == [
+                (26000, "test,3"),
+                (26000, "test1"),
+            ]
+            # re-running replaces the previous annotations
+            assert rts.zcard(zset_key) == 2
+        test1_ts_name = changepoints[1][2]
+        assert rts.zscore(zset_key, "{}:{}".format(test1_ts_name, 26000)) == float(
+            26000
+        )
+        details = json.loads(rts.hget(series_key, test1_ts_name))
+        assert len(details) == 1
+        assert details[0]["test_name"] == "test1"
+        assert details[0]["pct_change"] < -15.0
+    except redis.exceptions.ConnectionError:
+        pass
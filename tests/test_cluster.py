@@ -3,7 +3,67 @@
 #  Copyright (c) 2021., Redis Labs Modules
 #  All rights reserved.
 #
+import redis
+
+from redisbench_admin.environments.oss_cluster import (
+    cluster_addslots_range,
+    generate_cluster_slots_ranges,
+    wait_for_cluster_convergence,
+)
 
 
 def test_generate_startup_nodes_array():
     assert True
+
+
+class FakeClusterConn:
+    def __init__(self, addslotsrange=True, infos=None):
+        self.addslotsrange = addslotsrange
+        self.infos = infos
+        self.commands = []
+
+    def execute_command(self, *args):
+        self.commands.append(args)
+        if args[0] == "CLUSTER ADDSLOTSRANGE" and self.addslotsrange is False:
+            raise redis.exceptions.ResponseError(
+                "Unknown subcommand or wrong number of arguments for 'ADDSLOTSRANGE'"
+            )
+        if args[0] == "CLUSTER INFO":
+            return self.infos.pop(0) if len(self.infos) > 1 else self.infos[0]
+        return True
+
+
+def test_generate_cluster_slots_ranges():
+    assert generate_cluster_slots_ranges(1) == [(0, 16383)]
+    assert generate_cluster_slots_ranges(3) == [
+        (0, 5460),
+        (5461, 10921),
+        (10922, 16383),
+    ]
+    slots_ranges = generate_cluster_slots_ranges(32)
+    assert len(slots_ranges) == 32
+    assert sum([end - start + 1 for start, end in slots_ranges]) == 16384
+
+
+def test_cluster_addslots_range():
+    conn = FakeClusterConn()
+    cluster_addslots_range(conn, 0, 5460)
+    assert conn.commands == [("CLUSTER ADDSLOTSRANGE", 0, 5460)]
+    # older servers fallback to ADDSLOTS
+    conn = FakeClusterConn(addslotsrange=False)
+    cluster_addslots_range(conn, 10, 12)
+    assert conn.commands[-1] == ("CLUSTER ADDSLOTS", 10, 11, 12)
+
+
+def test_wait_for_cluster_convergence():
+    converged = {"cluster_slots_ok": "16384", "cluster_state": "ok"}
+    pending = {"cluster_slots_ok": "16384", "cluster_state": "fail"}
+    conns = [
+        FakeClusterConn(infos=[converged]),
+        FakeClusterConn(infos=[{"cluster_slots_ok": "0", "cluster_state": "fail"}]),
+    ]
+    assert wait_for_cluster_convergence(conns, 0.05) is False
+    conns[1].infos = [pending, pending, converged]
+    conns[1].commands = []
+    assert wait_for_cluster_convergence(conns, 5) is True
+    assert len(conns[1].commands) == 3
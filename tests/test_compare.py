@@ -1,10 +1,45 @@
 import argparse
+import json
+import math
 import os
+import re
+import statistics
 
+import numpy as np
 import redis
 
 from redisbench_admin.compare.args import create_compare_arguments
-from redisbench_admin.compare.compare import compare_command_logic
+from redisbench_admin.compare.matrix import (
+    compute_matrix_regression_table,
+    get_matrix_by_strings,
+)
+from redisbench_admin.compare.output import (
+    CompareRecordsWriter,
+    get_compare_record,
+    get_float_or_none,
+)
+from redisbench_admin.compare.series_cache import SeriesCache
+from redisbench_admin.compare.significance import (
+    get_mann_whitney_exact_p_value,
+    get_mann_whitney_u_batch,
+    get_significance_batch,
+)
+from redisbench_admin.compare.stats import (
+    get_datapoints_stats,
+    get_datapoints_stats_batch,
+)
+from redisbench_admin.compare.compare import (
+    compare_command_logic,
+    compute_regression_table,
+    get_compaction_tier,
+    get_compare_aggregation,
+    get_defaults_comparison_metrics,
+    get_regex_literal_prefix,
+    get_test_names_filter_chunks,
+    get_test_names_from_db,
+    get_timeseries_by_test_name,
+    prepare_value_str,
+)
 from redisbench_admin.export.args import create_export_arguments
 from redisbench_admin.export.export import export_command_logic
 
@@ -142,3 +177,792 @@ def test_compare_command_logic():
         assert "Automated performance analysis summary" in comment_body
     except SystemExit as e:
         assert e.code == 0
+
+
+def test_compute_regression_table_bulk_fetch(tmp_path):
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        test_names = ["test1", "test2", "test3", "test,4"]
+        for branch, base_value in [("master", 100.0), ("comparison", 90.0)]:
+            for pos, test_name in enumerate(test_names):
+                labels = {
+                    "branch": branch,
+                    "metric": "rps",
+                    "test_name": test_name,
+                    "deployment_name": "oss-standalone",
+                    "triggering_env": "circleci",
+                }
+                ts_names = ["{}:{}:Totals:rps".format(branch, test_name)]
+                if test_name == "test2":
+                    # only the Totals time-series is used
+                    ts_names.append("{}:{}:Gets:rps".format(branch, test_name))
+                if test_name == "test3":
+                    # target time-series are ignored
+                    ts_names.append("{}:{}:target:rps".format(branch, test_name))
+                for ts_name in ts_names:
+                    rts.ts().create(ts_name, labels=labels)
+                    for timestamp in range(1, 11):
+                        rts.ts().add(
+                            ts_name, timestamp, base_value + pos + (timestamp % 3)
+                        )
+        results = []
+        series_cache = SeriesCache(os.path.join(tmp_path, "compare-cache"))
+        for bulk_fetch, compare_workers, cache in [
+            (True, 1, None),
+            (False, 1, None),
+            (True, 4, None),
+            (False, 4, None),
+            (True, 4, series_cache),
+            (True, 4, series_cache),
+        ]:
+            results.append(
+                compute_regression_table(
+                    rts,
+                    "redis-org",
+                    "redis-repo",
+                    "circleci",
+                    "rps",
+                    "comparison",
+                    "master",
+                    test=",".join(test_names),
+                    from_ts_ms=0,
+                    to_ts_ms=100,
+                    last_n_baseline=7,
+                    last_n_comparison=1,
+                    bulk_fetch=bulk_fetch,
+                    compare_workers=compare_workers,
+                    series_cache=cache,
+                )
+            )
+        assert series_cache.hits > 0
+        # same output regardless of the fetch mode, workers and local cache
+        for result in results[1:]:
+            assert results[0] == result
+        (
+            detected_regressions,
+            table_output,
+            _,
+            total_regressions,
+            _,
+            _,
+            total_comparison_points,
+        ) = results[0]
+        # test,4 is split by the --test comma separated list
+        assert total_comparison_points == 3
+        assert total_regressions == 3
+        assert detected_regressions == ["test1", "test2", "test3"]
+
+        for detection_method, ncolumns in [("mann-whitney", 7), ("bootstrap", 8)]:
+            (
+                detected_regressions,
+                table_output,
+                _,
+                total_regressions,
+                _,
+                _,
+                total_comparison_points,
+            ) = compute_regression_table(
+                rts,
+                "redis-org",
+                "redis-repo",
+                "circleci",
+                "rps",
+                "comparison",
+                "master",
+                test=",".join(test_names),
+                from_ts_ms=0,
+                to_ts_ms=100,
+                detection_method=detection_method,
+            )
+            assert total_regressions == 3
+            assert detected_regressions == ["test1", "test2", "test3"]
+            assert "p-value ({})".format(detection_method) in table_output
+            header = [
+                line for line in table_output.splitlines() if "Test Case" in line
+            ][0]
+            assert len(header.strip("|").split("|")) == ncolumns
+
+        # test names that can't be part of a multi value filter
+        timeseries_by_test_name = get_timeseries_by_test_name(
+            rts,
+            ["branch=master", "metric=rps"],
+            "test_name",
+            test_names,
+            0,
+            100,
+        )
+        assert list(timeseries_by_test_name.keys()) == test_names
+        assert len(timeseries_by_test_name["test,4"]) == 1
+        assert len(timeseries_by_test_name["test2"]) == 2
+        assert timeseries_by_test_name["test1"]["master:test1:Totals:rps"][0] == (
+            10,
+            101.0,
+        )
+    except redis.exceptions.ConnectionError:
+        pass
+
+
+def test_compute_regression_table_multi_metric(monkeypatch):
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        test_names = ["test1", "test2"]
+        # the comparison branch is 10% slower on every metric
+        for branch, factor in [("master", 1.0), ("comparison", 1.1)]:
+            for test_name in test_names:
+                for metric, base_value in [("rps", 100.0), ("p50", 1.0)]:
+                    if metric == "rps":
+                        factor_value = base_value / factor
+                    else:
+                        factor_value = base_value * factor
+                    ts_name = "{}:{}:Totals:{}".format(branch, test_name, metric)
+                    rts.ts().create(
+                        ts_name,
+                        labels={
+                            "branch": branch,
+                            "metric": metric,
+                            "test_name": test_name,
+                            "deployment_name": "oss-standalone",
+                            "triggering_env": "circleci",
+                        },
+                    )
+                    for timestamp in range(1, 11):
+                        rts.ts().add(ts_name, timestamp, factor_value)
+        results = []
+        for bulk_fetch in [True, False]:
+            results.append(
+                compute_regression_table(
+                    rts,
+                    "redis-org",
+                    "redis-repo",
+                    "circleci",
+                    "(rps,p50)",
+                    "comparison",
+                    "master",
+                    test=",".join(test_names),
+                    from_ts_ms=0,
+                    to_ts_ms=100,
+                    bulk_fetch=bulk_fetch,
+                    metric_modes={"p50": "lower-better"},
+                )
+            )
+        assert results[0] == results[1]
+        # one test per chunk, all metrics of a test are fetched together
+        monkeypatch.setattr(
+            "redisbench_admin.compare.compare.COMPARE_TESTS_CHUNK_SIZE", 1
+        )
+        chunked_result = compute_regression_table(
+            rts,
+            "redis-org",
+            "redis-repo",
+            "circleci",
+            "(rps,p50)",
+            "comparison",
+            "master",
+            test=",".join(test_names),
+            from_ts_ms=0,
+            to_ts_ms=100,
+            metric_modes={"p50": "lower-better"},
+        )
+        assert chunked_result[1:] == results[0][1:]
+        assert sorted(chunked_result[0]) == sorted(results[0][0])
+        (
+            detected_regressions,
+            table_output,
+            total_improvements,
+            total_regressions,
+            _,
+            _,
+            total_comparison_points,
+        ) = results[0]
+        assert total_comparison_points == 4
+        assert total_regressions == 4
+        assert total_improvements == 0
+        assert detected_regressions == [
+            "test1 (rps)",
+            "test2 (rps)",
+            "test1 (p50)",
+            "test2 (p50)",
+        ]
+        # rows are grouped by test, and each metric has its own counters
+        rows = [line for line in table_output.splitlines() if "|test" in line]
+        assert [row.split("|")[2].strip() for row in rows] == [
+            "rps (higher-better)",
+            "p50 (lower-better)",
+            "rps (higher-better)",
+            "p50 (lower-better)",
+        ]
+        assert "|p50   |lower-better |          2|" in table_output
+    except redis.exceptions.ConnectionError:
+        pass
+
+
+def test_compute_regression_table_server_aggregation():
+    assert get_compare_aggregation(None, 1000) is None
+    assert get_compare_aggregation("avg", 1000) == ("avg", 1000)
+    # the raw sample variance threshold doesn't apply to bucket aggregates
+    assert "UNSTABLE" in prepare_value_str(20.0, 100.0, 5, False)
+    assert prepare_value_str(20.0, 100.0, 5, False, True) == " 100 +- 20.0% (5 buckets)"
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        # 100 datapoints per branch, 10 per bucket of 10ms
+        for branch, base_value in [("master", 100.0), ("comparison", 80.0)]:
+            ts_name = "{}:test1:Totals:rps".format(branch)
+            rts.ts().create(
+                ts_name,
+                labels={
+                    "branch": branch,
+                    "metric": "rps",
+                    "test_name": "test1",
+                    "deployment_name": "oss-standalone",
+                    "triggering_env": "circleci",
+                },
+            )
+            for timestamp in range(0, 100):
+                rts.ts().add(ts_name, timestamp, base_value + timestamp % 10)
+        results = []
+        for bulk_fetch in [True, False]:
+            results.append(
+                compute_regression_table(
+                    rts,
+                    "redis-org",
+                    "redis-repo",
+                    "circleci",
+                    "rps",
+                    "comparison",
+                    "master",
+                    test="test1",
+                    from_ts_ms=0,
+                    to_ts_ms=100,
+                    bulk_fetch=bulk_fetch,
+                    aggregation=("avg", 10),
+                )
+            )
+        assert results[0] == results[1]
+        (detected_regressions, table_output, _, total_regressions, *_) = results[0]
+        assert total_regressions == 1
+        assert detected_regressions == ["test1"]
+        # every bucket average is used as one observation, labeled as such
+        assert "104 +- 0.0% (10 buckets)" in table_output
+        assert "84 +- 0.0% (10 buckets)" in table_output
+        assert "median bucket +- std.dev across buckets" in table_output
+    except redis.exceptions.ConnectionError:
+        pass
+
+
+def test_compute_regression_table_jsonl_records(tmp_path, monkeypatch):
+    # one test per chunk, so records are written while comparing the next ones
+    monkeypatch.setattr("redisbench_admin.compare.compare.COMPARE_TESTS_CHUNK_SIZE", 1)
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        for branch in ["master", "comparison"]:
+            for test_name, value in [("test1", 100.0), ("test2", 100.0)]:
+                if branch == "comparison" and test_name == "test2":
+                    value = 50.0
+                ts_name = "{}:{}:Totals:rps".format(branch, test_name)
+                rts.ts().create(
+                    ts_name,
+                    labels={
+                        "branch": branch,
+                        "metric": "rps",
+                        "test_name": test_name,
+                        "deployment_name": "oss-standalone",
+                        "triggering_env": "circleci",
+                    },
+                )
+                for timestamp in range(1, 6):
+                    rts.ts().add(ts_name, timestamp, value)
+        output_file = str(tmp_path / "compare.jsonl")
+        records_writer = CompareRecordsWriter(output_file)
+        (
+            detected_regressions,
+            _,
+            _,
+            total_regressions,
+            total_stable,
+            _,
+            total_comparison_points,
+        ) = compute_regression_table(
+            rts,
+            "redis-org",
+            "redis-repo",
+            "circleci",
+            "rps",
+            "comparison",
+            "master",
+            test="test1,test2,test3",
+            from_ts_ms=0,
+            to_ts_ms=100,
+            last_n_baseline=3,
+            records_writer=records_writer,
+        )
+        records_writer.close()
+        assert records_writer.total_records == 2
+        assert total_comparison_points == 2
+        assert total_regressions == 1
+        assert total_stable == 1
+        assert detected_regressions == ["test2"]
+        with open(output_file) as fd:
+            records = [json.loads(line) for line in fd]
+        assert [record["test_name"] for record in records] == ["test1", "test2"]
+        assert records[0]["classification"] == "stable"
+        assert records[1]["classification"] == "regression"
+        assert records[1]["metric"] == "rps"
+        assert records[1]["pct_change"] == -50.0
+        assert records[1]["baseline"] == {
+            "raw_samples": 5,
+            "samples": 3,
+            "median": 100.0,
+            "cv_pct": 0.0,
+        }
+        assert records[1]["comparison"]["median"] == 50.0
+        assert "p_value" not in records[1]
+    except redis.exceptions.ConnectionError:
+        pass
+
+
+def test_get_compare_record():
+    assert get_float_or_none(float("inf")) is None
+    assert get_float_or_none(float("nan")) is None
+    assert get_float_or_none(1) == 1.0
+    # a zero baseline yields an infinite change, which isn't valid JSON
+    record = get_compare_record(
+        "test1",
+        "rps",
+        "higher-better",
+        ([(1, 0.0)], [(1, 1.0)]),
+        ((0.0, 0.0, 0.0, 1), (1.0, 0.0, 0.0, 1)),
+        float("inf"),
+        "stable",
+        "",
+    )
+    assert record["pct_change"] is None
+    json.loads(json.dumps(record, allow_nan=False))
+
+
+def test_get_compaction_tier():
+    day_ms = 24 * 60 * 60 * 1000
+    compaction_policy = {
+        "retention_ms": None,
+        "tiers": [
+            {"bucket_ms": day_ms, "aggregations": ["avg"], "retention_ms": 0},
+            {
+                "bucket_ms": 7 * day_ms,
+                "aggregations": ["avg", "max"],
+                "retention_ms": 365 * day_ms,
+            },
+        ],
+    }
+    now_ms = 1000 * day_ms
+    assert get_compaction_tier(None, None, 0, now_ms, now_ms) is None
+    # a month window has too few weekly buckets
+    assert (
+        get_compaction_tier(
+            compaction_policy, None, now_ms - 31 * day_ms, now_ms, now_ms
+        )
+        == "avg_86400000"
+    )
+    # the coarsest tier serving the window is used
+    assert get_compaction_tier(
+        compaction_policy, None, now_ms - 300 * day_ms, now_ms, now_ms
+    ) == "avg_{}".format(7 * day_ms)
+    # the weekly tier doesn't retain datapoints that old
+    assert (
+        get_compaction_tier(
+            compaction_policy, None, now_ms - 400 * day_ms, now_ms, now_ms
+        )
+        == "avg_86400000"
+    )
+    assert get_compaction_tier(
+        compaction_policy, ("max", day_ms), now_ms - 300 * day_ms, now_ms, now_ms
+    ) == "max_{}".format(7 * day_ms)
+    assert (
+        get_compaction_tier(
+            compaction_policy, ("min", day_ms), now_ms - 300 * day_ms, now_ms, now_ms
+        )
+        is None
+    )
+    # too short for any tier
+    assert (
+        get_compaction_tier(compaction_policy, None, now_ms - day_ms, now_ms, now_ms)
+        is None
+    )
+
+
+def test_compute_regression_table_compaction_tier():
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        for branch, raw_value, tier_value in [
+            ("master", 100.0, 100.0),
+            ("comparison", 100.0, 80.0),
+        ]:
+            labels = {
+                "branch": branch,
+                "metric": "rps",
+                "test_name": "test1",
+                "deployment_name": "oss-standalone",
+                "triggering_env": "circleci",
+            }
+            ts_name = "{}:test1:Totals:rps".format(branch)
+            rts.ts().create(ts_name, labels=labels)
+            labels["compaction"] = "avg_10"
+            rts.ts().create("{}:avg_10".format(ts_name), labels=labels)
+            for timestamp in range(0, 10):
+                rts.ts().add(ts_name, timestamp, raw_value)
+                rts.ts().add("{}:avg_10".format(ts_name), timestamp, tier_value)
+        for compaction_tier, expected_regressions in [(None, 0), ("avg_10", 1)]:
+            for metric_name, bulk_fetch in [
+                ("rps", True),
+                ("rps", False),
+                ("(rps,p50)", True),
+            ]:
+                (
+                    detected_regressions,
+                    _,
+                    _,
+                    total_regressions,
+                    *_,
+                ) = compute_regression_table(
+                    rts,
+                    "redis-org",
+                    "redis-repo",
+                    "circleci",
+                    metric_name,
+                    "comparison",
+                    "master",
+                    test="test1",
+                    from_ts_ms=0,
+                    to_ts_ms=100,
+                    bulk_fetch=bulk_fetch,
+                    compaction_tier=compaction_tier,
+                )
+                assert total_regressions == expected_regressions
+    except redis.exceptions.ConnectionError:
+        pass
+
+
+def test_get_defaults_comparison_metrics():
+    metrics, metric_modes = get_defaults_comparison_metrics(
+        {
+            "metrics": [
+                "$.Tests.Overall.rps",
+                {"$.Tests.Overall.p50_latency_ms": "lower-better"},
+            ],
+            "mode": "higher-better",
+        }
+    )
+    assert metrics == ["Tests.Overall.rps", "Tests.Overall.p50_latency_ms"]
+    assert metric_modes == {
+        "Tests.Overall.rps": "higher-better",
+        "Tests.Overall.p50_latency_ms": "lower-better",
+    }
+    assert get_defaults_comparison_metrics({"metrics": ["Ops/sec"]}) == (
+        ["Ops/sec"],
+        {},
+    )
+
+
+def test_get_matrix_by_strings():
+    entries, reference_entry = get_matrix_by_strings("unstable", "7.0.0,7.2.0")
+    assert entries == [
+        ("branch", "unstable"),
+        ("version", "7.0.0"),
+        ("version", "7.2.0"),
+    ]
+    assert reference_entry == ("branch", "unstable")
+    _, reference_entry = get_matrix_by_strings("unstable", "7.0.0,7.2.0", "7.0.0")
+    assert reference_entry == ("version", "7.0.0")
+
+
+def test_compute_matrix_regression_table():
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        entries = [
+            ("version", "7.0.0", 100.0),
+            ("version", "7.2.0", 110.0),
+            ("version", "7.4.0", 90.0),
+            ("branch", "unstable", 101.0),
+        ]
+        for by_str, value, rps in entries:
+            for test_name in ["test1", "test2"]:
+                ts_names = ["by.{}/{}/{}:Totals:rps".format(by_str, value, test_name)]
+                if test_name == "test2":
+                    # only the Totals time-series is used
+                    ts_names.append(
+                        "by.{}/{}/{}:Gets:rps".format(by_str, value, test_name)
+                    )
+                for ts_name in ts_names:
+                    rts.ts().create(
+                        ts_name,
+                        labels={
+                            by_str: value,
+                            "metric": "rps",
+                            "test_name": test_name,
+                            "deployment_name": "oss-standalone",
+                            "triggering_env": "circleci",
+                        },
+                    )
+                    for timestamp in range(1, 4):
+                        rts.ts().add(ts_name, timestamp, rps)
+        table_output, totals = compute_matrix_regression_table(
+            rts,
+            [(by_str, value) for by_str, value, _ in entries],
+            ("version", "7.0.0"),
+            "rps",
+            ["test1", "test2", "test3"],
+            from_ts_ms=0,
+            to_ts_ms=100,
+        )
+        assert totals == {"7.2.0": (0, 2), "7.4.0": (2, 0), "unstable": (0, 0)}
+        rows = [line for line in table_output.splitlines() if "|test" in line]
+        # tests without data for the reference are skipped
+        assert len(rows) == 2
+        columns = [x.strip() for x in rows[0].split("|")[1:-1]]
+        assert columns[0] == "test1"
+        assert columns[5:] == [
+            "10.0%",
+            "-10.0%",
+            "1.0%",
+            "IMPROVEMENT on 7.2.0, REGRESSION on 7.4.0",
+        ]
+    except redis.exceptions.ConnectionError:
+        pass
+
+
+def test_compute_matrix_regression_table_zero_median():
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        entries = [
+            ("version", "7.0.0", 0.0),
+            ("version", "7.2.0", 10.0),
+            ("branch", "unstable", 0.0),
+        ]
+        for by_str, value, rps in entries:
+            ts_name = "by.{}/{}/test1:Totals:rps".format(by_str, value)
+            rts.ts().create(
+                ts_name,
+                labels={
+                    by_str: value,
+                    "metric": "rps",
+                    "test_name": "test1",
+                    "deployment_name": "oss-standalone",
+                    "triggering_env": "circleci",
+                },
+            )
+            for timestamp in range(0, 20):
+                rts.ts().add(ts_name, timestamp, rps)
+        for metric_mode, expected_changes in [
+            ("higher-better", ["N/A", "N/A"]),
+            ("lower-better", ["-100.0%", "N/A"]),
+        ]:
+            table_output, totals = compute_matrix_regression_table(
+                rts,
+                [(by_str, value) for by_str, value, _ in entries],
+                ("version", "7.0.0"),
+                "rps",
+                ["test1"],
+                from_ts_ms=0,
+                to_ts_ms=100,
+                metric_mode=metric_mode,
+                aggregation=("avg", 10),
+            )
+            rows = [line for line in table_output.splitlines() if "|test" in line]
+            columns = [x.strip() for x in rows[0].split("|")[1:-1]]
+            assert columns[4:6] == expected_changes
+            # every bucket average is used as one observation, labeled as such
+            assert "(2 buckets)" in columns[2]
+            assert "median bucket +- std.dev across buckets" in table_output
+            assert "median obs. +- std.dev" not in table_output
+    except redis.exceptions.ConnectionError:
+        pass
+
+
+def test_get_regex_literal_prefix():
+    assert get_regex_literal_prefix(".*") == ""
+    assert get_regex_literal_prefix("memtier") == ""
+    assert get_regex_literal_prefix("^memtier_benchmark-") == "memtier_benchmark-"
+    assert get_regex_literal_prefix(re.compile("^memtier.*get")) == "memtier"
+    assert get_regex_literal_prefix("^memtiers?-") == "memtier"
+    assert get_regex_literal_prefix("^memtier|ycsb") == ""
+
+
+def test_get_test_names_from_db():
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        set_key = "ci.benchmarks.redislabs/ci/org/repo:testcases"
+        for test_name, last_run_ts_ms in [
+            ("memtier-get", 100),
+            ("memtier-set", 10),
+            ("memtier-[hset]", 200),
+            ("ycsb-a", 200),
+        ]:
+            rts.sadd(set_key, test_name)
+            rts.zadd(set_key + ":zset", {test_name: last_run_ts_ms})
+        # a test only present on the set ( e.g. pushed by older versions )
+        rts.sadd(set_key, "memtier-old")
+        all_memtier = ["memtier-[hset]", "memtier-get", "memtier-old", "memtier-set"]
+        assert (
+            get_test_names_from_db(rts, re.compile("^memtier-"), [], set_key)
+            == all_memtier
+        )
+        assert get_test_names_from_db(rts, re.compile(".*"), [], set_key) == [
+            "memtier-[hset]",
+            "memtier-get",
+            "memtier-old",
+            "memtier-set",
+            "ycsb-a",
+        ]
+        # only the tests that ran since the window start
+        assert get_test_names_from_db(
+            rts, re.compile("^memtier-"), [], set_key, 50
+        ) == ["memtier-[hset]", "memtier-get"]
+        assert get_test_names_from_db(rts, re.compile("set"), [], set_key, 0) == [
+            "memtier-[hset]",
+            "memtier-set",
+        ]
+        # without the sorted set no test is filtered out
+        rts.delete(set_key + ":zset")
+        assert (
+            get_test_names_from_db(rts, re.compile("^memtier-"), [], set_key, 50)
+            == all_memtier
+        )
+    except redis.exceptions.ConnectionError:
+        pass
+
+
+def test_get_test_names_filter_chunks():
+    assert get_test_names_filter_chunks([]) == []
+    assert get_test_names_filter_chunks(["a", "b", "c"], 2) == [["a", "b"], ["c"]]
+    assert get_test_names_filter_chunks(["a", "b(1)", "c"], 2) == [
+        ["b(1)"],
+        ["a", "c"],
+    ]
+
+
+def test_get_datapoints_stats_batch():
+    datapoints = [(1, 10.0), (2, 12.0), (3, 11.0), (4, 20.0)]
+    median, std, cv, count = get_datapoints_stats_batch(
+        [datapoints, datapoints, datapoints[:1], []], [-1, 3, -1, -1], [-1, 1, -1, -1]
+    )
+    assert list(count) == [4, 2, 1, 0]
+    assert median[0] == 11.5
+    assert round(std[0], 4) == round(statistics.stdev([10.0, 12.0, 11.0, 20.0]), 4)
+    assert round(cv[0], 4) == round(std[0] / 11.5 * 100.0, 4)
+    # [first_n:last_n] window
+    assert median[1] == 11.5
+    assert round(std[1], 4) == round(statistics.stdev([12.0, 11.0]), 4)
+    # a single sample has no std-dev, and an empty window has no median
+    assert median[2] == 10.0
+    assert math.isnan(std[2])
+    assert math.isnan(median[3])
+    assert get_datapoints_stats(datapoints, 3, 1) == (
+        median[1],
+        std[1],
+        cv[1],
+        2,
+    )
+    # windows of very different lengths match the per window results
+    rng = np.random.default_rng(0)
+    datapoints_list = [
+        [(ts, value) for ts, value in enumerate(rng.random(length))]
+        for length in [2000, 3, 50, 0, 1]
+    ]
+    median, std, cv, count = get_datapoints_stats_batch(
+        datapoints_list, [-1] * 5, [-1] * 5
+    )
+    assert list(count) == [2000, 3, 50, 0, 1]
+    for pos in [0, 1, 2]:
+        values = [value for _, value in datapoints_list[pos]]
+        assert math.isclose(median[pos], statistics.median(values))
+        assert math.isclose(std[pos], statistics.stdev(values))
+
+
+def test_get_significance_batch():
+    # exact two-sided p-values of fully separated samples
+    assert round(get_mann_whitney_exact_p_value(0, 3, 3), 4) == 0.1
+    assert round(get_mann_whitney_exact_p_value(9, 3, 3), 4) == 0.1
+    assert get_mann_whitney_exact_p_value(4.5, 3, 3) == 1.0
+    baseline = [[100.0, 101.0, 102.0, 103.0, 104.0, 105.0]]
+    lower = [[90.0, 91.0, 92.0, 93.0, 94.0, 95.0]]
+    same = [[100.5, 101.5, 102.5, 103.5, 104.5, 105.5]]
+    # the normal approximation is used when there are ties
+    tied = [[100.0, 100.0, 101.0, 101.0, 102.0, 102.0]]
+    u, p_values, effect_size = get_mann_whitney_u_batch(
+        baseline * 3, lower + same + tied
+    )
+    assert list(u) == [0.0, 21.0, 9.0]
+    assert p_values[0] < 0.01
+    assert p_values[1] > 0.05
+    assert 0.0 < p_values[2] < 1.0
+    assert effect_size[0] == -1.0
+
+    for detection_method in ["mann-whitney", "bootstrap"]:
+        p_values, effect_size, ci_low, ci_high = get_significance_batch(
+            detection_method,
+            baseline * 3,
+            lower + same + [[]],
+        )
+        assert p_values[0] < 0.05
+        assert p_values[1] > 0.05
+        assert math.isnan(p_values[2])
+        assert effect_size[0] == -1.0
+        if detection_method == "bootstrap":
+            assert ci_low[0] <= ci_high[0] < 0.0
+            assert ci_low[1] < 0.0 < ci_high[1]
+        else:
+            assert math.isnan(ci_low[0])
+    # lower-better metrics flip the effect size
+    _, effect_size, _, _ = get_significance_batch(
+        "mann-whitney", baseline, lower, "lower-better"
+    )
+    assert effect_size[0] == 1.0
+    # the bootstrap is seeded, so the same data produces the same result
+    first = get_significance_batch("bootstrap", baseline, same)
+    second = get_significance_batch("bootstrap", baseline, same)
+    assert first[0][0] == second[0][0] and first[2][0] == second[2][0]
+    # a long window next to short ones is tested as if it was alone
+    long_baseline = [float(value) for value in range(2000)]
+    long_comparison = [value + 0.5 for value in long_baseline]
+    batch = get_mann_whitney_u_batch(
+        baseline * 2 + [long_baseline], lower + same + [long_comparison]
+    )
+    alone = get_mann_whitney_u_batch([long_baseline], [long_comparison])
+    assert batch[0][2] == alone[0][0] == 2000 * 2001 / 2
+    assert batch[1][2] == alone[1][0]
+    # every row is ranked on its own, with ties, NaN values and empty rows
+    rng = np.random.default_rng(0)
+    baseline_windows = [
+        list(rng.integers(0, 5, size)) + [np.nan] for size in [0, 1, 7, 12, 40]
+    ]
+    comparison_windows = [list(rng.integers(0, 5, size)) for size in [3, 0, 9, 5, 35]]
+    u, p_values, effect_size = get_mann_whitney_u_batch(
+        baseline_windows, comparison_windows
+    )
+    assert np.isnan(u[:2]).all() and np.isnan(p_values[:2]).all()
+    for pos in range(2, 5):
+        row_baseline = np.array(baseline_windows[pos][:-1])
+        row_comparison = np.array(comparison_windows[pos])
+        greater = (row_comparison[:, None] > row_baseline[None, :]).sum()
+        ties = (row_comparison[:, None] == row_baseline[None, :]).sum()
+        assert u[pos] == greater + ties / 2.0
+        assert 0.0 < p_values[pos] <= 1.0
+    p_values, _, ci_low, ci_high = get_significance_batch(
+        "bootstrap", baseline * 2 + [long_baseline], lower + same + [long_comparison]
+    )
+    assert p_values[0] < 0.05
+    assert ci_low[2] < 0.0 < ci_high[2]
@@ -0,0 +1,226 @@
+import argparse
+import json
+
+from redisbench_admin.compare.args import create_compare_arguments
+from redisbench_admin.compare.compare import compare_command_logic
+from redisbench_admin.compare.local_results import (
+    get_local_result_run_info,
+    get_local_results_branch,
+    get_local_results_filenames,
+    get_local_results_test_names,
+    load_local_results,
+    match_local_results_test_names,
+)
+from redisbench_admin.utils.local import get_local_run_full_filename
+from redisbench_admin.utils.remote import get_run_full_filename
+
+
+def write_local_result(dirname, start_time_str, branch, test_name, rps):
+    filename = dirname / get_local_run_full_filename(
+        start_time_str, branch, test_name, "oss-standalone"
+    )
+    with open(filename, "w") as json_file:
+        json.dump({"Tests": {"Overall": {"rps": rps}}}, json_file)
+    return filename
+
+
+def test_get_local_result_run_info():
+    start_time_ms, run_name = get_local_result_run_info(
+        get_local_run_full_filename(
+            "2021-10-01-12-00-00", "my-branch", "memtier-get-set", "oss-standalone"
+        ),
+        "oss-standalone",
+        "redis",
+        "redis",
+    )
+    assert start_time_ms == 1633089600000
+    assert run_name == "my-branch-memtier-get-set"
+    assert (
+        get_local_result_run_info(
+            get_local_run_full_filename(
+                "2021-10-01-12-00-00", "master", "test1", "oss-cluster-03-primaries"
+            ),
+            "oss-standalone",
+            "redis",
+            "redis",
+        )
+        is None
+    )
+    _, run_name = get_local_result_run_info(
+        "/tmp/"
+        + get_run_full_filename(
+            "2021-10-01-12-00-00",
+            "oss-standalone",
+            "redis",
+            "redis",
+            "unstable",
+            "memtier-get-set",
+            "0a1b2c3",
+        ),
+        "oss-standalone",
+        "redis",
+        "redis",
+    )
+    assert run_name == "unstable-memtier-get-set"
+    assert get_local_result_run_info("results.json", "oss-standalone", "a", "b") is None
+
+
+def test_get_local_results_test_names():
+    run_names = ["my-branch-test-a", "my-branch-test-b"]
+    assert get_local_results_test_names(run_names, "my-branch") == {
+        "my-branch-test-a": "test-a",
+        "my-branch-test-b": "test-b",
+    }
+    assert get_local_results_test_names(
+        run_names + ["my-branch-other"], test_names=["test-a", "a"]
+    ) == {"my-branch-test-a": "test-a"}
+
+
+def test_match_local_results_test_names():
+    # the tests share a prefix as well, only the branches are removed
+    baseline_test_names = get_local_results_test_names(
+        ["master-memtier-test-a", "master-memtier-test-b"]
+    )
+    comparison_test_names = get_local_results_test_names(
+        ["feature-x-memtier-test-a", "feature-x-memtier-test-b"]
+    )
+    match_local_results_test_names(baseline_test_names, comparison_test_names)
+    assert baseline_test_names == {
+        "master-memtier-test-a": "memtier-test-a",
+        "master-memtier-test-b": "memtier-test-b",
+    }
+    assert sorted(comparison_test_names.values()) == [
+        "memtier-test-a",
+        "memtier-test-b",
+    ]
+    # a single run on each side
+    baseline_test_names = get_local_results_test_names(["master-test-a"])
+    comparison_test_names = get_local_results_test_names(["feature-x-test-a"])
+    match_local_results_test_names(baseline_test_names, comparison_test_names)
+    assert baseline_test_names == {"master-test-a": "test-a"}
+    assert comparison_test_names == {"feature-x-test-a": "test-a"}
+    # same branch on both sides, nothing to tell apart
+    baseline_test_names = get_local_results_test_names(["master-test-a"])
+    comparison_test_names = get_local_results_test_names(["master-test-a"])
+    match_local_results_test_names(baseline_test_names, comparison_test_names)
+    assert baseline_test_names == {"master-test-a": "master-test-a"}
+    # a single, differently named, test on each side is paired explicitly
+    baseline_test_names = get_local_results_test_names(["master-test-a"])
+    comparison_test_names = get_local_results_test_names(["feature-x-test-b"])
+    match_local_results_test_names(baseline_test_names, comparison_test_names)
+    assert baseline_test_names == {"master-test-a": "master-test-a vs feature-x-test-b"}
+    assert comparison_test_names == {
+        "feature-x-test-b": "master-test-a vs feature-x-test-b"
+    }
+
+
+def test_get_local_results_branch(tmp_path):
+    assert (
+        get_local_results_branch(
+            "results", {"feature-x-test-a": "test-a", "feature-x-test-b": "test-b"}
+        )
+        == "feature-x"
+    )
+    # falls back to the results directory name
+    results_dir = str(tmp_path / "baseline")
+    assert get_local_results_branch(results_dir, {"test-a": "test-a"}) == "baseline"
+    assert (
+        get_local_results_branch(results_dir + "/*.json", {"test-a": "test-a"})
+        == "baseline"
+    )
+
+
+def test_load_local_results(tmp_path):
+    baseline_dir = tmp_path / "baseline"
+    baseline_dir.mkdir()
+    comparison_dir = tmp_path / "comparison"
+    comparison_dir.mkdir()
+    for pos, rps in enumerate([100.0, 110.0, 90.0]):
+        write_local_result(
+            baseline_dir, "2021-10-01-12-00-0{}".format(pos), "master", "test1", rps
+        )
+    write_local_result(comparison_dir, "2021-10-02-12-00-00", "feature", "test1", 50.0)
+    with open(comparison_dir / "not-a-result.json", "w") as json_file:
+        json_file.write("{")
+    assert len(get_local_results_filenames(str(comparison_dir))) == 2
+    assert (
+        len(get_local_results_filenames(str(baseline_dir / "*-00-00-master-*.json")))
+        == 1
+    )
+    (
+        baseline_by_metric,
+        comparison_by_metric,
+        baseline_branch,
+        comparison_branch,
+    ) = load_local_results(
+        str(baseline_dir),
+        str(comparison_dir),
+        ["Tests.Overall.rps"],
+        [],
+        "oss-standalone",
+        "redis",
+        "redis",
+        workers=2,
+    )
+    baseline_datapoints = baseline_by_metric["Tests.Overall.rps"]["test1"][
+        "Tests.Overall.rps"
+    ]
+    # most recent first, as read from RedisTimeSeries
+    assert [value for _, value in baseline_datapoints] == [90.0, 110.0, 100.0]
+    assert comparison_by_metric["Tests.Overall.rps"]["test1"] == {
+        "Tests.Overall.rps": [[1633176000000, 50.0]]
+    }
+    assert baseline_branch == "master"
+
+
+def test_compare_command_logic_local_results(tmp_path):
+    baseline_dir = tmp_path / "baseline"
+    baseline_dir.mkdir()
+    comparison_dir = tmp_path / "comparison"
+    comparison_dir.mkdir()
+    for pos in range(3):
+        start_time_str = "2021-10-01-12-00-0{}".format(pos)
+        write_local_result(baseline_dir, start_time_str, "master", "test1", 100.0)
+        write_local_result(baseline_dir, start_time_str, "master", "test2", 100.0)
+        write_local_result(comparison_dir, start_time_str, "feature", "test1", 101.0)
+        write_local_result(comparison_dir, start_time_str, "feature", "test2", 50.0)
+    parser = argparse.ArgumentParser(
+        description="test",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser = create_compare_arguments(parser)
+    args = parser.parse_args(
+        args=[
+            "--baseline-results",
+            str(baseline_dir),
+            "--comparison-results",
+            str(comparison_dir),
+            "--metric_name",
+            "Tests.Overall.rps",
+            "--defaults_filename",
+            "",
+            "--last_n_baseline",
+            "-1",
+            "--last_n_comparison",
+            "-1",
+        ]
+    )
+    args.github_token = None
+    (
+        detected_regressions,
+        comment_body,
+        total_improvements,
+        total_regressions,
+        total_stable,
+        _,
+        total_comparison_points,
+    ) = compare_command_logic(args, "tool", "v0")
+    assert total_comparison_points == 2
+    assert total_regressions == 1
+    assert total_improvements == 0
+    assert total_stable == 1
+    assert detected_regressions == ["test2"]
+    assert "-50.0%" in comment_body
+    # the sides are labeled with their branches, not with the results paths
+    assert "feature" in comment_body
+    assert str(comparison_dir) not in comment_body
@@ -0,0 +1,81 @@
+import os
+
+import redis
+
+from redisbench_admin.compare.series_cache import (
+    SeriesCache,
+    get_series_cache_dirname,
+    load_series_cache,
+)
+
+
+def test_get_series_cache_dirname():
+    rts = redis.Redis(host="datasink", port=16379)
+    dirname = get_series_cache_dirname(rts, "/tmp")
+    assert dirname == "/tmp/.redisbench-admin/compare-series-cache-datasink_16379_0"
+
+
+def test_series_cache_get_datapoints(tmp_path):
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        ts_name = "ts1"
+        rts.ts().create(ts_name, duplicate_policy="last")
+        for timestamp in range(1, 11):
+            rts.ts().add(ts_name, timestamp, float(timestamp))
+
+        series_cache = load_series_cache(rts, tmp_path)
+        datapoints = series_cache.get_datapoints(rts, ts_name, 2, 100)
+        assert datapoints == rts.ts().revrange(ts_name, 2, 100)
+        assert series_cache.misses == 1
+        series_cache.save()
+        assert os.path.exists(series_cache.index_filename)
+
+        # new datapoints and an overwrite of the last one are fetched incrementally
+        rts.ts().add(ts_name, 10, 100.0)
+        rts.ts().add(ts_name, 11, 11.0)
+        series_cache = load_series_cache(rts, tmp_path)
+        datapoints = series_cache.get_datapoints(rts, ts_name, 2, 100)
+        assert datapoints == rts.ts().revrange(ts_name, 2, 100)
+        assert datapoints[:2] == [(11, 11.0), (10, 100.0)]
+        assert series_cache.hits == 1
+        assert series_cache.fetched_datapoints == 2
+        assert series_cache.cached_datapoints == 8
+        # the requested range is filtered from the cached data
+        assert series_cache.get_datapoints(rts, ts_name, 3, 5) == [
+            (5, 5.0),
+            (4, 4.0),
+            (3, 3.0),
+        ]
+
+        # a datapoint inserted before the last cached one invalidates the cache
+        rts.ts().add(ts_name, 12, 12.0)
+        rts.ts().add(ts_name, 1, 1.0)
+        datapoints = series_cache.get_datapoints(rts, ts_name, 0, 100)
+        assert datapoints == rts.ts().revrange(ts_name, 0, 100)
+        assert series_cache.misses == 1
+        series_cache.invalidate("ts1")
+        datapoints = series_cache.get_datapoints(rts, ts_name, 0, 100)
+        assert datapoints == rts.ts().revrange(ts_name, 0, 100)
+        assert series_cache.misses == 2
+    except redis.exceptions.ConnectionError:
+        pass
+
+
+def test_series_cache_evict(tmp_path):
+    series_cache = SeriesCache(os.path.join(tmp_path, "cache"), 3600, 32)
+    for pos, ts_name in enumerate(["ts1", "ts2", "ts3"]):
+        series_cache.entries[ts_name] = {
+            "from_ts": 0,
+            "last_ts": 1,
+            "total_samples": 1,
+            "size": 16,
+            "fetched_at": 0,
+            "last_used": pos,
+        }
+    series_cache.save()
+    assert sorted(series_cache.entries.keys()) == ["ts2", "ts3"]
+    series_cache = SeriesCache(os.path.join(tmp_path, "cache"), 3600, 32)
+    series_cache.load()
+    assert sorted(series_cache.entries.keys()) == ["ts2", "ts3"]
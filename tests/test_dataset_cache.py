@@ -0,0 +1,251 @@
+import argparse
+import functools
+import hashlib
+import http.server
+import os
+import threading
+
+import pytest
+
+from redisbench_admin.dataset_cache.args import create_dataset_cache_arguments
+from redisbench_admin.dataset_cache.dataset_cache import (
+    dataset_cache_command_logic,
+    get_dataset_cache_table,
+    get_remote_datasets,
+    get_remote_datasets_sha256,
+)
+from redisbench_admin.utils.dataset_cache import (
+    fetch_dataset,
+    get_dataset_cache_entries,
+    get_dataset_cache_key,
+    prune_dataset_cache,
+)
+from redisbench_admin.utils.local import (
+    check_dataset_local_requirements,
+    check_if_needs_remote_fetch,
+)
+
+
+class QuietHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    def end_headers(self):
+        path = self.translate_path(self.path)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            self.send_header("ETag", '"{}-{}"'.format(stat.st_size, stat.st_mtime))
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(directory):
+    handler = functools.partial(QuietHTTPRequestHandler, directory=str(directory))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:{}".format(server.server_address[1])
+
+
+def test_get_dataset_cache_key():
+    url = "http://127.0.0.1/dataset.rdb"
+    assert get_dataset_cache_key(url) == get_dataset_cache_key(url, None)
+    assert get_dataset_cache_key(url, "a") != get_dataset_cache_key(url, "b")
+    assert get_dataset_cache_key(url) != get_dataset_cache_key(url + "2")
+
+
+def test_fetch_dataset(tmp_path):
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+    cache_dir = str(tmp_path / "datasets")
+    data = b"REDIS0009" * 1000
+    (remote_dir / "dataset.rdb").write_bytes(data)
+    (remote_dir / "other").mkdir()
+    (remote_dir / "other" / "dataset.rdb").write_bytes(b"REDIS0009")
+    server, base_url = start_http_server(remote_dir)
+    try:
+        path = fetch_dataset(base_url + "/dataset.rdb", cache_dir)
+        assert open(path, "rb").read() == data
+        assert os.path.basename(path) == "dataset.rdb"
+        # same basename, different url, no collision
+        other_path = fetch_dataset(base_url + "/other/dataset.rdb", cache_dir)
+        assert other_path != path
+        assert open(other_path, "rb").read() == b"REDIS0009"
+        # cache hit
+        assert fetch_dataset(base_url + "/dataset.rdb", cache_dir) == path
+        entries = get_dataset_cache_entries(cache_dir)
+        assert len(entries) == 2
+        # least recently used first
+        assert entries[0]["path"] == other_path
+        assert entries[1]["sha256"] == hashlib.sha256(data).hexdigest()
+        # the remote object changed, a new entry is created
+        (remote_dir / "dataset.rdb").write_bytes(data + b"changed")
+        changed_path = fetch_dataset(base_url + "/dataset.rdb", cache_dir)
+        assert changed_path != path
+        assert open(changed_path, "rb").read() == data + b"changed"
+        # no partial files left behind
+        for entry in get_dataset_cache_entries(cache_dir):
+            assert os.listdir(os.path.dirname(entry["path"])) == [
+                "dataset.rdb",
+                "metadata.json",
+            ] or os.listdir(os.path.dirname(entry["path"])) == [
+                "metadata.json",
+                "dataset.rdb",
+            ]
+    finally:
+        server.shutdown()
+
+
+def test_prune_dataset_cache(tmp_path):
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+    cache_dir = str(tmp_path / "datasets")
+    for pos in range(3):
+        (remote_dir / "dataset-{}.rdb".format(pos)).write_bytes(b"x" * 100)
+    server, base_url = start_http_server(remote_dir)
+    try:
+        paths = [
+            fetch_dataset(base_url + "/dataset-{}.rdb".format(pos), cache_dir, 250)
+            for pos in range(3)
+        ]
+    finally:
+        server.shutdown()
+    # the least recently used entry was evicted to fit the budget
+    assert os.path.exists(paths[0]) is False
+    assert [x["path"] for x in get_dataset_cache_entries(cache_dir)] == paths[1:]
+    # a corrupted entry is only detected when verifying the sha256
+    with open(paths[1], "r+b") as fd:
+        fd.write(b"y")
+    # an interrupted download
+    leftover_dir = os.path.join(cache_dir, "leftover")
+    os.mkdir(leftover_dir)
+    with open(os.path.join(leftover_dir, "dataset.rdb.part"), "w") as fd:
+        fd.write("partial")
+    assert prune_dataset_cache(cache_dir, 0) == []
+    assert os.path.exists(leftover_dir)
+    removed = prune_dataset_cache(cache_dir, 0, True, [], True)
+    assert [x["path"] for x in removed] == [paths[1]]
+    assert [x["path"] for x in get_dataset_cache_entries(cache_dir)] == [paths[2]]
+    assert os.path.exists(leftover_dir) is False
+    assert "1 entries" in get_dataset_cache_table(cache_dir)
+
+
+def test_get_remote_datasets():
+    assert get_remote_datasets(
+        {
+            "test1": {"dbconfig": [{"dataset": "https://a/1.rdb"}]},
+            "test2": {"dbconfig": {"dataset": "https://a/1.rdb"}},
+            "test3": {"dbconfig": [{"dataset": "./local.rdb"}]},
+            "test4": {"dbconfig": [{"dataset_name": "2"}, {"dataset": "http://a/2"}]},
+            "test5": {},
+        }
+    ) == ["http://a/2", "https://a/1.rdb"]
+
+
+def test_dataset_cache_command_logic_prefetch(tmp_path):
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+    (remote_dir / "dataset.rdb").write_bytes(b"REDIS0009")
+    tests_dir = tmp_path / "tests"
+    tests_dir.mkdir()
+    cache_dir = str(tmp_path / "datasets")
+    server, base_url = start_http_server(remote_dir)
+    try:
+        for pos in range(2):
+            with open(str(tests_dir / "test-{}.yml".format(pos)), "w") as fd:
+                fd.write(
+                    "name: test-{}\ndbconfig:\n  - dataset: {}/dataset.rdb\n".format(
+                        pos, base_url
+                    )
+                )
+        parser = argparse.ArgumentParser(
+            description="test",
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        )
+        parser = create_dataset_cache_arguments(parser)
+        args = parser.parse_args(
+            args=[
+                "prefetch",
+                "--dataset-cache-dir",
+                cache_dir,
+                "--test",
+                ",".join(
+                    [str(tests_dir / "test-{}.yml".format(pos)) for pos in range(2)]
+                ),
+            ]
+        )
+        dataset_cache_command_logic(args, "tool", "v0")
+    finally:
+        server.shutdown()
+    entries = get_dataset_cache_entries(cache_dir)
+    assert len(entries) == 1
+    assert entries[0]["url"] == base_url + "/dataset.rdb"
+
+
+def test_get_remote_datasets_sha256():
+    assert get_remote_datasets_sha256(
+        {
+            "test1": {"dbconfig": [{"dataset": "https://a/1.rdb"}]},
+            "test2": {
+                "dbconfig": {"dataset": "https://a/2.rdb", "dataset_sha256": "AB"}
+            },
+        }
+    ) == {"https://a/2.rdb": "ab"}
+    with pytest.raises(Exception):
+        get_remote_datasets_sha256(
+            {
+                "test1": {"dbconfig": {"dataset": "a", "dataset_sha256": "ab"}},
+                "test2": {"dbconfig": {"dataset": "a", "dataset_sha256": "cd"}},
+            }
+        )
+
+
+def test_check_dataset_local_requirements_sha256(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+    data = b"REDIS0009" * 10
+    (remote_dir / "dataset.rdb").write_bytes(data)
+    redis_dbdir = tmp_path / "dbdir"
+    redis_dbdir.mkdir()
+    server, base_url = start_http_server(remote_dir)
+    try:
+        benchmark_config = {
+            "dbconfig": [
+                {"dataset": base_url + "/dataset.rdb", "dataset_sha256": "0" * 64}
+            ]
+        }
+        # the downloaded data doesn't match the configured checksum
+        with pytest.raises(Exception):
+            check_dataset_local_requirements(benchmark_config, str(redis_dbdir))
+        benchmark_config["dbconfig"][0]["dataset_sha256"] = hashlib.sha256(
+            data
+        ).hexdigest()
+        _, _, full_path, tmp_path = check_dataset_local_requirements(
+            benchmark_config, str(redis_dbdir)
+        )
+        assert open(tmp_path, "rb").read() == data
+    finally:
+        server.shutdown()
+
+
+def test_check_if_needs_remote_fetch_dataset_cache(tmp_path):
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+    (remote_dir / "queries.txt").write_bytes(b"queries")
+    server, base_url = start_http_server(remote_dir)
+    try:
+        # tool input files are downloaded to the given dir, outside the cache
+        inputs_dir = str(tmp_path / "inputs")
+        full_path = check_if_needs_remote_fetch(
+            base_url + "/queries.txt", inputs_dir, None
+        )
+        assert full_path == "{}/queries.txt".format(inputs_dir)
+        assert get_dataset_cache_entries(inputs_dir) == []
+        # datasets are fetched into the cache
+        cache_dir = str(tmp_path / "datasets")
+        full_path = check_if_needs_remote_fetch(
+            base_url + "/queries.txt", cache_dir, None, use_dataset_cache=True
+        )
+        assert len(get_dataset_cache_entries(cache_dir)) == 1
+        assert open(full_path, "rb").read() == b"queries"
+    finally:
+        server.shutdown()
@@ -0,0 +1,212 @@
+import hashlib
+import http.server
+import json
+import os
+import re
+import threading
+
+import pytest
+
+from redisbench_admin.run_local.local_helpers import (
+    fetch_benchmark_tool_from_source_to_local,
+)
+from redisbench_admin.utils import download
+from redisbench_admin.utils.benchmark_config import (
+    extract_benchmark_tool_source_sha256,
+)
+from redisbench_admin.utils.download import (
+    download_file,
+    get_download_parts,
+    write_download_state,
+)
+
+
+def start_range_http_server(data, accept_ranges=True, etag="v1", truncate=0):
+    """
+    Serves data on any path, honouring single range requests. The first
+    truncate responses are cut in half to simulate dropped connections.
+    """
+    state = {"requests": [], "truncate": truncate}
+
+    class RangeHTTPRequestHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send_common_headers(self, length):
+            self.send_header("Content-Length", "{}".format(length))
+            self.send_header("ETag", '"{}"'.format(etag))
+            if accept_ranges:
+                self.send_header("Accept-Ranges", "bytes")
+
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_common_headers(len(data))
+            self.end_headers()
+
+        def do_GET(self):
+            range_header = self.headers.get("Range")
+            state["requests"].append(range_header)
+            start, end = 0, len(data) - 1
+            match = None
+            if accept_ranges and range_header is not None:
+                match = re.match(r"bytes=(\d+)-(\d*)", range_header)
+            if match is not None:
+                start = int(match.group(1))
+                if match.group(2) != "":
+                    end = min(int(match.group(2)), len(data) - 1)
+                self.send_response(206)
+                self.send_header(
+                    "Content-Range", "bytes {}-{}/{}".format(start, end, len(data))
+                )
+            else:
+                self.send_response(200)
+            body = data[start : end + 1]
+            self.send_common_headers(len(body))
+            self.end_headers()
+            if state["truncate"] > 0:
+                state["truncate"] = state["truncate"] - 1
+                body = body[: len(body) // 2]
+                self.close_connection = True
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RangeHTTPRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:{}/dataset.rdb".format(server.server_address[1])
+    return server, url, state
+
+
+def test_get_download_parts():
+    assert get_download_parts(10, 4) == [(0, 3), (4, 7), (8, 9)]
+    assert get_download_parts(8, 4) == [(0, 3), (4, 7)]
+    assert get_download_parts(3, 4) == [(0, 2)]
+    assert get_download_parts(0, 4) == []
+
+
+def test_download_file_ranges(tmp_path):
+    data = os.urandom(1000)
+    filename = str(tmp_path / "dataset.rdb")
+    server, url, state = start_range_http_server(data)
+    try:
+        sha256 = download_file(url, filename, workers=4, part_size=100)
+    finally:
+        server.shutdown()
+    assert sha256 == hashlib.sha256(data).hexdigest()
+    assert open(filename, "rb").read() == data
+    assert len(state["requests"]) == 10
+    assert "bytes=900-999" in state["requests"]
+    assert sorted(os.listdir(str(tmp_path))) == ["dataset.rdb"]
+
+
+def test_download_file_retries(tmp_path, monkeypatch):
+    monkeypatch.setattr(download, "DOWNLOAD_RETRY_BACKOFF_SECS", 0)
+    data = os.urandom(1000)
+    filename = str(tmp_path / "dataset.rdb")
+    # ranged and single stream downloads
+    for accept_ranges in [True, False]:
+        server, url, state = start_range_http_server(
+            data, accept_ranges=accept_ranges, truncate=2
+        )
+        try:
+            download_file(url, filename, workers=1, part_size=400)
+        finally:
+            server.shutdown()
+        assert open(filename, "rb").read() == data
+        os.remove(filename)
+    # the ranged retry continues from the last chunk written
+    large_data = os.urandom(4 * download.DOWNLOAD_CHUNK_SIZE)
+    server, url, state = start_range_http_server(large_data, truncate=1)
+    try:
+        download_file(url, filename, workers=1, part_size=len(large_data))
+    finally:
+        server.shutdown()
+    assert len(state["requests"]) == 2
+    resumed_start = int(state["requests"][1].split("=")[1].split("-")[0])
+    assert resumed_start > 0
+    assert open(filename, "rb").read() == large_data
+    os.remove(filename)
+    # giving up keeps the partial data for the next attempt
+    server, url, state = start_range_http_server(data, truncate=100)
+    try:
+        with pytest.raises(Exception):
+            download_file(url, filename, workers=1, part_size=1000, retries=1)
+    finally:
+        server.shutdown()
+    assert os.path.exists(filename) is False
+    assert os.path.exists(filename + ".part")
+
+
+def test_download_file_resume(tmp_path):
+    data = os.urandom(1000)
+    filename = str(tmp_path / "dataset.rdb")
+    server, url, state = start_range_http_server(data)
+    try:
+        # the first half was downloaded by a previous attempt
+        with open(filename + ".part", "wb") as fd:
+            fd.write(data[:500] + b"\0" * 500)
+        write_download_state(
+            filename + ".part.json", url, 1000, "v1", 100, [0, 1, 2, 3, 4]
+        )
+        download_file(url, filename, workers=2, part_size=100)
+        assert open(filename, "rb").read() == data
+        assert len(state["requests"]) == 5
+        assert os.path.exists(filename + ".part.json") is False
+        # a previous attempt of another version of the object isn't reused
+        state["requests"] = []
+        with open(filename + ".part", "wb") as fd:
+            fd.write(b"\0" * 1000)
+        write_download_state(
+            filename + ".part.json", url, 1000, "v0", 100, [0, 1, 2, 3, 4]
+        )
+        download_file(url, filename, workers=2, part_size=100)
+        assert open(filename, "rb").read() == data
+        assert len(state["requests"]) == 10
+    finally:
+        server.shutdown()
+
+
+def test_download_file_checksum(tmp_path):
+    data = os.urandom(1000)
+    filename = str(tmp_path / "dataset.rdb")
+    server, url, _ = start_range_http_server(data)
+    try:
+        with pytest.raises(Exception):
+            download_file(url, filename, expected_sha256="0" * 64, part_size=100)
+        assert os.listdir(str(tmp_path)) == []
+        download_file(url, filename, expected_sha256=hashlib.sha256(data).hexdigest())
+    finally:
+        server.shutdown()
+    assert open(filename, "rb").read() == data
+    # the progress state is plain json
+    write_download_state(str(tmp_path / "state.json"), url, 1, None, 1, {0})
+    with open(str(tmp_path / "state.json")) as fd:
+        assert json.load(fd)["done_parts"] == [0]
+
+
+def test_fetch_benchmark_tool_checksum(tmp_path):
+    benchmark_config = {
+        "clientconfig": [
+            {"tool": "tool"},
+            {"tool_source": [{"remote": "http://a/t.tar.gz"}, {"sha256": "0" * 64}]},
+        ]
+    }
+    assert extract_benchmark_tool_source_sha256(benchmark_config) == "0" * 64
+    assert extract_benchmark_tool_source_sha256({"clientconfig": {}}) is None
+    server, url, _ = start_range_http_server(os.urandom(1000))
+    binaries_dir = str(tmp_path / "binaries")
+    try:
+        # a tampered tool binary is never decompressed
+        with pytest.raises(Exception):
+            fetch_benchmark_tool_from_source_to_local(
+                "tool",
+                str(tmp_path),
+                binaries_dir,
+                url,
+                "./bin/tool",
+                None,
+                extract_benchmark_tool_source_sha256(benchmark_config),
+            )
+    finally:
+        server.shutdown()
+    assert os.listdir(binaries_dir) == []
@@ -8,6 +8,10 @@ from redisbench_admin.environments.oss_standalone import (
     spin_up_local_redis,
     generate_standalone_redis_server_args,
 )
+from redisbench_admin.utils.local import (
+    check_dataset_local_requirements,
+    place_dataset_files,
+)
 
 
 #
@@ -46,6 +50,47 @@ from redisbench_admin.environments.oss_standalone import (
 #         shutil.rmtree(tests_remote_tmp_datasets)
 
 
+def test_place_dataset_files(tmp_path):
+    src = tmp_path / "dataset.rdb"
+    src.write_bytes(b"REDIS0009" * 100)
+    dbdir = tmp_path / "dbdir"
+    dbdir.mkdir()
+    dsts = [str(dbdir / "cluster-node-port-{}.rdb".format(x)) for x in range(3)]
+    # a stale file is replaced
+    with open(dsts[1], "w") as stale_file:
+        stale_file.write("stale")
+    bytes_copied, bytes_linked = place_dataset_files(str(src), dsts)
+    assert bytes_copied + bytes_linked == 900 * 3
+    # same filesystem, nothing is copied
+    assert bytes_copied == 0
+    for dst in dsts:
+        assert open(dst, "rb").read() == src.read_bytes()
+    assert place_dataset_files(str(src), []) == (0, 0)
+
+
+def test_check_dataset_local_requirements_cluster(tmp_path):
+    src = tmp_path / "dataset.rdb"
+    src.write_bytes(b"REDIS0009")
+    dbdir = tmp_path / "dbdir"
+    dbdir.mkdir()
+    dataset, _, full_path, _ = check_dataset_local_requirements(
+        {"dbconfig": [{"dataset": "dataset.rdb"}]},
+        str(dbdir),
+        str(tmp_path),
+        str(tmp_path / "datasets"),
+        "dbconfig",
+        3,
+        True,
+    )
+    assert dataset == "dataset.rdb"
+    assert full_path == str(src)
+    assert sorted(os.listdir(str(dbdir))) == [
+        "cluster-node-port-6379.rdb",
+        "cluster-node-port-6380.rdb",
+        "cluster-node-port-6381.rdb",
+    ]
+
+
 def test_generate_standalone_redis_server_args():
     cmd = generate_standalone_redis_server_args("redis-server", ".", None, "9999")
     logfile = "redis.log"
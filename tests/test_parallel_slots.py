@@ -0,0 +1,87 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from redisbench_admin.run_local.parallel_slots import (
+    PARALLEL_SLOT_PORT_RANGE,
+    get_available_cpus,
+    get_parallel_slots,
+    get_parallel_slots_cpus,
+    remove_parallel_slots,
+    run_in_parallel_slots,
+)
+
+
+def test_get_parallel_slots_cpus():
+    assert get_parallel_slots_cpus(2, [0, 1, 2, 3]) == [[0, 1], [2, 3]]
+    assert get_parallel_slots_cpus(3, [0, 1, 2, 3, 4]) == [[0, 1], [2, 3], [4]]
+    assert get_parallel_slots_cpus(1, [4, 5]) == [[4, 5]]
+    with pytest.raises(Exception):
+        get_parallel_slots_cpus(3, [0, 1])
+
+
+def test_get_parallel_slots(tmp_path):
+    parallel_slots = get_parallel_slots(2, 6379, [0, 1, 2, 3], str(tmp_path))
+    assert [slot["slot"] for slot in parallel_slots] == [0, 1]
+    assert [slot["port"] for slot in parallel_slots] == [
+        6379,
+        6379 + PARALLEL_SLOT_PORT_RANGE,
+    ]
+    assert [slot["cpus"] for slot in parallel_slots] == [[0, 1], [2, 3]]
+    dirs = [slot["dir"] for slot in parallel_slots]
+    assert len(set(dirs)) == 2
+    for slot_dir in dirs:
+        assert os.path.dirname(slot_dir) == str(tmp_path)
+        assert os.path.isdir(slot_dir)
+    remove_parallel_slots(parallel_slots)
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_run_in_parallel_slots(tmp_path):
+    cpus = get_available_cpus()
+    parallel_slots = get_parallel_slots(1, 6379, cpus[:1], str(tmp_path))
+    threads = set()
+
+    def run_task(task, slot):
+        threads.add(threading.get_ident())
+        return task * 2, slot["slot"]
+
+    try:
+        results = run_in_parallel_slots(parallel_slots, [1, 2, 3], run_task)
+    finally:
+        remove_parallel_slots(parallel_slots)
+    # results follow the tasks order
+    assert results == [(2, 0), (4, 0), (6, 0)]
+    # the tasks didn't run on the calling thread
+    assert threading.get_ident() not in threads
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "sched_getaffinity"), reason="requires sched_getaffinity"
+)
+def test_run_in_parallel_slots_affinity(tmp_path):
+    cpus = get_available_cpus()
+    parallel_slots = get_parallel_slots(1, 6379, cpus[-1:], str(tmp_path))
+
+    def get_child_affinity(task, slot):
+        # processes spawned from the slot inherit its cpu set
+        output = subprocess.check_output(
+            [sys.executable, "-c", "import os; print(sorted(os.sched_getaffinity(0)))"]
+        )
+        return output.decode().strip()
+
+    try:
+        results = run_in_parallel_slots(parallel_slots, [0], get_child_affinity)
+    finally:
+        remove_parallel_slots(parallel_slots)
+    assert results == ["{}".format(cpus[-1:])]
+    # the calling thread keeps its affinity
+    assert get_available_cpus() == cpus
@@ -0,0 +1,138 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import pytest
+
+from redisbench_admin.run import cluster
+from redisbench_admin.run.placement import (
+    format_cpu_list,
+    generate_placement_command_prefix,
+    get_placement_metadata_tags,
+    get_placement_policy,
+    get_server_cpus,
+    get_shards_cpus,
+    merge_default_placement,
+    parse_cpu_list,
+)
+from redisbench_admin.run.scheduler import get_dbconfig_fingerprint
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list(3) == [3]
+    assert parse_cpu_list("0-3,8") == [0, 1, 2, 3, 8]
+    assert parse_cpu_list([5, "1-2", 1]) == [1, 2, 5]
+    with pytest.raises(Exception):
+        parse_cpu_list("0-a")
+    assert format_cpu_list([8, 0, 1, 2, 3, 10]) == "0-3,8,10"
+    assert format_cpu_list([4]) == "4"
+
+
+def test_get_placement_policy():
+    assert get_placement_policy({}) is None
+    assert get_placement_policy({"placement": {}}) is None
+    with pytest.raises(Exception):
+        get_placement_policy({"placement": "0-3"})
+    placement_policy = get_placement_policy(
+        {
+            "placement": {
+                "server_cores": "0",
+                "io_threads_cores": "1-2",
+                "client_cores": [4, 5],
+                "numa_node": "0",
+            }
+        }
+    )
+    assert placement_policy == {
+        "server_cores": [0],
+        "io_threads_cores": [1, 2],
+        "client_cores": [4, 5],
+        "numa_node": 0,
+    }
+    assert get_server_cpus(placement_policy) == [0, 1, 2]
+    assert get_placement_metadata_tags(placement_policy) == {
+        "placement_server_cores": "0",
+        "placement_io_threads_cores": "1-2",
+        "placement_client_cores": "4-5",
+        "placement_numa_node": "0",
+    }
+    assert get_placement_metadata_tags(None) == {}
+
+
+def test_merge_default_placement():
+    benchmark_config = {"placement": {"client_cores": "4-7"}}
+    merge_default_placement(
+        benchmark_config, {"server_cores": "0-3", "client_cores": "8"}
+    )
+    # the benchmark entries take precedence over the defaults
+    assert benchmark_config["placement"] == {
+        "server_cores": "0-3",
+        "client_cores": "4-7",
+    }
+    benchmark_config = {}
+    merge_default_placement(benchmark_config, None)
+    assert benchmark_config == {}
+
+
+def test_generate_placement_command_prefix():
+    assert generate_placement_command_prefix(None) == []
+    assert generate_placement_command_prefix([0, 1, 3]) == ["taskset", "-c", "0-1,3"]
+    assert generate_placement_command_prefix([0, 1], 1) == [
+        "numactl",
+        "--membind=1",
+        "--physcpubind=0-1",
+    ]
+    assert generate_placement_command_prefix(None, 0) == [
+        "numactl",
+        "--membind=0",
+        "--cpunodebind=0",
+    ]
+
+
+def test_get_shards_cpus():
+    assert get_shards_cpus([0, 1, 2, 3], 2) == [[0, 1], [2, 3]]
+    # not enough cores to split them, all shards share them
+    assert get_shards_cpus([0, 1], 3) == [[0, 1], [0, 1], [0, 1]]
+    assert get_shards_cpus(None, 2) == [None, None]
+
+
+def test_spin_up_redis_cluster_remote_redis(monkeypatch):
+    commands = []
+
+    def execute_remote_commands(
+        server_public_ip, username, private_key, redis_process_commands, ssh_port
+    ):
+        commands.extend(redis_process_commands)
+        return [[0, "", ""] for _ in redis_process_commands]
+
+    monkeypatch.setattr(cluster, "execute_remote_commands", execute_remote_commands)
+    cluster.spin_up_redis_cluster_remote_redis(
+        "127.0.0.1",
+        "127.0.0.1",
+        "ubuntu",
+        None,
+        None,
+        None,
+        "/tmp",
+        2,
+        20000,
+        22,
+        {},
+        "redis.log",
+        True,
+        get_placement_policy({"placement": {"server_cores": "0-3"}}),
+    )
+    assert len(commands) == 2
+    assert commands[0].startswith("taskset -c 0-1 redis-server ")
+    assert commands[1].startswith("taskset -c 2-3 redis-server ")
+
+
+def test_get_dbconfig_fingerprint():
+    benchmark_config = {"dbconfig": [{"dataset_name": "dataset1"}]}
+    fingerprint = get_dbconfig_fingerprint(benchmark_config)
+    # the client placement doesn't change the environment, the server one does
+    benchmark_config["placement"] = {"client_cores": "4"}
+    assert get_dbconfig_fingerprint(benchmark_config) == fingerprint
+    benchmark_config["placement"] = {"server_cores": "0"}
+    assert get_dbconfig_fingerprint(benchmark_config) != fingerprint
@@ -14,7 +14,12 @@ from redisbench_admin.run.common import (
     merge_default_and_config_metrics,
     get_start_time_vars,
 )
-from redisbench_admin.run.redistimeseries import timeseries_test_sucess_flow
+from redisbench_admin.run.redistimeseries import (
+    timeseries_test_sucess_flow,
+    get_secondary_result_keys_pipeline,
+    execute_secondary_result_keys_pipeline,
+    update_secondary_result_keys,
+)
 
 
 def test_timeseries_test_sucess_flow():
@@ -224,3 +229,148 @@ def test_timeseries_test_sucess_flow():
 
     except redis.exceptions.ConnectionError:
         pass
+
+
+def test_update_secondary_result_keys_deferred_pipeline():
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        tf_github_org = "redis"
+        tf_github_repo = "redis"
+        tf_triggering_env = "gh"
+        (
+            _,
+            testcases_setname,
+            deployment_name_zsetname,
+            _,
+            tsname_project_total_success,
+            _,
+            _,
+            _,
+            _,
+            project_archs_setname,
+            _,
+            project_branches_setname,
+            project_versions_setname,
+            _,
+        ) = get_overall_dashboard_keynames(
+            tf_github_org, tf_github_repo, tf_triggering_env
+        )
+        pipeline = get_secondary_result_keys_pipeline(rts)
+        for test_name in ["test1", "test2"]:
+            update_secondary_result_keys(
+                "6.2.4",
+                60,
+                None,
+                0,
+                "oss-standalone",
+                "oss-standalone",
+                {"arch": "amd64"},
+                rts,
+                None,
+                1000,
+                test_name,
+                [],
+                "unstable",
+                tf_github_org,
+                tf_github_repo,
+                tf_triggering_env,
+                None,
+                pipeline,
+            )
+        # nothing is sent until the deferred pipeline is executed
+        assert rts.exists(testcases_setname) == 0
+        assert rts.exists(deployment_name_zsetname) == 0
+        # a failing command does not prevent the remaining ones to be applied
+        rts.set(project_archs_setname, "wrongtype")
+        errors, total_commands = execute_secondary_result_keys_pipeline(pipeline)
+        assert errors == 1
+        assert total_commands > 2
+        assert len(pipeline.command_stack) == 0
+        assert rts.smembers(testcases_setname) == {b"test1", b"test2"}
+        assert rts.smembers(project_branches_setname) == {b"unstable"}
+        assert rts.smembers(project_versions_setname) == {b"6.2.4"}
+        assert rts.zcard(deployment_name_zsetname) == 1
+        assert rts.exists(tsname_project_total_success)
+        assert execute_secondary_result_keys_pipeline(pipeline) == (0, 0)
+
+    except redis.exceptions.ConnectionError:
+        pass
+
+
+def test_update_secondary_result_keys_spin_up_duration():
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        for test_name, spin_up_duration_seconds in [("test1", 0.25), ("test2", None)]:
+            update_secondary_result_keys(
+                "6.2.4",
+                60,
+                None,
+                spin_up_duration_seconds,
+                "oss-cluster",
+                "oss-cluster",
+                {},
+                rts,
+                None,
+                1000,
+                test_name,
+                [],
+                "unstable",
+                "redis",
+                "redis",
+                "gh",
+                None,
+                None,
+                spin_up_duration_seconds,
+                spin_up_duration_seconds,
+            )
+        ts_names = rts.ts().queryindex(["metric=spin_up_duration"])
+        assert len(ts_names) == 2
+        for ts_name in ts_names:
+            assert "test1" in ts_name
+            assert rts.ts().get(ts_name)[1] == 0.25
+        # not tracked when the setup was not spun for the test
+        assert rts.ts().queryindex(["metric=dataset_load_duration"]) != []
+        # nor is the dataset load when nothing was reloaded
+        assert (
+            rts.ts().queryindex(["metric=dataset_load_duration", "test_name=test2"])
+            == []
+        )
+        assert rts.ts().queryindex(["metric=spin_up_duration", "test_name=test2"]) == []
+        # the same applies to the dataset restore duration
+        assert len(rts.ts().queryindex(["metric=dataset_restore_duration"])) == 2
+        assert (
+            rts.ts().queryindex(["metric=dataset_restore_duration", "test_name=test2"])
+            == []
+        )
+        # the parallel slot of each run is kept as a metric, not a label
+        for start_time_ms, slot in [(2000, 0), (3000, 1)]:
+            update_secondary_result_keys(
+                "6.2.4",
+                60,
+                None,
+                None,
+                "oss-cluster",
+                "oss-cluster",
+                {},
+                rts,
+                None,
+                start_time_ms,
+                "test3",
+                [],
+                "unstable",
+                "redis",
+                "redis",
+                "gh",
+                slot=slot,
+            )
+        ts_names = rts.ts().queryindex(["metric=slot", "test_name=test3"])
+        assert len(ts_names) == 2
+        for ts_name in ts_names:
+            assert rts.ts().range(ts_name, 0, 5000) == [(2000, 0.0), (3000, 1.0)]
+        assert rts.ts().queryindex(["metric=slot", "test_name=test1"]) == []
+    except redis.exceptions.ConnectionError:
+        pass
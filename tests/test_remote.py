@@ -20,6 +20,7 @@ from redisbench_admin.utils.remote import (
     extract_perversion_timeseries_from_results,
     extract_perbranch_timeseries_from_results,
     exporter_create_ts,
+    get_compaction_ts_name,
     get_overall_dashboard_keynames,
     common_timeseries_extraction,
 )
@@ -137,6 +138,56 @@ def test_push_data_to_redistimeseries():
         assert datapoint_inserts == 0
 
 
+def test_push_data_to_redistimeseries_batched():
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        time_series_dict = {}
+        for series_n in range(5):
+            time_series_dict["ts:{}".format(series_n)] = {
+                "labels": {"metric": "rps", "series": str(series_n)},
+                "data": {1000 + x: float(series_n * x) for x in range(3)},
+            }
+        time_series_dict["ts:invalid"] = {
+            "labels": {"metric": "rps", "series": "invalid"},
+            "data": {1000: None, 1001: "not-a-number", 1002: 1.0},
+        }
+        # small batches and window so that multiple round-trips are exercised
+        datapoint_errors, datapoint_inserts = push_data_to_redistimeseries(
+            rts, time_series_dict, 0, 2, 2
+        )
+        assert datapoint_errors == 2
+        assert datapoint_inserts == 16
+        assert rts.ts().range("ts:4", "-", "+") == [
+            (1000, 0.0),
+            (1001, 4.0),
+            (1002, 8.0),
+        ]
+
+        # pushing the same timestamps again overwrites the previous values
+        time_series_dict["ts:4"]["data"] = {1001: 40.0}
+        datapoint_errors, datapoint_inserts = push_data_to_redistimeseries(
+            rts, {"ts:4": time_series_dict["ts:4"]}, 0, 2, 2
+        )
+        assert datapoint_errors == 0
+        assert datapoint_inserts == 1
+        assert rts.ts().range("ts:4", "-", "+")[1] == (1001, 40.0)
+
+        # series created without duplicate policy reject TS.MADD duplicates
+        rts.ts().create("ts:legacy", labels={"metric": "rps"})
+        rts.ts().add("ts:legacy", 1000, 1.0)
+        datapoint_errors, datapoint_inserts = push_data_to_redistimeseries(
+            rts,
+            {"ts:legacy": {"labels": {"metric": "rps"}, "data": {1000: 2.0}}},
+        )
+        assert datapoint_errors == 0
+        assert datapoint_inserts == 1
+        assert rts.ts().range("ts:legacy", "-", "+") == [(1000, 2.0)]
+    except redis.exceptions.ConnectionError:
+        pass
+
+
 def test_extract_perversion_timeseries_from_results():
     # default and specific metrics test
     with open("./tests/test_data/common-properties-v0.1.yml", "r") as yml_file:
@@ -493,3 +544,60 @@ def test_exporter_create_ts():
 
     except redis.exceptions.ConnectionError:
         pass
+
+
+def test_exporter_create_ts_compaction_rules():
+    compaction_policy = {
+        "retention_ms": 100000,
+        "tiers": [
+            {"bucket_ms": 10, "aggregations": ["avg", "max"], "retention_ms": 0},
+            {"bucket_ms": 100, "aggregations": ["avg"], "retention_ms": 0},
+        ],
+    }
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        # a pre existing series is backfilled with its closed buckets when the
+        # rules are created, the still open one is aggregated by the rule
+        rts.ts().create("ts1", labels={"metric": "rps"})
+        for timestamp in range(0, 15):
+            rts.ts().add("ts1", timestamp, timestamp)
+        time_series = {
+            "labels": {"metric": "rps"},
+            "data": {timestamp: timestamp for timestamp in range(15, 22)},
+        }
+        push_data_to_redistimeseries(
+            rts, {"ts1": time_series}, compaction_policy=compaction_policy
+        )
+        avg_10_name = get_compaction_ts_name("ts1", "avg", 10)
+        assert avg_10_name == "ts1:avg_10"
+        assert len(rts.ts().info("ts1").rules) == 3
+        assert rts.ts().info(avg_10_name).labels == {
+            "metric": "rps",
+            "compaction": "avg_10",
+        }
+        assert rts.ts().range(avg_10_name, 0, 100) == [(0, 4.5), (10, 17.0)]
+        assert rts.ts().range("ts1:max_10", 0, 100) == [(0, 9.0), (10, 19.0)]
+        # the raw series reads exclude the compaction tiers
+        assert rts.ts().queryindex(["metric=rps", "compaction="]) == ["ts1"]
+        # rules are only created once
+        time_series = {"labels": {"metric": "rps"}}
+        assert False == exporter_create_ts(
+            rts, time_series, "ts1", compaction_policy=compaction_policy
+        )
+        assert len(rts.ts().info("ts1").rules) == 3
+        # new series get the raw retention
+        assert True == exporter_create_ts(
+            rts, time_series, "ts2", compaction_policy=compaction_policy
+        )
+        assert rts.ts().info("ts2").retention_msecs == 100000
+        assert rts.ts().info("ts2:avg_100").labels["compaction"] == "avg_100"
+        # label updates are propagated to the compaction tiers
+        time_series["labels"]["branch"] = "master"
+        assert True == exporter_create_ts(
+            rts, time_series, "ts2", compaction_policy=compaction_policy
+        )
+        assert rts.ts().info("ts2:avg_10").labels["branch"] == "master"
+    except redis.exceptions.ConnectionError:
+        pass
@@ -1,4 +1,5 @@
 import os
+import shutil
 
 import argparse
 import redis
@@ -7,6 +8,12 @@ import yaml
 from redisbench_admin.profilers.pprof import process_pprof_text_to_tabular
 from redisbench_admin.run.args import REDIS_7
 from redisbench_admin.run_local.args import create_run_local_arguments
+from redisbench_admin.run_local import local_db
+from redisbench_admin.run_local.local_db import (
+    local_db_reset,
+    local_db_restore,
+    local_db_snapshot,
+)
 from redisbench_admin.run_local.local_helpers import (
     check_benchmark_binaries_local_requirements,
 )
@@ -17,6 +24,110 @@ from redisbench_admin.run_local.run_local import (
 from redisbench_admin.run.redistimeseries import datasink_profile_tabular_data
 
 
+class FakeDbConn:
+    """
+    Keeps its dataset as bytes, saving it into dir/dbfilename on BGSAVE
+    ( via rename, like redis-server ) and loading it back on DEBUG RELOAD.
+    """
+
+    def __init__(self, dirname, dbfilename, data):
+        self.dirname = dirname
+        self.dbfilename = dbfilename
+        self.data = data
+        # commands sent besides the ones below, gone on a flush
+        self.commands = []
+        self.connection_pool = redis.ConnectionPool(host="localhost", port=6379)
+
+    def config_get(self, name):
+        return {"dir": self.dirname, "dbfilename": self.dbfilename}
+
+    def info(self, section):
+        return {
+            "rdb_bgsave_in_progress": 0,
+            "rdb_last_bgsave_status": "ok",
+            "used_memory_dataset": len(self.data),
+        }
+
+    def bgsave(self):
+        tmp_filename = os.path.join(self.dirname, "temp.rdb")
+        with open(tmp_filename, "wb") as fd:
+            fd.write(self.data)
+        os.replace(tmp_filename, os.path.join(self.dirname, self.dbfilename))
+
+    def flushall(self, asynchronous=False):
+        self.data = b""
+        self.commands = []
+
+    def execute_command(self, *args, **kwargs):
+        if args[0] == "DEBUG RELOAD NOSAVE":
+            with open(os.path.join(self.dirname, self.dbfilename), "rb") as fd:
+                self.data = fd.read()
+        elif args[0] != "PING":
+            self.commands.append(args)
+        return True
+
+
+def test_local_db_snapshot_and_restore(tmp_path):
+    snapshot_dir = tmp_path / "snapshot"
+    snapshot_dir.mkdir()
+    conns = []
+    for shard_n in range(2):
+        shard_dir = tmp_path / "shard-{}".format(shard_n)
+        shard_dir.mkdir()
+        conns.append(
+            FakeDbConn(
+                str(shard_dir),
+                "dump.rdb",
+                "dataset-{}".format(shard_n).encode(),
+            )
+        )
+    snapshot_paths, _ = local_db_snapshot({}, conns, str(snapshot_dir))
+    assert sorted(os.listdir(str(snapshot_dir))) == ["shard-0.rdb", "shard-1.rdb"]
+    # the benchmark writes, and saves, over the dataset
+    for conn in conns:
+        conn.data = b"written"
+        conn.bgsave()
+    restore_duration_seconds = local_db_restore({}, conns, snapshot_paths)
+    assert restore_duration_seconds > 0
+    assert [conn.data for conn in conns] == [b"dataset-0", b"dataset-1"]
+    # the snapshot survives the next restores
+    conns[0].data = b"written"
+    conns[0].bgsave()
+    local_db_restore({}, conns, snapshot_paths)
+    assert conns[0].data == b"dataset-0"
+
+
+def test_local_db_reset_init_commands(tmp_path):
+    dataset = tmp_path / "dataset.rdb"
+    dataset.write_bytes(b"dataset")
+    benchmark_config = {
+        "dbconfig": [
+            {"dataset": str(dataset)},
+            {"init_commands": ['"FT.CREATE" "idx" "SCHEMA" "f" "TEXT"']},
+        ]
+    }
+    clusterconfig = {"init_commands": [{"commands": ["CONFIG SET x 1"]}]}
+    conn = FakeDbConn(str(tmp_path), "dump.rdb", b"written")
+    conn.commands = [("index created on spin up",)]
+    local_db_reset(benchmark_config, [conn], None, False, clusterconfig)
+    assert conn.data == b"dataset"
+    # the flush removed the index, it's created again as on a spin up
+    assert conn.commands == [
+        ("CONFIG SET x 1",),
+        ("FT.CREATE", "idx", "SCHEMA", "f", "TEXT"),
+    ]
+
+
+def test_local_db_snapshot_free_space(tmp_path, monkeypatch):
+    conn = FakeDbConn(str(tmp_path), "dump.rdb", b"dataset")
+    monkeypatch.setattr(
+        local_db.shutil, "disk_usage", lambda x: shutil._ntuple_diskusage(10, 9, 1)
+    )
+    # no room to keep a second copy of the dataset
+    assert local_db_snapshot({}, [conn], str(tmp_path)) == (None, 0)
+    assert os.listdir(str(tmp_path)) == []
+
+
 def test_check_benchmark_binaries_local_requirements():
     filename = "ycsb-redisearch-binding-0.18.0-SNAPSHOT.tar.gz"
     inner_foldername = "ycsb-redisearch-binding-0.18.0-SNAPSHOT"
@@ -0,0 +1,211 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import redis
+
+from redisbench_admin.run.run import define_benchmark_plan
+from redisbench_admin.run.scheduler import (
+    BENCHMARK_RESET_FLUSH,
+    BENCHMARK_RESET_RELOAD,
+    BENCHMARK_RESET_RESPIN,
+    define_benchmark_schedule,
+    estimate_benchmark_group,
+    get_benchmark_reset_type,
+    get_historical_durations,
+    print_benchmark_schedule,
+)
+
+DEFAULT_SPECS = {
+    "setups": [
+        {"name": "oss-standalone", "type": "oss-standalone", "redis_topology": {}},
+        {"name": "oss-cluster-3", "type": "oss-cluster", "redis_topology": {}},
+    ]
+}
+
+
+def get_test_config(benchmark_type, dataset_name="dataset1", setups=None):
+    benchmark_config = {
+        "dbconfig": [
+            {"dataset_name": dataset_name},
+            {"dataset": "./{}.rdb".format(dataset_name)},
+        ],
+        "clientconfig": [{"benchmark_type": benchmark_type}],
+    }
+    if setups is not None:
+        benchmark_config["setups"] = setups
+    return benchmark_config
+
+
+def test_define_benchmark_schedule():
+    benchmark_definitions = {
+        "write-1": get_test_config("mixed", setups=["oss-standalone"]),
+        "read-1": get_test_config("read-only", setups=["oss-standalone"]),
+        "write-2": get_test_config("mixed", setups=["oss-standalone"]),
+        "read-2": get_test_config(
+            "read-only", setups=["oss-standalone", "oss-cluster-3"]
+        ),
+        "other-dataset": get_test_config("read-only", "dataset2", ["oss-standalone"]),
+    }
+    benchmark_plan = define_benchmark_plan(benchmark_definitions, DEFAULT_SPECS)
+    schedule = define_benchmark_schedule(benchmark_plan)
+    groups = {
+        (group["dataset_name"], group["setup_name"]): [
+            test_name for test_name, _, _ in group["benchmarks"]
+        ]
+        for group in schedule
+    }
+    # all benchmark types share the environment, read-only first
+    assert groups == {
+        ("dataset1", "oss-standalone"): ["read-1", "read-2", "write-1", "write-2"],
+        ("dataset1", "oss-cluster-3"): ["read-2"],
+        ("dataset2", "oss-standalone"): ["other-dataset"],
+    }
+    # a different dbconfig for the same dataset can't share the environment
+    benchmark_definitions["read-3"] = get_test_config(
+        "read-only", setups=["oss-standalone"]
+    )
+    benchmark_definitions["read-3"]["dbconfig"].append({"dataset_load_timeout_secs": 1})
+    schedule = define_benchmark_schedule(
+        define_benchmark_plan(benchmark_definitions, DEFAULT_SPECS)
+    )
+    assert len(schedule) == 4
+
+
+def test_get_benchmark_reset_type():
+    assert get_benchmark_reset_type(get_test_config("mixed")) == BENCHMARK_RESET_RELOAD
+    assert get_benchmark_reset_type({}) == BENCHMARK_RESET_FLUSH
+    assert (
+        get_benchmark_reset_type(
+            {"dbconfig": [{"tool": "memtier_benchmark"}, {"parameters": []}]}
+        )
+        == BENCHMARK_RESET_RESPIN
+    )
+
+
+def test_estimate_benchmark_group():
+    group = {
+        "dataset_name": "dataset1",
+        "setup_name": "oss-standalone",
+        "setup_settings": {},
+        "benchmarks": [
+            ("read-1", "read-only", get_test_config("read-only")),
+            ("write-1", "mixed", get_test_config("mixed")),
+            ("write-2", "mixed", get_test_config("mixed")),
+        ],
+    }
+    durations = {
+        ("spin_up_duration", "read-1", "oss-standalone"): 2.0,
+        ("dataset_load_duration", "read-1", "oss-standalone"): 10.0,
+        ("dataset_load_duration", "write-1", "oss-standalone"): 10.0,
+        ("dataset_load_duration", "write-2", "oss-standalone"): 10.0,
+        ("benchmark_duration", "read-1", "oss-standalone"): 30.0,
+        ("benchmark_duration", "write-1", "oss-standalone"): 30.0,
+        ("benchmark_duration", "write-2", "oss-standalone"): 30.0,
+    }
+    (
+        estimated_secs,
+        spins,
+        resets,
+        baseline_secs,
+        baseline_spins,
+    ) = estimate_benchmark_group(group, durations, 2)
+    # a single spin, every writer repetition after the first one reloads
+    assert spins == 1
+    assert resets == 3
+    # the spin up already includes the dataset load
+    assert estimated_secs == 2.0 + 6 * 30.0 + 3 * 10.0
+    # a spin for the read-only tests and for each writer repetition
+    assert baseline_spins == 5
+    assert baseline_secs > estimated_secs
+    total_secs, total_baseline_secs = print_benchmark_schedule([group], durations, 2)
+    assert total_secs == estimated_secs
+    assert total_baseline_secs == baseline_secs
+    # RDB datasets are reloaded, a golden snapshot wouldn't restore them faster
+    durations[("dataset_restore_duration", "write-1", "oss-standalone")] = 1.0
+    durations[("dataset_restore_duration", "write-2", "oss-standalone")] = 1.0
+    assert estimate_benchmark_group(group, durations, 2, True)[:3] == (
+        estimated_secs,
+        1,
+        3,
+    )
+    # datasets loaded by a client tool are restored instead of respun
+    tool_config = {
+        "dbconfig": [{"tool": "memtier_benchmark"}, {"parameters": []}],
+        "clientconfig": [{"benchmark_type": "mixed"}],
+    }
+    tool_group = dict(
+        group,
+        benchmarks=[
+            ("write-1", "mixed", tool_config),
+            ("write-2", "mixed", tool_config),
+        ],
+    )
+    _, spins, resets, _, _ = estimate_benchmark_group(tool_group, durations, 2)
+    assert (spins, resets) == (4, 0)
+    estimated_snapshot_secs, spins, resets, _, _ = estimate_benchmark_group(
+        tool_group, durations, 2, True
+    )
+    assert (spins, resets) == (1, 3)
+    assert estimated_snapshot_secs == 11.0 + 4 * 30.0 + 3 * 1.0
+    # without spin up history the dataset load is added to the default spin up
+    del durations[("spin_up_duration", "read-1", "oss-standalone")]
+    estimated_secs, _, _, _, _ = estimate_benchmark_group(group, durations, 2)
+    assert estimated_secs == 11.0 + 6 * 30.0 + 3 * 10.0
+
+
+def test_get_historical_durations():
+    assert get_historical_durations(None, ["test1"], "org", "repo", "ci") == {}
+    rts = redis.Redis(port=16379)
+    try:
+        rts.ping()
+    except redis.exceptions.ConnectionError:
+        # without a datasink there is no history
+        assert (
+            get_historical_durations(
+                redis.Redis(port=1, socket_connect_timeout=1),
+                ["test1"],
+                "org",
+                "repo",
+                "ci",
+            )
+            == {}
+        )
+        return
+    rts.flushall()
+    labels = {
+        "metric": "benchmark_duration",
+        "test_name": "test1",
+        "deployment_name": "oss-standalone",
+        "github_org": "org",
+        "github_repo": "repo",
+        "triggering_env": "ci",
+        "branch": "master",
+    }
+    now_ms = int(rts.time()[0] * 1000)
+    rts.ts().create("test1:benchmark_duration", labels=labels)
+    for pos, value in enumerate([100, 10, 20, 30]):
+        rts.ts().add("test1:benchmark_duration", now_ms - 4 + pos, value)
+    # other variants, platforms and compaction tiers of the same test
+    for ts_name, extra_labels in [
+        ("by.version:test1:benchmark_duration", {"branch": "", "version": "1.0"}),
+        ("other:test1:benchmark_duration", {"branch": "other"}),
+        ("platform:test1:benchmark_duration", {"running_platform": "x"}),
+        ("test1:benchmark_duration:avg_10", {"compaction": "avg_10"}),
+    ]:
+        other_labels = dict(labels)
+        other_labels.update(extra_labels)
+        rts.ts().create(
+            ts_name, labels={k: v for k, v in other_labels.items() if v != ""}
+        )
+        rts.ts().add(ts_name, now_ms, 1000)
+    durations = get_historical_durations(
+        rts, ["test1"], "org", "repo", "ci", 30, 3, "master"
+    )
+    # median of the last 3 datapoints
+    assert durations == {("benchmark_duration", "test1", "oss-standalone"): 20.0}
+    # without a branch only the by.version series are used
+    assert get_historical_durations(rts, ["test1"], "org", "repo", "ci") == {
+        ("benchmark_duration", "test1", "oss-standalone"): 1000.0
+    }
@@ -0,0 +1,111 @@
+import os
+import time
+
+import redis
+
+from redisbench_admin.utils.remote import push_data_to_redistimeseries
+from redisbench_admin.utils.schema_cache import (
+    SchemaCache,
+    get_labels_hash,
+    get_schema_cache_filename,
+    load_schema_cache,
+)
+
+
+def test_get_labels_hash():
+    assert get_labels_hash({"a": "1", "b": "2"}) == get_labels_hash({"b": "2", "a": 1})
+    assert get_labels_hash({"a": "1"}) != get_labels_hash({"a": "2"})
+    assert get_labels_hash({"a": "1"}) != get_labels_hash({"a": "1", "b": "2"})
+    compaction_policy = {"tiers": [{"bucket_ms": 10, "aggregations": ["avg"]}]}
+    assert get_labels_hash({"a": "1"}, compaction_policy) != get_labels_hash({"a": "1"})
+
+
+def test_get_schema_cache_filename():
+    rts = redis.Redis(host="datasink", port=16379)
+    filename = get_schema_cache_filename(rts, "/tmp")
+    assert filename == "/tmp/.redisbench-admin/rts-schema-cache-datasink_16379_0.json"
+
+
+def test_schema_cache(tmp_path):
+    filename = os.path.join(tmp_path, "cache", "schema.json")
+    schema_cache = SchemaCache(filename, 3600, 2)
+    labels = {"metric": "rps"}
+    assert schema_cache.is_current("ts1", labels) is False
+    schema_cache.update("ts1", labels)
+    assert schema_cache.is_current("ts1", labels) is True
+    # a label change requires contacting the datasink again
+    assert schema_cache.is_current("ts1", {"metric": "p50"}) is False
+    # so does a compaction policy change
+    compaction_policy = {"tiers": [{"bucket_ms": 10, "aggregations": ["avg"]}]}
+    assert schema_cache.is_current("ts1", labels, compaction_policy) is False
+    schema_cache.update("ts1", labels, compaction_policy)
+    assert schema_cache.is_current("ts1", labels, compaction_policy) is True
+    assert schema_cache.is_current("ts1", labels) is False
+    schema_cache.update("ts1", labels)
+    schema_cache.save()
+    assert os.path.exists(filename)
+
+    # persisted across runs
+    schema_cache = SchemaCache(filename, 3600, 2)
+    schema_cache.load()
+    assert schema_cache.is_current("ts1", labels) is True
+
+    # TTL
+    schema_cache.entries["ts1"][1] = time.time() - 7200
+    assert schema_cache.is_current("ts1", labels) is False
+    schema_cache.expire()
+    assert "ts1" not in schema_cache.entries
+
+    # size bounded LRU eviction
+    for pos, timeseries_name in enumerate(["ts2", "ts3", "ts4"]):
+        schema_cache.update(timeseries_name, labels)
+        schema_cache.entries[timeseries_name][2] = pos
+    schema_cache.save()
+    assert sorted(schema_cache.entries.keys()) == ["ts3", "ts4"]
+
+    # corrupted files are ignored
+    with open(filename, "w") as cache_fd:
+        cache_fd.write("{")
+    schema_cache = SchemaCache(filename, 3600, 2)
+    schema_cache.load()
+    assert schema_cache.entries == {}
+
+
+def test_push_data_to_redistimeseries_schema_cache(tmp_path):
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        rts.flushall()
+        time_series_dict = {
+            "ts1": {"labels": {"metric": "rps"}, "data": {1000: 1.0}},
+        }
+        schema_cache = load_schema_cache(rts, tmp_path)
+        datapoint_errors, datapoint_inserts = push_data_to_redistimeseries(
+            rts, time_series_dict, schema_cache=schema_cache
+        )
+        assert (datapoint_errors, datapoint_inserts) == (0, 1)
+        assert schema_cache.misses == 1
+        assert os.path.exists(get_schema_cache_filename(rts, tmp_path))
+
+        schema_cache = load_schema_cache(rts, tmp_path)
+        time_series_dict["ts1"]["data"] = {1001: 2.0}
+        datapoint_errors, datapoint_inserts = push_data_to_redistimeseries(
+            rts, time_series_dict, schema_cache=schema_cache
+        )
+        assert (datapoint_errors, datapoint_inserts) == (0, 1)
+        assert schema_cache.hits == 1
+
+        # labels changed: the series is altered on the datasink
+        time_series_dict["ts1"]["labels"] = {"metric": "rps", "version": "1.0"}
+        push_data_to_redistimeseries(rts, time_series_dict, schema_cache=schema_cache)
+        assert rts.ts().info("ts1").labels == {"metric": "rps", "version": "1.0"}
+
+        # the series was removed while cached: it is recreated with its labels
+        rts.delete("ts1")
+        datapoint_errors, datapoint_inserts = push_data_to_redistimeseries(
+            rts, time_series_dict, schema_cache=schema_cache
+        )
+        assert (datapoint_errors, datapoint_inserts) == (0, 1)
+        assert rts.ts().info("ts1").labels == {"metric": "rps", "version": "1.0"}
+    except redis.exceptions.ConnectionError:
+        pass
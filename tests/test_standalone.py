@@ -10,6 +10,7 @@ from time import sleep
 
 import yaml
 
+from redisbench_admin.run.placement import get_placement_policy
 from redisbench_admin.run_remote.standalone import (
     spin_up_standalone_remote_redis,
     generate_remote_standalone_redis_cmd,
@@ -85,3 +86,14 @@ def test_generate_remote_standalone_redis_cmd():
         False,
     )
     assert initial_redis_cmd.endswith("m2.so")
+
+    # pinned to the server and io-threads cores, on NUMA node 1
+    placement_policy = get_placement_policy(
+        {"placement": {"server_cores": "0-1", "io_threads_cores": [2], "numa_node": 1}}
+    )
+    full_logfile, initial_redis_cmd = generate_remote_standalone_redis_cmd(
+        "log1", None, None, ".", {}, False, "yes", placement_policy
+    )
+    assert initial_redis_cmd.startswith(
+        "numactl --membind=1 --physcpubind=0-2 redis-server "
+    )
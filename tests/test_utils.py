@@ -1,8 +1,15 @@
+import subprocess
+import sys
+import time
 from unittest import TestCase
 
+import redis
+
 from redisbench_admin.utils.utils import (
     retrieve_local_or_remote_input_json,
     get_ts_metric_name,
+    wait_for_conn_ready,
+    wait_for_conns_ready,
 )
 
 
@@ -115,3 +122,32 @@ def test_get_ts_metric_name():
     ) == "ci.benchmarks.redislabs/by.branch/ci/redis/redis/test-1/{}/oss-standalone/unstable/rps/PING".format(
         build_variant_name
     )
+
+
+def test_wait_for_conn_ready():
+    try:
+        rts = redis.Redis(port=16379)
+        rts.ping()
+        assert wait_for_conn_ready(rts, 1) is True
+    except redis.exceptions.ConnectionError:
+        pass
+    # nothing listening: gives up on the timeout
+    conn = redis.Redis(port=1)
+    start = time.monotonic()
+    assert wait_for_conn_ready(conn, 0.2) is False
+    assert time.monotonic() - start < 1.0
+    # gives up as soon as the process exits, without waiting for the timeout
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    start = time.monotonic()
+    assert wait_for_conn_ready(conn, 10, process=process) is False
+    assert time.monotonic() - start < 1.0
+
+
+def test_wait_for_conns_ready():
+    assert wait_for_conns_ready([]) == []
+    conns = [redis.Redis(port=1) for _ in range(4)]
+    start = time.monotonic()
+    assert wait_for_conns_ready(conns, 0.3) == [False, False, False, False]
+    # checked in parallel
+    assert time.monotonic() - start < 1.0